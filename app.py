@@ -1,14 +1,61 @@
 """
 Główna aplikacja Streamlit z modularną strukturą stron
 """
+import time
+import uuid
 import streamlit as st
 import logging
 from src.config import Config
-from src.auth_service import AuthService
+from src.anomaly import AnomalyDetector, METRIC_RESPONSE_TIME, install_log_handler
+from src.auth_events import AuthEventStream
+from src.auth_service import AuthService, SESSION_QUERY_PARAM
+from src.cohorts import CohortStore
+from src.credential_store import CredentialStore
+from src.memory_snapshots import register_default_owners
+from src.metrics import MetricsServer, ActiveSessions, RERUN_DURATION
+from src.metrics_history import MetricsHistory, wall_now
+from src.metrics import install_log_handler as install_metrics_log_handler
+from src.payload import PayloadMeter
+from src.preferences import UserPreferences, SIDEBAR_STATES
+from src.router import Page, nav_button, current_page, render_page, count_run
 
 # Inicjalizacja konfiguracji i logowania
 Config.setup_logging()
 logger = logging.getLogger(__name__)
+# Wpisy WARNING/ERROR zasilają detektor anomalii (zapisane ustawienie powiadomień - raz na proces)
+install_log_handler()
+AnomalyDetector.load_settings()
+install_metrics_log_handler()
+
+# Kalibracja kosztu bcrypt (wykonywana raz na proces)
+AuthService.configure_bcrypt_cost()
+
+# Liczniki zdarzeń i szkice statystyk z dysku, start sygnałów życia (uptime)
+AuthEventStream.load()
+
+# Metryki Prometheus i sondy zdrowia na osobnym wątku (raz na proces)
+MetricsServer.register_check('config', Config.validate_config)
+MetricsServer.register_check('database', lambda: CredentialStore.connect().close())
+MetricsServer.start()
+
+# Bufory i cache raportowane w migawkach pamięci (narzędzia deweloperskie)
+register_default_owners()
+
+# Kohorty i statystyki użytkowników dopisywane w tle po zamknięciu tygodnia
+CohortStore.start()
+
+# Pliki historii metryk starsze niż METRICS_RETENTION_DAYS (raz dziennie)
+MetricsHistory.purge_daily()
+
+# Strony po zalogowaniu - funkcje stron wywoływane bezpośrednio przez router
+PAGES = {
+    page.key: page for page in [
+        Page('dashboard', "📊 Dashboard", 'pages.dashboard', 'show_dashboard_page'),
+        Page('data', "📈 Dane i Analizy", 'pages.data', 'show_data_page'),
+        Page('settings', "⚙️ Ustawienia", 'pages.settings', 'show_settings_page')
+    ]
+}
+DEFAULT_PAGE = 'dashboard'
 
 
 def init_session_state():
@@ -19,10 +66,27 @@ def init_session_state():
         st.session_state['username'] = None
     if 'login_time' not in st.session_state:
         st.session_state['login_time'] = None
+    if 'session_token' not in st.session_state:
+        st.session_state['session_token'] = None
 
 
-def show_navigation():
-    """Wyświetla nawigację aplikacji w sidebarze"""
+def restore_session():
+    """Wznawia sesję z kodu wznowienia w URL (np. po odświeżeniu przeglądarki)"""
+    if st.session_state.get('authenticated'):
+        return
+
+    code = st.query_params.get(SESSION_QUERY_PARAM)
+    if code:
+        AuthService.resume_from_restore_code(code)
+
+
+def show_navigation(current_key):
+    """
+    Wyświetla nawigację aplikacji w sidebarze
+
+    Args:
+        current_key: Klucz wyświetlanej strony (wyróżniony w menu)
+    """
     st.sidebar.markdown("## 🧭 Nawigacja")
 
     # Informacje o użytkowniku
@@ -38,24 +102,28 @@ def show_navigation():
 
         st.sidebar.markdown("---")
 
-        # Menu nawigacyjne
-        pages = {
-            "📊 Dashboard": "pages/dashboard.py",
-            "📈 Dane i Analizy": "pages/data.py",
-            "⚙️ Ustawienia": "pages/settings.py"
-        }
-
+        # Menu nawigacyjne - callback ustawia stronę przed przebiegiem wywołanym kliknięciem
         st.sidebar.markdown("### 📋 Strony")
-        for page_name, page_path in pages.items():
-            if st.sidebar.button(page_name, use_container_width=True):
-                st.switch_page(page_path)
+        for page in PAGES.values():
+            nav_button(
+                page.title,
+                page.key,
+                container=st.sidebar,
+                key=f"nav_{page.key}",
+                use_container_width=True,
+                type="primary" if page.key == current_key else "secondary"
+            )
 
         st.sidebar.markdown("---")
 
-        # Przycisk wylogowania
-        if st.sidebar.button("🚪 Wyloguj się", use_container_width=True, type="secondary"):
-            AuthService.logout_user()
-            st.rerun()
+        # Przycisk wylogowania - w tym samym przebiegu wyświetla się strona logowania
+        st.sidebar.button(
+            "🚪 Wyloguj się",
+            key="nav_logout",
+            use_container_width=True,
+            type="secondary",
+            on_click=AuthService.logout_user
+        )
 
         # Dodatkowe informacje
         st.sidebar.markdown("---")
@@ -66,33 +134,59 @@ def show_navigation():
 
 
 def show_main_app():
-    """Wyświetla główną aplikację po zalogowaniu"""
+    """Wyświetla główną aplikację po zalogowaniu - strona wybierana raz na przebieg"""
+    page = current_page(PAGES, DEFAULT_PAGE)
+
     # Nawigacja w sidebarze
-    show_navigation()
+    show_navigation(page.key)
 
-    # Domyślnie pokazuj dashboard
-    st.switch_page("pages/dashboard.py")
+    render_page(page)
 
 
 def show_login_page():
     """Wyświetla stronę logowania"""
     # Import tutaj, żeby uniknąć cyklicznych importów
     from pages.login import show_login_page
+    PayloadMeter.set_page('login')
     show_login_page()
 
 
 def main():
-    """Główna funkcja aplikacji"""
-    # Konfiguracja strony
+    """Główna funkcja aplikacji - czas i dane przebiegu skryptu trafiają do metryk i detektora anomalii"""
+    started = time.perf_counter()
+    count_run()
+    PayloadMeter.start_run()
+    try:
+        run_app()
+    finally:
+        elapsed = time.perf_counter() - started
+        session_id = st.session_state.setdefault('metrics_session_id', uuid.uuid4().hex)
+        RERUN_DURATION.observe(elapsed)
+        PayloadMeter.finish_run(session_id)
+        ActiveSessions.touch(session_id)
+        AnomalyDetector.observe_sample(METRIC_RESPONSE_TIME, elapsed * 1000)
+        try:
+            # Najdłuższy przebieg w interwale - wykres historii pokazuje maksimum
+            MetricsHistory.append('response_ms', wall_now(), elapsed * 1000, keep_max=True)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Nie zapisano czasu przebiegu w historii metryk: {e}")
+        AnomalyDetector.tick()
+
+
+def run_app():
+    """Konfiguracja strony, uwierzytelnienie i wyświetlenie aplikacji"""
+    # Konfiguracja strony - układ z preferencji, jeśli zostały już wczytane w tej sesji
+    prefs = st.session_state.get('preferences') or UserPreferences()
     st.set_page_config(
         page_title=Config.get_app_name(),
         page_icon="🚀",
-        layout="wide",
-        initial_sidebar_state="expanded"
+        layout="wide" if prefs.page_layout == "Szeroki" else "centered",
+        initial_sidebar_state=SIDEBAR_STATES.get(prefs.sidebar_state, "expanded")
     )
 
     # Inicjalizacja
     init_session_state()
+    restore_session()
 
     try:
         # Walidacja konfiguracji
@@ -0,0 +1,3 @@
+"""
+Inicjalizacja pakietu benchmarków
+"""
@@ -0,0 +1,77 @@
+"""
+Benchmark wykresów - budowa figury i serializacja: dotychczasowy kod (plotly express,
+moduł json) kontra src.charts (WebGL, gotowe szablony, orjson)
+
+Użycie:
+    python -m benchmarks.bench_charts [--points 1000 10000 100000] [--repeat 5]
+"""
+import argparse
+import sys
+import time
+from typing import Callable, List, Optional
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+from src.charts import line_chart, bar_chart, figure_json
+
+SERIES = ['CPU (%)', 'RAM (%)']
+
+
+def sample_data(points: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'Czas': pd.date_range('2025-07-01', periods=points, freq='min'),
+        **{column: rng.uniform(0, 100, points) for column in SERIES}
+    })
+
+
+def timed(func: Callable, repeat: int) -> float:
+    """Najlepszy czas wywołania w ms"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def bench(points: int, repeat: int) -> List[tuple]:
+    data = sample_data(points)
+    cases = [
+        ('line', lambda: px.line(data, x='Czas', y=SERIES), lambda: line_chart(data, x='Czas', y=SERIES)),
+        ('bar', lambda: px.bar(data, x='Czas', y=SERIES), lambda: bar_chart(data, x='Czas', y=SERIES))
+    ]
+    rows = []
+    for name, baseline, helper in cases:
+        old_figure, new_figure = baseline(), helper()
+        rows.append((
+            name,
+            points,
+            timed(baseline, repeat),
+            timed(helper, repeat),
+            timed(lambda: pio.to_json(old_figure, validate=False, engine='json'), repeat),
+            timed(lambda: figure_json(new_figure), repeat)
+        ))
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_charts', description=__doc__.splitlines()[1])
+    parser.add_argument('--points', type=int, nargs='+', default=[1000, 10000, 100000], help='Punkty na serię')
+    parser.add_argument('--repeat', type=int, default=5, help='Powtórzenia pomiaru')
+    args = parser.parse_args(argv)
+
+    print(f"{'wykres':<6} {'punkty':>8} | {'budowa [ms]':>21} | {'serializacja [ms]':>21}")
+    print(f"{'':<6} {'':>8} | {'przed':>10} {'po':>10} | {'przed':>10} {'po':>10}")
+    for points in args.points:
+        for name, count, old_build, new_build, old_json, new_json in bench(points, args.repeat):
+            print(
+                f"{name:<6} {count:>8,} | {old_build:>10.1f} {new_build:>10.1f} | "
+                f"{old_json:>10.1f} {new_json:>10.1f}"
+            )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
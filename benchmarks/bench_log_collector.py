@@ -0,0 +1,128 @@
+"""
+Benchmark zapisu logów przez wiele procesów - bezpośredni FileHandler na wspólnym pliku
+kontra kolektor na gnieździe lokalnym (src.log_collector)
+
+Użycie:
+    python -m benchmarks.bench_log_collector [--writers 8] [--records 20000] [--message-size 120]
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+import numpy as np
+from src.log_collector import LogCollector, CollectorHandler
+from src.log_store import parse_line
+
+FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+MODES = ('plik', 'kolektor')
+
+
+def writer(mode: str, socket_path: str, log_file: str, index: int, records: int,
+           message_size: int, start, results) -> None:
+    """Proces piszący: records wpisów, czas każdego wywołania loggera (µs)"""
+    if mode == 'kolektor':
+        handler = CollectorHandler(socket_path, log_file)
+    else:
+        handler = logging.FileHandler(log_file)
+    handler.setFormatter(logging.Formatter(FORMAT))
+    bench_logger = logging.getLogger(f'bench.writer{index}')
+    bench_logger.propagate = False
+    bench_logger.addHandler(handler)
+    bench_logger.setLevel(logging.INFO)
+
+    payload = 'x' * message_size
+    latencies = np.empty(records)
+    start.wait()
+    for i in range(records):
+        began = time.perf_counter()
+        bench_logger.info(f"{i} {payload}")
+        latencies[i] = time.perf_counter() - began
+    handler.close()
+    results.put(latencies * 1e6)
+
+
+def run(mode: str, writers: int, records: int, message_size: int) -> Dict[str, float]:
+    """
+    Jeden pomiar: writers procesów zapisuje po records wpisów
+
+    Returns:
+        Czas do zapisania wszystkich wpisów w pliku, przepustowość, percentyle
+        czasu wywołania loggera i liczba kompletnych linii w pliku
+    """
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, 'c.sock')
+        log_file = os.path.join(directory, 'app.log')
+        collector = None
+        if mode == 'kolektor':
+            collector = LogCollector(socket_path, log_file)
+            collector.start()
+
+        start = context.Event()
+        results = context.Queue()
+        processes = [
+            context.Process(
+                target=writer,
+                args=(mode, socket_path, log_file, n, records, message_size, start, results)
+            )
+            for n in range(writers)
+        ]
+        for process in processes:
+            process.start()
+        # Start po uruchomieniu wszystkich procesów (import interpretera nie wlicza się do pomiaru)
+        time.sleep(2.0)
+        began = time.perf_counter()
+        start.set()
+        latencies = np.concatenate([results.get() for _ in processes])
+        for process in processes:
+            process.join()
+        if collector is not None:
+            total = writers * records
+            while sum(s['records'] for s in collector.stats().values()) < total:
+                time.sleep(0.001)
+            collector.stop()
+        elapsed = time.perf_counter() - began
+
+        with open(log_file, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        intact = sum(1 for line in lines if parse_line(line) and line.endswith('x' * message_size))
+
+    return {
+        'elapsed': elapsed,
+        'throughput': writers * records / elapsed,
+        'p50': float(np.percentile(latencies, 50)),
+        'p99': float(np.percentile(latencies, 99)),
+        'max': float(latencies.max()),
+        'intact': intact,
+        'lines': len(lines)
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_log_collector', description=__doc__.splitlines()[1])
+    parser.add_argument('--writers', type=int, default=8, help='Procesy piszące')
+    parser.add_argument('--records', type=int, default=20000, help='Wpisy na proces')
+    parser.add_argument('--message-size', type=int, default=120, help='Długość wiadomości (znaki)')
+    args = parser.parse_args(argv)
+
+    print(f"{args.writers} procesów x {args.records:,} wpisów, wiadomość {args.message_size} znaków")
+    print(
+        f"{'tryb':<9} {'czas [s]':>9} {'wpisy/s':>10} | {'p50 [µs]':>9} {'p99 [µs]':>9} {'max [µs]':>10} | "
+        f"{'kompletne linie':>16}"
+    )
+    for mode in MODES:
+        result = run(mode, args.writers, args.records, args.message_size)
+        print(
+            f"{mode:<9} {result['elapsed']:>9.2f} {result['throughput']:>10,.0f} | "
+            f"{result['p50']:>9.1f} {result['p99']:>9.1f} {result['max']:>10.0f} | "
+            f"{result['intact']:>7,}/{args.writers * args.records:,}"
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Benchmark danych wysyłanych do przeglądarki - bajty przebiegu każdej strony aplikacji
+z danymi syntetycznymi, opcjonalnie z kontrolą budżetu stron
+
+Użycie:
+    python -m benchmarks.bench_payload [--sessions 20000] [--log-lines 20000]
+                                       [--budget data=256 ...] [--check]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from typing import Dict, List, Optional
+from unittest.mock import patch
+import bcrypt
+from streamlit.testing.v1 import AppTest
+from src import synthetic
+from src.payload import PayloadMeter, RerunPayload
+
+APP_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+PASSWORD = 'benchmark'
+
+# Budżet danych jednego przebiegu strony (kB)
+PAGE_BUDGETS_KB = {
+    'login': 8,
+    'dashboard': 32,
+    'data': 128,
+    'settings': 128
+}
+
+
+def environment(directory: str) -> Dict[str, str]:
+    """Konfiguracja aplikacji z danymi w katalogu tymczasowym"""
+    return {
+        'SECRET_KEY': 'benchmark-secret-key-' + 'x' * 16,
+        'DEBUG': 'True',
+        'METRICS_PORT': '0',
+        'BCRYPT_ROUNDS': '4',
+        'ADMIN_PASSWORD_HASH': bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(4)).decode(),
+        'DATABASE_FILE': os.path.join(directory, 'app.db'),
+        'LOG_DB_FILE': os.path.join(directory, 'logs.db'),
+        'LOG_FILE': os.path.join(directory, 'app.log'),
+        'SESSION_HISTORY_DIR': os.path.join(directory, 'sessions'),
+        'AUTH_EVENTS_FILE': os.path.join(directory, 'auth_events.jsonl'),
+        'PROFILE_DIR': os.path.join(directory, 'profiles')
+    }
+
+
+def measure_pages(sessions: int, log_lines: int, timeout: float = 120) -> Dict[str, RerunPayload]:
+    """
+    Przebieg każdej strony w AppTest na danych syntetycznych
+
+    Args:
+        sessions: Liczba syntetycznych sesji w historii
+        log_lines: Liczba syntetycznych linii logów
+        timeout: Limit czasu przebiegu (s)
+
+    Returns:
+        Dane ostatniego przebiegu każdej strony wg klucza strony
+    """
+    with tempfile.TemporaryDirectory() as directory, patch.dict(os.environ, environment(directory)):
+        args = ['--days', '7']
+        if sessions:
+            args += ['--sessions', str(sessions)]
+        if log_lines:
+            args += ['--log-lines', str(log_lines)]
+        if sessions or log_lines:
+            synthetic.main(args)
+
+        PayloadMeter.reset()
+        app = AppTest.from_file(APP_FILE, default_timeout=timeout)
+        app.run()
+        app.text_input(key='login_username').input('admin')
+        app.text_input(key='login_password').input(PASSWORD)
+        app.button[0].click().run()
+        for page in ('data', 'settings'):
+            app.button(key=f'nav_{page}').click().run()
+        if app.exception:
+            raise RuntimeError(f"Błąd strony: {app.exception[0].value}")
+
+        return {payload.page: payload for payload in PayloadMeter.reruns()}
+
+
+def over_budget(results: Dict[str, RerunPayload], budgets_kb: Dict[str, float]) -> List[str]:
+    """Strony, których przebieg przekracza budżet"""
+    return [
+        page for page, payload in results.items()
+        if page in budgets_kb and payload.bytes > budgets_kb[page] * 1024
+    ]
+
+
+def parse_budget(value: str) -> tuple:
+    page, _, limit = value.partition('=')
+    try:
+        return page, float(limit)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"oczekiwano strona=kB, otrzymano '{value}'")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_payload', description=__doc__.splitlines()[1])
+    parser.add_argument('--sessions', type=int, default=20000, help='Syntetyczne sesje w historii')
+    parser.add_argument('--log-lines', type=int, default=20000, help='Syntetyczne linie logów')
+    parser.add_argument('--budget', type=parse_budget, nargs='+', default=[],
+                        help='Budżet strony w kB, np. data=256 (nadpisuje domyślny)')
+    parser.add_argument('--check', action='store_true', help='Kod wyjścia 1 po przekroczeniu budżetu')
+    args = parser.parse_args(argv)
+
+    budgets = {**PAGE_BUDGETS_KB, **dict(args.budget)}
+    results = measure_pages(args.sessions, args.log_lines)
+    over = over_budget(results, budgets)
+
+    print(f"{'strona':<10} {'kB':>9} {'elementy':>9} {'budżet kB':>10}  największe typy elementów")
+    for page, payload in results.items():
+        top = sorted(payload.by_type.items(), key=lambda item: item[1], reverse=True)[:3]
+        print(
+            f"{page:<10} {payload.bytes / 1024:>9.1f} {payload.elements:>9} "
+            f"{budgets.get(page, float('nan')):>10.0f}{' !' if page in over else '  '} "
+            + ", ".join(f"{name} {size / 1024:.1f}" for name, size in top)
+        )
+
+    if over:
+        print(f"Przekroczony budżet: {', '.join(over)}")
+        if args.check:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
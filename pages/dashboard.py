@@ -1,12 +1,24 @@
 """
 Strona Dashboard - główny panel po zalogowaniu
 """
-import streamlit as st
 import time
-from datetime import datetime
+from datetime import date, timedelta
+import streamlit as st
+from src.auth_events import activity_series, app_uptime
 from src.auth_service import AuthService
+from src.charts import line_chart
+from src.preferences import get_session_preferences
+from src.profiler import RerunProfiler
+from src.router import nav_button
+
+
+def show_activity_chart(resolution, span):
+    """Wykres liczników zdarzeń logowania z ostatnich span sekund"""
+    now = time.time()
+    st.plotly_chart(line_chart(activity_series(resolution, now - span, now)), use_container_width=True)
 
 
+@RerunProfiler.page("dashboard")
 def show_dashboard_page():
     """Wyświetla stronę dashboard"""
     st.header("📊 Dashboard")
@@ -14,6 +26,7 @@ def show_dashboard_page():
 
     # Metryki użytkownika
     session_info = AuthService.get_session_info()
+    prefs = get_session_preferences()
 
     col1, col2, col3, col4 = st.columns(4)
 
@@ -22,7 +35,7 @@ def show_dashboard_page():
             "Aktywni użytkownicy",
             "1",
             "0",
-            help="Liczba aktualnie zalogowanych użytkowników"
+            help=prefs.tooltip("Liczba aktualnie zalogowanych użytkowników")
         )
 
     with col2:
@@ -32,7 +45,7 @@ def show_dashboard_page():
                 "Czas sesji",
                 f"{duration_minutes} min",
                 "aktywna",
-                help="Czas trwania aktualnej sesji"
+                help=prefs.tooltip("Czas trwania aktualnej sesji")
             )
 
     with col3:
@@ -41,15 +54,15 @@ def show_dashboard_page():
             st.metric(
                 "Pozostały czas",
                 f"{time_left_minutes} min",
-                help="Czas do automatycznego wylogowania"
+                help=prefs.tooltip("Czas do automatycznego wylogowania")
             )
 
     with col4:
+        uptime = app_uptime(date.today() - timedelta(days=30), date.today())
         st.metric(
             "Uptime aplikacji",
-            "100%",
-            "0%",
-            help="Dostępność aplikacji"
+            f"{uptime:.1%}" if uptime is not None else "—",
+            help=prefs.tooltip("Dostępność aplikacji w ostatnich 30 dniach (sygnały życia)")
         )
 
     st.markdown("---")
@@ -60,19 +73,24 @@ def show_dashboard_page():
     with col1:
         st.subheader("📈 Aktywność")
 
-        # Przykładowy wykres aktywności
-        import pandas as pd
-        import numpy as np
-
-        # Generuj przykładowe dane aktywności
-        dates = pd.date_range('2025-07-01', '2025-07-23', freq='D')
-        activity_data = pd.DataFrame({
-            'Data': dates,
-            'Logowania': np.random.randint(1, 10, len(dates)),
-            'Sesje': np.random.randint(1, 8, len(dates))
-        })
-
-        st.line_chart(activity_data.set_index('Data'))
+        # Zakres wykresu: (rozdzielczość liczników, długość zakresu w sekundach)
+        ranges = {
+            "Ostatnia godzina": ('minute', 3600),
+            "Ostatnia doba": ('hour', 86400),
+            "Ostatnie 30 dni": ('day', 30 * 86400)
+        }
+        selected = st.radio(
+            "Zakres",
+            list(ranges),
+            index=2,
+            horizontal=True,
+            label_visibility="collapsed",
+            help=prefs.tooltip("Liczniki zdarzeń logowania aktualizowane na bieżąco")
+        )
+        resolution, span = ranges[selected]
+        # Automatyczne odświeżanie przelicza tylko wykres, bez przebiegu całej strony
+        run_every = prefs.refresh_interval if prefs.auto_refresh else None
+        st.fragment(show_activity_chart, run_every=run_every)(resolution, span)
 
     with col2:
         st.subheader("ℹ️ Informacje o sesji")
@@ -80,8 +98,8 @@ def show_dashboard_page():
         if session_info:
             st.write(f"**Użytkownik:** {session_info['username']}")
 
-            login_time = datetime.fromtimestamp(session_info['login_time'])
-            st.write(f"**Zalogowano:** {login_time.strftime('%H:%M:%S')}")
+            login_time = prefs.format_timestamp(session_info['login_time'], with_date=False)
+            st.write(f"**Zalogowano:** {login_time}")
 
             st.write(f"**Czas sesji:** {int(session_info['session_duration'])}s")
             st.write(f"**Pozostały czas:** {int(session_info['time_left'])}s")
@@ -97,19 +115,15 @@ def show_dashboard_page():
 
     col1, col2, col3, col4 = st.columns(4)
 
+    # Kliknięcie samo wywołuje przebieg skryptu - przejścia i wylogowanie przez callbacki
     with col1:
-        if st.button("🔄 Odśwież dashboard", use_container_width=True):
-            st.rerun()
+        st.button("🔄 Odśwież dashboard", use_container_width=True)
 
     with col2:
-        if st.button("📊 Przejdź do danych", use_container_width=True):
-            st.switch_page("pages/data.py")
+        nav_button("📊 Przejdź do danych", 'data', use_container_width=True)
 
     with col3:
-        if st.button("⚙️ Ustawienia", use_container_width=True):
-            st.switch_page("pages/settings.py")
+        nav_button("⚙️ Ustawienia", 'settings', use_container_width=True)
 
     with col4:
-        if st.button("🚪 Wyloguj się", use_container_width=True, type="secondary"):
-            AuthService.logout_user()
-            st.rerun()
+        st.button("🚪 Wyloguj się", use_container_width=True, type="secondary", on_click=AuthService.logout_user)
@@ -1,19 +1,132 @@
 """
 Strona Dane - analiza i wizualizacja danych
 """
+import logging
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
-import plotly.express as px
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from src.anomaly import AnomalyDetector
+from src.auth_events import activity_series, usage_summary
+from src.cohorts import CohortStore
+from src.config import Config
+from src.charts import line_chart, area_chart, bar_chart, heatmap_chart
+from src.preferences import get_session_preferences
+from src.profiler import RerunProfiler
+from src.log_store import LogStore, LOG_LEVELS
+from src.metrics_history import MetricsHistory, wall_seconds
+from src.paginated_table import show_paginated_table
+from src.session_history import SessionHistory, LoginHeatmap, GROUP_ADMINS, GROUP_USERS
+
+logger = logging.getLogger(__name__)
+
+# Wiersze mapy logowań (dzień tygodnia od poniedziałku)
+WEEKDAYS = ['Pon', 'Wt', 'Śr', 'Czw', 'Pt', 'Sob', 'Nd']
+# Metryki historii metryk -> nazwy kolumn wykresów i tabeli
+SYSTEM_METRICS = {'cpu_percent': 'CPU (%)', 'ram_percent': 'RAM (%)', 'response_ms': 'Odpowiedź (ms)'}
+
+
+def _range_start(date_range):
+    """Początek wybranego zakresu dat (epoch) lub None"""
+    if not date_range:
+        return None
+    return datetime.combine(date_range[0], datetime.min.time()).timestamp()
+
+
+def _range_end(date_range):
+    """Koniec wybranego zakresu dat (epoch, rozłącznie) lub None"""
+    if len(date_range) < 2:
+        return None
+    return datetime.combine(date_range[1] + timedelta(days=1), datetime.min.time()).timestamp()
+
+
+def _metrics_window(date_range):
+    """Zakres dat jako okno historii metryk (czas ścienny, s) - domyślnie ostatnie 30 dni"""
+    last_day = date_range[1] if len(date_range) > 1 else date.today()
+    first_day = date_range[0] if date_range else last_day - timedelta(days=30)
+    return wall_seconds(first_day), wall_seconds(last_day + timedelta(days=1))
+
+
+def _format_duration(seconds):
+    """Czas trwania w postaci '42 min' lub '3h 25min'"""
+    if seconds is None:
+        return "—"
+    minutes = int(round(seconds / 60))
+    if minutes < 60:
+        return f"{minutes} min"
+    return f"{minutes // 60}h {minutes % 60}min"
+
+
+def _toggle_error_alerts():
+    """Włącza lub wyłącza powiadomienia o anomaliach dla całej aplikacji"""
+    AnomalyDetector.set_notifications(st.session_state['error_alerts'])
+    logger.info(f"Użytkownik {st.session_state.get('username')} zmienił powiadomienia o anomaliach")
+
+
+def show_active_alerts(prefs):
+    """Wyświetla aktywne alerty o anomaliach ze stanu detektora"""
+    alerts = AnomalyDetector.active_alerts()
+    if not alerts:
+        st.caption("✅ Brak aktywnych alertów")
+        return
+
+    for alert in alerts:
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.warning(
+                f"**{alert.label}:** {alert.value:.1f} (baza {alert.baseline:.1f}, "
+                f"{alert.method} {alert.score:.1f}) · wykryto {alert.count}× · "
+                f"ostatnio {prefs.format_timestamp(alert.last_seen, with_date=False)}"
+            )
+        with col2:
+            st.button(
+                "Potwierdź",
+                key=f"ack_{alert.metric}",
+                on_click=AnomalyDetector.acknowledge,
+                args=(alert.metric,),
+                use_container_width=True
+            )
+
+
+def show_session_history(date_range, prefs, group=None, min_duration_s=0):
+    """Wyświetla sesje z historii spełniające filtry zaawansowane"""
+    st.markdown("#### 🕒 Historia sesji")
+
+    sessions = SessionHistory.query(
+        since=date_range[0] if date_range else None,
+        until=date_range[1] if len(date_range) > 1 else None,
+        group=group,
+        min_duration_s=min_duration_s,
+        columns=['username', 'login_time', 'duration_s', 'end_reason']
+    ).to_pandas()
+
+    if sessions.empty:
+        st.info("Brak sesji spełniających filtry")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Liczba sesji", len(sessions))
+    col2.metric("Średni czas sesji", f"{sessions['duration_s'].mean() / 60:.0f} min")
+    col3.metric("Najdłuższa sesja", f"{sessions['duration_s'].max() / 60:.0f} min")
+
+    latest = sessions.nlargest(prefs.items_per_page, 'login_time')
+    latest = latest.assign(duration_s=(latest['duration_s'] / 60).round(1)).rename(columns={
+        'username': 'Użytkownik',
+        'login_time': 'Zalogowano',
+        'duration_s': 'Czas sesji (min)',
+        'end_reason': 'Zakończenie'
+    })
+    st.dataframe(latest, use_container_width=True, hide_index=True)
 
 
+@RerunProfiler.page("data")
 def show_data_page():
     """Wyświetla stronę z danymi i analizami"""
     st.header("📈 Analiza danych")
     st.write("Strona do analizy i wizualizacji danych aplikacji.")
 
+    prefs = get_session_preferences()
+
     # Sidebar z opcjami filtrowania
     st.sidebar.markdown("### 🔍 Filtry danych")
 
@@ -21,14 +134,19 @@ def show_data_page():
     date_range = st.sidebar.date_input(
         "Zakres dat",
         value=[datetime.now() - timedelta(days=30), datetime.now()],
-        help="Wybierz zakres dat do analizy"
+        help=prefs.tooltip("Wybierz zakres dat do analizy")
     )
 
+    # Nowe wpisy z pliku logów trafiają do indeksowanej bazy co kilka sekund -
+    # raz na przebieg, wersja danych wspólna dla tabeli logów i wyszukiwania
+    LogStore.sync(min_interval=5)
+    log_version = LogStore.version()
+
     # Wybór typu danych
     data_type = st.sidebar.selectbox(
         "Typ danych",
         ["Aktywność użytkowników", "Wydajność systemu", "Logi aplikacji"],
-        help="Wybierz typ danych do wyświetlenia"
+        help=prefs.tooltip("Wybierz typ danych do wyświetlenia")
     )
 
     # Tabs dla różnych analiz
@@ -57,41 +175,56 @@ def show_data_page():
 
             with col1:
                 st.markdown("#### 👥 Logowania dzienne")
-                fig = px.bar(data, x='Data', y='Logowania',
-                           title="Liczba logowań dziennie")
+                until = _range_end(date_range) or datetime.now().timestamp()
+                since = _range_start(date_range) or until - 30 * 86400
+                logins = activity_series('day', since, until - 1).reset_index()
+                fig = bar_chart(logins, x='Czas', y=['Logowania', 'Nieudane logowania'],
+                                title="Liczba logowań dziennie")
                 st.plotly_chart(fig, use_container_width=True)
 
             with col2:
                 st.markdown("#### ⏱️ Średni czas sesji")
-                fig = px.line(data, x='Data', y='Czas sesji (min)',
-                            title="Średni czas sesji (minuty)")
+                fig = line_chart(data, x='Data', y='Czas sesji (min)',
+                                 title="Średni czas sesji (minuty)")
                 st.plotly_chart(fig, use_container_width=True)
 
-        elif data_type == "Wydajność systemu":
-            data = pd.DataFrame({
-                'Czas': pd.date_range('2025-07-23 00:00', '2025-07-23 23:59', freq='H'),
-                'CPU (%)': np.random.randint(10, 80, 24),
-                'RAM (%)': np.random.randint(20, 70, 24),
-                'Odpowiedź (ms)': np.random.randint(50, 300, 24)
-            })
-
-            col1, col2 = st.columns(2)
-
-            with col1:
-                st.markdown("#### 💻 Wykorzystanie zasobów")
-                fig = go.Figure()
-                fig.add_trace(go.Scatter(x=data['Czas'], y=data['CPU (%)'],
-                                       name='CPU', line=dict(color='red')))
-                fig.add_trace(go.Scatter(x=data['Czas'], y=data['RAM (%)'],
-                                       name='RAM', line=dict(color='blue')))
-                fig.update_layout(title="Wykorzystanie CPU i RAM", yaxis_title="Procent (%)")
+            st.markdown("#### 🗓️ Logowania wg dnia tygodnia i godziny")
+            heatmap = LoginHeatmap.counts(
+                since=date_range[0] if date_range else None,
+                until=date_range[1] if len(date_range) > 1 else None
+            )
+            if heatmap.any():
+                fig = heatmap_chart(heatmap, x=[f"{hour:02d}:00" for hour in range(24)], y=WEEKDAYS,
+                                    title="Liczba logowań wg dnia tygodnia i godziny", value_label="Logowania")
                 st.plotly_chart(fig, use_container_width=True)
+            else:
+                st.info("Brak zapisanych sesji w wybranym zakresie dat")
 
-            with col2:
-                st.markdown("#### ⚡ Czas odpowiedzi")
-                fig = px.area(data, x='Czas', y='Odpowiedź (ms)',
-                            title="Czas odpowiedzi aplikacji")
-                st.plotly_chart(fig, use_container_width=True)
+        elif data_type == "Wydajność systemu":
+            # Okno czytane z plików dni w zakresie - najwyżej MAX_POINTS punktów na wykres
+            since, until = _metrics_window(date_range)
+            data = MetricsHistory.window(
+                list(SYSTEM_METRICS), since, until, agg={'response_ms': 'max'}
+            ).rename(columns=SYSTEM_METRICS)
+
+            if data.empty:
+                st.info("Brak historii metryk w wybranym zakresie dat")
+            else:
+                col1, col2 = st.columns(2)
+
+                with col1:
+                    st.markdown("#### 💻 Wykorzystanie zasobów")
+                    fig = line_chart(data, x='Czas', y=['CPU (%)', 'RAM (%)'],
+                                     title="Wykorzystanie CPU i RAM", y_title="Procent (%)",
+                                     labels={'CPU (%)': 'CPU', 'RAM (%)': 'RAM'},
+                                     colors=['red', 'blue'])
+                    st.plotly_chart(fig, use_container_width=True)
+
+                with col2:
+                    st.markdown("#### ⚡ Czas odpowiedzi")
+                    fig = area_chart(data, x='Czas', y='Odpowiedź (ms)',
+                                     title="Czas odpowiedzi aplikacji (maksimum w przedziale)")
+                    st.plotly_chart(fig, use_container_width=True)
 
         else:  # Logi aplikacji
             # Wykresy logów
@@ -103,60 +236,69 @@ def show_data_page():
             })
 
             st.markdown("#### 📝 Logi aplikacji wg poziomu")
-            fig = px.bar(log_data, x='Godzina', y=['INFO', 'WARNING', 'ERROR'],
-                        title="Liczba logów wg poziomu i godziny")
+            fig = bar_chart(log_data, x='Godzina', y=['INFO', 'WARNING', 'ERROR'],
+                            title="Liczba logów wg poziomu i godziny")
             st.plotly_chart(fig, use_container_width=True)
 
     with tab2:
         st.subheader("Tabele danych")
 
         if data_type == "Aktywność użytkowników":
-            st.markdown("#### 👥 Szczegóły aktywności użytkowników")
-            user_data = pd.DataFrame({
-                'Użytkownik': ['admin', 'user1', 'user2', 'user3'],
-                'Ostatnie logowanie': [
-                    '2025-07-23 14:30:00',
-                    '2025-07-23 12:15:00',
-                    '2025-07-22 16:45:00',
-                    '2025-07-21 09:20:00'
-                ],
-                'Liczba sesji': [25, 18, 12, 8],
-                'Średni czas sesji (min)': [45, 32, 28, 52],
-                'Status': ['Aktywny', 'Nieaktywny', 'Nieaktywny', 'Nieaktywny']
-            })
-            st.dataframe(user_data, use_container_width=True)
+            # Wyniki materializowane w tle po zamknięciu tygodnia - bez przeliczania tutaj
+            if CohortStore.version() == 0:
+                st.info("Kohorty i statystyki użytkowników pojawią się po przetworzeniu pierwszego zamkniętego tygodnia")
+            else:
+                st.markdown("#### 📅 Retencja kohort tygodniowych")
+                st.caption("Odsetek użytkowników kohorty (tydzień pierwszego logowania) aktywnych N tygodni później")
+                st.dataframe(CohortStore.retention_matrix(), use_container_width=True)
+
+                st.markdown("#### 👥 Statystyki sesji użytkowników")
+                st.caption("Wszystkie konta, sesje do końca poprzedniego tygodnia")
+                show_paginated_table(
+                    "user_stats_table",
+                    CohortStore.fetch_users_page,
+                    page_size=prefs.items_per_page,
+                    version=CohortStore.version()
+                )
 
         elif data_type == "Wydajność systemu":
             st.markdown("#### 💻 Metryki systemu")
-            system_data = pd.DataFrame({
-                'Metryka': ['CPU średnie', 'RAM średnie', 'Dysk wolne', 'Połączenia'],
-                'Wartość': ['45%', '62%', '25 GB', '128'],
-                'Status': ['OK', 'Ostrzeżenie', 'OK', 'OK'],
-                'Limit': ['80%', '85%', '5 GB', '1000']
-            })
-            st.dataframe(system_data, use_container_width=True)
+            since, until = _metrics_window(date_range)
+            rows = []
+            for metric, label in SYSTEM_METRICS.items():
+                stats = MetricsHistory.stats(metric, since, until)
+                rows.append({
+                    'Metryka': label,
+                    'Średnia': round(stats['mean'], 1),
+                    'Maksimum': round(stats['max'], 1),
+                    'Próbki': stats['samples']
+                })
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
 
         else:
             st.markdown("#### 📝 Ostatnie logi")
-            log_entries = pd.DataFrame({
-                'Czas': [
-                    '2025-07-23 14:35:22',
-                    '2025-07-23 14:34:15',
-                    '2025-07-23 14:33:08',
-                    '2025-07-23 14:32:45',
-                    '2025-07-23 14:31:30'
-                ],
-                'Poziom': ['INFO', 'INFO', 'WARNING', 'INFO', 'ERROR'],
-                'Moduł': ['auth_service', 'config', 'auth_service', 'app', 'database'],
-                'Wiadomość': [
-                    'Pomyślne logowanie użytkownika: admin',
-                    'Konfiguracja załadowana pomyślnie',
-                    'Próba logowania z nieprawidłowym hasłem',
-                    'Aplikacja uruchomiona pomyślnie',
-                    'Błąd połączenia z bazą danych'
-                ]
-            })
-            st.dataframe(log_entries, use_container_width=True)
+
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                table_levels = st.multiselect(
+                    "Poziom", LOG_LEVELS, [], key="log_table_levels",
+                    placeholder="Wszystkie poziomy"
+                )
+            with col2:
+                table_order = st.selectbox(
+                    "Kolejność", ["Najnowsze", "Najstarsze"], key="log_table_order"
+                )
+
+            show_paginated_table(
+                "log_table",
+                LogStore.fetch_page,
+                page_size=prefs.items_per_page,
+                version=log_version,
+                levels=table_levels,
+                since=_range_start(date_range),
+                until=_range_end(date_range),
+                descending=table_order == "Najnowsze"
+            )
 
     with tab3:
         st.subheader("Szczegółowe informacje")
@@ -165,13 +307,19 @@ def show_data_page():
 
         with col1:
             st.markdown("#### 📊 Statystyki ogólne")
+            first_day = date_range[0] if date_range else date.today() - timedelta(days=30)
+            last_day = date_range[1] if len(date_range) > 1 else date.today()
+            summary = usage_summary(first_day, last_day)
             stats = {
-                "Całkowita liczba logowań": "1,247",
-                "Średni czas sesji": "42 min",
-                "Najdłuższa sesja": "3h 25min",
-                "Najczęstszy użytkownik": "admin",
-                "Błędy w tym miesiącu": "3",
-                "Uptime aplikacji": "99.8%"
+                "Całkowita liczba logowań": f"{summary['logins']:,}",
+                "Unikalni użytkownicy": f"~{summary['distinct_users']:,}",
+                "Mediana czasu sesji": _format_duration(summary['median_session_s']),
+                "Najdłuższa sesja": _format_duration(summary['max_session_s']),
+                "Najczęstszy użytkownik": summary['top_user'] or "—",
+                "Nieudane logowania": f"{summary['failures']:,}",
+                "Uptime aplikacji": (
+                    f"{summary['uptime']:.1%}" if summary['uptime'] is not None else "—"
+                )
             }
 
             for key, value in stats.items():
@@ -181,13 +329,49 @@ def show_data_page():
             st.markdown("#### 🔍 Filtry zaawansowane")
 
             # Dodatkowe opcje filtrowania
-            st.selectbox("Grupa użytkowników", ["Wszyscy", "Administratorzy", "Użytkownicy"])
-            st.slider("Minimalny czas sesji (min)", 0, 180, 5)
-            st.multiselect("Poziomy logów", ["DEBUG", "INFO", "WARNING", "ERROR"], ["INFO", "WARNING", "ERROR"])
+            user_group = st.selectbox("Grupa użytkowników", ["Wszyscy", GROUP_ADMINS, GROUP_USERS])
+            min_session = st.slider("Minimalny czas sesji (min)", 0, 180, 5)
+            log_levels = st.multiselect(
+                "Poziomy logów", LOG_LEVELS, ["INFO", "WARNING", "ERROR"]
+            )
 
             if st.button("Zastosuj filtry", use_container_width=True):
+                st.session_state['session_filters'] = {
+                    'group': None if user_group == "Wszyscy" else user_group,
+                    'min_duration_s': min_session * 60
+                }
                 st.success("Filtry zastosowane!")
 
+        if 'session_filters' in st.session_state:
+            show_session_history(date_range, prefs, **st.session_state['session_filters'])
+
+        st.markdown("#### 🔎 Wyszukiwanie w logach")
+
+        col1, col2, col3 = st.columns([3, 1, 1])
+        with col1:
+            search_text = st.text_input(
+                "Szukaj w wiadomościach",
+                placeholder="np. logowanie admin, błąd połącz*",
+                help=prefs.tooltip("Wszystkie słowa muszą wystąpić; * na końcu słowa dopasowuje prefiks")
+            )
+        with col2:
+            search_module = st.selectbox("Moduł", ["Wszystkie"] + LogStore.modules(log_version))
+        with col3:
+            search_order = st.selectbox("Sortuj", ["Trafność", "Najnowsze"])
+
+        if search_text:
+            results = LogStore.search(
+                search_text,
+                levels=log_levels,
+                module=None if search_module == "Wszystkie" else search_module,
+                since=_range_start(date_range),
+                until=_range_end(date_range),
+                order="rank" if search_order == "Trafność" else "time",
+                limit=prefs.items_per_page
+            )
+            st.caption(f"Znaleziono {results.num_rows} wpisów (limit {prefs.items_per_page})")
+            st.dataframe(results, use_container_width=True, hide_index=True)
+
     with tab4:
         st.subheader("Eksport danych")
 
@@ -220,7 +404,19 @@ def show_data_page():
 
             st.checkbox("Dzienny raport email", value=False)
             st.checkbox("Tygodniowy raport PDF", value=False)
-            st.checkbox("Alerty o błędach", value=True)
+            # Powiadomienia dotyczą całej aplikacji - przełącznik tylko dla administratora
+            if st.session_state.get('username') == Config.get_admin_user():
+                st.checkbox(
+                    "Alerty o błędach (cała aplikacja)",
+                    value=AnomalyDetector.load_settings(),
+                    key="error_alerts",
+                    on_change=_toggle_error_alerts,
+                    help=prefs.tooltip(
+                        "Powiadomienia o nietypowym wzroście błędów w logach i czasu odpowiedzi "
+                        "- ustawienie wspólne dla wszystkich użytkowników"
+                    )
+                )
+            show_active_alerts(prefs)
 
             st.time_input("Godzina wysyłki", value=None)
             st.text_input("Email odbiorcy", placeholder="admin@example.com")
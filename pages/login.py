@@ -4,6 +4,31 @@ Strona logowania - formularz uwierzytelniania
 import streamlit as st
 from src.config import Config
 from src.auth_service import AuthService
+from src.router import PAGE_STATE_KEY
+
+# Komunikat błędu logowania przekazywany z callbacku do przebiegu strony
+LOGIN_ERROR_KEY = 'login_error'
+
+
+def submit_login():
+    """
+    Callback formularza logowania - wykonywany przed przebiegiem skryptu
+
+    Po udanym logowaniu ten sam przebieg wyświetla już aplikację (bez st.rerun).
+    """
+    username = st.session_state.get('login_username', '')
+    password = st.session_state.get('login_password', '')
+    st.session_state[LOGIN_ERROR_KEY] = None
+
+    if not username or not password:
+        st.session_state[LOGIN_ERROR_KEY] = "Wprowadź nazwę użytkownika i hasło"
+    elif AuthService.authenticate_user(username, password):
+        AuthService.login_user(username)
+        # Hasło nie zostaje w stanie sesji, po zalogowaniu wyświetla się strona domyślna
+        st.session_state['login_password'] = ''
+        st.session_state.pop(PAGE_STATE_KEY, None)
+    else:
+        st.session_state[LOGIN_ERROR_KEY] = "Nieprawidłowa nazwa użytkownika lub hasło"
 
 
 def show_login_page():
@@ -17,32 +42,28 @@ def show_login_page():
         with st.form("login_form"):
             st.markdown("### Zaloguj się do aplikacji")
 
-            username = st.text_input(
+            st.text_input(
                 "Nazwa użytkownika",
-                placeholder="Wprowadź nazwę użytkownika"
+                placeholder="Wprowadź nazwę użytkownika",
+                key="login_username"
             )
-            password = st.text_input(
+            st.text_input(
                 "Hasło",
                 type="password",
-                placeholder="Wprowadź hasło"
+                placeholder="Wprowadź hasło",
+                key="login_password"
             )
 
-            submitted = st.form_submit_button(
+            st.form_submit_button(
                 "Zaloguj się",
                 use_container_width=True,
-                type="primary"
+                type="primary",
+                on_click=submit_login
             )
 
-            if submitted:
-                if username and password:
-                    if AuthService.authenticate_user(username, password):
-                        AuthService.login_user(username)
-                        st.success("Pomyślnie zalogowano!")
-                        st.rerun()
-                    else:
-                        st.error("Nieprawidłowa nazwa użytkownika lub hasło")
-                else:
-                    st.error("Wprowadź nazwę użytkownika i hasło")
+        error = st.session_state.pop(LOGIN_ERROR_KEY, None)
+        if error:
+            st.error(error)
 
     # Informacje dla developera
     if Config.get_debug():
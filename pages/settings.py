@@ -2,31 +2,344 @@
 Strona Ustawień - konfiguracja aplikacji i użytkownika
 """
 import streamlit as st
+import uuid
 import logging
+import pandas as pd
+from datetime import datetime
+from dataclasses import replace
 from src.config import Config
 from src.auth_service import AuthService
+from src.charts import flame_chart, line_chart
+from src.log_tail import LogTailer
+from src.memory_snapshots import MemorySnapshots, to_json
+from src.payload import PayloadMeter
+from src.profiler import RerunProfiler, MODE_LABELS, flame_nodes
+from src.router import nav_button, run_count
+from src.preferences import (
+    get_session_preferences, save_session_preferences, SIDEBAR_STATES, DATE_FORMATS, TIME_FORMATS
+)
 
 logger = logging.getLogger(__name__)
 
+# Liczba linii logów wyświetlanych w podglądzie na żywo
+LOG_TAIL_LINES = 200
 
+# Strony, których przebiegi można profilować (nazwy z dekoratora RerunProfiler.page)
+PROFILED_PAGES = {
+    "Dowolna strona": None,
+    "📊 Dashboard": "dashboard",
+    "📈 Dane i Analizy": "data",
+    "⚙️ Ustawienia": "settings"
+}
+
+
+def _is_admin():
+    """Czy zalogowany użytkownik jest administratorem aplikacji"""
+    return st.session_state.get('username') == Config.get_admin_user()
+
+
+def _option_index(options, value):
+    """Indeks zapisanej wartości na liście opcji (0 gdy wartość jest nieznana)"""
+    return options.index(value) if value in options else 0
+
+
+def show_log_tail():
+    """Podgląd końcówki logów ze wspólnego bufora - przy odświeżeniu tylko nowe linie"""
+    lines, seq = LogTailer.read(st.session_state.get('log_tail_seq', 0), limit=LOG_TAIL_LINES)
+    shown = (st.session_state.get('log_tail_lines', []) + lines)[-LOG_TAIL_LINES:]
+    st.session_state['log_tail_seq'] = seq
+    st.session_state['log_tail_lines'] = shown
+
+    st.code("\n".join(shown) if shown else "Brak wpisów w logach")
+    st.button("🔄 Odśwież logi", use_container_width=True)
+
+
+def show_profiler():
+    """Uzbrajanie profilowania kolejnych przebiegów i przegląd zapisanych profili"""
+    # Profile obejmują przebiegi sesji innych użytkowników
+    if not _is_admin():
+        return
+    with st.form("profiler_form"):
+        col1, col2 = st.columns(2)
+        with col1:
+            page_label = st.selectbox("Strona", list(PROFILED_PAGES))
+            scope = st.radio("Sesje", ["Tylko ta sesja", "Wszystkie sesje"], horizontal=True)
+        with col2:
+            runs = st.number_input("Liczba przebiegów", min_value=1, max_value=20, value=3)
+            modes = list(MODE_LABELS)
+            mode = st.selectbox("Profiler", modes, format_func=MODE_LABELS.get)
+
+        if st.form_submit_button("🎯 Uzbrój profilowanie", use_container_width=True):
+            session_id = None
+            if scope == "Tylko ta sesja":
+                session_id = st.session_state.setdefault('metrics_session_id', uuid.uuid4().hex)
+            RerunProfiler.arm(int(runs), PROFILED_PAGES[page_label], session_id, mode)
+
+    armed = RerunProfiler.armed()
+    if armed:
+        pending = ", ".join(
+            f"{request.page or 'dowolna strona'}: {request.runs}" for request in armed
+        )
+        st.info(f"⏳ Oczekujące przebiegi - {pending}")
+        st.button("✖️ Anuluj profilowanie", use_container_width=True, on_click=RerunProfiler.disarm)
+
+    capture_ids = RerunProfiler.captures()
+    if not capture_ids:
+        st.caption("Brak zapisanych profili")
+        return
+
+    capture = RerunProfiler.load(st.selectbox("Profil", capture_ids))
+    if capture is None:
+        st.warning("Profil został usunięty")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Strona", capture.page)
+    col2.metric("Czas przebiegu", f"{capture.duration * 1000:.0f} ms")
+    col3.metric("Profiler", MODE_LABELS.get(capture.mode, capture.mode).split(" ")[0])
+
+    top = pd.DataFrame(capture.top).rename(columns={
+        'function': 'Funkcja', 'calls': 'Wywołania', 'self_s': 'Czas własny (s)', 'total_s': 'Czas całkowity (s)'
+    })
+    st.dataframe(top, use_container_width=True, hide_index=True)
+
+    nodes = flame_nodes({tuple(stack): value for stack, value in capture.stacks})
+    if nodes['ids']:
+        st.plotly_chart(flame_chart(nodes, title="Rozkład czasu wywołań"), use_container_width=True)
+
+    st.button("🗑️ Usuń zapisane profile", use_container_width=True, on_click=RerunProfiler.clear)
+
+
+def _megabytes(size, signed=False):
+    return f"{size / 2 ** 20:{'+' if signed else ''}.1f} MB"
+
+
+def _snapshot_label(snapshot):
+    return f"{snapshot.label} ({datetime.fromtimestamp(snapshot.timestamp):%H:%M:%S})"
+
+
+def _size_table(rows, columns):
+    """Tabela z rozmiarami w MB zamiast bajtów"""
+    table = pd.DataFrame(rows)
+    for column in columns:
+        if column in table:
+            table[column] = (table[column] / 2 ** 20).round(3)
+    return table
+
+
+def show_memory_tools():
+    """Migawki pamięci, porównanie dwóch migawek i rozmiary stanów sesji"""
+    # Migawki obejmują stany sesji innych użytkowników
+    if not _is_admin():
+        return
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("📸 Wykonaj migawkę pamięci", use_container_width=True):
+            MemorySnapshots.take()
+    with col2:
+        if MemorySnapshots.is_tracing():
+            st.button("⏹️ Wyłącz śledzenie alokacji", use_container_width=True, on_click=MemorySnapshots.stop)
+
+    snapshots = MemorySnapshots.snapshots()
+    if not snapshots:
+        st.caption("Brak migawek - pierwsza migawka włącza śledzenie alokacji (tracemalloc)")
+        return
+
+    latest = snapshots[-1]
+    col1, col2 = st.columns(2)
+    col1.metric("RSS procesu", _megabytes(latest.rss))
+    col2.metric("Pamięć śledzona", _megabytes(latest.traced))
+
+    if latest.sessions:
+        st.markdown("**Stany sesji** (MB)")
+        sessions = _size_table([
+            {'Sesja': row['session_id'][:8], 'Użytkownik': row['username'], 'size': row['size'],
+             'Największe klucze': ", ".join(row['top_keys'])}
+            for row in latest.sessions
+        ], ['size']).rename(columns={'size': 'Rozmiar (MB)'})
+        st.dataframe(sessions, use_container_width=True, hide_index=True)
+
+    if len(snapshots) < 2:
+        st.caption("Wykonaj drugą migawkę, aby porównać przyrost pamięci")
+        st.download_button(
+            "💾 Eksport migawki (JSON)", to_json(latest.to_dict()),
+            file_name=f"memory-snapshot-{latest.id}.json", mime="application/json"
+        )
+        return
+
+    by_id = {snapshot.id: snapshot for snapshot in snapshots}
+    ids = list(by_id)
+    col1, col2 = st.columns(2)
+    with col1:
+        old_id = st.selectbox("Migawka bazowa", ids, index=len(ids) - 2,
+                              format_func=lambda i: _snapshot_label(by_id[i]))
+    with col2:
+        new_id = st.selectbox("Porównaj z", ids, index=len(ids) - 1,
+                              format_func=lambda i: _snapshot_label(by_id[i]))
+
+    diff = MemorySnapshots.diff(by_id[old_id], by_id[new_id])
+    col1, col2 = st.columns(2)
+    col1.metric("Przyrost RSS", _megabytes(diff['rss_diff'], signed=True))
+    col2.metric("Przyrost pamięci śledzonej", _megabytes(diff['traced_diff'], signed=True))
+
+    st.markdown("**Miejsca alokacji** (MB)")
+    st.dataframe(_size_table(diff['allocations'], ['size_diff', 'size']).rename(columns={
+        'location': 'Plik:linia', 'size_diff': 'Przyrost', 'count_diff': 'Przyrost obiektów', 'size': 'Rozmiar'
+    }), use_container_width=True, hide_index=True)
+
+    st.markdown("**Właściciele pamięci** (MB)")
+    st.dataframe(_size_table(diff['owners'], ['before', 'after', 'diff']).rename(columns={
+        'owner': 'Właściciel', 'before': 'Przed', 'after': 'Po', 'diff': 'Przyrost'
+    }), use_container_width=True, hide_index=True)
+
+    st.download_button(
+        "💾 Eksport porównania (JSON)", to_json(diff),
+        file_name=f"memory-diff-{old_id}-{new_id}.json", mime="application/json"
+    )
+
+
+def show_payload():
+    """Dane wysyłane do przeglądarki: bajty na przebieg i elementy wysyłające najwięcej"""
+    reruns = PayloadMeter.reruns()
+    if not reruns:
+        st.caption("Brak zmierzonych przebiegów")
+        return
+
+    history = pd.DataFrame({
+        'Czas': pd.to_datetime([payload.timestamp for payload in reruns], unit='s'),
+        'Strona': [payload.page for payload in reruns],
+        'kB': [payload.bytes / 1024 for payload in reruns]
+    })
+    per_page = history.pivot_table(index='Czas', columns='Strona', values='kB', aggfunc='sum')
+    st.plotly_chart(
+        line_chart(per_page, title="Dane na przebieg", y_title="kB"),
+        use_container_width=True
+    )
+
+    st.markdown("**Elementy wysyłające najwięcej danych** (kB)")
+    offenders = pd.DataFrame(PayloadMeter.offenders())
+    for column in ['bytes', 'avg_bytes', 'max_bytes', 'bytes_per_rerun']:
+        offenders[column] = (offenders[column] / 1024).round(2)
+    st.dataframe(offenders.rename(columns={
+        'page': 'Strona', 'tab': 'Zakładka', 'element_type': 'Element', 'count': 'Wysłane',
+        'bytes': 'Razem', 'avg_bytes': 'Średnio', 'max_bytes': 'Największy', 'bytes_per_rerun': 'Na przebieg'
+    }), use_container_width=True, hide_index=True)
+
+    st.markdown("**Największe pojedyncze elementy**")
+    st.dataframe(pd.DataFrame([
+        {'Strona': e.page, 'Zakładka': e.tab, 'Element': e.element_type, 'Pozycja': e.path,
+         'kB': round(e.bytes / 1024, 2)}
+        for e in PayloadMeter.largest()
+    ]), use_container_width=True, hide_index=True)
+
+    st.button("🗑️ Wyczyść pomiary", use_container_width=True, on_click=PayloadMeter.reset)
+
+
+def show_password_change_status():
+    """Wyświetla wynik zmiany hasła wykonywanej w tle"""
+    future = st.session_state.get('password_change')
+    if future is None:
+        return
+
+    if not future.done():
+        st.info("⏳ Trwa zmiana hasła...")
+        st.button("🔄 Sprawdź status", use_container_width=True)
+        return
+
+    del st.session_state['password_change']
+    try:
+        success, message = future.result()
+    except Exception as e:
+        logger.error(f"Błąd zmiany hasła: {e}")
+        st.error("Nie udało się zmienić hasła")
+        return
+
+    if success:
+        st.success(message)
+    else:
+        st.error(message)
+
+
+def show_dev_tools(current_user):
+    """Narzędzia deweloperskie - logi, profile i pamięć wszystkich sesji (tylko administrator)"""
+    if Config.get_debug():
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.markdown("#### 🐛 Debug i testy")
+
+            if st.button("🧪 Test logowania", use_container_width=True):
+                logger.info(f"Test logowania wykonany przez użytkownika {current_user}")
+                st.success("Test logowania zapisany w logach")
+
+            show_logs = st.toggle("📝 Podgląd logów na żywo", key="log_tail_enabled")
+
+            st.button("🔄 Wymuś restart sesji", use_container_width=True, on_click=AuthService.logout_user)
+
+        with col2:
+            st.markdown("#### ⚙️ Informacje systemowe")
+
+            st.write("**Tryb debug:** Włączony")
+            st.write(f"**Nazwa aplikacji:** {Config.get_app_name()}")
+            st.write(f"**Host:** {Config.get_host()}")
+            st.write(f"**Port:** {Config.get_port()}")
+            st.write(f"**Poziom logów:** {Config.get_log_level()}")
+            st.write(f"**Przebiegi skryptu w tej sesji:** {run_count() or 0}")
+
+            st.markdown("#### 🔑 Generowanie hashów")
+
+            with st.form("hash_form"):
+                password_to_hash = st.text_input(
+                    "Hasło do zahashowania",
+                    type="password"
+                )
+
+                if st.form_submit_button("🔐 Generuj hash"):
+                    if password_to_hash:
+                        hashed = AuthService.hash_password(password_to_hash)
+                        st.code(hashed)
+                        st.success("Hash wygenerowany!")
+                    else:
+                        st.error("Wprowadź hasło")
+
+        if show_logs:
+            st.markdown("#### 📝 Logi aplikacji")
+            show_log_tail()
+
+        st.markdown("#### ⏱️ Profilowanie przebiegów")
+        show_profiler()
+
+        st.markdown("#### 🧠 Pamięć procesu")
+        show_memory_tools()
+
+        st.markdown("#### 📦 Dane wysyłane do przeglądarki")
+        show_payload()
+    else:
+        st.info("🔒 Narzędzia deweloperskie są dostępne tylko w trybie debug.")
+        st.write("Aby włączyć tryb debug, ustaw `DEBUG=True` w pliku `.env`")
+
+
+@RerunProfiler.page("settings")
 def show_settings_page():
     """Wyświetla stronę ustawień"""
     st.header("⚙️ Ustawienia")
     st.write("Konfiguracja aplikacji i ustawienia użytkownika.")
 
-    # Tabs dla różnych kategorii ustawień
-    tab1, tab2, tab3, tab4 = st.tabs([
-        "👤 Profil użytkownika",
-        "🔧 Konfiguracja aplikacji",
-        "🔒 Bezpieczeństwo",
-        "🛠️ Narzędzia deweloperskie"
-    ])
+    # Tabs dla różnych kategorii ustawień - narzędzia deweloperskie (logi, profile
+    # i pamięć sesji wszystkich użytkowników) tylko dla administratora
+    is_admin = _is_admin()
+    labels = ["👤 Profil użytkownika", "🔧 Konfiguracja aplikacji", "🔒 Bezpieczeństwo"]
+    if is_admin:
+        labels.append("🛠️ Narzędzia deweloperskie")
+    tabs = st.tabs(labels)
+    tab1, tab2, tab3 = tabs[:3]
 
     with tab1:
         st.subheader("Profil użytkownika")
 
         current_user = AuthService.get_current_user()
         session_info = AuthService.get_session_info()
+        prefs = get_session_preferences()
 
         col1, col2 = st.columns([1, 2])
 
@@ -37,22 +350,26 @@ def show_settings_page():
                 st.write(f"**Status:** Zalogowany")
                 st.write(f"**Czas sesji:** {int(session_info['session_duration'])} sekund")
 
-                from datetime import datetime
-                login_time = datetime.fromtimestamp(session_info['login_time'])
-                st.write(f"**Ostatnie logowanie:** {login_time.strftime('%Y-%m-%d %H:%M:%S')}")
+                login_time = prefs.format_timestamp(session_info['login_time'])
+                st.write(f"**Ostatnie logowanie:** {login_time}")
 
         with col2:
             st.markdown("#### ✏️ Edycja profilu")
 
             with st.form("profile_form"):
                 st.text_input("Nazwa wyświetlana", value=current_user, disabled=True)
-                st.text_input("Email", placeholder="admin@example.com")
-                st.selectbox("Język interfejsu", ["Polski", "English", "Deutsch"])
-                st.selectbox("Strefa czasowa", ["Europe/Warsaw", "UTC", "US/Eastern"])
+                email = st.text_input("Email", value=prefs.email, placeholder="admin@example.com")
+                timezones = ["Europe/Warsaw", "UTC", "US/Eastern"]
+                timezone = st.selectbox(
+                    "Strefa czasowa", timezones, index=_option_index(timezones, prefs.timezone)
+                )
 
                 col1, col2 = st.columns(2)
                 with col1:
                     if st.form_submit_button("💾 Zapisz zmiany", use_container_width=True):
+                        save_session_preferences(
+                            replace(prefs, email=email, timezone=timezone)
+                        )
                         st.success("Profil został zaktualizowany!")
                         logger.info(f"Profil użytkownika {current_user} został zaktualizowany")
 
@@ -68,34 +385,31 @@ def show_settings_page():
         with col1:
             st.markdown("#### 🎨 Wygląd i zachowanie")
 
-            theme = st.selectbox(
-                "Motyw aplikacji",
-                ["Auto", "Jasny", "Ciemny"],
-                help="Wybierz preferowany motyw interfejsu"
-            )
-
+            sidebar_states = list(SIDEBAR_STATES)
             sidebar_state = st.selectbox(
                 "Stan paska bocznego",
-                ["Rozwinięty", "Zwinięty", "Auto"],
-                index=0
+                sidebar_states,
+                index=_option_index(sidebar_states, prefs.sidebar_state)
             )
 
+            layouts = ["Szeroki", "Normalny"]
             page_layout = st.selectbox(
                 "Layout strony",
-                ["Szeroki", "Normalny"],
-                index=0
+                layouts,
+                index=_option_index(layouts, prefs.page_layout)
             )
 
             auto_refresh = st.checkbox(
                 "Automatyczne odświeżanie dashboardu",
-                value=False,
-                help="Automatycznie odświeża dane co 30 sekund"
+                value=prefs.auto_refresh,
+                help=prefs.tooltip("Automatycznie odświeża wykres aktywności na dashboardzie")
             )
 
+            refresh_interval = prefs.refresh_interval
             if auto_refresh:
                 refresh_interval = st.slider(
                     "Interwał odświeżania (sekundy)",
-                    10, 300, 30
+                    10, 300, prefs.refresh_interval
                 )
 
         with col2:
@@ -105,29 +419,43 @@ def show_settings_page():
                 "Elementów na stronę",
                 min_value=10,
                 max_value=100,
-                value=20,
+                value=prefs.items_per_page,
                 step=10
             )
 
+            date_formats = list(DATE_FORMATS)
             date_format = st.selectbox(
                 "Format daty",
-                ["DD/MM/YYYY", "MM/DD/YYYY", "YYYY-MM-DD"],
-                index=2
+                date_formats,
+                index=_option_index(date_formats, prefs.date_format)
             )
 
+            time_formats = list(TIME_FORMATS)
             time_format = st.selectbox(
                 "Format czasu",
-                ["24h", "12h AM/PM"],
-                index=0
+                time_formats,
+                index=_option_index(time_formats, prefs.time_format)
             )
 
             show_tooltips = st.checkbox(
                 "Pokaż podpowiedzi",
-                value=True,
-                help="Wyświetla dodatkowe informacje przy najechaniu"
+                value=prefs.show_tooltips,
+                help=prefs.tooltip("Wyświetla dodatkowe informacje przy najechaniu")
             )
 
+        # Zmiany widżetów nie są zapisywane na bieżąco - dopiero po kliknięciu
         if st.button("💾 Zapisz ustawienia aplikacji", use_container_width=True):
+            save_session_preferences(replace(
+                prefs,
+                sidebar_state=sidebar_state,
+                page_layout=page_layout,
+                auto_refresh=auto_refresh,
+                refresh_interval=refresh_interval,
+                items_per_page=int(items_per_page),
+                date_format=date_format,
+                time_format=time_format,
+                show_tooltips=show_tooltips
+            ))
             st.success("Ustawienia aplikacji zostały zapisane!")
             logger.info("Ustawienia aplikacji zostały zaktualizowane")
 
@@ -160,10 +488,18 @@ def show_settings_page():
                         st.error("Nowe hasła nie są identyczne")
                     elif len(new_password) < 6:
                         st.error("Hasło musi mieć co najmniej 6 znaków")
+                    elif 'password_change' in st.session_state:
+                        st.warning("Poprzednia zmiana hasła jest jeszcze w toku")
                     else:
-                        # Tutaj byłaby logika zmiany hasła
-                        st.success("Hasło zostało zmienione!")
-                        logger.info(f"Hasło użytkownika {current_user} zostało zmienione")
+                        # Weryfikacja i hashowanie (bcrypt) w puli wątków - strona nie jest blokowana
+                        st.session_state['password_change'] = AuthService.change_password_async(
+                            current_user,
+                            current_password,
+                            new_password,
+                            keep_token=st.session_state.get('session_token')
+                        )
+
+            show_password_change_status()
 
         with col2:
             st.markdown("#### 🛡️ Ustawienia sesji")
@@ -193,63 +529,14 @@ def show_settings_page():
             if st.button("🚪 Wyloguj wszystkie sesje", use_container_width=True, type="secondary"):
                 st.warning("Funkcja dostępna w pełnej wersji aplikacji")
 
-    with tab4:
-        st.subheader("Narzędzia deweloperskie")
-
-        if Config.get_debug():
-            col1, col2 = st.columns(2)
-
-            with col1:
-                st.markdown("#### 🐛 Debug i testy")
-
-                if st.button("🧪 Test logowania", use_container_width=True):
-                    logger.info(f"Test logowania wykonany przez użytkownika {current_user}")
-                    st.success("Test logowania zapisany w logach")
-
-                if st.button("📝 Pokaż logi aplikacji", use_container_width=True):
-                    try:
-                        with open("app.log", "r") as f:
-                            logs = f.readlines()[-10:]  # Ostatnie 10 linii
-                        st.code("\n".join(logs))
-                    except FileNotFoundError:
-                        st.warning("Plik logów nie istnieje")
-
-                if st.button("🔄 Wymuś restart sesji", use_container_width=True):
-                    AuthService.logout_user()
-                    st.rerun()
-
-            with col2:
-                st.markdown("#### ⚙️ Informacje systemowe")
-
-                st.write("**Tryb debug:** Włączony")
-                st.write(f"**Nazwa aplikacji:** {Config.get_app_name()}")
-                st.write(f"**Host:** {Config.get_host()}")
-                st.write(f"**Port:** {Config.get_port()}")
-                st.write(f"**Poziom logów:** {Config.get_log_level()}")
-
-                st.markdown("#### 🔑 Generowanie hashów")
-
-                with st.form("hash_form"):
-                    password_to_hash = st.text_input(
-                        "Hasło do zahashowania",
-                        type="password"
-                    )
-
-                    if st.form_submit_button("🔐 Generuj hash"):
-                        if password_to_hash:
-                            hashed = AuthService.hash_password(password_to_hash)
-                            st.code(hashed)
-                            st.success("Hash wygenerowany!")
-                        else:
-                            st.error("Wprowadź hasło")
-        else:
-            st.info("🔒 Narzędzia deweloperskie są dostępne tylko w trybie debug.")
-            st.write("Aby włączyć tryb debug, ustaw `DEBUG=True` w pliku `.env`")
+    if is_admin:
+        with tabs[3]:
+            st.subheader("Narzędzia deweloperskie")
+            show_dev_tools(current_user)
 
     # Przycisk powrotu
     st.markdown("---")
     col1, col2, col3 = st.columns([1, 1, 1])
 
     with col2:
-        if st.button("🏠 Powrót do Dashboard", use_container_width=True):
-            st.switch_page("pages/dashboard.py")
+        nav_button("🏠 Powrót do Dashboard", 'dashboard', use_container_width=True)
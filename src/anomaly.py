@@ -0,0 +1,435 @@
+"""
+Strumieniowe wykrywanie anomalii - częstość błędów w logach i czasy odpowiedzi
+"""
+import json
+import math
+import os
+import threading
+import time
+import logging
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from .config import Config
+from .credential_store import CredentialStore
+
+logger = logging.getLogger(__name__)
+
+METRIC_ERRORS = 'log_error'
+METRIC_WARNINGS = 'log_warning'
+METRIC_RESPONSE_TIME = 'response_time_ms'
+
+METRIC_LABELS = {
+    METRIC_ERRORS: 'Błędy w logach (na minutę)',
+    METRIC_WARNINGS: 'Ostrzeżenia w logach (na minutę)',
+    METRIC_RESPONSE_TIME: 'Czas odpowiedzi (ms)'
+}
+
+# Okno zliczania częstości wpisów w logach (s)
+RATE_WINDOW = 60.0
+# Po dłuższej przerwie do bazy trafia co najwyżej tyle pustych okien
+MAX_IDLE_WINDOWS = 60
+
+# Ustawienia całej aplikacji w bazie aplikacji (klucz -> wartość JSON)
+SETTINGS_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS app_settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+)
+'''
+SETTING_NOTIFICATIONS = 'anomaly_notifications'
+
+EWMA_ALPHA = 0.1
+Z_THRESHOLD = 4.0
+CUSUM_K = 0.5
+CUSUM_H = 5.0
+# Liczba obserwacji budujących bazę przed pierwszym alertem
+WARMUP = 10
+HISTORY_SIZE = 50
+
+
+@dataclass
+class Alert:
+    """Alert o anomalii - jeden aktywny alert na metrykę"""
+    metric: str
+    method: str
+    value: float
+    baseline: float
+    score: float
+    first_seen: float
+    last_seen: float
+    count: int = 1
+
+    @property
+    def label(self) -> str:
+        return METRIC_LABELS.get(self.metric, self.metric)
+
+
+class EwmaDetector:
+    """
+    Bazowa średnia i wariancja liczone wykładniczo (EWMA) z progami z-score i CUSUM
+
+    Każda obserwacja kosztuje O(1). Z-score wykrywa pojedyncze skoki, CUSUM
+    kumuluje mniejsze, utrzymujące się odchylenia w górę.
+    """
+
+    def __init__(
+        self,
+        alpha: float = EWMA_ALPHA,
+        z_threshold: float = Z_THRESHOLD,
+        cusum_k: float = CUSUM_K,
+        cusum_h: float = CUSUM_H,
+        min_std: float = 1.0,
+        min_rel_std: float = 0.0,
+        warmup: int = WARMUP
+    ):
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.cusum_k = cusum_k
+        self.cusum_h = cusum_h
+        self.min_std = min_std
+        self.min_rel_std = min_rel_std
+        self.warmup = warmup
+        self.mean = 0.0
+        self.var = 0.0
+        self.n = 0
+        self.cusum = 0.0
+
+    @property
+    def std(self) -> float:
+        # Dolne ograniczenie chroni przed alertami przy niemal stałej bazie
+        return max(math.sqrt(self.var), self.min_std, self.min_rel_std * abs(self.mean))
+
+    def score(self, value: float) -> float:
+        return (value - self.mean) / self.std
+
+    def check(self, value: float) -> Optional[Tuple[str, float]]:
+        """Sprawdza próg z-score bez aktualizacji bazy (np. dla niepełnego okna)"""
+        if self.n < self.warmup:
+            return None
+        z = self.score(value)
+        return ('z-score', z) if z >= self.z_threshold else None
+
+    def update(self, value: float) -> Optional[Tuple[str, float]]:
+        """
+        Dodaje obserwację do bazy
+
+        Args:
+            value: Obserwowana wartość
+
+        Returns:
+            (metoda, wynik) gdy wartość jest anomalią, w przeciwnym razie None
+        """
+        if self.n == 0:
+            self.mean = value
+            self.n = 1
+            return None
+
+        result = None
+        z = self.score(value)
+        if self.n >= self.warmup:
+            self.cusum = max(0.0, self.cusum + z - self.cusum_k)
+            if z >= self.z_threshold:
+                result = ('z-score', z)
+            elif self.cusum >= self.cusum_h:
+                result = ('cusum', self.cusum)
+            if result:
+                self.cusum = 0.0
+
+        # Pojedyncze skoki nie zawyżają bazy - przesunięcia poziomu są wchłaniane stopniowo
+        if result is None or result[0] == 'cusum':
+            diff = value - self.mean
+            increment = self.alpha * diff
+            self.mean += increment
+            self.var = (1 - self.alpha) * (self.var + diff * increment)
+        self.n += 1
+        return result
+
+
+class RateDetector:
+    """Częstość zdarzeń w oknach czasu z detekcją EWMA - O(1) na zdarzenie"""
+
+    def __init__(self, window: float = RATE_WINDOW, detector: Optional[EwmaDetector] = None):
+        self.window = window
+        self.detector = detector or EwmaDetector()
+        self.window_start: Optional[float] = None
+        self.count = 0
+
+    def advance(self, ts: float) -> List[Tuple[float, float, Tuple[str, float]]]:
+        """
+        Zamyka okna zakończone przed ts
+
+        Returns:
+            Lista (koniec okna, liczba zdarzeń w oknie, wynik detekcji) dla okien z anomalią
+        """
+        if self.window_start is None:
+            self.window_start = ts - ts % self.window
+            return []
+
+        anomalies = []
+        closed = 0
+        while ts >= self.window_start + self.window:
+            result = self.detector.update(self.count)
+            if result:
+                anomalies.append((self.window_start + self.window, self.count, result))
+            self.count = 0
+            self.window_start += self.window
+            closed += 1
+            if closed >= MAX_IDLE_WINDOWS:
+                self.window_start = ts - ts % self.window
+                break
+        return anomalies
+
+    def observe(self, ts: float) -> List[Tuple[float, float, Tuple[str, float]]]:
+        """Rejestruje zdarzenie; anomalia wykrywana też w trakcie trwania okna"""
+        anomalies = self.advance(ts)
+        self.count += 1
+        result = self.detector.check(self.count)
+        if result:
+            anomalies.append((ts, self.count, result))
+        return anomalies
+
+
+def log_notifier(alert: Alert) -> None:
+    """Domyślny notyfikator - wpis w logu aplikacji"""
+    logger.warning(
+        f"Anomalia: {alert.label} = {alert.value:.1f} "
+        f"(baza {alert.baseline:.1f}, {alert.method} {alert.score:.1f})"
+    )
+
+
+class AnomalyDetector:
+    """Detekcja anomalii ze stanem alertów współdzielonym przez sesje"""
+
+    _rates: Dict[str, RateDetector] = {}
+    _samples: Dict[str, EwmaDetector] = {}
+    _alerts: Dict[str, Alert] = {}
+    _history: Deque[Alert] = deque(maxlen=HISTORY_SIZE)
+    _last_notified: Dict[str, float] = {}
+    _notifiers: List[Callable[[Alert], None]] = [log_notifier]
+    # Ustawienie całej aplikacji (wszystkich sesji), zapisywane w bazie - set_notifications()
+    notifications_enabled = True
+    _settings_loaded = False
+    _lock = threading.Lock()
+
+    @classmethod
+    def observe_log(cls, level: str, ts: Optional[float] = None) -> None:
+        """
+        Rejestruje wpis w logu o poziomie WARNING lub ERROR
+
+        Args:
+            level: Poziom wpisu
+            ts: Czas wpisu (domyślnie teraz)
+        """
+        metric = METRIC_ERRORS if level in ('ERROR', 'CRITICAL') else METRIC_WARNINGS
+        ts = time.time() if ts is None else ts
+        with cls._lock:
+            detector = cls._rates.get(metric)
+            if detector is None:
+                detector = cls._rates[metric] = RateDetector()
+            anomalies = detector.observe(ts)
+            baseline = detector.detector.mean
+        for seen, value, (method, score) in anomalies:
+            cls._raise(metric, method, value, baseline, score, seen)
+
+    @classmethod
+    def observe_sample(cls, metric: str, value: float, ts: Optional[float] = None) -> None:
+        """
+        Rejestruje próbkę metryki (np. czas odpowiedzi)
+
+        Args:
+            metric: Nazwa metryki
+            value: Wartość próbki
+            ts: Czas próbki (domyślnie teraz)
+        """
+        ts = time.time() if ts is None else ts
+        with cls._lock:
+            detector = cls._samples.get(metric)
+            if detector is None:
+                detector = cls._samples[metric] = EwmaDetector(min_rel_std=0.1)
+            baseline = detector.mean
+            result = detector.update(value)
+        if result:
+            cls._raise(metric, result[0], value, baseline, result[1], ts)
+        else:
+            cls._expire(ts)
+
+    @classmethod
+    def tick(cls, ts: Optional[float] = None) -> None:
+        """Zamyka zakończone okna częstości i wygasza nieaktualne alerty"""
+        ts = time.time() if ts is None else ts
+        with cls._lock:
+            closed = [
+                (metric, detector.detector.mean, detector.advance(ts))
+                for metric, detector in cls._rates.items()
+            ]
+        for metric, baseline, anomalies in closed:
+            for seen, value, (method, score) in anomalies:
+                cls._raise(metric, method, value, baseline, score, seen)
+        cls._expire(ts)
+
+    @classmethod
+    def _raise(
+        cls,
+        metric: str,
+        method: str,
+        value: float,
+        baseline: float,
+        score: float,
+        ts: float
+    ) -> None:
+        with cls._lock:
+            alert = cls._alerts.get(metric)
+            if alert is None:
+                alert = Alert(metric, method, value, baseline, score, ts, ts)
+                cls._alerts[metric] = alert
+                cls._history.appendleft(alert)
+            else:
+                # Deduplikacja - kolejne wykrycia aktualizują aktywny alert
+                alert.count += 1
+                alert.last_seen = max(alert.last_seen, ts)
+                if score > alert.score:
+                    alert.method, alert.value, alert.score = method, value, score
+            cooldown = Config.get_alert_cooldown()
+            notify = (
+                cls.notifications_enabled
+                and ts - cls._last_notified.get(metric, float('-inf')) >= cooldown
+            )
+            if notify:
+                cls._last_notified[metric] = ts
+            notifiers = list(cls._notifiers)
+            snapshot = replace(alert)
+
+        if notify:
+            for notifier in notifiers:
+                try:
+                    notifier(snapshot)
+                except Exception as e:
+                    logger.error(f"Błąd notyfikatora alertów: {e}")
+
+    @classmethod
+    def _expire(cls, ts: float) -> None:
+        cooldown = Config.get_alert_cooldown()
+        with cls._lock:
+            for metric in [m for m, a in cls._alerts.items() if ts - a.last_seen >= cooldown]:
+                del cls._alerts[metric]
+
+    @classmethod
+    def active_alerts(cls) -> List[Alert]:
+        """Aktywne alerty (kopie) - odczyt bez przeliczania detektorów"""
+        with cls._lock:
+            return [replace(alert) for alert in cls._alerts.values()]
+
+    @classmethod
+    def recent_alerts(cls) -> List[Alert]:
+        """Ostatnio zgłoszone alerty, od najnowszego"""
+        with cls._lock:
+            return [replace(alert) for alert in cls._history]
+
+    @classmethod
+    def acknowledge(cls, metric: str) -> None:
+        """Zamyka aktywny alert metryki - kolejna anomalia zgłosi nowy"""
+        with cls._lock:
+            cls._alerts.pop(metric, None)
+
+    @staticmethod
+    def _connect():
+        conn = CredentialStore.connect()
+        conn.execute(SETTINGS_SCHEMA)
+        return conn
+
+    @classmethod
+    def load_settings(cls, force: bool = False) -> bool:
+        """
+        Wczytuje zapisane ustawienie powiadomień (raz na proces, chyba że force)
+
+        Args:
+            force: Wczytaj ponownie - np. zmiana w innym procesie
+
+        Returns:
+            Czy powiadomienia są włączone
+        """
+        if cls._settings_loaded and not force:
+            return cls.notifications_enabled
+        enabled = True
+        if os.path.exists(Config.get_database_file()):
+            conn = cls._connect()
+            try:
+                row = conn.execute(
+                    'SELECT value FROM app_settings WHERE key = ?', (SETTING_NOTIFICATIONS,)
+                ).fetchone()
+            finally:
+                conn.close()
+            if row is not None:
+                enabled = bool(json.loads(row[0]))
+        with cls._lock:
+            cls.notifications_enabled = enabled
+            cls._settings_loaded = True
+        return enabled
+
+    @classmethod
+    def set_notifications(cls, enabled: bool) -> None:
+        """
+        Włącza lub wyłącza powiadomienia o anomaliach dla całej aplikacji i zapisuje ustawienie
+
+        Args:
+            enabled: Czy wysyłać powiadomienia
+        """
+        conn = cls._connect()
+        try:
+            conn.execute(
+                'INSERT INTO app_settings (key, value, updated_at) VALUES (?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at',
+                (SETTING_NOTIFICATIONS, json.dumps(enabled), time.time())
+            )
+        finally:
+            conn.close()
+        with cls._lock:
+            cls.notifications_enabled = enabled
+            cls._settings_loaded = True
+        logger.info(f"Powiadomienia o anomaliach {'włączone' if enabled else 'wyłączone'} dla całej aplikacji")
+
+    @classmethod
+    def register_notifier(cls, notifier: Callable[[Alert], None]) -> None:
+        """Dodaje notyfikator wywoływany dla nowych alertów (z uwzględnieniem cooldownu)"""
+        with cls._lock:
+            cls._notifiers.append(notifier)
+
+    @classmethod
+    def unregister_notifier(cls, notifier: Callable[[Alert], None]) -> None:
+        with cls._lock:
+            if notifier in cls._notifiers:
+                cls._notifiers.remove(notifier)
+
+    @classmethod
+    def reset(cls) -> None:
+        """Czyści detektory i alerty"""
+        with cls._lock:
+            cls._rates.clear()
+            cls._samples.clear()
+            cls._alerts.clear()
+            cls._history.clear()
+            cls._last_notified.clear()
+            cls.notifications_enabled = True
+            cls._settings_loaded = False
+
+
+class AnomalyLogHandler(logging.Handler):
+    """Przekazuje wpisy WARNING/ERROR z potoku logowania do detektora"""
+
+    def __init__(self):
+        super().__init__(level=logging.WARNING)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Wpisy samego detektora (np. notyfikacje) nie mogą zasilać detekcji
+        if record.name == __name__:
+            return
+        AnomalyDetector.observe_log(record.levelname, record.created)
+
+
+def install_log_handler(target: Optional[logging.Logger] = None) -> None:
+    """Podłącza detektor do loggera (domyślnie głównego) - jednokrotnie"""
+    target = target or logging.getLogger()
+    if not any(isinstance(handler, AnomalyLogHandler) for handler in target.handlers):
+        target.addHandler(AnomalyLogHandler())
@@ -0,0 +1,615 @@
+"""
+Strumień zdarzeń uwierzytelniania z przyrostowymi licznikami minutowymi, godzinowymi i dziennymi
+"""
+import atexit
+import json
+import os
+import threading
+import time
+import logging
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import pandas as pd
+from .config import Config
+from .sketches import HyperLogLog, TDigest, SpaceSaving, HeartbeatUptime
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOGIN = 'login'
+EVENT_LOGOUT = 'logout'
+EVENT_FAILURE = 'failure'
+EVENT_TIMEOUT = 'timeout'
+EVENT_REVOKED = 'revoked'
+# Wiersz pliku zdarzeń z sygnałem życia procesu (nie jest publikowany subskrybentom)
+EVENT_HEARTBEAT = 'heartbeat'
+EVENT_KINDS = (EVENT_LOGIN, EVENT_LOGOUT, EVENT_FAILURE, EVENT_TIMEOUT, EVENT_REVOKED)
+SESSION_END_EVENTS = (EVENT_LOGOUT, EVENT_TIMEOUT, EVENT_REVOKED)
+
+# Rozdzielczość liczników: długość kubełka (s) i liczba przechowywanych kubełków
+RESOLUTIONS = {
+    'minute': (60, 24 * 60),
+    'hour': (3600, 31 * 24),
+    'day': (86400, 400)
+}
+
+# Liczba ostatnich zdarzeń trzymanych w pamięci (zdarzenia starsze są już na dysku)
+STREAM_CAPACITY = 10000
+# Co tyle sekund zapisywane są nowe zdarzenia i rejestrowany jest sygnał życia aplikacji
+SPILL_INTERVAL = 10.0
+# Migawka zapisywana także bez nowych zdarzeń, żeby utrwalić dostępność aplikacji
+SNAPSHOT_INTERVAL = 60.0
+# Rozmiar pliku zdarzeń, po którym zapisany plik przechodzi do <plik>.1 (poprzedni segment jest usuwany)
+MAX_EVENTS_FILE_BYTES = 16 * 1024 * 1024
+# Liczba dni, dla których trzymane są dzienne szkice statystyk
+USAGE_RETENTION_DAYS = 400
+
+
+class AuthEvent(NamedTuple):
+    """Zdarzenie uwierzytelniania"""
+    seq: int
+    ts: float
+    kind: str
+    username: str
+    duration_s: float = 0.0
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """Wyłączna blokada pliku - zapis zdarzeń i migawki przez jeden proces naraz"""
+    if fcntl is None or not os.path.isdir(os.path.dirname(path) or '.'):
+        yield
+        return
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _local_seconds(ts: float) -> float:
+    """Czas lokalny w sekundach od epoki - granice kubełków wypadają o lokalnej północy"""
+    moment = datetime.fromtimestamp(ts).astimezone()
+    return ts + moment.utcoffset().total_seconds()
+
+
+class EventCounters:
+    """Liczniki zdarzeń w kubełkach czasowych, aktualizowane przy każdym zdarzeniu"""
+
+    def __init__(self):
+        self._buckets: Dict[str, Dict[int, Counter]] = {name: {} for name in RESOLUTIONS}
+        self._newest: Dict[str, int] = {name: 0 for name in RESOLUTIONS}
+        self._lock = threading.Lock()
+
+    def add(self, event: AuthEvent) -> None:
+        """Dolicza zdarzenie do kubełków wszystkich rozdzielczości"""
+        local = _local_seconds(event.ts)
+        with self._lock:
+            for name, (size, retention) in RESOLUTIONS.items():
+                key = int(local // size)
+                buckets = self._buckets[name]
+                if key not in buckets:
+                    buckets[key] = Counter()
+                    if key > self._newest[name]:
+                        self._newest[name] = key
+                        self._prune(name, key - retention)
+                buckets[key][event.kind] += 1
+
+    def _prune(self, name: str, oldest: int) -> None:
+        buckets = self._buckets[name]
+        for key in [key for key in buckets if key <= oldest]:
+            del buckets[key]
+
+    def series(
+        self,
+        resolution: str,
+        since: float,
+        until: float,
+        kinds: Iterable[str] = EVENT_KINDS
+    ) -> pd.DataFrame:
+        """
+        Zwraca liczniki z zakresu czasu - koszt proporcjonalny do liczby kubełków
+
+        Args:
+            resolution: 'minute', 'hour' lub 'day'
+            since: Początek zakresu (epoch)
+            until: Koniec zakresu (epoch, włącznie)
+            kinds: Rodzaje zdarzeń (kolumny wyniku)
+
+        Returns:
+            DataFrame z kolumną na rodzaj zdarzenia, indeksowany początkiem kubełka
+        """
+        size, _ = RESOLUTIONS[resolution]
+        first = int(_local_seconds(since) // size)
+        last = int(_local_seconds(until) // size)
+        kinds = list(kinds)
+        with self._lock:
+            buckets = self._buckets[resolution]
+            rows = [
+                [buckets[key][kind] if key in buckets else 0 for kind in kinds]
+                for key in range(first, last + 1)
+            ]
+        index = pd.DatetimeIndex(
+            [datetime(1970, 1, 1) + timedelta(seconds=key * size) for key in range(first, last + 1)],
+            name='Czas'
+        )
+        return pd.DataFrame(rows, index=index, columns=kinds, dtype='int64')
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                name: {str(key): dict(counts) for key, counts in buckets.items()}
+                for name, buckets in self._buckets.items()
+            }
+
+    def load_dict(self, data: Dict) -> None:
+        with self._lock:
+            for name in RESOLUTIONS:
+                buckets = {
+                    int(key): Counter(counts) for key, counts in data.get(name, {}).items()
+                }
+                self._buckets[name] = buckets
+                self._newest[name] = max(buckets, default=0)
+
+    def clear(self) -> None:
+        self.load_dict({})
+
+
+class DailyUsage:
+    """Szkice statystyk jednego dnia (lub połączonego zakresu dni)"""
+
+    def __init__(self):
+        self.logins = 0
+        self.failures = 0
+        self.users = HyperLogLog()
+        self.durations = TDigest()
+        self.top_users = SpaceSaving()
+
+    def merge(self, other: 'DailyUsage') -> None:
+        self.logins += other.logins
+        self.failures += other.failures
+        self.users.merge(other.users)
+        self.durations.merge(other.durations)
+        self.top_users.merge(other.top_users)
+
+    def to_dict(self) -> Dict:
+        return {
+            'logins': self.logins,
+            'failures': self.failures,
+            'users': self.users.to_dict(),
+            'durations': self.durations.to_dict(),
+            'top_users': self.top_users.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'DailyUsage':
+        usage = cls()
+        usage.logins = data['logins']
+        usage.failures = data['failures']
+        usage.users = HyperLogLog.from_dict(data['users'])
+        usage.durations = TDigest.from_dict(data['durations'])
+        usage.top_users = SpaceSaving.from_dict(data['top_users'])
+        return usage
+
+
+class UsageStats:
+    """Dzienne szkice użytkowania aktualizowane zdarzeniami - zakres dni to złączenie szkiców"""
+
+    def __init__(self):
+        self._days: Dict[int, DailyUsage] = {}
+        self._lock = threading.Lock()
+
+    def add(self, event: AuthEvent) -> None:
+        day = date.fromtimestamp(event.ts).toordinal()
+        with self._lock:
+            usage = self._days.get(day)
+            if usage is None:
+                usage = self._days[day] = DailyUsage()
+                for old in [old for old in self._days if old <= day - USAGE_RETENTION_DAYS]:
+                    del self._days[old]
+            if event.kind == EVENT_LOGIN:
+                usage.logins += 1
+                usage.users.add(event.username)
+                usage.top_users.add(event.username)
+            elif event.kind == EVENT_FAILURE:
+                usage.failures += 1
+            elif event.kind in SESSION_END_EVENTS and event.duration_s > 0:
+                usage.durations.add(event.duration_s)
+
+    def merged(self, first: date, last: date) -> DailyUsage:
+        """Łączy szkice dni z zakresu [first, last] - koszt proporcjonalny do liczby dni"""
+        result = DailyUsage()
+        with self._lock:
+            for day in range(first.toordinal(), last.toordinal() + 1):
+                if day in self._days:
+                    result.merge(self._days[day])
+        return result
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {str(day): usage.to_dict() for day, usage in self._days.items()}
+
+    def load_dict(self, data: Dict) -> None:
+        with self._lock:
+            self._days = {int(day): DailyUsage.from_dict(usage) for day, usage in data.items()}
+
+    def clear(self) -> None:
+        self.load_dict({})
+
+
+class AuthEventStream:
+    """
+    Strumień zdarzeń uwierzytelniania (tylko dopisywanie)
+
+    Liczniki i subskrybenci otrzymują każde zdarzenie w chwili publikacji. Zdarzenia są
+    okresowo dopisywane do pliku razem z migawką liczników, więc po restarcie
+    liczniki są odtwarzane z migawki i końcówki pliku, bez przetwarzania historii.
+
+    Plik zdarzeń jest wspólny dla wszystkich procesów aplikacji, a migawka to
+    stan złożony z jego początku (do zapisanej pozycji). Zapis odbywa się pod
+    blokadą pliku: proces dopisuje swoje zdarzenia i sygnały życia, dolicza do
+    zapisanej migawki końcówkę pliku (także wpisy innych procesów) i zapisuje
+    wynik - żaden proces nie nadpisuje liczników pozostałych. Agregaty
+    w pamięci to po zapisie migawka i jeszcze niezapisane zdarzenia procesu.
+    """
+
+    counters = EventCounters()
+    usage = UsageStats()
+    uptime = HeartbeatUptime(SPILL_INTERVAL)
+
+    _events: Deque[AuthEvent] = deque(maxlen=STREAM_CAPACITY)
+    # Sygnały życia procesu jeszcze niedopisane do pliku
+    _beats: List[float] = []
+    _subscribers: List[Callable[[AuthEvent], None]] = []
+    _next_seq = 1
+    _spilled_seq = 0
+    _snapshot_time = 0.0
+    _loaded = False
+    _lock = threading.Lock()
+    _spill_lock = threading.Lock()
+    _flusher: Optional[threading.Thread] = None
+    _wakeup = threading.Event()
+
+    @classmethod
+    def publish(
+        cls,
+        kind: str,
+        username: str,
+        ts: Optional[float] = None,
+        duration_s: float = 0.0
+    ) -> AuthEvent:
+        """
+        Publikuje zdarzenie i przekazuje je subskrybentom
+
+        Args:
+            kind: Rodzaj zdarzenia (EVENT_*)
+            username: Nazwa użytkownika
+            ts: Czas zdarzenia (domyślnie teraz)
+            duration_s: Czas trwania zakończonej sesji w sekundach
+
+        Returns:
+            Opublikowane zdarzenie
+        """
+        cls.load()
+        with cls._lock:
+            event = AuthEvent(
+                cls._next_seq, time.time() if ts is None else ts, kind, username, duration_s
+            )
+            cls._next_seq += 1
+            cls._events.append(event)
+            # Agregaty aktualizowane pod blokadą - migawka zawsze odpowiada prefiksowi strumienia
+            cls.counters.add(event)
+            cls.usage.add(event)
+            subscribers = list(cls._subscribers)
+            backlog = event.seq - cls._spilled_seq
+        # Zapis przed nadpisaniem niezapisanych zdarzeń w buforze pamięci
+        if backlog >= STREAM_CAPACITY // 2:
+            cls._wakeup.set()
+        for subscriber in subscribers:
+            try:
+                subscriber(event)
+            except Exception as e:
+                logger.error(f"Błąd subskrybenta zdarzeń uwierzytelniania: {e}")
+        return event
+
+    @classmethod
+    def subscribe(cls, callback: Callable[[AuthEvent], None]) -> None:
+        """Rejestruje subskrybenta wywoływanego dla każdego nowego zdarzenia"""
+        with cls._lock:
+            cls._subscribers.append(callback)
+
+    @classmethod
+    def unsubscribe(cls, callback: Callable[[AuthEvent], None]) -> None:
+        with cls._lock:
+            if callback in cls._subscribers:
+                cls._subscribers.remove(callback)
+
+    @classmethod
+    def read(cls, after_seq: int = 0) -> List[AuthEvent]:
+        """
+        Zwraca zdarzenia z pamięci o numerze większym niż after_seq
+
+        Args:
+            after_seq: Numer ostatniego przetworzonego zdarzenia
+
+        Returns:
+            Lista zdarzeń w kolejności publikacji
+        """
+        with cls._lock:
+            return [event for event in cls._events if event.seq > after_seq]
+
+    @classmethod
+    def heartbeat(cls, ts: Optional[float] = None) -> None:
+        """Rejestruje sygnał życia aplikacji (podstawa wyliczenia dostępności)"""
+        cls.load()
+        ts = time.time() if ts is None else ts
+        with cls._lock:
+            cls._beats.append(ts)
+            cls.uptime.beat(ts, date.fromtimestamp(ts).toordinal())
+            cls.uptime.prune(date.fromtimestamp(ts).toordinal() - USAGE_RETENTION_DAYS)
+
+    @staticmethod
+    def snapshot_file() -> str:
+        return f"{Config.get_auth_events_file()}.counters.json"
+
+    @staticmethod
+    def _empty_state() -> Dict[str, Any]:
+        return {'counters': EventCounters(), 'usage': UsageStats(), 'uptime': HeartbeatUptime(SPILL_INTERVAL)}
+
+    @staticmethod
+    def _apply(state: Dict[str, Any], ts: float, kind: str, username: str, duration_s: float = 0.0) -> None:
+        """Dolicza wiersz pliku zdarzeń (zdarzenie lub sygnał życia) do stanu"""
+        if kind == EVENT_HEARTBEAT:
+            state['uptime'].beat(ts, date.fromtimestamp(ts).toordinal())
+            return
+        event = AuthEvent(0, ts, kind, username, duration_s)
+        state['counters'].add(event)
+        state['usage'].add(event)
+
+    @classmethod
+    def _read_snapshot(cls) -> Tuple[Dict[str, Any], int]:
+        """Stan i pozycja w pliku zdarzeń z migawki (pusty stan bez migawki)"""
+        state = cls._empty_state()
+        try:
+            with open(cls.snapshot_file(), encoding='utf-8') as f:
+                snapshot = json.load(f)
+            state['counters'].load_dict(snapshot.get('counters', {}))
+            state['usage'].load_dict(snapshot.get('usage', {}))
+            if 'uptime' in snapshot:
+                state['uptime'] = HeartbeatUptime.from_dict(snapshot['uptime'])
+            return state, snapshot['offset']
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError) as e:
+            logger.error(f"Uszkodzona migawka liczników zdarzeń: {e}")
+        return cls._empty_state(), 0
+
+    @staticmethod
+    def _replay(state: Dict[str, Any], offset: int) -> Tuple[int, int]:
+        """
+        Dolicza do stanu wiersze pliku zdarzeń od pozycji offset
+
+        Returns:
+            Krotka (pozycja za ostatnim pełnym wierszem, liczba doliczonych wierszy)
+        """
+        replayed = 0
+        try:
+            with open(Config.get_auth_events_file(), 'rb') as f:
+                # Plik krótszy niż pozycja z migawki - przeniesiony po jej zapisie
+                # (przerwa przed migawką z pozycją 0), cały jest nowszy od migawki
+                if offset > os.fstat(f.fileno()).st_size:
+                    offset = 0
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    offset += len(line)
+                    try:
+                        AuthEventStream._apply(state, *json.loads(line))
+                    except (ValueError, TypeError) as e:
+                        logger.warning(f"Pominięto uszkodzony wiersz pliku zdarzeń: {e}")
+                        continue
+                    replayed += 1
+        except FileNotFoundError:
+            return 0, 0
+        return offset, replayed
+
+    @classmethod
+    def _write_snapshot(cls, state: Dict[str, Any], offset: int) -> None:
+        snapshot = {
+            'offset': offset,
+            'counters': state['counters'].to_dict(),
+            'usage': state['usage'].to_dict(),
+            'uptime': state['uptime'].to_dict()
+        }
+        tmp_path = f"{cls.snapshot_file()}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, cls.snapshot_file())
+
+    @classmethod
+    def _install(cls, state: Dict[str, Any]) -> None:
+        """Podmienia agregaty w pamięci na stan z pliku i niezapisane jeszcze zdarzenia procesu (pod _lock)"""
+        for event in cls._events:
+            if event.seq > cls._spilled_seq:
+                state['counters'].add(event)
+                state['usage'].add(event)
+        for ts in cls._beats:
+            state['uptime'].beat(ts, date.fromtimestamp(ts).toordinal())
+        if state['uptime'].last_beat is not None:
+            state['uptime'].prune(date.fromtimestamp(state['uptime'].last_beat).toordinal() - USAGE_RETENTION_DAYS)
+        cls.counters = state['counters']
+        cls.usage = state['usage']
+        cls.uptime = state['uptime']
+
+    @classmethod
+    def spill(cls, force: bool = False) -> int:
+        """
+        Dopisuje nowe zdarzenia do pliku i zapisuje migawkę liczników i szkiców
+
+        Args:
+            force: Zapisz migawkę także bez nowych zdarzeń
+
+        Returns:
+            Liczba zapisanych zdarzeń
+        """
+        with cls._spill_lock:
+            with cls._lock:
+                pending = [event for event in cls._events if event.seq > cls._spilled_seq]
+                beats = list(cls._beats)
+            if not pending and not force:
+                return 0
+
+            path = Config.get_auth_events_file()
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with _file_lock(f"{path}.lock"):
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.writelines(json.dumps([ts, EVENT_HEARTBEAT, '', 0.0]) + '\n' for ts in beats)
+                    f.writelines(
+                        json.dumps([event.ts, event.kind, event.username, event.duration_s]) + '\n'
+                        for event in pending
+                    )
+                # Migawka i końcówka pliku - zdarzenia wszystkich procesów, także tego
+                state, offset = cls._read_snapshot()
+                offset, _ = cls._replay(state, offset)
+                cls._write_snapshot(state, offset)
+                if offset >= MAX_EVENTS_FILE_BYTES:
+                    # Migawka obejmuje już cały plik - do odtworzenia potrzebna jest tylko
+                    # dalsza część, więc plik zastępuje poprzedni segment i zaczyna się od nowa
+                    os.replace(path, f"{path}.1")
+                    cls._write_snapshot(state, 0)
+                    logger.info(f"Plik zdarzeń uwierzytelniania przeniesiony do {path}.1")
+
+            with cls._lock:
+                if pending:
+                    cls._spilled_seq = pending[-1].seq
+                del cls._beats[:len(beats)]
+                cls._install(state)
+            cls._snapshot_time = time.time()
+        logger.debug(f"Zapisano {len(pending)} zdarzeń uwierzytelniania")
+        return len(pending)
+
+    @classmethod
+    def load(cls) -> None:
+        """
+        Odtwarza agregaty z migawki i zdarzeń dopisanych po niej (raz na proces)
+
+        Uruchamia też wątek zapisujący zdarzenia i sygnały życia aplikacji.
+        """
+        if cls._loaded:
+            return
+        with cls._spill_lock:
+            if cls._loaded:
+                return
+            with _file_lock(f"{Config.get_auth_events_file()}.lock"):
+                state, offset = cls._read_snapshot()
+                _, replayed = cls._replay(state, offset)
+            if replayed:
+                logger.info(f"Odtworzono {replayed} zdarzeń uwierzytelniania spoza migawki")
+            with cls._lock:
+                cls._install(state)
+            cls._loaded = True
+
+        with cls._lock:
+            if cls._flusher is None:
+                cls._flusher = threading.Thread(
+                    target=cls._spill_loop, name='auth-events-spiller', daemon=True
+                )
+                cls._flusher.start()
+                atexit.register(cls.spill)
+
+    @classmethod
+    def _spill_loop(cls) -> None:
+        while True:
+            cls._wakeup.wait(SPILL_INTERVAL)
+            cls._wakeup.clear()
+            try:
+                cls.heartbeat()
+                cls.spill(force=time.time() - cls._snapshot_time >= SNAPSHOT_INTERVAL)
+            except Exception as e:
+                logger.error(f"Błąd zapisu zdarzeń uwierzytelniania: {e}")
+
+    @classmethod
+    def reset(cls) -> None:
+        """Czyści stan strumienia w pamięci - kolejny dostęp wczyta go z dysku"""
+        with cls._lock:
+            cls._events.clear()
+            cls._beats.clear()
+            cls._next_seq = 1
+            cls._spilled_seq = 0
+            cls._snapshot_time = 0.0
+            cls._loaded = False
+            cls.counters.clear()
+            cls.usage.clear()
+            cls.uptime = HeartbeatUptime(SPILL_INTERVAL)
+
+
+def activity_series(resolution: str, since: float, until: float) -> pd.DataFrame:
+    """
+    Liczniki zdarzeń do wykresów aktywności
+
+    Args:
+        resolution: 'minute', 'hour' lub 'day'
+        since: Początek zakresu (epoch)
+        until: Koniec zakresu (epoch)
+
+    Returns:
+        DataFrame z kolumnami Logowania, Nieudane logowania i Zakończone sesje
+    """
+    AuthEventStream.load()
+    counts = AuthEventStream.counters.series(resolution, since, until)
+    return pd.DataFrame({
+        'Logowania': counts[EVENT_LOGIN],
+        'Nieudane logowania': counts[EVENT_FAILURE],
+        'Zakończone sesje': counts[EVENT_LOGOUT] + counts[EVENT_TIMEOUT] + counts[EVENT_REVOKED]
+    })
+
+
+def usage_summary(first: date, last: date) -> Dict[str, Any]:
+    """
+    Statystyki ogólne z dziennych szkiców - bez przeglądania historii sesji
+
+    Args:
+        first: Pierwszy dzień zakresu
+        last: Ostatni dzień zakresu (włącznie)
+
+    Returns:
+        Słownik z liczbą logowań i nieudanych logowań, liczbą unikalnych
+        użytkowników, medianą i maksimum czasu sesji (s), najczęstszym
+        użytkownikiem i dostępnością aplikacji (0-1); brakujące wartości to None
+    """
+    AuthEventStream.load()
+    usage = AuthEventStream.usage.merged(first, last)
+    top = usage.top_users.top(1)
+    return {
+        'logins': usage.logins,
+        'failures': usage.failures,
+        'distinct_users': usage.users.count(),
+        'median_session_s': usage.durations.quantile(0.5),
+        'max_session_s': usage.durations.max,
+        'top_user': top[0][0] if top else None,
+        'uptime': app_uptime(first, last)
+    }
+
+
+def app_uptime(first: date, last: date) -> Optional[float]:
+    """
+    Dostępność aplikacji w zakresie dni na podstawie sygnałów życia
+
+    Args:
+        first: Pierwszy dzień zakresu
+        last: Ostatni dzień zakresu (włącznie)
+
+    Returns:
+        Udział czasu dostępności (0-1) lub None bez danych
+    """
+    AuthEventStream.load()
+    with AuthEventStream._lock:
+        return AuthEventStream.uptime.uptime(first.toordinal(), last.toordinal())
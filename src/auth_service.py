@@ -3,29 +3,387 @@ Serwis uwierzytelniania - obsługa logowania i sesji użytkowników
 """
 import bcrypt
 import streamlit as st
+import math
+import threading
 import time
 import logging
-from typing import Optional, Dict, Any
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Set, Tuple
+from .auth_events import AuthEventStream, EVENT_LOGIN, EVENT_FAILURE
 from .config import Config
+from .credential_store import CredentialStore
+from .ldap_auth import LdapDirectory, LdapUnavailable
+from .metrics import LOGIN_ATTEMPTS, SESSION_ENDS, BCRYPT_DURATION
+from .session_history import SessionHistory
+from .session_token import SessionToken
 
 logger = logging.getLogger(__name__)
 
+# Nazwa parametru URL przechowującego token wznawiania sesji
+SESSION_QUERY_PARAM = 'session'
+
+# Koszt bcrypt: domyślny (jak bcrypt.gensalt()) i granice kalibracji
+DEFAULT_BCRYPT_ROUNDS = 12
+MIN_BCRYPT_ROUNDS = 10
+MAX_BCRYPT_ROUNDS = 16
+
+# Odstęp przeglądu zalogowanych sesji (s) - porzucone sesje zapisywane w historii jako 'timeout'
+SESSION_SWEEP_INTERVAL = 60
+# Jak długo pamiętane są sesje zapisane przez przegląd (s) - powracająca karta nie zapisze ich ponownie
+SWEPT_RETENTION = 86400
+
+
+class OpenSessions:
+    """
+    Zalogowane sesje procesu (klucz - token sesji)
+
+    Karta zamknięta bez wylogowania nie przejdzie już przez is_authenticated,
+    więc jej sesja zapisywana jest przez przegląd w tle po upływie
+    SESSION_TIMEOUT. Klucze zapisane przez przegląd są pamiętane, żeby karta,
+    która jednak wróci, nie zapisała tej samej sesji drugi raz.
+    """
+
+    _open: Dict[str, Tuple[str, float]] = {}
+    _swept: Dict[str, float] = {}
+    _lock = threading.Lock()
+    _sweeper: Optional[threading.Thread] = None
+
+    @classmethod
+    def open(cls, key: str, username: str, login_time: float) -> None:
+        """Rejestruje zalogowaną (lub wznowioną) sesję"""
+        with cls._lock:
+            cls._open[key] = (username, login_time)
+            if cls._sweeper is None:
+                cls._sweeper = threading.Thread(target=cls._sweep_loop, name='session-sweeper', daemon=True)
+                cls._sweeper.start()
+
+    @classmethod
+    def close(cls, key: Optional[str]) -> bool:
+        """
+        Usuwa sesję z rejestru
+
+        Returns:
+            False, jeśli sesję zapisał już przegląd - wtedy nie jest zapisywana ponownie
+        """
+        if key is None:
+            return True
+        with cls._lock:
+            cls._open.pop(key, None)
+            return cls._swept.pop(key, None) is None
+
+    @classmethod
+    def expire(cls, now: Optional[float] = None) -> List[Tuple[str, float]]:
+        """
+        Usuwa z rejestru sesje po czasie SESSION_TIMEOUT
+
+        Returns:
+            Lista (użytkownik, czas logowania) wygasłych sesji
+        """
+        now = now or time.time()
+        timeout = Config.get_session_timeout()
+        with cls._lock:
+            for key in [key for key, swept_at in cls._swept.items() if swept_at < now - SWEPT_RETENTION]:
+                del cls._swept[key]
+            expired = [key for key, (_, login_time) in cls._open.items() if login_time + timeout <= now]
+            for key in expired:
+                cls._swept[key] = now
+            return [cls._open.pop(key) for key in expired]
+
+    @classmethod
+    def _sweep_loop(cls) -> None:
+        while True:
+            time.sleep(SESSION_SWEEP_INTERVAL)
+            try:
+                AuthService.sweep_expired_sessions()
+            except Exception as e:
+                logger.error(f"Błąd przeglądu wygasłych sesji: {e}")
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._open.clear()
+            cls._swept.clear()
+
 
 class AuthService:
     """Serwis obsługi uwierzytelniania"""
     
+    # Koszt bcrypt dla nowych hashy - ustawiany przez configure_bcrypt_cost()
+    _bcrypt_rounds: int = DEFAULT_BCRYPT_ROUNDS
+    _bcrypt_configured: bool = False
+    
+    # Operacje bcrypt wykonywane poza wątkiem skryptu Streamlit
+    _bcrypt_executor: Optional[ThreadPoolExecutor] = None
+    # Przeliczanie hashy po logowaniu - jeden wątek, nie zajmuje puli zmian hasła
+    _rehash_executor: Optional[ThreadPoolExecutor] = None
+    _executor_lock = threading.Lock()
+    _rehash_pending: Set[str] = set()
+    _rehash_lock = threading.Lock()
+    # Blokady serializujące zmiany hasła tego samego konta
+    _account_locks: Dict[str, threading.Lock] = {}
+    # Katalog LDAP - tworzony z konfiguracji przy pierwszym logowaniu spoza kont lokalnych
+    _directory: Optional[LdapDirectory] = None
+    _directory_configured: bool = False
+    
     @staticmethod
-    def hash_password(password: str) -> str:
+    def hash_password(password: str, rounds: Optional[int] = None) -> str:
         """
         Hashuje hasło używając bcrypt
         
         Args:
             password: Hasło do zahashowania
+            rounds: Koszt bcrypt (domyślnie skonfigurowany koszt aplikacji)
             
         Returns:
             Zahashowane hasło jako string
         """
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        salt = bcrypt.gensalt(rounds or AuthService._bcrypt_rounds)
+        with BCRYPT_DURATION.time('hash'):
+            return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+    
+    @staticmethod
+    def get_hash_cost(hashed: str) -> Optional[int]:
+        """
+        Odczytuje koszt z hasha bcrypt (format $2b$<koszt>$...)
+        
+        Args:
+            hashed: Hash bcrypt
+            
+        Returns:
+            Koszt hasha lub None jeśli hash ma nieprawidłowy format
+        """
+        parts = hashed.split('$')
+        if len(parts) < 4 or not parts[2].isdigit():
+            return None
+        return int(parts[2])
+    
+    @staticmethod
+    def needs_rehash(hashed: str) -> bool:
+        """
+        Sprawdza czy hash ma inny koszt niż skonfigurowany
+        
+        Args:
+            hashed: Hash bcrypt
+            
+        Returns:
+            True jeśli hash powinien zostać przeliczony
+        """
+        cost = AuthService.get_hash_cost(hashed)
+        return cost is not None and cost != AuthService._bcrypt_rounds
+    
+    @staticmethod
+    def calibrate_bcrypt_cost(target_ms: float, probe_rounds: int = 8, samples: int = 3) -> int:
+        """
+        Mierzy bcrypt na bieżącej maszynie i dobiera koszt najbliższy docelowemu czasowi
+        
+        Pomiar wykonywany jest przy niskim koszcie - każdy kolejny poziom
+        kosztu podwaja czas hashowania, więc wynik jest ekstrapolowany.
+        
+        Args:
+            target_ms: Docelowy czas hashowania w milisekundach
+            probe_rounds: Koszt użyty do pomiaru
+            samples: Liczba pomiarów (brany jest najszybszy)
+            
+        Returns:
+            Koszt bcrypt z zakresu MIN_BCRYPT_ROUNDS..MAX_BCRYPT_ROUNDS
+        """
+        salt = bcrypt.gensalt(probe_rounds)
+        best = float('inf')
+        for _ in range(samples):
+            start = time.perf_counter()
+            bcrypt.hashpw(b'calibration-probe', salt)
+            best = min(best, time.perf_counter() - start)
+        
+        rounds = probe_rounds + round(math.log2(target_ms / 1000 / max(best, 1e-6)))
+        return max(MIN_BCRYPT_ROUNDS, min(MAX_BCRYPT_ROUNDS, rounds))
+    
+    @classmethod
+    def configure_bcrypt_cost(cls, force: bool = False) -> int:
+        """
+        Ustawia koszt bcrypt z BCRYPT_ROUNDS lub przez kalibrację (raz na proces)
+        
+        Args:
+            force: Wymuś ponowną konfigurację
+            
+        Returns:
+            Ustawiony koszt bcrypt
+        """
+        if cls._bcrypt_configured and not force:
+            return cls._bcrypt_rounds
+        
+        rounds = Config.get_bcrypt_rounds()
+        if rounds <= 0:
+            target_ms = Config.get_bcrypt_target_ms()
+            rounds = cls.calibrate_bcrypt_cost(target_ms)
+            logger.info(f"Skalibrowano koszt bcrypt: {rounds} (cel {target_ms:.0f} ms)")
+        
+        cls._bcrypt_rounds = rounds
+        cls._bcrypt_configured = True
+        return rounds
+    
+    @staticmethod
+    def get_password_hash(username: str) -> Optional[str]:
+        """
+        Zwraca hash hasła użytkownika - z bazy, a dla admina z konfiguracji
+        
+        Args:
+            username: Nazwa użytkownika
+            
+        Returns:
+            Hash hasła lub None dla nieznanego użytkownika
+        """
+        stored = CredentialStore.get_password_hash(username)
+        if stored is not None:
+            return stored
+        if username == Config.get_admin_user():
+            return Config.get_admin_password_hash()
+        return None
+    
+    @classmethod
+    def get_directory(cls) -> Optional[LdapDirectory]:
+        """
+        Zwraca katalog LDAP (wspólny dla procesu - jedna pula połączeń)
+        
+        Returns:
+            Katalog lub None, gdy LDAP nie jest skonfigurowany
+        """
+        with cls._executor_lock:
+            if not cls._directory_configured:
+                cls._directory = LdapDirectory.from_config()
+                cls._directory_configured = True
+            return cls._directory
+    
+    @classmethod
+    def get_bcrypt_executor(cls) -> ThreadPoolExecutor:
+        """
+        Zwraca pulę wątków dla operacji bcrypt (tworzoną przy pierwszym użyciu)
+        
+        Returns:
+            Współdzielona pula wątków
+        """
+        with cls._executor_lock:
+            if cls._bcrypt_executor is None:
+                cls._bcrypt_executor = ThreadPoolExecutor(
+                    max_workers=4, thread_name_prefix='bcrypt'
+                )
+            return cls._bcrypt_executor
+    
+    @classmethod
+    def get_rehash_executor(cls) -> ThreadPoolExecutor:
+        """
+        Zwraca jednowątkową pulę przeliczania hashy (tworzoną przy pierwszym użyciu)
+        
+        Returns:
+            Pula przeliczania hashy
+        """
+        with cls._executor_lock:
+            if cls._rehash_executor is None:
+                cls._rehash_executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix='bcrypt-rehash'
+                )
+            return cls._rehash_executor
+    
+    @classmethod
+    def schedule_rehash(cls, username: str, password: str, old_hash: str) -> Optional[Future]:
+        """
+        Przelicza hash hasła z aktualnym kosztem w wątku w tle
+        
+        Przeliczane są tylko konta zapisane w bazie - hash admina z konfiguracji
+        (ADMIN_PASSWORD_HASH) nie jest utrwalany, bo zapisany w bazie
+        przesłoniłby późniejszą zmianę zmiennej środowiskowej.
+        
+        Args:
+            username: Nazwa użytkownika
+            password: Zweryfikowane hasło
+            old_hash: Dotychczasowy hash (zapis nastąpi tylko jeśli się nie zmienił)
+            
+        Returns:
+            Future zadania lub None jeśli konta nie ma w bazie albo przeliczenie już jest w toku
+        """
+        if CredentialStore.get_password_hash(username) != old_hash:
+            return None
+        with cls._rehash_lock:
+            if username in cls._rehash_pending:
+                return None
+            cls._rehash_pending.add(username)
+        
+        def rehash():
+            try:
+                new_hash = cls.hash_password(password)
+                if CredentialStore.set_password_hash(username, new_hash, expected_hash=old_hash, create=False):
+                    logger.info(
+                        f"Przeliczono hash hasła użytkownika {username} "
+                        f"(koszt {cls.get_hash_cost(old_hash)} -> {cls._bcrypt_rounds})"
+                    )
+            except Exception as e:
+                logger.error(f"Błąd przeliczania hasha hasła użytkownika {username}: {e}")
+            finally:
+                with cls._rehash_lock:
+                    cls._rehash_pending.discard(username)
+        
+        return cls.get_rehash_executor().submit(rehash)
+    
+    @classmethod
+    def _account_lock(cls, username: str) -> threading.Lock:
+        with cls._executor_lock:
+            return cls._account_locks.setdefault(username, threading.Lock())
+    
+    @classmethod
+    def change_password(
+        cls,
+        username: str,
+        current_password: str,
+        new_password: str,
+        keep_token: Optional[str] = None
+    ) -> Tuple[bool, str]:
+        """
+        Zmienia hasło użytkownika i unieważnia jego pozostałe sesje
+        
+        Zmiany hasła tego samego konta są serializowane, a zapis w bazie
+        jest warunkowy - wygrywa tylko zmiana oparta na aktualnym hashu.
+        
+        Args:
+            username: Nazwa użytkownika
+            current_password: Aktualne hasło
+            new_password: Nowe hasło
+            keep_token: Token bieżącej sesji, która pozostaje aktywna
+            
+        Returns:
+            Krotka (czy się powiodło, komunikat dla użytkownika)
+        """
+        with cls._account_lock(username):
+            hashed = cls.get_password_hash(username)
+            if hashed is None or not cls.verify_password(current_password, hashed):
+                logger.warning(f"Nieudana zmiana hasła użytkownika {username}: błędne aktualne hasło")
+                return False, "Aktualne hasło jest nieprawidłowe"
+            
+            new_hash = cls.hash_password(new_password)
+            if not CredentialStore.set_password_hash(username, new_hash, expected_hash=hashed):
+                logger.warning(f"Konflikt przy zmianie hasła użytkownika {username}")
+                return False, "Hasło zostało w międzyczasie zmienione - spróbuj ponownie"
+        
+        claims = SessionToken.decode(keep_token) if keep_token else None
+        SessionToken.revoke_user_sessions(username, keep_jti=claims['jti'] if claims else None)
+        logger.info(f"Hasło użytkownika {username} zostało zmienione")
+        return True, "Hasło zostało zmienione!"
+    
+    @classmethod
+    def change_password_async(
+        cls,
+        username: str,
+        current_password: str,
+        new_password: str,
+        keep_token: Optional[str] = None
+    ) -> Future:
+        """
+        Zleca zmianę hasła w puli bcrypt, nie blokując wątku skryptu
+        
+        Returns:
+            Future z wynikiem change_password()
+        """
+        return cls.get_bcrypt_executor().submit(
+            cls.change_password, username, current_password, new_password, keep_token
+        )
     
     @staticmethod
     def verify_password(password: str, hashed: str) -> bool:
@@ -40,7 +398,8 @@ class AuthService:
             True jeśli hasło jest poprawne, False w przeciwnym razie
         """
         try:
-            return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+            with BCRYPT_DURATION.time('verify'):
+                return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
         except Exception as e:
             logger.error(f"Błąd weryfikacji hasła: {e}")
             return False
@@ -48,7 +407,7 @@ class AuthService:
     @staticmethod
     def authenticate_user(username: str, password: str) -> bool:
         """
-        Uwierzytelnia użytkownika
+        Uwierzytelnia użytkownika - konta lokalne (baza, admin z konfiguracji), następnie katalog LDAP
         
         Args:
             username: Nazwa użytkownika
@@ -57,39 +416,159 @@ class AuthService:
         Returns:
             True jeśli uwierzytelnienie się powiodło, False w przeciwnym razie
         """
-        if username == Config.get_admin_user():
-            if AuthService.verify_password(password, Config.get_admin_password_hash()):
+        hashed = AuthService.get_password_hash(username)
+        if hashed is not None:
+            if AuthService.verify_password(password, hashed):
                 logger.info(f"Pomyślne logowanie użytkownika: {username}")
+                LOGIN_ATTEMPTS.inc('success')
+                if AuthService.needs_rehash(hashed):
+                    AuthService.schedule_rehash(username, password, hashed)
                 return True
             else:
                 logger.warning(f"Nieudana próba logowania użytkownika: {username}")
+                LOGIN_ATTEMPTS.inc('failure')
+                AuthEventStream.publish(EVENT_FAILURE, username)
+                return False
+        
+        directory = AuthService.get_directory()
+        if directory is not None:
+            try:
+                verified = directory.authenticate(username, password)
+            except LdapUnavailable as e:
+                logger.error(f"Katalog LDAP niedostępny przy logowaniu {username}: {e}")
+                verified = False
+            if verified:
+                logger.info(f"Pomyślne logowanie użytkownika LDAP: {username}")
+                LOGIN_ATTEMPTS.inc('success')
+                return True
+            if verified is False:
+                logger.warning(f"Nieudana próba logowania użytkownika LDAP: {username}")
+                LOGIN_ATTEMPTS.inc('failure')
+                AuthEventStream.publish(EVENT_FAILURE, username)
                 return False
         
         logger.warning(f"Nieznany użytkownik: {username}")
+        LOGIN_ATTEMPTS.inc('failure')
+        AuthEventStream.publish(EVENT_FAILURE, username)
         return False
     
     @staticmethod
     def login_user(username: str) -> None:
         """
-        Loguje użytkownika - ustawia sesję
+        Loguje użytkownika - ustawia sesję i wydaje token wznawiania sesji
         
         Args:
             username: Nazwa użytkownika do zalogowania
         """
+        login_time = time.time()
+        token = SessionToken.issue(username, login_time)
         st.session_state['authenticated'] = True
         st.session_state['username'] = username
-        st.session_state['login_time'] = time.time()
+        st.session_state['login_time'] = login_time
+        st.session_state['session_token'] = token
+        # Kod wznowienia w URL przetrwa odświeżenie strony i ponowne połączenie
+        # websocket - sam token nie trafia do historii przeglądarki ani nagłówka Referer
+        st.query_params[SESSION_QUERY_PARAM] = SessionToken.issue_restore_code(token)
+        OpenSessions.open(token, username, login_time)
+        AuthEventStream.publish(EVENT_LOGIN, username, login_time)
         logger.info(f"Użytkownik {username} został zalogowany")
     
     @staticmethod
-    def logout_user() -> None:
-        """Wylogowuje użytkownika - czyści sesję"""
+    def resume_session(token: str) -> bool:
+        """
+        Wznawia sesję na podstawie tokena - bez ponownej weryfikacji hasła
+        
+        Args:
+            token: Token wydany przy logowaniu
+            
+        Returns:
+            True jeśli sesja została wznowiona, False w przeciwnym razie
+        """
+        claims = SessionToken.verify(token)
+        if claims is None:
+            logger.warning("Odrzucono nieprawidłowy lub wygasły token sesji")
+            return False
+        
+        # Zachowujemy pierwotny czas logowania - pozostały czas sesji się nie wydłuża
+        st.session_state['authenticated'] = True
+        st.session_state['username'] = claims['username']
+        st.session_state['login_time'] = claims['login_time']
+        st.session_state['session_token'] = token
+        OpenSessions.open(token, claims['username'], claims['login_time'])
+        logger.info(f"Wznowiono sesję użytkownika {claims['username']}")
+        return True
+    
+    @staticmethod
+    def resume_from_restore_code(code: str) -> bool:
+        """
+        Wznawia sesję na podstawie jednorazowego kodu z URL i wydaje kolejny kod
+
+        Args:
+            code: Kod wznowienia z parametru URL
+
+        Returns:
+            True jeśli sesja została wznowiona, False w przeciwnym razie
+        """
+        token = SessionToken.redeem_restore_code(code)
+        if token is None or not AuthService.resume_session(token):
+            st.query_params.pop(SESSION_QUERY_PARAM, None)
+            return False
+        # Wykorzystany kod jest już nieważny - adres z historii nie wznowi sesji ponownie
+        st.query_params[SESSION_QUERY_PARAM] = SessionToken.issue_restore_code(token)
+        return True
+
+    @staticmethod
+    def logout_user(reason: str = 'logout') -> None:
+        """
+        Wylogowuje użytkownika - czyści sesję, unieważnia token i zapisuje sesję w historii
+        
+        Args:
+            reason: Powód zakończenia sesji: 'logout', 'timeout' lub 'revoked'
+        """
         username = st.session_state.get('username', 'Unknown')
+        login_time = st.session_state.get('login_time')
+        token = st.session_state.get('session_token')
+        if st.session_state.get('authenticated') and login_time and OpenSessions.close(token):
+            # Sesja wygasła w chwili login_time + timeout - karta mogła wrócić dużo później
+            if reason == 'timeout':
+                end_time = login_time + Config.get_session_timeout()
+            else:
+                end_time = time.time()
+            AuthService._record_session_end(username, login_time, end_time, reason)
+        if token:
+            SessionToken.revoke(token)
+            st.query_params.pop(SESSION_QUERY_PARAM, None)
         st.session_state['authenticated'] = False
         st.session_state['username'] = None
         st.session_state['login_time'] = None
+        st.session_state['session_token'] = None
         logger.info(f"Użytkownik {username} został wylogowany")
     
+    @staticmethod
+    def _record_session_end(username: str, login_time: float, end_time: float, reason: str) -> None:
+        SessionHistory.record_session(username, login_time, end_time, reason)
+        AuthEventStream.publish(reason, username, end_time, end_time - login_time)
+        SESSION_ENDS.inc(reason)
+    
+    @classmethod
+    def sweep_expired_sessions(cls, now: Optional[float] = None) -> int:
+        """
+        Zapisuje w historii sesje, które wygasły bez powrotu karty
+        
+        Args:
+            now: Bieżący czas (domyślnie time.time())
+            
+        Returns:
+            Liczba zapisanych sesji
+        """
+        timeout = Config.get_session_timeout()
+        expired = OpenSessions.expire(now)
+        for username, login_time in expired:
+            cls._record_session_end(username, login_time, login_time + timeout, 'timeout')
+        if expired:
+            logger.info(f"Zapisano {len(expired)} wygasłych sesji bez powrotu karty")
+        return len(expired)
+    
     @staticmethod
     def is_authenticated() -> bool:
         """
@@ -104,7 +583,13 @@ class AuthService:
         # Sprawdź timeout sesji
         login_time = st.session_state.get('login_time', 0)
         if time.time() - login_time > Config.get_session_timeout():
-            AuthService.logout_user()
+            AuthService.logout_user(reason='timeout')
+            return False
+        
+        # Sesja unieważniona np. po zmianie hasła w innej sesji
+        token = st.session_state.get('session_token')
+        if token and SessionToken.verify(token) is None:
+            AuthService.logout_user(reason='revoked')
             return False
         
         return True
@@ -0,0 +1,201 @@
+"""
+Wykresy Plotly dla dużych serii - ślady WebGL, gotowe szablony układu i szybka serializacja
+"""
+from typing import Dict, Optional, Sequence, Union
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+# Powyżej tylu punktów w śladzie wykres rysowany jest przez WebGL (Scattergl)
+WEBGL_THRESHOLD = 5000
+
+# Streamlit serializuje wykresy przez plotly.io.to_json - z orjson kilkukrotnie szybciej
+try:
+    import orjson  # noqa: F401
+    JSON_ENGINE = 'orjson'
+except ImportError:
+    JSON_ENGINE = 'json'
+pio.json.config.default_engine = JSON_ENGINE
+
+# Szablony układu budowane raz - figura dostaje gotowy obiekt zamiast
+# przetwarzania domyślnego szablonu przy każdym wykresie
+BASE_TEMPLATE = go.layout.Template(layout=go.Layout(
+    margin=dict(l=10, r=10, t=50, b=10),
+    legend=dict(orientation='h', yanchor='bottom', y=1.0, xanchor='right', x=1.0, title=None),
+    hovermode='x unified',
+    xaxis=dict(showgrid=False),
+    yaxis=dict(rangemode='tozero')
+))
+TEMPLATES = {
+    'line': BASE_TEMPLATE,
+    'bar': go.layout.Template(layout=go.Layout(BASE_TEMPLATE.layout, barmode='relative', bargap=0.1))
+}
+
+Columns = Union[str, Sequence[str]]
+
+
+def _series(data: pd.DataFrame, x: Optional[str], y: Columns):
+    columns = [y] if isinstance(y, str) else list(y)
+    x_values = data.index if x is None else data[x]
+    # Tablice numpy zamiast Series - szybsza walidacja i serializacja
+    return np.asarray(x_values), [(column, data[column].to_numpy()) for column in columns]
+
+
+def _layout(
+    kind: str,
+    title: Optional[str],
+    x_title: Optional[str],
+    y_title: Optional[str]
+) -> go.Layout:
+    return go.Layout(
+        template=TEMPLATES[kind],
+        title=title,
+        xaxis_title=x_title,
+        yaxis_title=y_title
+    )
+
+
+def line_chart(
+    data: pd.DataFrame,
+    x: Optional[str] = None,
+    y: Optional[Columns] = None,
+    title: Optional[str] = None,
+    y_title: Optional[str] = None,
+    labels: Optional[Dict[str, str]] = None,
+    colors: Optional[Sequence[str]] = None,
+    fill: bool = False
+) -> go.Figure:
+    """
+    Wykres liniowy (lub warstwowy) jednej lub wielu kolumn
+
+    Args:
+        data: Dane
+        x: Kolumna osi X (domyślnie indeks)
+        y: Kolumna lub kolumny serii (domyślnie wszystkie kolumny poza x)
+        title: Tytuł wykresu
+        y_title: Tytuł osi Y (domyślnie nazwa jedynej serii)
+        labels: Nazwy serii w legendzie zamiast nazw kolumn
+        colors: Kolory kolejnych serii
+        fill: Wypełnienie pod linią (wykres warstwowy)
+
+    Returns:
+        Figura Plotly - ślady WebGL powyżej WEBGL_THRESHOLD punktów
+    """
+    y = y if y is not None else [column for column in data.columns if column != x]
+    x_values, series = _series(data, x, y)
+    trace = go.Scattergl if len(x_values) > WEBGL_THRESHOLD else go.Scatter
+    labels = labels or {}
+    traces = [
+        trace(
+            x=x_values,
+            y=values,
+            name=labels.get(column, column),
+            mode='lines',
+            fill='tozeroy' if fill else None,
+            line=dict(color=colors[i]) if colors else None
+        )
+        for i, (column, values) in enumerate(series)
+    ]
+    if y_title is None and len(series) == 1:
+        y_title = series[0][0]
+    return go.Figure(traces, _layout('line', title, x or data.index.name, y_title))
+
+
+def area_chart(data: pd.DataFrame, x: Optional[str] = None, y: Optional[Columns] = None, **kwargs) -> go.Figure:
+    """Wykres warstwowy - line_chart z wypełnieniem pod linią"""
+    return line_chart(data, x, y, fill=True, **kwargs)
+
+
+def bar_chart(
+    data: pd.DataFrame,
+    x: Optional[str] = None,
+    y: Optional[Columns] = None,
+    title: Optional[str] = None,
+    y_title: Optional[str] = None,
+    labels: Optional[Dict[str, str]] = None
+) -> go.Figure:
+    """
+    Wykres słupkowy (serie skumulowane)
+
+    Plotly nie ma słupków WebGL - dla dużych serii zysk daje budowa
+    figury z tablic numpy i gotowego szablonu oraz szybka serializacja.
+
+    Args:
+        data: Dane
+        x: Kolumna osi X (domyślnie indeks)
+        y: Kolumna lub kolumny serii (domyślnie wszystkie kolumny poza x)
+        title: Tytuł wykresu
+        y_title: Tytuł osi Y (domyślnie nazwa jedynej serii)
+        labels: Nazwy serii w legendzie zamiast nazw kolumn
+
+    Returns:
+        Figura Plotly
+    """
+    y = y if y is not None else [column for column in data.columns if column != x]
+    x_values, series = _series(data, x, y)
+    labels = labels or {}
+    traces = [go.Bar(x=x_values, y=values, name=labels.get(column, column)) for column, values in series]
+    if y_title is None and len(series) == 1:
+        y_title = series[0][0]
+    return go.Figure(traces, _layout('bar', title, x or data.index.name, y_title))
+
+
+def flame_chart(nodes: Dict[str, Sequence], title: Optional[str] = None) -> go.Figure:
+    """
+    Wykres płomieniowy (icicle) - szerokość węzła to jego czas całkowity
+
+    Args:
+        nodes: Listy ids, labels, parents i values (np. z profiler.flame_nodes)
+        title: Tytuł wykresu
+
+    Returns:
+        Figura Plotly
+    """
+    trace = go.Icicle(
+        ids=nodes['ids'],
+        labels=nodes['labels'],
+        parents=nodes['parents'],
+        values=nodes['values'],
+        branchvalues='total',
+        tiling=dict(orientation='v'),
+        hovertemplate='%{label}<br>%{value:.4f} s (%{percentRoot:.1%})<extra></extra>',
+        maxdepth=12
+    )
+    return go.Figure(trace, go.Layout(template=BASE_TEMPLATE, title=title, hovermode='closest'))
+
+
+def heatmap_chart(
+    values: np.ndarray,
+    x: Sequence,
+    y: Sequence,
+    title: Optional[str] = None,
+    value_label: str = 'Liczba'
+) -> go.Figure:
+    """
+    Mapa cieplna macierzy wartości (wiersze - oś Y od góry, kolumny - oś X)
+
+    Args:
+        values: Macierz len(y) x len(x)
+        x: Etykiety kolumn
+        y: Etykiety wierszy
+        title: Tytuł wykresu
+        value_label: Nazwa wartości w podpowiedzi
+
+    Returns:
+        Figura Plotly
+    """
+    trace = go.Heatmap(
+        z=np.asarray(values),
+        x=list(x),
+        y=list(y),
+        colorscale='Blues',
+        hovertemplate=f'%{{y}} %{{x}}<br>{value_label}: %{{z}}<extra></extra>'
+    )
+    layout = go.Layout(template=BASE_TEMPLATE, title=title, hovermode='closest', yaxis=dict(autorange='reversed'))
+    return go.Figure(trace, layout)
+
+
+def figure_json(figure: go.Figure) -> str:
+    """Serializacja figury tak jak przy wysyłce do przeglądarki"""
+    return pio.to_json(figure, validate=False, engine=JSON_ENGINE)
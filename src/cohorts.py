@@ -0,0 +1,356 @@
+"""
+Kohorty tygodniowe i statystyki użytkowników - wyniki materializowane przyrostowo z historii sesji
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .config import Config
+from .session_history import SessionHistory
+
+logger = logging.getLogger(__name__)
+
+# Katalog wyników w katalogu historii sesji (prefiks '_' - pomijany przez czytnik zbioru sesji)
+COHORTS_DIRNAME = '_cohorts'
+STATE_FILE = 'state.json'
+USERS_FILE = 'users.parquet'
+RETENTION_FILE = 'retention.parquet'
+WEEKLY_FILE = 'weekly.parquet'
+STATE_VERSION = 2
+# Odstęp sprawdzania, czy zamknął się kolejny tydzień (s)
+REFRESH_INTERVAL = 600
+# 1970-01-01 był czwartkiem - przesunięcie dni epoki do tygodni od poniedziałku
+EPOCH_WEEK_OFFSET_DAYS = 3
+EPOCH = date(1970, 1, 1)
+
+USERS_SCHEMA = pa.schema([
+    ('username', pa.string()),
+    ('first_week', pa.int64()),
+    ('sessions', pa.int64()),
+    ('total_duration_s', pa.float64()),
+    ('max_duration_s', pa.float64()),
+    ('first_login', pa.timestamp('us')),
+    ('last_login', pa.timestamp('us'))
+])
+# Sumy sesji użytkownika w tygodniu - wiersze tygodnia to zarazem zbiór jego aktywnych użytkowników
+WEEKLY_SCHEMA = pa.schema([
+    ('week', pa.int64()),
+    ('username', pa.string()),
+    ('sessions', pa.int64()),
+    ('total_duration_s', pa.float64()),
+    ('max_duration_s', pa.float64()),
+    ('first_login', pa.timestamp('us')),
+    ('last_login', pa.timestamp('us'))
+])
+RETENTION_SCHEMA = pa.schema([
+    ('cohort_week', pa.int64()),
+    ('week_offset', pa.int64()),
+    ('users', pa.int64())
+])
+
+
+def week_of(day: date) -> int:
+    """Numer tygodnia (od poniedziałku) liczony od epoki"""
+    return (day.toordinal() - EPOCH.toordinal() + EPOCH_WEEK_OFFSET_DAYS) // 7
+
+
+def week_start(week: int) -> date:
+    """Poniedziałek tygodnia o danym numerze"""
+    return EPOCH + timedelta(days=week * 7 - EPOCH_WEEK_OFFSET_DAYS)
+
+
+def _fingerprint(paths: List[str]) -> str:
+    return hashlib.sha1('\n'.join(sorted(os.path.basename(path) for path in paths)).encode()).hexdigest()
+
+
+class CohortStore:
+    """
+    Retencja kohort tygodniowych i statystyki sesji każdego użytkownika
+
+    Zamknięte tygodnie (przed bieżącym) są przetwarzane raz: sesje tygodnia
+    grupowane są wg użytkownika (group_by Arrow) i zapisywane jako sumy
+    tygodnia (WEEKLY_FILE) razem z odciskiem plików tygodnia. Tabela
+    użytkowników i retencja kohort wyliczane są z sum tygodni, bez odczytu
+    sesji - nowy plik w przetworzonym tygodniu oznacza ponowne zgrupowanie
+    tylko tego tygodnia. Wyniki zapisywane są w COHORTS_DIRNAME; widok czyta
+    tylko zapisane wyniki (raz na zmianę pliku stanu).
+    """
+
+    _lock = threading.Lock()
+    _thread: Optional[threading.Thread] = None
+    # ((plik stanu, czas modyfikacji), użytkownicy, retencja)
+    _loaded: Optional[Tuple[Tuple[str, int], pd.DataFrame, pd.DataFrame]] = None
+
+    @staticmethod
+    def directory() -> str:
+        return os.path.join(Config.get_session_history_dir(), COHORTS_DIRNAME)
+
+    @staticmethod
+    def closed_weeks(today: Optional[date] = None) -> Dict[int, List[str]]:
+        """
+        Pliki partycji sesji zamkniętych tygodni
+
+        Args:
+            today: Bieżący dzień (domyślnie dzisiaj) - jego tydzień nie jest zamknięty
+
+        Returns:
+            Numer tygodnia -> ścieżki plików Parquet
+        """
+        root = Config.get_session_history_dir()
+        current = week_of(today or date.today())
+        weeks: Dict[int, List[str]] = {}
+        if not os.path.isdir(root):
+            return weeks
+        for partition in os.scandir(root):
+            if not (partition.is_dir() and partition.name.startswith('date=')):
+                continue
+            try:
+                week = week_of(date.fromisoformat(partition.name[len('date='):]))
+            except ValueError:
+                continue
+            if week >= current:
+                continue
+            weeks.setdefault(week, []).extend(
+                entry.path for entry in os.scandir(partition.path)
+                if entry.name.endswith('.parquet') and not entry.name.startswith(('.', '_'))
+            )
+        return {week: sorted(paths) for week, paths in weeks.items() if paths}
+
+    @classmethod
+    def _read_state(cls) -> Tuple[Dict[str, str], pd.DataFrame]:
+        directory = cls.directory()
+        try:
+            with open(os.path.join(directory, STATE_FILE), encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') != STATE_VERSION:
+                raise ValueError(f"wersja {state.get('version')}")
+            weekly = pq.read_table(os.path.join(directory, WEEKLY_FILE)).to_pandas()
+            return state['weeks'], weekly
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Wyniki kohort do przeliczenia: {e}")
+        return {}, WEEKLY_SCHEMA.empty_table().to_pandas()
+
+    @classmethod
+    def _write_state(
+        cls,
+        weeks: Dict[str, str],
+        weekly: pd.DataFrame,
+        users: pd.DataFrame,
+        retention: pd.DataFrame
+    ) -> None:
+        directory = cls.directory()
+        os.makedirs(directory, exist_ok=True)
+        # Najaktywniejsi użytkownicy na początku - strony tabeli to kolejne wycinki
+        users = users.sort_values(['sessions', 'last_login'], ascending=False).reset_index()
+        tables = {
+            WEEKLY_FILE: pa.Table.from_pandas(weekly, schema=WEEKLY_SCHEMA, preserve_index=False),
+            USERS_FILE: pa.Table.from_pandas(users, schema=USERS_SCHEMA, preserve_index=False),
+            RETENTION_FILE: pa.Table.from_pandas(retention, schema=RETENTION_SCHEMA, preserve_index=False)
+        }
+        for name, table in tables.items():
+            tmp_path = os.path.join(directory, f".{name}.tmp")
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, os.path.join(directory, name))
+        # Plik stanu na końcu - jego zmiana oznacza komplet nowych wyników
+        tmp_path = os.path.join(directory, f".{STATE_FILE}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': STATE_VERSION, 'weeks': weeks, 'updated_at': time.time()}, f)
+        os.replace(tmp_path, os.path.join(directory, STATE_FILE))
+
+    @staticmethod
+    def _aggregate_week(week: int, paths: List[str]) -> pd.DataFrame:
+        """Sumy sesji każdego użytkownika aktywnego w zamkniętym tygodniu"""
+        table = pq.ParquetDataset(paths).read(columns=['username', 'login_time', 'duration_s'])
+        week_users = table.group_by('username').aggregate([
+            ('duration_s', 'count'),
+            ('duration_s', 'sum'),
+            ('duration_s', 'max'),
+            ('login_time', 'min'),
+            ('login_time', 'max')
+        ]).to_pandas().rename(columns={
+            'duration_s_count': 'sessions',
+            'duration_s_sum': 'total_duration_s',
+            'duration_s_max': 'max_duration_s',
+            'login_time_min': 'first_login',
+            'login_time_max': 'last_login'
+        })
+        week_users.insert(0, 'week', week)
+        return week_users[WEEKLY_SCHEMA.names]
+
+    @staticmethod
+    def _combine(weekly: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Tabela użytkowników i retencja kohort z sum tygodni"""
+        users = weekly.groupby('username').agg(
+            first_week=('week', 'min'),
+            sessions=('sessions', 'sum'),
+            total_duration_s=('total_duration_s', 'sum'),
+            max_duration_s=('max_duration_s', 'max'),
+            first_login=('first_login', 'min'),
+            last_login=('last_login', 'max')
+        )
+        # Aktywni w każdym tygodniu wg tygodnia pierwszego logowania
+        cohort_week = weekly['username'].map(users['first_week'])
+        retention = pd.DataFrame({
+            'cohort_week': cohort_week,
+            'week_offset': weekly['week'] - cohort_week
+        }).value_counts().rename('users').reset_index()
+        return users, retention[RETENTION_SCHEMA.names]
+
+    @classmethod
+    def refresh(cls, today: Optional[date] = None) -> int:
+        """
+        Grupuje zamknięte tygodnie, których sumy nie są zapisane lub których pliki się zmieniły
+
+        Args:
+            today: Bieżący dzień (domyślnie dzisiaj)
+
+        Returns:
+            Liczba przetworzonych tygodni
+        """
+        # Scalanie historii sesji nie usuwa plików w trakcie odczytu tygodni
+        with cls._lock, SessionHistory.compaction_lock():
+            weeks = cls.closed_weeks(today)
+            processed, weekly = cls._read_state()
+            fingerprints = {str(week): _fingerprint(paths) for week, paths in weeks.items()}
+            # Nowe tygodnie, tygodnie z nowymi (lub scalonymi) plikami i tygodnie bez plików
+            pending = sorted(week for week in weeks if processed.get(str(week)) != fingerprints[str(week)])
+            removed = [week for week in processed if int(week) not in weeks]
+            if not pending and not removed:
+                return 0
+
+            started = time.perf_counter()
+            stale = set(pending) | {int(week) for week in removed}
+            kept = weekly[~weekly['week'].isin(stale)]
+            parts = ([kept] if not kept.empty else []) + [cls._aggregate_week(week, weeks[week]) for week in pending]
+            weekly = pd.concat(parts, ignore_index=True) if parts else kept
+            weekly = weekly.sort_values(['week', 'username'], ignore_index=True)
+            users, retention = cls._combine(weekly)
+            cls._write_state(fingerprints, weekly, users, retention)
+            logger.info(
+                f"Kohorty: przetworzono {len(pending)} tygodni w {time.perf_counter() - started:.1f} s "
+                f"({len(users)} użytkowników)"
+            )
+            return len(pending)
+
+    @classmethod
+    def start(cls) -> None:
+        """Uruchamia wątek dopisujący zamknięte tygodnie (raz na proces)"""
+        with cls._lock:
+            if cls._thread is not None:
+                return
+            cls._thread = threading.Thread(target=cls._refresh_loop, name='cohorts', daemon=True)
+        cls._thread.start()
+
+    @classmethod
+    def _refresh_loop(cls) -> None:
+        while True:
+            try:
+                cls.refresh()
+            except Exception as e:
+                logger.error(f"Błąd materializacji kohort: {e}")
+            time.sleep(REFRESH_INTERVAL)
+
+    @classmethod
+    def load(cls) -> Optional[Tuple[pd.DataFrame, pd.DataFrame]]:
+        """
+        Zapisane wyniki (wczytywane ponownie tylko po zmianie pliku stanu)
+
+        Returns:
+            Krotka (użytkownicy, retencja) lub None przed pierwszą materializacją
+        """
+        state_path = os.path.join(cls.directory(), STATE_FILE)
+        try:
+            mtime = os.stat(state_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        loaded = cls._loaded
+        if loaded is not None and loaded[0] == (state_path, mtime):
+            return loaded[1], loaded[2]
+        users = pq.read_table(os.path.join(cls.directory(), USERS_FILE)).to_pandas()
+        retention = pq.read_table(os.path.join(cls.directory(), RETENTION_FILE)).to_pandas()
+        cls._loaded = ((state_path, mtime), users, retention)
+        return users, retention
+
+    @classmethod
+    def version(cls) -> int:
+        """Wersja zapisanych wyników (czas modyfikacji pliku stanu) - klucz stron tabeli"""
+        try:
+            return os.stat(os.path.join(cls.directory(), STATE_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    @classmethod
+    def retention_matrix(cls, cohorts: int = 12, weeks: int = 12) -> pd.DataFrame:
+        """
+        Retencja ostatnich kohort: odsetek użytkowników kohorty aktywnych N tygodni później
+
+        Args:
+            cohorts: Liczba ostatnich kohort (wierszy)
+            weeks: Liczba tygodni po pierwszym logowaniu (kolumn, poza tygodniem 0)
+
+        Returns:
+            Ramka: indeks - poniedziałek tygodnia kohorty, kolumna 'Użytkownicy'
+            (rozmiar kohorty) i kolumny 'Tydzień N' (%)
+        """
+        loaded = cls.load()
+        if loaded is None or loaded[1].empty:
+            return pd.DataFrame()
+        retention = loaded[1]
+        matrix = retention.pivot_table(
+            index='cohort_week', columns='week_offset', values='users', aggfunc='sum', fill_value=0
+        ).sort_index().iloc[-cohorts:]
+        matrix = matrix.reindex(columns=range(weeks + 1), fill_value=0)
+        sizes = matrix[0]
+        percent = matrix.div(sizes.where(sizes > 0), axis=0).mul(100).round(1)
+        # Tygodnie po ostatnim zamkniętym tygodniu jeszcze nie nastąpiły
+        last_week = int(retention['cohort_week'].add(retention['week_offset']).max())
+        offsets = np.arange(weeks + 1)
+        future = matrix.index.to_numpy()[:, None] + offsets[None, :] > last_week
+        percent = percent.mask(future)
+        percent.columns = [f"Tydzień {offset}" for offset in offsets]
+        percent.insert(0, 'Użytkownicy', sizes.to_numpy())
+        percent.index = [week_start(int(week)).isoformat() for week in matrix.index]
+        percent.index.name = 'Kohorta'
+        return percent.drop(columns='Tydzień 0')
+
+    @classmethod
+    def fetch_users_page(cls, after: Optional[int], limit: int) -> Tuple[pa.Table, Optional[int]]:
+        """
+        Strona tabeli statystyk użytkowników (od najaktywniejszych) dla show_paginated_table
+
+        Args:
+            after: Przesunięcie strony (kursor poprzedniej strony)
+            limit: Rozmiar strony
+
+        Returns:
+            Krotka (tabela Arrow, kursor następnej strony lub None)
+        """
+        loaded = cls.load()
+        if loaded is None:
+            return pa.table({}), None
+        users = loaded[0]
+        start = after or 0
+        page = users.iloc[start:start + limit]
+        table = pa.table({
+            'Użytkownik': page['username'],
+            'Pierwsze logowanie': page['first_login'],
+            'Ostatnie logowanie': page['last_login'],
+            'Liczba sesji': page['sessions'],
+            'Średni czas sesji (min)': (page['total_duration_s'] / page['sessions'] / 60).round(1),
+            'Najdłuższa sesja (min)': (page['max_duration_s'] / 60).round(1)
+        })
+        return table, start + limit if start + limit < len(users) else None
+
+    @classmethod
+    def reset(cls) -> None:
+        cls._loaded = None
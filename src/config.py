@@ -28,6 +28,15 @@ class Config:
     def get_port(cls):
         return int(os.getenv('PORT', 8501))
     
+    @classmethod
+    def get_metrics_host(cls):
+        return os.getenv('METRICS_HOST', cls.get_host())
+    
+    @classmethod
+    def get_metrics_port(cls):
+        # 0 wyłącza serwer metryk i sond zdrowia
+        return int(os.getenv('METRICS_PORT', 9464))
+    
     @classmethod
     def get_secret_key(cls):
         return os.getenv('SECRET_KEY', 'default-secret-key')
@@ -44,6 +53,99 @@ class Config:
     def get_admin_password_hash(cls):
         return os.getenv('ADMIN_PASSWORD_HASH', '')
     
+    @classmethod
+    def get_bcrypt_rounds(cls):
+        # 0 oznacza automatyczną kalibrację do BCRYPT_TARGET_MS
+        return int(os.getenv('BCRYPT_ROUNDS', 0))
+    
+    @classmethod
+    def get_bcrypt_target_ms(cls):
+        return float(os.getenv('BCRYPT_TARGET_MS', 250))
+    
+    @classmethod
+    def get_database_file(cls):
+        return os.getenv('DATABASE_FILE', 'app.db')
+    
+    @classmethod
+    def get_preferences_flush_interval(cls):
+        return float(os.getenv('PREFERENCES_FLUSH_INTERVAL', 5))
+    
+    @classmethod
+    def get_log_db_file(cls):
+        return os.getenv('LOG_DB_FILE', 'logs.db')
+    
+    @classmethod
+    def get_session_history_dir(cls):
+        return os.getenv('SESSION_HISTORY_DIR', 'data/sessions')
+    
+    @classmethod
+    def get_metrics_history_dir(cls):
+        return os.getenv('METRICS_HISTORY_DIR', 'data/metrics')
+    
+    @classmethod
+    def get_metrics_retention_days(cls):
+        return int(os.getenv('METRICS_RETENTION_DAYS', 90))
+    
+    @classmethod
+    def get_auth_events_file(cls):
+        return os.getenv('AUTH_EVENTS_FILE', 'data/auth_events.jsonl')
+    
+    @classmethod
+    def get_profile_dir(cls):
+        return os.getenv('PROFILE_DIR', 'data/profiles')
+    
+    @classmethod
+    def get_alert_cooldown(cls):
+        return int(os.getenv('ALERT_COOLDOWN', 300))
+    
+    @classmethod
+    def get_ldap_url(cls):
+        return os.getenv('LDAP_URL', '')
+    
+    @classmethod
+    def get_ldap_base_dn(cls):
+        return os.getenv('LDAP_BASE_DN', '')
+    
+    @classmethod
+    def get_ldap_bind_dn(cls):
+        return os.getenv('LDAP_BIND_DN', '')
+    
+    @classmethod
+    def get_ldap_bind_password(cls):
+        return os.getenv('LDAP_BIND_PASSWORD', '')
+    
+    @classmethod
+    def get_ldap_user_filter(cls):
+        return os.getenv('LDAP_USER_FILTER', '(uid={username})')
+    
+    @classmethod
+    def get_ldap_group_filter(cls):
+        return os.getenv('LDAP_GROUP_FILTER', '(&(objectClass=groupOfNames)(member={user_dn}))')
+    
+    @classmethod
+    def get_ldap_required_group(cls):
+        return os.getenv('LDAP_REQUIRED_GROUP', '')
+    
+    @classmethod
+    def get_ldap_pool_size(cls):
+        return int(os.getenv('LDAP_POOL_SIZE', 4))
+    
+    @classmethod
+    def get_ldap_keepalive(cls):
+        return float(os.getenv('LDAP_KEEPALIVE', 60))
+    
+    @classmethod
+    def get_ldap_timeout(cls):
+        return float(os.getenv('LDAP_TIMEOUT', 5))
+    
+    @classmethod
+    def get_ldap_cache_ttl(cls):
+        return float(os.getenv('LDAP_CACHE_TTL', 300))
+    
+    @classmethod
+    def get_ldap_negative_ttl(cls):
+        return float(os.getenv('LDAP_NEGATIVE_TTL', 60))
+    
     @classmethod
     def get_log_level(cls):
         return os.getenv('LOG_LEVEL', 'INFO')
@@ -52,6 +154,10 @@ class Config:
     def get_log_file(cls):
         return os.getenv('LOG_FILE', 'app.log')
     
+    @classmethod
+    def get_log_collector_socket(cls):
+        return os.getenv('LOG_COLLECTOR_SOCKET', '')
+    
     # Właściwości dla kompatybilności wstecznej
     @property
     def APP_NAME(self):
@@ -95,12 +201,22 @@ class Config:
     
     @classmethod
     def setup_logging(cls):
-        """Konfiguracja systemu logowania"""
+        """Konfiguracja systemu logowania (raz na proces - kolejne przebiegi skryptu jej nie powtarzają)"""
+        # basicConfig i tak pominąłby nowe handlery - bez tworzenia ich (otwarcia pliku, gniazda)
+        if logging.getLogger().handlers:
+            return logging.getLogger(__name__)
+        collector_socket = cls.get_log_collector_socket()
+        if collector_socket:
+            # Wiele procesów na hoście - zapis do pliku przez wspólny kolektor
+            from .log_collector import CollectorHandler
+            file_handler = CollectorHandler(collector_socket, cls.get_log_file())
+        else:
+            file_handler = logging.FileHandler(cls.get_log_file())
         logging.basicConfig(
             level=getattr(logging, cls.get_log_level()),
             format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
             handlers=[
-                logging.FileHandler(cls.get_log_file()),
+                file_handler,
                 logging.StreamHandler()
             ]
         )
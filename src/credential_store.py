@@ -0,0 +1,162 @@
+"""
+Magazyn poświadczeń - hashe haseł użytkowników w bazie SQLite
+"""
+import os
+import sqlite3
+import time
+import logging
+from typing import Optional, Iterable, Tuple, Set, List
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password_hash TEXT NOT NULL,
+    updated_at REAL NOT NULL
+)
+'''
+
+
+class CredentialStore:
+    """Dostęp do tabeli użytkowników w bazie aplikacji"""
+
+    @staticmethod
+    def connect() -> sqlite3.Connection:
+        """
+        Otwiera połączenie z bazą i tworzy schemat jeśli nie istnieje
+
+        Returns:
+            Połączenie w trybie autocommit (transakcje zarządzane jawnie)
+        """
+        conn = sqlite3.connect(Config.get_database_file(), timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(SCHEMA)
+        return conn
+
+    @staticmethod
+    def get_password_hash(username: str) -> Optional[str]:
+        """
+        Zwraca zapisany hash hasła użytkownika
+
+        Args:
+            username: Nazwa użytkownika
+
+        Returns:
+            Hash hasła lub None jeśli użytkownik nie ma wpisu w bazie
+        """
+        # Odczyt nie tworzy pliku bazy - brak bazy oznacza brak wpisów
+        if not os.path.exists(Config.get_database_file()):
+            return None
+
+        conn = CredentialStore.connect()
+        try:
+            row = conn.execute(
+                'SELECT password_hash FROM users WHERE username = ?', (username,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    @staticmethod
+    def set_password_hash(
+        username: str, password_hash: str, expected_hash: Optional[str] = None, create: bool = True
+    ) -> bool:
+        """
+        Atomowo zapisuje hash hasła użytkownika
+
+        Args:
+            username: Nazwa użytkownika
+            password_hash: Nowy hash hasła
+            expected_hash: Jeśli podany, zapis nastąpi tylko gdy aktualny wpis
+                w bazie ma ten hash (albo wpisu jeszcze nie ma)
+            create: Czy tworzyć brakujący wpis (False - tylko podmiana istniejącego)
+
+        Returns:
+            True jeśli hash został zapisany, False jeśli wpis zmienił się w międzyczasie
+        """
+        conn = CredentialStore.connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT password_hash FROM users WHERE username = ?', (username,)
+            ).fetchone()
+            if (row is None and not create) or (
+                expected_hash is not None and row is not None and row[0] != expected_hash
+            ):
+                conn.execute('ROLLBACK')
+                return False
+            conn.execute(
+                'INSERT INTO users (username, password_hash, updated_at) VALUES (?, ?, ?) '
+                'ON CONFLICT(username) DO UPDATE SET '
+                'password_hash = excluded.password_hash, updated_at = excluded.updated_at',
+                (username, password_hash, time.time())
+            )
+            conn.execute('COMMIT')
+            return True
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def upsert_many(rows: Iterable[Tuple[str, str]]) -> int:
+        """
+        Zapisuje wiele hashy w jednej transakcji
+
+        Args:
+            rows: Pary (nazwa użytkownika, hash hasła)
+
+        Returns:
+            Liczba zapisanych wierszy
+        """
+        now = time.time()
+        params = [(username, password_hash, now) for username, password_hash in rows]
+        conn = CredentialStore.connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany(
+                'INSERT INTO users (username, password_hash, updated_at) VALUES (?, ?, ?) '
+                'ON CONFLICT(username) DO UPDATE SET '
+                'password_hash = excluded.password_hash, updated_at = excluded.updated_at',
+                params
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        return len(params)
+
+    @staticmethod
+    def existing_usernames(usernames: List[str]) -> Set[str]:
+        """
+        Zwraca podzbiór nazw użytkowników, które mają już wpis w bazie
+
+        Args:
+            usernames: Nazwy użytkowników do sprawdzenia
+
+        Returns:
+            Zbiór nazw istniejących użytkowników
+        """
+        if not usernames or not os.path.exists(Config.get_database_file()):
+            return set()
+
+        existing = set()
+        conn = CredentialStore.connect()
+        try:
+            # Limit parametrów zapytania SQLite - sprawdzamy porcjami
+            for start in range(0, len(usernames), 500):
+                chunk = usernames[start:start + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                existing.update(row[0] for row in conn.execute(
+                    f'SELECT username FROM users WHERE username IN ({placeholders})', chunk
+                ))
+        finally:
+            conn.close()
+        return existing
@@ -0,0 +1,402 @@
+"""
+Uwierzytelnianie w katalogu LDAP - pula połączeń i pamięć podręczna wyszukiwań
+"""
+import socket
+import threading
+import time
+import logging
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Deque, FrozenSet, Hashable, Iterator, Optional
+from .config import Config
+from .metrics import LDAP_CACHE, LDAP_DURATION
+
+try:
+    import ldap3
+    from ldap3.core.exceptions import LDAPException
+    from ldap3.utils.conv import escape_filter_chars
+except ImportError:
+    ldap3 = None
+    LDAPException = OSError
+
+logger = logging.getLogger(__name__)
+
+# Domyślne filtry wyszukiwania (OpenLDAP / 389 DS); {username} i {user_dn} są escapowane
+DEFAULT_USER_FILTER = '(uid={username})'
+DEFAULT_GROUP_FILTER = '(&(objectClass=groupOfNames)(member={user_dn}))'
+# Atrybut z nazwą grupy
+GROUP_NAME_ATTRIBUTE = 'cn'
+# Maksymalna liczba wpisów każdej pamięci podręcznej
+CACHE_SIZE = 10000
+
+
+class LdapUnavailable(Exception):
+    """Katalog niedostępny - brak wolnego połączenia lub błąd serwera"""
+
+
+class TtlCache:
+    """Słownik z czasem życia wpisów i limitem rozmiaru (najstarsze wpisy usuwane pierwsze)"""
+
+    def __init__(self, ttl: float, maxsize: int = CACHE_SIZE, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        """Wartość klucza lub None, gdy brak wpisu lub wpis wygasł"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= self._clock():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key: Hashable, value) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, self._clock() + self.ttl)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+@dataclass
+class PooledConnection:
+    """Połączenie z puli i tożsamość, z którą jest aktualnie związane (bind)"""
+    conn: object
+    identity: Optional[str]
+    last_used: float
+
+
+class ConnectionPool:
+    """
+    Ograniczona pula połączeń z kontrolą żywotności
+
+    Połączenie bezczynne dłużej niż keepalive jest przed wydaniem sprawdzane
+    tanim zapytaniem; martwe jest zamykane i zastępowane nowym. Połączenie,
+    na którym wystąpił błąd serwera, nie wraca do puli.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], PooledConnection],
+        probe: Callable[[PooledConnection], bool],
+        size: int = 4,
+        keepalive: float = 60,
+        timeout: float = 5
+    ):
+        self.size = size
+        self.keepalive = keepalive
+        self.timeout = timeout
+        self._factory = factory
+        self._probe = probe
+        self._idle: Deque[PooledConnection] = deque()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    @contextmanager
+    def connection(self) -> Iterator[PooledConnection]:
+        """
+        Wypożycza połączenie na czas bloku
+
+        Raises:
+            LdapUnavailable: Wszystkie połączenia zajęte dłużej niż timeout lub błąd serwera
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise LdapUnavailable(f"Brak wolnego połączenia LDAP (pula {self.size})")
+        pooled = None
+        try:
+            pooled = self._checkout()
+            yield pooled
+        except (LDAPException, LdapUnavailable) as e:
+            if pooled is not None:
+                _unbind(pooled)
+                pooled = None
+            if isinstance(e, LdapUnavailable):
+                raise
+            raise LdapUnavailable(f"Błąd połączenia LDAP: {e}") from e
+        finally:
+            if pooled is not None:
+                pooled.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.append(pooled)
+            self._slots.release()
+
+    def _checkout(self) -> PooledConnection:
+        while True:
+            with self._lock:
+                pooled = self._idle.pop() if self._idle else None
+            if pooled is None:
+                break
+            if time.monotonic() - pooled.last_used <= self.keepalive or self._probe(pooled):
+                return pooled
+            logger.info("Zamknięto nieaktywne połączenie LDAP")
+            _unbind(pooled)
+        pooled = self._factory()
+        with self._lock:
+            self.opened += 1
+        return pooled
+
+    def idle(self) -> int:
+        with self._lock:
+            return len(self._idle)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for pooled in idle:
+            _unbind(pooled)
+
+
+def _unbind(pooled: PooledConnection) -> None:
+    try:
+        pooled.conn.unbind()
+    except Exception as e:
+        logger.debug(f"Błąd zamykania połączenia LDAP: {e}")
+
+
+class LdapDirectory:
+    """
+    Katalog LDAP: wyszukanie DN użytkownika kontem serwisowym i bind jego hasłem
+
+    DN użytkowników i ich grupy są zapamiętywane na cache_ttl sekund, a nazwy
+    nieznane katalogowi na negative_ttl sekund - powtarzane logowania nie
+    wykonują wyszukiwań. Hasła i wyniki bindów nie są zapamiętywane.
+    """
+
+    def __init__(
+        self,
+        server,
+        base_dn: str,
+        bind_dn: str = '',
+        bind_password: str = '',
+        user_filter: str = DEFAULT_USER_FILTER,
+        group_filter: str = DEFAULT_GROUP_FILTER,
+        required_group: str = '',
+        pool_size: int = 4,
+        keepalive: float = 60,
+        timeout: float = 5,
+        cache_ttl: float = 300,
+        negative_ttl: float = 60,
+        client_strategy: Optional[str] = None
+    ):
+        if ldap3 is None:
+            raise RuntimeError("Uwierzytelnianie LDAP wymaga pakietu ldap3")
+        self.server = server
+        self.base_dn = base_dn
+        self.bind_dn = bind_dn
+        self.bind_password = bind_password
+        self.user_filter = user_filter
+        self.group_filter = group_filter
+        self.required_group = required_group
+        self.timeout = timeout
+        self.client_strategy = client_strategy or ldap3.SYNC
+        self.user_dns = TtlCache(cache_ttl)
+        self.user_groups = TtlCache(cache_ttl)
+        self.unknown_users = TtlCache(negative_ttl)
+        self.pool = ConnectionPool(self._connect, self._alive, pool_size, keepalive, timeout)
+
+    @classmethod
+    def from_config(cls) -> Optional['LdapDirectory']:
+        """
+        Katalog skonfigurowany zmiennymi LDAP_* (None, gdy LDAP_URL jest pusty)
+        """
+        url = Config.get_ldap_url()
+        if not url:
+            return None
+        if ldap3 is None:
+            logger.error("Ustawiono LDAP_URL, ale pakiet ldap3 nie jest zainstalowany")
+            return None
+        timeout = Config.get_ldap_timeout()
+        # Bez odczytu schematu przy każdym połączeniu
+        server = ldap3.Server(url, connect_timeout=timeout, get_info=ldap3.NONE)
+        return cls(
+            server,
+            Config.get_ldap_base_dn(),
+            bind_dn=Config.get_ldap_bind_dn(),
+            bind_password=Config.get_ldap_bind_password(),
+            user_filter=Config.get_ldap_user_filter(),
+            group_filter=Config.get_ldap_group_filter(),
+            required_group=Config.get_ldap_required_group(),
+            pool_size=Config.get_ldap_pool_size(),
+            keepalive=Config.get_ldap_keepalive(),
+            timeout=timeout,
+            cache_ttl=Config.get_ldap_cache_ttl(),
+            negative_ttl=Config.get_ldap_negative_ttl()
+        )
+
+    def _connect(self) -> PooledConnection:
+        conn = ldap3.Connection(
+            self.server,
+            user=self.bind_dn or None,
+            password=self.bind_password or None,
+            client_strategy=self.client_strategy,
+            receive_timeout=self.timeout,
+            raise_exceptions=False
+        )
+        with LDAP_DURATION.time('connect'):
+            bound = conn.bind()
+        if not bound:
+            conn.unbind()
+            raise LdapUnavailable(f"Bind konta serwisowego LDAP nie powiódł się: {conn.result.get('description')}")
+        sock = getattr(conn, 'socket', None)
+        if isinstance(sock, socket.socket):
+            # Systemowy keepalive TCP - zapory nie zrywają bezczynnych połączeń z puli
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        return PooledConnection(conn, self.bind_dn, time.monotonic())
+
+    def _alive(self, pooled: PooledConnection) -> bool:
+        try:
+            if pooled.conn.closed:
+                return False
+            pooled.conn.search(self.base_dn, '(objectClass=*)', ldap3.BASE, attributes=['1.1'])
+            return True
+        except LDAPException:
+            return False
+
+    def _as_service(self, pooled: PooledConnection) -> None:
+        """Przywraca tożsamość konta serwisowego po bindzie użytkownika"""
+        if pooled.identity == self.bind_dn:
+            return
+        with LDAP_DURATION.time('bind'):
+            if self.bind_dn:
+                bound = pooled.conn.rebind(self.bind_dn, self.bind_password)
+            else:
+                pooled.conn.user = None
+                bound = pooled.conn.rebind(authentication=ldap3.ANONYMOUS)
+        if not bound:
+            raise LdapUnavailable("Ponowny bind konta serwisowego LDAP nie powiódł się")
+        pooled.identity = self.bind_dn
+
+    def _search(self, pooled: PooledConnection, search_filter: str, attributes) -> list:
+        self._as_service(pooled)
+        with LDAP_DURATION.time('search'):
+            pooled.conn.search(self.base_dn, search_filter, ldap3.SUBTREE, attributes=attributes)
+        if pooled.conn.result.get('result') not in (0, 32):
+            # 32 - noSuchObject: brak wyników, nie błąd serwera
+            raise LdapUnavailable(f"Wyszukiwanie LDAP nie powiodło się: {pooled.conn.result.get('description')}")
+        return list(pooled.conn.entries)
+
+    def find_user_dn(self, username: str) -> Optional[str]:
+        """
+        DN użytkownika (z pamięci podręcznej lub wyszukany)
+
+        Args:
+            username: Nazwa użytkownika
+
+        Returns:
+            DN lub None dla użytkownika nieznanego katalogowi
+        """
+        dn = self.user_dns.get(username)
+        if dn is not None:
+            LDAP_CACHE.inc('dn', 'hit')
+            return dn
+        if self.unknown_users.get(username):
+            LDAP_CACHE.inc('negative', 'hit')
+            return None
+        LDAP_CACHE.inc('dn', 'miss')
+
+        search_filter = self.user_filter.format(username=escape_filter_chars(username))
+        with self.pool.connection() as pooled:
+            entries = self._search(pooled, search_filter, ['1.1'])
+        if len(entries) != 1:
+            if len(entries) > 1:
+                logger.warning(f"Niejednoznaczny użytkownik LDAP {username}: {len(entries)} wpisy")
+            self.unknown_users.set(username, True)
+            return None
+        dn = entries[0].entry_dn
+        self.user_dns.set(username, dn)
+        return dn
+
+    def groups(self, username: str) -> FrozenSet[str]:
+        """
+        Nazwy grup użytkownika (pusty zbiór dla nieznanego użytkownika)
+
+        Args:
+            username: Nazwa użytkownika
+
+        Returns:
+            Zbiór nazw grup (atrybut cn)
+        """
+        cached = self.user_groups.get(username)
+        if cached is not None:
+            LDAP_CACHE.inc('groups', 'hit')
+            return cached
+        dn = self.find_user_dn(username)
+        if dn is None:
+            return frozenset()
+        LDAP_CACHE.inc('groups', 'miss')
+
+        search_filter = self.group_filter.format(user_dn=escape_filter_chars(dn))
+        with self.pool.connection() as pooled:
+            entries = self._search(pooled, search_filter, [GROUP_NAME_ATTRIBUTE])
+        names = frozenset(
+            str(value)
+            for entry in entries
+            for value in entry.entry_attributes_as_dict.get(GROUP_NAME_ATTRIBUTE, [])
+        )
+        self.user_groups.set(username, names)
+        return names
+
+    def authenticate(self, username: str, password: str) -> Optional[bool]:
+        """
+        Sprawdza hasło bindem jako użytkownik na połączeniu z puli
+
+        Args:
+            username: Nazwa użytkownika
+            password: Hasło
+
+        Returns:
+            True/False - wynik weryfikacji, None - użytkownik nieznany katalogowi
+
+        Raises:
+            LdapUnavailable: Katalog niedostępny
+        """
+        dn = self.find_user_dn(username)
+        if dn is None:
+            return None
+        # Puste hasło to bind nieuwierzytelniony - serwer by go zaakceptował
+        if not password:
+            return False
+        with self.pool.connection() as pooled:
+            with LDAP_DURATION.time('bind'):
+                bound = pooled.conn.rebind(dn, password)
+            pooled.identity = dn if bound else None
+        if not bound:
+            return False
+        if self.required_group and self.required_group not in self.groups(username):
+            logger.warning(f"Użytkownik LDAP {username} nie należy do grupy {self.required_group}")
+            return False
+        return True
+
+    def invalidate(self, username: Optional[str] = None) -> None:
+        """Usuwa z pamięci podręcznej wpisy użytkownika (bez argumentu - wszystkie)"""
+        caches = (self.user_dns, self.user_groups, self.unknown_users)
+        for cache in caches:
+            if username is None:
+                cache.clear()
+            else:
+                cache.pop(username)
+
+    def close(self) -> None:
+        self.pool.close()
@@ -0,0 +1,332 @@
+"""
+Import historycznych archiwów logów do magazynu logów - równoległe parsowanie porcji plików
+
+Użycie:
+    python -m src.log_backfill PLIK [PLIK ...] [--workers N] [--chunk-mb N]
+
+Pliki dzielone są na zakresy bajtów wyrównane do końca linii, zakresy parsowane
+są w puli procesów jednym skompilowanym wyrażeniem regularnym na całą porcję,
+a wyniki kolejnych zakresów wstawiane są do LogStore po kolei (jedna transakcja
+na zakres, w pamięci tylko zakresy w toku). Pozycja wczytania pliku jest ta sama
+co przy LogStore.sync (tożsamość pliku, nie ścieżka) i sprawdzana w transakcji
+każdego zakresu - ponowny import, plik po rotacji i zakres wczytany w międzyczasie
+przez sync nie są wstawiane drugi raz, a bieżący plik logów po imporcie jest dalej
+synchronizowany przyrostowo.
+"""
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+import logging
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
+from typing import BinaryIO, Deque, Iterable, Iterator, List, Optional, Sequence, Tuple
+from .log_store import LogStore, LogRecord
+
+logger = logging.getLogger(__name__)
+
+# Docelowy rozmiar zakresu parsowanego przez jeden proces
+CHUNK_BYTES = 16 * 1024 * 1024
+
+# Wzorzec LINE_PATTERN dopasowywany w całej porcji: minuta, sekunda i milisekundy osobno
+ENTRY_PATTERN = re.compile(
+    r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}):(\d{2}),(\d{3}) - (\S+) - '
+    r'(DEBUG|INFO|WARNING|ERROR|CRITICAL) - (.*)$',
+    re.MULTILINE
+)
+
+# (plik, początek, koniec) - zakres bajtów zaczynający się od początku linii
+ByteRange = Tuple[str, int, int]
+# (linie kontynuacji przed pierwszym wpisem, wpisy) - wynik parse_chunk
+ParsedChunk = Tuple[List[str], List[LogRecord]]
+
+
+@dataclass
+class BackfillResult:
+    """Podsumowanie importu"""
+    files: int = 0
+    bytes: int = 0
+    records: int = 0
+    seconds: float = 0.0
+    # Czas wstawiania do bazy (parsowanie w puli trwa równolegle)
+    insert_seconds: float = 0.0
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.bytes / 1024 / 1024 / max(self.seconds, 1e-9)
+
+
+@lru_cache(maxsize=4096)
+def _minute_start(minute: str) -> float:
+    # Czas lokalny jak w parse_line - strptime raz na minutę zamiast na każdą linię
+    return datetime.strptime(minute, '%Y-%m-%d %H:%M').timestamp()
+
+
+def split_ranges(path: str, start: int, end: int, chunk_bytes: int = CHUNK_BYTES) -> List[ByteRange]:
+    """
+    Dzieli fragment pliku na zakresy wyrównane do początku linii
+
+    Args:
+        path: Plik logów
+        start: Początek fragmentu (początek linii)
+        end: Koniec fragmentu (za znakiem nowej linii)
+        chunk_bytes: Docelowy rozmiar zakresu
+
+    Returns:
+        Kolejne, przylegające zakresy pokrywające [start, end)
+    """
+    ranges = []
+    with open(path, 'rb') as f:
+        while start < end:
+            boundary = start + chunk_bytes
+            if boundary < end:
+                f.seek(boundary)
+                f.readline()
+                boundary = f.tell()
+            boundary = min(boundary, end)
+            ranges.append((path, start, boundary))
+            start = boundary
+    return ranges
+
+
+def parse_chunk(byte_range: ByteRange) -> ParsedChunk:
+    """
+    Parsuje zakres pliku logów (wywoływane w procesie puli)
+
+    Args:
+        byte_range: (plik, początek, koniec)
+
+    Returns:
+        Krotka (linie kontynuacji przed pierwszym wpisem zakresu - należą do
+        ostatniego wpisu poprzedniego zakresu, wpisy w kolejności z pliku)
+    """
+    path, start, end = byte_range
+    with open(path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8', errors='replace')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n')
+
+    head: List[str] = []
+    records: List[LogRecord] = []
+    # Koniec poprzedniego wpisu (pozycja znaku nowej linii)
+    pos = -1
+    for match in ENTRY_PATTERN.finditer(text):
+        if match.start() > pos + 1:
+            _attach(text[pos + 1:match.start()], head, records)
+        minute, second, millis, module, level, message = match.groups()
+        ts = _minute_start(minute) + int(second) + int(millis) / 1000
+        records.append((ts, level, module, message))
+        pos = match.end()
+    _attach(text[pos + 1:], head, records)
+    return head, records
+
+
+def _attach(gap: str, head: List[str], records: List[LogRecord]) -> None:
+    # Linie kontynuacji (traceback) doklejane do poprzedniego wpisu, jak w parse_lines
+    lines = [line for line in gap.split('\n') if line]
+    if not lines:
+        return
+    if records:
+        ts, level, module, message = records[-1]
+        records[-1] = (ts, level, module, '\n'.join([message, *lines]))
+    else:
+        head.extend(lines)
+
+
+def join_chunks(chunks: Iterable[ParsedChunk]) -> Iterator[List[LogRecord]]:
+    """
+    Skleja wyniki kolejnych zakresów jednego pliku
+
+    Linie kontynuacji z początku zakresu należą do ostatniego wpisu wcześniejszego
+    zakresu, więc zakres zwracany jest dopiero, gdy kolejny zakres z wpisami to
+    przesądzi - w pamięci są tylko zakresy jeszcze niezwrócone.
+
+    Args:
+        chunks: Wyniki parse_chunk w kolejności zakresów w pliku
+
+    Returns:
+        Wpisy kolejnych zakresów (jedna lista na zakres, także pusta),
+        posortowane po czasie w zakresie (stabilnie)
+    """
+    by_time = itemgetter(0)
+    # Niezwrócone zakresy: pierwszy z wpisami, po nim tylko puste
+    waiting: List[List[LogRecord]] = []
+    for head, records in chunks:
+        if head and waiting and waiting[0]:
+            _attach('\n'.join(head), [], waiting[0])
+        if records:
+            for ready in waiting:
+                # Porcje logów są zwykle już uporządkowane - sortowanie jest wtedy liniowe
+                ready.sort(key=by_time)
+                yield ready
+            waiting = []
+        waiting.append(records)
+    for ready in waiting:
+        ready.sort(key=by_time)
+        yield ready
+
+
+def backfill(
+    paths: Sequence[str],
+    workers: Optional[int] = None,
+    chunk_bytes: int = CHUNK_BYTES
+) -> BackfillResult:
+    """
+    Importuje pliki logów do magazynu logów
+
+    Args:
+        paths: Pliki logów (np. app.log.1, app.log.2, ...)
+        workers: Liczba procesów parsujących (domyślnie liczba rdzeni, 1 - bez puli)
+        chunk_bytes: Docelowy rozmiar zakresu parsowanego przez jeden proces
+
+    Returns:
+        Podsumowanie importu
+    """
+    started = time.perf_counter()
+    result = BackfillResult()
+    workers = workers or os.cpu_count() or 1
+
+    conn = LogStore.connect()
+    try:
+        plan = []
+        for path in paths:
+            # Plan bez blokady bazy - pozycja sprawdzana jest ponownie przy zapisie zakresu
+            with open(path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                start = LogStore.ingest_offset(conn, f)
+            end = _complete_end(path, start, stat.st_size)
+            plan.append((path, (stat.st_dev, stat.st_ino), split_ranges(path, start, end, chunk_bytes)))
+
+        tasks = [(index, byte_range) for index, (_, _, ranges) in enumerate(plan) for byte_range in ranges]
+        if workers == 1:
+            _insert_files(conn, result, plan, ((index, parse_chunk(r)) for index, r in tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                _insert_files(conn, result, plan, _parse_pooled(pool, tasks, workers))
+        result.files = len(plan)
+    finally:
+        conn.close()
+
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def _parse_pooled(
+    pool: ProcessPoolExecutor,
+    tasks: Sequence[Tuple[int, ByteRange]],
+    workers: int
+) -> Iterator[Tuple[int, ParsedChunk]]:
+    """Wyniki kolejnych zakresów (numer pliku, wynik); w toku najwyżej 2 x workers zakresów"""
+    remaining = iter(tasks)
+    pending: Deque[Tuple[int, Future]] = deque()
+
+    def fill() -> None:
+        while len(pending) < 2 * workers:
+            task = next(remaining, None)
+            if task is None:
+                return
+            pending.append((task[0], pool.submit(parse_chunk, task[1])))
+
+    fill()
+    while pending:
+        index, future = pending.popleft()
+        fill()
+        yield index, future.result()
+
+
+def _complete_end(path: str, start: int, size: int) -> int:
+    # Tylko pełne linie - niedokończona ostatnia linia bieżącego pliku poczeka na LogStore.sync
+    with open(path, 'rb') as f:
+        pos = size
+        while pos > start:
+            block = max(start, pos - 64 * 1024)
+            f.seek(block)
+            cut = f.read(pos - block).rfind(b'\n')
+            if cut >= 0:
+                return block + cut + 1
+            pos = block
+    return start
+
+
+def _insert_files(
+    conn: sqlite3.Connection,
+    result: BackfillResult,
+    plan: list,
+    parsed: Iterator[Tuple[int, ParsedChunk]]
+) -> None:
+    for index, group in groupby(parsed, key=itemgetter(0)):
+        path, identity, ranges = plan[index]
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if (stat.st_dev, stat.st_ino) != identity:
+                logger.warning(f"Plik {path} został podmieniony w trakcie importu - pominięto")
+                continue
+            for byte_range, records in zip(ranges, join_chunks(chunk for _, chunk in group)):
+                if not _insert_chunk(conn, result, f, byte_range, records):
+                    logger.info(f"Dalsza część {path} wczytana równolegle - pominięto")
+                    break
+
+
+def _insert_chunk(
+    conn: sqlite3.Connection,
+    result: BackfillResult,
+    f: BinaryIO,
+    byte_range: ByteRange,
+    records: List[LogRecord]
+) -> bool:
+    _, start, end = byte_range
+    started = time.perf_counter()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        # Zakres mógł w międzyczasie wczytać LogStore.sync (lub inny import)
+        if LogStore.ingest_offset(conn, f) != start:
+            conn.execute('ROLLBACK')
+            return False
+        if records:
+            result.records += LogStore.bulk_insert_records(conn, records)
+        LogStore.set_ingest_offset(conn, f, end)
+        conn.execute('COMMIT')
+    except Exception:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+    result.bytes += end - start
+    result.insert_seconds += time.perf_counter() - started
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m src.log_backfill',
+        description='Import historycznych plików logów do magazynu logów'
+    )
+    parser.add_argument('paths', nargs='+', metavar='PLIK', help='Pliki logów')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Liczba procesów parsujących (domyślnie liczba rdzeni)')
+    parser.add_argument('--chunk-mb', type=int, default=CHUNK_BYTES // 1024 // 1024,
+                        help='Rozmiar zakresu parsowanego przez jeden proces (MB)')
+    args = parser.parse_args(argv)
+
+    missing = [path for path in args.paths if not os.path.isfile(path)]
+    if missing:
+        parser.error(f"brak pliku: {', '.join(missing)}")
+
+    result = backfill(args.paths, args.workers, args.chunk_mb * 1024 * 1024)
+    print(
+        f"pliki: {result.files}, wpisy: {result.records:,}, "
+        f"{result.bytes / 1024 / 1024:,.1f} MB w {result.seconds:.1f}s ({result.mb_per_s:,.1f} MB/s), "
+        f"w tym zapis do bazy {result.insert_seconds:.1f}s"
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,347 @@
+"""
+Wspólny zapis logów wielu procesów aplikacji - kolektor na gnieździe lokalnym
+
+Procesy aplikacji (LOG_COLLECTOR_SOCKET) wysyłają sformatowane wpisy przez
+gniazdo Unix do jednego kolektora, który zapisuje je porcjami do pliku logów
+w tym samym formacie co Config.setup_logging.
+
+Użycie:
+    python -m src.log_collector [--socket data/log_collector.sock] [--log-file app.log]
+"""
+import argparse
+import math
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+import logging
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Nagłówek ramki: długość wpisu, pid, numer kolejny wpisu w procesie, czas wpisu (epoch)
+HEADER = struct.Struct('!IIQd')
+# Gniazdo kolektora, gdy LOG_COLLECTOR_SOCKET jest pusty (tylko CLI)
+DEFAULT_SOCKET = 'data/log_collector.sock'
+# Rozmiar odczytu z gniazda klienta (B)
+RECV_BUFFER = 256 * 1024
+# Odstęp zapisu porcji do pliku (s)
+FLUSH_INTERVAL = 0.05
+# Wpisy młodsze niż to okno czekają na następną porcję - wpisy innych
+# procesów z tego samego momentu trafiają do pliku w kolejności czasu
+ORDER_WINDOW = 0.1
+# Po tylu oczekujących wpisach porcja jest zapisywana od razu
+MAX_PENDING = 100000
+# Bufor wysyłki gniazda procesu aplikacji (B)
+SEND_BUFFER = 1024 * 1024
+# Limit czasu wysyłki wpisu przez proces aplikacji (s)
+SEND_TIMEOUT = 1.0
+# Odstęp prób ponownego połączenia z kolektorem (s)
+RECONNECT_INTERVAL = 5.0
+
+# Wpis oczekujący na zapis: (czas, pid, numer, linia UTF-8)
+Pending = Tuple[float, int, int, bytes]
+
+
+def frame(pid: int, seq: int, created: float, line: str) -> bytes:
+    """Ramka wpisu wysyłana do kolektora"""
+    data = line.encode('utf-8')
+    return HEADER.pack(len(data), pid, seq, created) + data
+
+
+class CollectorHandler(logging.Handler):
+    """
+    Handler wysyłający wpisy do kolektora, a gdy ten jest niedostępny - do pliku
+
+    Każdy wpis dostaje kolejny numer w procesie, także zapisany bezpośrednio
+    do pliku, więc kolektor widzi wpisy, które go ominęły, jako lukę.
+    """
+
+    def __init__(self, socket_path: str, fallback_file: str, timeout: float = SEND_TIMEOUT):
+        super().__init__()
+        self.socket_path = socket_path
+        self.fallback_file = fallback_file
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._fallback: Optional[logging.FileHandler] = None
+        self._seq = 0
+        # Połączenie przy pierwszym wpisie (emit)
+        self._retry_at = 0.0
+
+    def _connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        # Większy bufor wysyłki - chwilowe opóźnienie kolektora nie blokuje wątku loggera
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            self._retry_at = time.monotonic() + RECONNECT_INTERVAL
+            # Logger aplikacji prowadzi do tego handlera - komunikat tylko na stderr
+            sys.stderr.write(f"Kolektor logów {self.socket_path} niedostępny ({e}) - zapis do {self.fallback_file}\n")
+            return
+        self._sock = sock
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Wywoływane pod blokadą handlera - numeracja i wysyłka są atomowe
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        self._seq += 1
+        if self._sock is None and time.monotonic() >= self._retry_at:
+            self._connect()
+        if self._sock is not None:
+            try:
+                self._sock.sendall(frame(os.getpid(), self._seq, record.created, line))
+                return
+            except OSError as e:
+                sys.stderr.write(f"Utracono połączenie z kolektorem logów ({e}) - zapis do {self.fallback_file}\n")
+                self._sock.close()
+                self._sock = None
+                self._retry_at = time.monotonic() + RECONNECT_INTERVAL
+        if self._fallback is None:
+            self._fallback = logging.FileHandler(self.fallback_file)
+            self._fallback.setFormatter(self.formatter)
+        self._fallback.emit(record)
+
+    def close(self) -> None:
+        self.acquire()
+        try:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+            if self._fallback is not None:
+                self._fallback.close()
+                self._fallback = None
+        finally:
+            self.release()
+        super().close()
+
+
+class _ClientHandler(socketserver.BaseRequestHandler):
+    """Odbiór ramek jednego procesu aplikacji - porcjami, bez odczytu na każdy wpis"""
+
+    def handle(self) -> None:
+        collector: LogCollector = self.server.collector
+        buffer = b''
+        while True:
+            chunk = self.request.recv(RECV_BUFFER)
+            if not chunk:
+                return
+            buffer += chunk
+            entries = []
+            offset = 0
+            while len(buffer) - offset >= HEADER.size:
+                length, pid, seq, created = HEADER.unpack_from(buffer, offset)
+                end = offset + HEADER.size + length
+                if end > len(buffer):
+                    break
+                entries.append((created, pid, seq, buffer[offset + HEADER.size:end]))
+                offset = end
+            buffer = buffer[offset:]
+            if entries:
+                collector.add_batch(entries)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class LogCollector:
+    """
+    Kolektor wpisów: odbiór z gniazda, porządkowanie wg czasu i zapis porcjami
+
+    Wpisy czekają na liście i przed zapisem są sortowane wg (czas, pid, numer);
+    wątek zapisujący co FLUSH_INTERVAL zapisuje jednym wywołaniem write()
+    wpisy starsze niż ORDER_WINDOW. Dla każdego procesu kolektor pamięta
+    ostatni numer wpisu i liczy luki (wpisy zapisane przez proces
+    bezpośrednio do pliku).
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        log_file: str,
+        flush_interval: float = FLUSH_INTERVAL,
+        order_window: float = ORDER_WINDOW
+    ):
+        self.socket_path = socket_path
+        self.log_file = log_file
+        self.flush_interval = flush_interval
+        self.order_window = order_window
+        self._pending: List[Pending] = []
+        # pid -> [wpisy, ostatni numer, luki]
+        self._processes: Dict[int, List[int]] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._server: Optional[_Server] = None
+        self._threads: List[threading.Thread] = []
+        self._file = None
+        self.written = 0
+
+    def start(self) -> None:
+        """
+        Otwiera gniazdo i uruchamia wątki odbioru i zapisu
+
+        Raises:
+            RuntimeError: Na tym gnieździe działa już inny kolektor
+        """
+        self._remove_stale_socket()
+        self._stopped.clear()
+        directory = os.path.dirname(self.socket_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.log_file, 'ab')
+        self._server = _Server(self.socket_path, _ClientHandler)
+        self._server.collector = self
+        self._threads = [
+            threading.Thread(
+                target=self._server.serve_forever, kwargs={'poll_interval': 0.1}, name='log-collector', daemon=True
+            ),
+            threading.Thread(target=self._flush_loop, name='log-collector-writer', daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Kolektor logów: {self.socket_path} -> {self.log_file}")
+
+    def _remove_stale_socket(self) -> None:
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            # Gniazdo po zakończonym kolektorze
+            os.unlink(self.socket_path)
+            return
+        finally:
+            probe.close()
+        raise RuntimeError(f"Kolektor logów już działa na {self.socket_path}")
+
+    def add(self, pid: int, seq: int, created: float, line: str) -> None:
+        """Dodaje wpis procesu do kolejki zapisu"""
+        self.add_batch([(created, pid, seq, line.encode('utf-8'))])
+
+    def add_batch(self, entries: List[Pending]) -> None:
+        """Dodaje wpisy (w kolejności odbioru) do kolejki zapisu"""
+        with self._lock:
+            for _, pid, seq, _ in entries:
+                process = self._processes.get(pid)
+                if process is None or seq <= process[1]:
+                    # Nowy proces lub ponownie użyty pid - numeracja od początku
+                    process = self._processes[pid] = [0, 0, 0]
+                process[0] += 1
+                process[2] += seq - process[1] - 1
+                process[1] = seq
+            self._pending.extend(entries)
+            overflow = len(self._pending) >= MAX_PENDING
+        if overflow:
+            self.flush(force=True)
+
+    def flush(self, force: bool = False) -> int:
+        """
+        Zapisuje oczekujące wpisy starsze niż okno porządkowania
+
+        Args:
+            force: Zapisz wszystkie oczekujące wpisy
+
+        Returns:
+            Liczba zapisanych wpisów
+        """
+        # Jeden zapisujący naraz - porcje trafiają do pliku w kolejności pobrania
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            # Sortowanie poza blokadą - odbiór wpisów w tym czasie nie czeka
+            pending.sort()
+            ready = len(pending) if force else bisect_right(pending, (time.time() - self.order_window, math.inf))
+            if ready < len(pending):
+                with self._lock:
+                    self._pending.extend(pending[ready:])
+            if ready and self._file is not None:
+                self._file.write(b'\n'.join(entry[3] for entry in pending[:ready]) + b'\n')
+                self._file.flush()
+                self.written += ready
+        return ready
+
+    def _flush_loop(self) -> None:
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Błąd zapisu porcji logów: {e}")
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def stats(self) -> Dict[int, Dict[str, int]]:
+        """
+        Wpisy odebrane od każdego procesu
+
+        Returns:
+            pid -> słownik records, last_seq i gaps (wpisy, które nie dotarły przez gniazdo)
+        """
+        with self._lock:
+            return {
+                pid: {'records': records, 'last_seq': last_seq, 'gaps': gaps}
+                for pid, (records, last_seq, gaps) in self._processes.items()
+            }
+
+    def stop(self) -> None:
+        """Zamyka gniazdo i zapisuje wszystkie oczekujące wpisy"""
+        self._stopped.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+        self.flush(force=True)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m src.log_collector', description=__doc__.splitlines()[1])
+    parser.add_argument('--socket', default=Config.get_log_collector_socket() or DEFAULT_SOCKET,
+                        help='Gniazdo Unix kolektora')
+    parser.add_argument('--log-file', default=Config.get_log_file(), help='Plik logów')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    collector = LogCollector(args.socket, args.log_file)
+    try:
+        collector.start()
+    except RuntimeError as e:
+        logger.error(str(e))
+        return 1
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    stop.wait()
+    collector.stop()
+    for pid, stats in sorted(collector.stats().items()):
+        logger.info(f"Proces {pid}: {stats['records']} wpisów, luki: {stats['gaps']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,514 @@
+"""
+Magazyn logów - wpisy z pliku logów aplikacji w indeksowanej bazie SQLite
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import BinaryIO, Optional, List, Tuple, Sequence, Iterable
+import pyarrow as pa
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+FTS_INSERT_TRIGGER = '''
+CREATE TRIGGER IF NOT EXISTS log_entries_fts_insert AFTER INSERT ON log_entries BEGIN
+    INSERT INTO log_entries_fts (rowid, message) VALUES (new.id, new.message);
+END;
+'''
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS log_entries (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    level TEXT NOT NULL,
+    module TEXT NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_log_entries_ts ON log_entries (ts, id);
+CREATE INDEX IF NOT EXISTS idx_log_entries_level ON log_entries (level, ts, id);
+CREATE INDEX IF NOT EXISTS idx_log_entries_module ON log_entries (module, ts, id);
+CREATE TABLE IF NOT EXISTS log_ingest_files (
+    dev INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    head BLOB NOT NULL,
+    offset INTEGER NOT NULL,
+    PRIMARY KEY (dev, inode)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS log_entries_fts USING fts5(
+    message,
+    content='log_entries',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS log_entries_fts_delete AFTER DELETE ON log_entries BEGIN
+    INSERT INTO log_entries_fts (log_entries_fts, rowid, message)
+    VALUES ('delete', old.id, old.message);
+END;
+''' + FTS_INSERT_TRIGGER
+
+# Wersja schematu (PRAGMA user_version) - 2: indeks pełnotekstowy,
+# 3: pozycje wczytania plików wg tożsamości pliku (urządzenie, i-węzeł) zamiast ścieżki
+SCHEMA_VERSION = 3
+
+# Początek pliku zapisywany z pozycją - i-węzeł użyty ponownie przez inny plik
+# ma inny początek, więc taki plik czytany jest od początku
+HEAD_BYTES = 256
+
+# Format z Config.setup_logging: '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LINE_PATTERN = re.compile(
+    r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),(\d{3}) - (\S+) - '
+    r'(DEBUG|INFO|WARNING|ERROR|CRITICAL) - (.*)$'
+)
+
+LOG_LEVELS = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
+
+# Maksymalna porcja pliku wczytywana w jednej synchronizacji
+# (historyczne archiwa logów importuje narzędzie backfill)
+MAX_SYNC_BYTES = 8 * 1024 * 1024
+
+# Kursor stronicowania: (czas, id) ostatniego wiersza poprzedniej strony
+Cursor = Tuple[float, int]
+LogRecord = Tuple[float, str, str, str]
+
+
+def parse_line(line: str) -> Optional[LogRecord]:
+    """
+    Parsuje linię pliku logów
+
+    Args:
+        line: Linia w formacie Config.setup_logging (bez znaku nowej linii)
+
+    Returns:
+        Krotka (czas epoch, poziom, moduł, wiadomość) lub None dla linii
+        niebędącej początkiem wpisu (np. kontynuacja tracebacku)
+    """
+    match = LINE_PATTERN.match(line)
+    if match is None:
+        return None
+    asctime, millis, module, level, message = match.groups()
+    ts = datetime.strptime(asctime, '%Y-%m-%d %H:%M:%S').timestamp() + int(millis) / 1000
+    return ts, level, module, message
+
+
+def parse_lines(lines: Iterable[str]) -> List[LogRecord]:
+    """
+    Parsuje linie logów, doklejając linie kontynuacji do poprzedniego wpisu
+
+    Args:
+        lines: Linie pliku logów
+
+    Returns:
+        Lista wpisów
+    """
+    records: List[LogRecord] = []
+    for line in lines:
+        line = line.rstrip('\r\n')
+        record = parse_line(line)
+        if record is not None:
+            records.append(record)
+        elif records and line:
+            ts, level, module, message = records[-1]
+            records[-1] = (ts, level, module, f"{message}\n{line}")
+    return records
+
+
+class LogStore:
+    """Dostęp do tabeli wpisów logów"""
+
+    _sync_lock = threading.Lock()
+    _last_sync = 0.0
+    # Lista modułów zapamiętana dla (plik bazy, wersja danych) - wspólna dla sesji
+    _modules: Optional[Tuple[Tuple[str, int], List[str]]] = None
+
+    @staticmethod
+    def connect() -> sqlite3.Connection:
+        """
+        Otwiera połączenie z bazą logów i tworzy schemat jeśli nie istnieje
+
+        Returns:
+            Połączenie w trybie autocommit (transakcje zarządzane jawnie)
+        """
+        conn = sqlite3.connect(Config.get_log_db_file(), timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+        if conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+            LogStore._migrate(conn)
+        return conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if version < 2:
+                # Jednorazowe zaindeksowanie wpisów sprzed indeksu pełnotekstowego -
+                # kolejne wpisy indeksowane są przyrostowo przez trigger
+                conn.execute("INSERT INTO log_entries_fts (log_entries_fts) VALUES ('rebuild')")
+            if version < 3 and conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'log_ingest_state'"
+            ).fetchone():
+                # Pozycje wg ścieżki przenoszone dla plików, które nadal są pod tą ścieżką
+                for path, inode, offset in conn.execute('SELECT path, inode, offset FROM log_ingest_state').fetchall():
+                    try:
+                        with open(path, 'rb') as f:
+                            if os.fstat(f.fileno()).st_ino == inode:
+                                LogStore.set_ingest_offset(conn, f, offset)
+                    except OSError:
+                        continue
+                conn.execute('DROP TABLE log_ingest_state')
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    @staticmethod
+    def insert_records(conn: sqlite3.Connection, records: Sequence[LogRecord]) -> int:
+        """
+        Wstawia wpisy logów (w ramach transakcji wywołującego)
+
+        Args:
+            conn: Połączenie z bazą logów
+            records: Wpisy (czas, poziom, moduł, wiadomość)
+
+        Returns:
+            Liczba wstawionych wpisów
+        """
+        conn.executemany(
+            'INSERT INTO log_entries (ts, level, module, message) VALUES (?, ?, ?, ?)', records
+        )
+        return len(records)
+
+    @staticmethod
+    def bulk_insert_records(conn: sqlite3.Connection, records: Iterable[LogRecord]) -> int:
+        """
+        Wstawia dużą liczbę wpisów (w ramach transakcji wywołującego)
+
+        Indeks pełnotekstowy uzupełniany jest jednym poleceniem po wstawieniu
+        wszystkich wierszy zamiast triggerem dla każdego wiersza - kilkukrotnie
+        szybciej. Trigger jest przywracany przed końcem transakcji.
+
+        Args:
+            conn: Połączenie z bazą logów (w otwartej transakcji)
+            records: Wpisy (czas, poziom, moduł, wiadomość)
+
+        Returns:
+            Liczba wstawionych wpisów
+        """
+        last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM log_entries').fetchone()[0]
+        conn.execute('DROP TRIGGER log_entries_fts_insert')
+        cursor = conn.executemany(
+            'INSERT INTO log_entries (ts, level, module, message) VALUES (?, ?, ?, ?)', records
+        )
+        conn.execute(
+            'INSERT INTO log_entries_fts (rowid, message) '
+            'SELECT id, message FROM log_entries WHERE id > ?', (last_id,)
+        )
+        conn.execute(FTS_INSERT_TRIGGER)
+        return cursor.rowcount
+
+    @staticmethod
+    def ingest_offset(conn: sqlite3.Connection, f: BinaryIO) -> int:
+        """
+        Zwraca pozycję w pliku, do której wpisy są już w bazie
+
+        Pozycja przypisana jest do pliku (urządzenie, i-węzeł), nie do ścieżki -
+        plik po rotacji (app.log -> app.log.1) zachowuje pozycję, więc backfill
+        nie wstawia ponownie wpisów wczytanych wcześniej przez sync.
+
+        Args:
+            conn: Połączenie z bazą logów
+            f: Plik otwarty w trybie binarnym (pozycja odczytu może się zmienić)
+
+        Returns:
+            Przesunięcie w bajtach (0 dla nowego, podmienionego lub obciętego pliku)
+        """
+        stat = os.fstat(f.fileno())
+        row = conn.execute(
+            'SELECT head, offset FROM log_ingest_files WHERE dev = ? AND inode = ?', (stat.st_dev, stat.st_ino)
+        ).fetchone()
+        if row is None or row[1] > stat.st_size:
+            return 0
+        f.seek(0)
+        # Obcięty i zapisany od nowa albo inny plik na tym samym i-węźle - czytamy od początku
+        return row[1] if f.read(len(row[0])) == row[0] else 0
+
+    @staticmethod
+    def set_ingest_offset(conn: sqlite3.Connection, f: BinaryIO, offset: int) -> None:
+        """Zapisuje pozycję wczytania pliku (w ramach transakcji wywołującego)"""
+        stat = os.fstat(f.fileno())
+        f.seek(0)
+        head = f.read(min(offset, HEAD_BYTES))
+        conn.execute(
+            'INSERT INTO log_ingest_files (dev, inode, head, offset) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(dev, inode) DO UPDATE SET head = excluded.head, offset = excluded.offset',
+            (stat.st_dev, stat.st_ino, head, offset)
+        )
+
+    @classmethod
+    def sync(cls, path: Optional[str] = None, min_interval: float = 0) -> int:
+        """
+        Dopisuje do bazy nowe wpisy z pliku logów (od ostatnio wczytanej pozycji)
+
+        Args:
+            path: Plik logów (domyślnie Config.get_log_file())
+            min_interval: Minimalny odstęp w sekundach od poprzedniej synchronizacji
+
+        Returns:
+            Liczba dopisanych wpisów
+        """
+        path = path or Config.get_log_file()
+        if time.time() - cls._last_sync < min_interval or not os.path.exists(path):
+            return 0
+
+        # Jedna synchronizacja naraz - pozostałe sesje nie czekają, tylko ją pomijają
+        if not cls._sync_lock.acquire(blocking=False):
+            return 0
+        try:
+            cls._last_sync = time.time()
+            return cls._sync_file(path)
+        finally:
+            cls._sync_lock.release()
+
+    @classmethod
+    def _sync_file(cls, path: str) -> int:
+        conn = cls.connect()
+        try:
+            with open(path, 'rb') as f:
+                # Pozycja czytana w transakcji zapisu - inny proces (druga instancja
+                # aplikacji, backfill) nie wstawi tych samych linii równolegle
+                conn.execute('BEGIN IMMEDIATE')
+                size = os.fstat(f.fileno()).st_size
+                offset = cls.ingest_offset(conn, f)
+                if offset == size:
+                    conn.execute('COMMIT')
+                    return 0
+                f.seek(offset)
+                data = f.read(MAX_SYNC_BYTES)
+                # Tylko pełne linie - niedokończona ostatnia linia poczeka na kolejną synchronizację
+                complete = data[:data.rfind(b'\n') + 1]
+                records = parse_lines(complete.decode('utf-8', errors='replace').splitlines())
+
+                count = cls.insert_records(conn, records)
+                cls.set_ingest_offset(conn, f, offset + len(complete))
+                conn.execute('COMMIT')
+                return count
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def version() -> int:
+        """
+        Zwraca wersję danych (najwyższe id) - zmienia się po dopisaniu wpisów
+
+        Returns:
+            Najwyższe id wpisu lub 0 dla pustej bazy
+        """
+        if not os.path.exists(Config.get_log_db_file()):
+            return 0
+        conn = LogStore.connect()
+        try:
+            return conn.execute('SELECT COALESCE(MAX(id), 0) FROM log_entries').fetchone()[0]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def fetch_page(
+        after: Optional[Cursor],
+        limit: int,
+        levels: Sequence[str] = (),
+        module: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        descending: bool = True
+    ) -> Tuple[pa.Table, Optional[Cursor]]:
+        """
+        Zwraca jedną stronę wpisów (stronicowanie po kluczu czas + id)
+
+        Args:
+            after: Kursor ostatniego wiersza poprzedniej strony (None dla pierwszej)
+            limit: Liczba wierszy na stronę
+            levels: Filtr poziomów logów
+            module: Filtr modułu
+            since: Początek zakresu czasu (epoch, włącznie)
+            until: Koniec zakresu czasu (epoch, rozłącznie)
+            descending: Najnowsze wpisy jako pierwsze
+
+        Returns:
+            Krotka (tabela Arrow ze stroną, kursor następnej strony lub None)
+        """
+        where, params = [], []
+        if levels:
+            where.append(f"level IN ({', '.join('?' * len(levels))})")
+            params.extend(levels)
+        if module:
+            where.append('module = ?')
+            params.append(module)
+        if since is not None:
+            where.append('ts >= ?')
+            params.append(since)
+        if until is not None:
+            where.append('ts < ?')
+            params.append(until)
+        if after is not None:
+            where.append('(ts, id) < (?, ?)' if descending else '(ts, id) > (?, ?)')
+            params.extend(after)
+
+        order = 'DESC' if descending else 'ASC'
+        sql = 'SELECT id, ts, level, module, message FROM log_entries'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += f' ORDER BY ts {order}, id {order} LIMIT ?'
+        # Jeden wiersz więcej - informacja czy istnieje kolejna strona
+        params.append(limit + 1)
+
+        rows = []
+        if os.path.exists(Config.get_log_db_file()):
+            conn = LogStore.connect()
+            try:
+                rows = conn.execute(sql, params).fetchall()
+            finally:
+                conn.close()
+
+        page = rows[:limit]
+        next_cursor = (page[-1][1], page[-1][0]) if len(rows) > limit else None
+        return logs_to_arrow(page), next_cursor
+
+    @staticmethod
+    def search(
+        text: str,
+        levels: Sequence[str] = (),
+        module: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        order: str = 'rank',
+        limit: int = 100
+    ) -> pa.Table:
+        """
+        Wyszukuje pełnotekstowo w wiadomościach logów
+
+        Args:
+            text: Tekst wyszukiwania
+            levels: Filtr poziomów logów
+            module: Filtr modułu
+            since: Początek zakresu czasu (epoch, włącznie)
+            until: Koniec zakresu czasu (epoch, rozłącznie)
+            order: 'rank' - najtrafniejsze (BM25), 'time' - najnowsze
+            limit: Maksymalna liczba wyników
+
+        Returns:
+            Tabela Arrow z wynikami
+        """
+        match = build_match_query(text)
+        if not match or not os.path.exists(Config.get_log_db_file()):
+            return logs_to_arrow([])
+
+        where, params = ['log_entries_fts MATCH ?'], [match]
+        if levels:
+            where.append(f"e.level IN ({', '.join('?' * len(levels))})")
+            params.extend(levels)
+        if module:
+            where.append('e.module = ?')
+            params.append(module)
+        if since is not None:
+            where.append('e.ts >= ?')
+            params.append(since)
+        if until is not None:
+            where.append('e.ts < ?')
+            params.append(until)
+        params.append(limit)
+
+        order_by = 'bm25(log_entries_fts)' if order == 'rank' else 'e.ts DESC, e.id DESC'
+        sql = (
+            'SELECT e.id, e.ts, e.level, e.module, e.message '
+            'FROM log_entries_fts JOIN log_entries e ON e.id = log_entries_fts.rowid '
+            f"WHERE {' AND '.join(where)} ORDER BY {order_by} LIMIT ?"
+        )
+        conn = LogStore.connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        return logs_to_arrow(rows)
+
+    @classmethod
+    def modules(cls, version: Optional[int] = None) -> List[str]:
+        """
+        Zwraca listę modułów występujących w logach
+
+        Lista jest zapamiętywana dla wersji danych - SELECT DISTINCT
+        wykonywany jest ponownie dopiero po dopisaniu wpisów.
+
+        Args:
+            version: Wersja danych z version() (domyślnie odczytywana)
+
+        Returns:
+            Posortowana lista nazw modułów
+        """
+        db_file = Config.get_log_db_file()
+        if not os.path.exists(db_file):
+            return []
+        key = (db_file, cls.version() if version is None else version)
+        cached = cls._modules
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        conn = cls.connect()
+        try:
+            modules = [row[0] for row in conn.execute(
+                'SELECT DISTINCT module FROM log_entries ORDER BY module'
+            )]
+        finally:
+            conn.close()
+        cls._modules = (key, modules)
+        return modules
+
+
+def build_match_query(text: str) -> str:
+    """
+    Zamienia tekst wpisany przez użytkownika na zapytanie FTS5
+
+    Każde słowo jest cytowane (znaki specjalne FTS5 nie powodują błędów),
+    słowa muszą wystąpić wszystkie, a `*` na końcu słowa oznacza prefiks.
+
+    Args:
+        text: Tekst wyszukiwania
+
+    Returns:
+        Zapytanie MATCH lub pusty napis gdy tekst nie zawiera słów
+    """
+    terms = []
+    for word in text.split():
+        prefix = word.endswith('*')
+        word = word.rstrip('*').replace('"', '""')
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return ' '.join(terms)
+
+
+def logs_to_arrow(rows: Sequence[Tuple[int, float, str, str, str]]) -> pa.Table:
+    """
+    Konwertuje wiersze logów do tabeli Arrow z polskimi nazwami kolumn
+
+    Args:
+        rows: Wiersze (id, czas, poziom, moduł, wiadomość)
+
+    Returns:
+        Tabela Arrow
+    """
+    ids, ts, levels, modules, messages = zip(*rows) if rows else ((), (), (), (), ())
+    return pa.table({
+        'ID': pa.array(ids, pa.int64()),
+        # Czas lokalny, tak jak w pliku logów
+        'Czas': pa.array([datetime.fromtimestamp(t) for t in ts], pa.timestamp('us')),
+        'Poziom': pa.array(levels, pa.string()),
+        'Moduł': pa.array(modules, pa.string()),
+        'Wiadomość': pa.array(messages, pa.string())
+    })
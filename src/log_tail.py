@@ -0,0 +1,163 @@
+"""
+Wspólny podgląd końcówki pliku logów - jeden wątek czytający na proces, wiele sesji
+"""
+import os
+import threading
+import time
+import logging
+from collections import deque
+from itertools import islice
+from typing import BinaryIO, Deque, List, Optional, Tuple
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Liczba ostatnich linii trzymanych w pamięci
+TAIL_CAPACITY = 5000
+# Odstęp sprawdzania pliku przez wątek (s)
+TAIL_INTERVAL = 1.0
+# Przy starcie wczytywana jest końcówka pliku o tym rozmiarze
+INITIAL_BYTES = 64 * 1024
+
+
+class LogTailer:
+    """
+    Śledzenie pliku logów do ograniczonego bufora linii z numerami sekwencyjnymi
+
+    Plik czyta tylko wątek tailera - sesje odczytują bufor od ostatnio
+    widzianego numeru, więc liczba odczytów pliku nie zależy od liczby
+    oglądających. Po rotacji (nowy plik pod tą samą ścieżką) dokańczany jest
+    stary plik, a potem czytany nowy od początku; po obcięciu - od początku.
+    """
+
+    _lines: Deque[str] = deque(maxlen=TAIL_CAPACITY)
+    # Numer najnowszej linii w buforze (numery kolejnych linii rosną o 1)
+    _last_seq = 0
+    _path: Optional[str] = None
+    _file: Optional[BinaryIO] = None
+    _partial = b''
+    _lock = threading.Lock()
+    _poll_lock = threading.Lock()
+    _thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def start(cls, path: Optional[str] = None) -> None:
+        """
+        Uruchamia wątek śledzący plik (raz na proces)
+
+        Args:
+            path: Plik logów (domyślnie Config.get_log_file())
+        """
+        with cls._poll_lock:
+            if cls._path is None:
+                cls._path = path or Config.get_log_file()
+            if cls._thread is not None:
+                return
+            cls._thread = threading.Thread(target=cls._tail_loop, name='log-tailer', daemon=True)
+        # Pierwszy odczyt od razu - pierwsza sesja nie czeka na wątek
+        cls.poll()
+        cls._thread.start()
+
+    @classmethod
+    def _tail_loop(cls) -> None:
+        while True:
+            try:
+                cls.poll()
+            except Exception as e:
+                logger.error(f"Błąd odczytu pliku logów: {e}")
+            time.sleep(TAIL_INTERVAL)
+
+    @classmethod
+    def poll(cls) -> int:
+        """
+        Dopisuje do bufora nowe linie z pliku
+
+        Returns:
+            Liczba nowych linii
+        """
+        with cls._poll_lock:
+            path = cls._path or Config.get_log_file()
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stat = None
+
+            if cls._file is None:
+                if stat is None:
+                    return 0
+                cls._file = cls._open_tail(path, stat.st_size)
+            elif stat is not None and os.fstat(cls._file.fileno()).st_ino == stat.st_ino \
+                    and stat.st_size < cls._file.tell():
+                # Obcięcie pliku - czytamy od początku
+                cls._file.seek(0)
+                cls._partial = b''
+
+            data = cls._file.read()
+            if stat is not None and os.fstat(cls._file.fileno()).st_ino != stat.st_ino:
+                # Rotacja - reszta starego pliku już wczytana, niedokończona linia zamykana
+                if (cls._partial or data) and not (cls._partial + data).endswith(b'\n'):
+                    data += b'\n'
+                count = cls._append(data)
+                cls._file.close()
+                cls._file = open(path, 'rb')
+                data = cls._file.read()
+                return count + cls._append(data)
+            return cls._append(data)
+
+    @classmethod
+    def _open_tail(cls, path: str, size: int) -> BinaryIO:
+        f = open(path, 'rb')
+        if size > INITIAL_BYTES:
+            # Pierwsza, niepełna linia końcówki jest pomijana
+            f.seek(size - INITIAL_BYTES)
+            f.readline()
+        return f
+
+    @classmethod
+    def _append(cls, data: bytes) -> int:
+        data = cls._partial + data
+        cut = data.rfind(b'\n')
+        cls._partial = data[cut + 1:]
+        if cut < 0:
+            return 0
+        lines = data[:cut].decode('utf-8', errors='replace').replace('\r', '').split('\n')
+        with cls._lock:
+            cls._lines.extend(lines)
+            cls._last_seq += len(lines)
+        return len(lines)
+
+    @classmethod
+    def read(cls, after_seq: int = 0, limit: Optional[int] = None) -> Tuple[List[str], int]:
+        """
+        Zwraca linie dopisane po danym numerze (bez odczytu pliku)
+
+        Args:
+            after_seq: Numer ostatnio widzianej linii (0 - cały bufor)
+            limit: Maksymalna liczba zwracanych, najnowszych linii
+
+        Returns:
+            Krotka (nowe linie od najstarszej, numer najnowszej linii)
+        """
+        if cls._thread is None:
+            cls.start()
+        with cls._lock:
+            last_seq = cls._last_seq
+            # Numer spoza bufora (np. po restarcie procesu) - zwracany cały bufor
+            count = last_seq - after_seq if 0 <= after_seq <= last_seq else len(cls._lines)
+            count = min(count, len(cls._lines), limit if limit is not None else count)
+            lines = list(islice(reversed(cls._lines), count))
+        lines.reverse()
+        return lines, last_seq
+
+    @classmethod
+    def reset(cls) -> None:
+        """Zamyka plik i czyści bufor (wątek, jeśli działa, czyta dalej od nowa)"""
+        with cls._poll_lock:
+            if cls._file is not None:
+                cls._file.close()
+            cls._file = None
+            cls._path = None
+            cls._partial = b''
+            with cls._lock:
+                cls._lines.clear()
+                cls._last_seq = 0
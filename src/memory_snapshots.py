@@ -0,0 +1,360 @@
+"""
+Migawki pamięci na żądanie - alokacje (tracemalloc), właściciele pamięci i rozmiary stanów sesji
+"""
+import gc
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import types
+import logging
+from dataclasses import dataclass, field, fields
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Liczba ramek stosu zapisywanych przy alokacji (więcej = większy narzut)
+TRACE_FRAMES = 1
+# Migawki tracemalloc są duże - w pamięci trzymane są tylko ostatnie
+MAX_SNAPSHOTS = 10
+# Liczba miejsc alokacji w porównaniu migawek
+TOP_ALLOCATIONS = 30
+# Liczba największych kluczy stanu sesji w raporcie
+TOP_SESSION_KEYS = 5
+# Przerwanie liczenia rozmiaru bardzo dużych struktur
+MAX_SIZE_OBJECTS = 1_000_000
+
+# Alokacje samego mechanizmu śledzenia i importów nie są raportowane
+TRACE_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>')
+]
+
+# Typy, w które liczenie rozmiaru nie schodzi (kod i definicje, nie dane)
+_SKIP_TYPES = (
+    type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+    types.MethodType, types.CodeType, types.FrameType
+)
+
+
+def _data_size(obj) -> Optional[int]:
+    """Rozmiar obiektów trzymających dane poza obiektami Pythona (numpy, pandas, Arrow)"""
+    module = type(obj).__module__
+    if module.startswith('numpy') or module.startswith('pandas'):
+        # __sizeof__ tablic numpy i struktur pandas obejmuje ich dane
+        return sys.getsizeof(obj)
+    if module.startswith('pyarrow') and hasattr(obj, 'nbytes'):
+        return sys.getsizeof(obj) + obj.nbytes
+    return None
+
+
+def deep_size(obj) -> int:
+    """
+    Przybliżony rozmiar obiektu razem z obiektami, do których się odwołuje
+
+    Każdy obiekt liczony jest raz. Moduły, klasy, funkcje i kod są pomijane,
+    a tablice numpy, struktury pandas i tabele Arrow liczone razem z buforami
+    danych, bez schodzenia w głąb.
+
+    Args:
+        obj: Mierzony obiekt
+
+    Returns:
+        Rozmiar w bajtach
+    """
+    seen = set()
+    pending = [obj]
+    total = 0
+    while pending and len(seen) < MAX_SIZE_OBJECTS:
+        current = pending.pop()
+        if id(current) in seen or isinstance(current, _SKIP_TYPES):
+            continue
+        seen.add(id(current))
+        size = _data_size(current)
+        if size is not None:
+            total += size
+            continue
+        total += sys.getsizeof(current)
+        pending.extend(gc.get_referents(current))
+    return total
+
+
+def rss_bytes() -> int:
+    """Bieżąca pamięć rezydentna procesu (RSS) w bajtach"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        # Poza Linuksem dostępne jest tylko maksimum (ru_maxrss w kB, na macOS w bajtach)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def session_state_sizes() -> List[Dict]:
+    """
+    Rozmiary stanów wszystkich aktywnych sesji Streamlit
+
+    Returns:
+        Lista słowników session_id, username, size i top_keys (największe klucze),
+        od największej sesji; pusta poza działającym serwerem Streamlit
+    """
+    try:
+        from streamlit import runtime
+        if not runtime.exists():
+            return []
+        sessions = runtime.get_instance()._session_mgr.list_active_sessions()
+    except Exception as e:
+        logger.debug(f"Nie udało się pobrać listy sesji: {e}")
+        return []
+
+    result = []
+    for info in sessions:
+        state = info.session.session_state.filtered_state
+        key_sizes = sorted(((key, deep_size(value)) for key, value in state.items()),
+                           key=lambda item: item[1], reverse=True)
+        result.append({
+            'session_id': info.session.id,
+            'username': state.get('username'),
+            'size': sum(size for _, size in key_sizes),
+            'top_keys': dict(key_sizes[:TOP_SESSION_KEYS])
+        })
+    result.sort(key=lambda row: row['size'], reverse=True)
+    return result
+
+
+def streamlit_cache_size() -> int:
+    """Rozmiar wpisów st.cache_data i st.cache_resource wg statystyk Streamlit"""
+    from streamlit.runtime.caching import get_data_cache_stats_provider, get_resource_cache_stats_provider
+    total = 0
+    for provider in (get_data_cache_stats_provider(), get_resource_cache_stats_provider()):
+        stats = provider.get_stats()
+        # Nowsze wersje Streamlit grupują statystyki w słowniku rodzin metryk
+        if isinstance(stats, dict):
+            stats = [stat for family in stats.values() for stat in family]
+        total += sum(stat.byte_length for stat in stats)
+    return total
+
+
+@dataclass
+class MemorySnapshot:
+    """Migawka pamięci procesu"""
+    id: int
+    label: str
+    timestamp: float
+    rss: int
+    # Pamięć zaalokowana od włączenia śledzenia (bieżąca i szczytowa)
+    traced: int
+    traced_peak: int
+    # Rozmiar każdego zarejestrowanego właściciela pamięci (bajty)
+    owners: Dict[str, int] = field(default_factory=dict)
+    sessions: List[Dict] = field(default_factory=list)
+    snapshot: Optional[tracemalloc.Snapshot] = field(default=None, repr=False)
+
+    def to_dict(self, top: int = TOP_ALLOCATIONS) -> Dict:
+        """Dane migawki z największymi miejscami alokacji (bez obiektu tracemalloc)"""
+        # Bez asdict - kopiowałby całą migawkę tracemalloc
+        data = {f.name: getattr(self, f.name) for f in fields(self) if f.name != 'snapshot'}
+        stats = self.snapshot.statistics('lineno')[:top] if self.snapshot else []
+        data['allocations'] = [
+            {'location': str(stat.traceback[0]), 'size': stat.size, 'count': stat.count}
+            for stat in stats
+        ]
+        return data
+
+
+class MemorySnapshots:
+    """
+    Migawki pamięci i ich porównania dla narzędzi deweloperskich
+
+    Śledzenie alokacji (tracemalloc) włączane jest dopiero przy pierwszej
+    migawce - wcześniej aplikacja nie ponosi jego narzutu. Właściciele pamięci
+    (bufory, cache) rejestrowani są funkcjami zwracającymi rozmiar w bajtach.
+    """
+
+    _snapshots: List[MemorySnapshot] = []
+    _owners: Dict[str, Callable[[], int]] = {}
+    _next_id = 1
+    _lock = threading.Lock()
+
+    @classmethod
+    def register_owner(cls, name: str, size: Callable[[], int]) -> None:
+        """
+        Rejestruje właściciela pamięci raportowanego w migawkach
+
+        Args:
+            name: Nazwa w raporcie
+            size: Funkcja zwracająca rozmiar w bajtach (np. przez deep_size)
+        """
+        cls._owners[name] = size
+
+    @classmethod
+    def owner_sizes(cls) -> Dict[str, int]:
+        """Rozmiary zarejestrowanych właścicieli (właściciel z błędem jest pomijany)"""
+        sizes = {}
+        for name, size in list(cls._owners.items()):
+            try:
+                sizes[name] = int(size())
+            except Exception as e:
+                logger.warning(f"Nie udało się zmierzyć pamięci '{name}': {e}")
+        return sizes
+
+    @classmethod
+    def is_tracing(cls) -> bool:
+        return tracemalloc.is_tracing()
+
+    @classmethod
+    def take(cls, label: Optional[str] = None) -> MemorySnapshot:
+        """
+        Wykonuje migawkę (przy pierwszej włącza śledzenie alokacji)
+
+        Args:
+            label: Opis migawki
+
+        Returns:
+            Zapisana migawka
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+            logger.info("Włączono śledzenie alokacji pamięci")
+        snapshot = tracemalloc.take_snapshot().filter_traces(TRACE_FILTERS)
+        traced, traced_peak = tracemalloc.get_traced_memory()
+        owners = cls.owner_sizes()
+        sessions = session_state_sizes()
+
+        with cls._lock:
+            memory_snapshot = MemorySnapshot(
+                id=cls._next_id,
+                label=label or f"Migawka {cls._next_id}",
+                timestamp=time.time(),
+                rss=rss_bytes(),
+                traced=traced,
+                traced_peak=traced_peak,
+                owners=owners,
+                sessions=sessions,
+                snapshot=snapshot
+            )
+            cls._next_id += 1
+            cls._snapshots.append(memory_snapshot)
+            del cls._snapshots[:-MAX_SNAPSHOTS]
+        logger.info(f"Migawka pamięci {memory_snapshot.id}: RSS {memory_snapshot.rss / 2**20:.1f} MB")
+        return memory_snapshot
+
+    @classmethod
+    def snapshots(cls) -> List[MemorySnapshot]:
+        """Migawki w pamięci od najstarszej"""
+        with cls._lock:
+            return list(cls._snapshots)
+
+    @classmethod
+    def get(cls, snapshot_id: int) -> Optional[MemorySnapshot]:
+        with cls._lock:
+            return next((s for s in cls._snapshots if s.id == snapshot_id), None)
+
+    @classmethod
+    def diff(cls, old: MemorySnapshot, new: MemorySnapshot, top: int = TOP_ALLOCATIONS) -> Dict:
+        """
+        Porównuje dwie migawki
+
+        Args:
+            old: Wcześniejsza migawka
+            new: Późniejsza migawka
+            top: Liczba miejsc alokacji o największym przyroście
+
+        Returns:
+            Słownik z przyrostem RSS i pamięci śledzonej oraz listami allocations
+            (plik:linia), owners (właściciele) i sessions (stany sesji)
+        """
+        allocations = []
+        if old.snapshot is not None and new.snapshot is not None:
+            stats = new.snapshot.compare_to(old.snapshot, 'lineno')
+            stats.sort(key=lambda stat: abs(stat.size_diff), reverse=True)
+            allocations = [
+                {
+                    'location': str(stat.traceback[0]),
+                    'size_diff': stat.size_diff,
+                    'count_diff': stat.count_diff,
+                    'size': stat.size
+                }
+                for stat in stats[:top] if stat.size_diff or stat.count_diff
+            ]
+
+        owners = [
+            {
+                'owner': name,
+                'before': old.owners.get(name, 0),
+                'after': new.owners.get(name, 0),
+                'diff': new.owners.get(name, 0) - old.owners.get(name, 0)
+            }
+            for name in dict.fromkeys([*old.owners, *new.owners])
+        ]
+        owners.sort(key=lambda row: abs(row['diff']), reverse=True)
+
+        old_sessions = {row['session_id']: row for row in old.sessions}
+        new_sessions = {row['session_id']: row for row in new.sessions}
+        sessions = [
+            {
+                'session_id': session_id,
+                'username': (new_sessions.get(session_id) or old_sessions[session_id])['username'],
+                'before': old_sessions.get(session_id, {}).get('size', 0),
+                'after': new_sessions.get(session_id, {}).get('size', 0)
+            }
+            for session_id in dict.fromkeys([*old_sessions, *new_sessions])
+        ]
+        for row in sessions:
+            row['diff'] = row['after'] - row['before']
+        sessions.sort(key=lambda row: abs(row['diff']), reverse=True)
+
+        return {
+            'old': {'id': old.id, 'label': old.label, 'timestamp': old.timestamp},
+            'new': {'id': new.id, 'label': new.label, 'timestamp': new.timestamp},
+            'seconds': new.timestamp - old.timestamp,
+            'rss_diff': new.rss - old.rss,
+            'traced_diff': new.traced - old.traced,
+            'allocations': allocations,
+            'owners': owners,
+            'sessions': sessions
+        }
+
+    @classmethod
+    def stop(cls) -> None:
+        """Wyłącza śledzenie alokacji i usuwa migawki"""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("Wyłączono śledzenie alokacji pamięci")
+        with cls._lock:
+            cls._snapshots.clear()
+
+
+def register_default_owners() -> None:
+    """Rejestruje bufory i cache aplikacji jako właścicieli pamięci"""
+    from .anomaly import AnomalyDetector
+    from .auth_events import AuthEventStream
+    from .log_tail import LogTailer
+    from .metrics import MetricsRegistry, ActiveSessions
+    from .paginated_table import PageCache
+    from .preferences import PreferencesStore
+    from .session_history import SessionHistory
+    from .session_token import SessionToken
+
+    owners = {
+        'Cache Streamlit (st.cache_*)': streamlit_cache_size,
+        'Cache stron tabel (Arrow)': lambda: deep_size(PageCache._pages),
+        'Bufor podglądu logów': lambda: deep_size(LogTailer._lines),
+        'Strumień zdarzeń logowania': lambda: deep_size(vars(AuthEventStream)),
+        'Detektor anomalii': lambda: deep_size(vars(AnomalyDetector)),
+        'Metryki i aktywne sesje': lambda: deep_size([vars(MetricsRegistry), vars(ActiveSessions)]),
+        'Bufory zapisu w tle': lambda: deep_size([PreferencesStore._dirty, SessionHistory._buffer]),
+        'Unieważnione tokeny sesji': lambda: deep_size(vars(SessionToken))
+    }
+    for name, size in owners.items():
+        MemorySnapshots.register_owner(name, size)
+
+
+def to_json(report: Dict) -> str:
+    """Raport (migawka lub porównanie) jako JSON do pobrania"""
+    return json.dumps(report, ensure_ascii=False, indent=2)
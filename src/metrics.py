@@ -0,0 +1,446 @@
+"""
+Metryki w formacie Prometheus i sondy zdrowia na osobnym wątku serwera HTTP
+"""
+import math
+import threading
+import time
+import logging
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Granice kubełków histogramów (s)
+RERUN_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BCRYPT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+LDAP_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+PAYLOAD_BUCKETS = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7)
+
+# Sesja jest aktywna, jeśli jej skrypt wykonał się w tym okresie (s)
+ACTIVE_SESSION_WINDOW = 300
+
+Labels = Tuple[str, ...]
+
+
+class _ShardedValues:
+    """
+    Wartości metryki w osobnym fragmencie (shard) dla każdego wątku
+
+    Wątek zapisuje tylko do własnego fragmentu, więc aktualizacja nie wymaga
+    blokady. Odczyt sumuje fragmenty. Fragmenty zakończonych wątków (Streamlit
+    uruchamia skrypt w nowym wątku przy każdym przebiegu) są przenoszone do
+    wspólnej sumy przy rejestracji fragmentu nowego wątku i przy odczycie -
+    liczba fragmentów nie rośnie także bez odczytów (np. z METRICS_PORT=0).
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._local = threading.local()
+        self._shards: List[Tuple[threading.Thread, Dict[Labels, List[float]]]] = []
+        self._retired: Dict[Labels, List[float]] = {}
+        # Tylko rejestracja fragmentu (raz na wątek) i odczyt
+        self._lock = threading.Lock()
+
+    def slots(self, labels: Labels) -> List[float]:
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._retire_dead()
+                self._shards.append((threading.current_thread(), shard))
+        values = shard.get(labels)
+        if values is None:
+            values = shard[labels] = [0.0] * self.size
+        return values
+
+    def _retire_dead(self) -> None:
+        # Wywoływane pod self._lock - zakończony wątek nie zapisze już do fragmentu
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                _add(self._retired, shard)
+        self._shards = alive
+
+    def collect(self) -> Dict[Labels, List[float]]:
+        with self._lock:
+            self._retire_dead()
+            totals = {labels: list(values) for labels, values in self._retired.items()}
+            for _, shard in self._shards:
+                _add(totals, shard)
+        return totals
+
+    def clear(self) -> None:
+        with self._lock:
+            self._retire_dead()
+            for _, shard in self._shards:
+                shard.clear()
+            self._retired.clear()
+
+
+def _add(totals: Dict[Labels, List[float]], shard: Dict[Labels, List[float]]) -> None:
+    # Kopia - wątek właściciel może w tym czasie dodać nowy zestaw etykiet
+    for labels, values in shard.copy().items():
+        target = totals.get(labels)
+        if target is None:
+            totals[labels] = list(values)
+        else:
+            for i, value in enumerate(values):
+                target[i] += value
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metric:
+    """Wspólna część metryk: nazwa, opis, etykiety i rejestracja"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        MetricsRegistry.register(self)
+
+    def _labels(self, values: Sequence[str]) -> Labels:
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"Metryka {self.name} wymaga etykiet: {', '.join(self.labelnames)}")
+        return tuple(values)
+
+    def render(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(Metric):
+    """Licznik rosnący - aktualizacja bez blokad"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values = _ShardedValues(1)
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values.slots(self._labels(labels))[0] += amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.collect().get(tuple(labels), [0.0])[0]
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        values = self._values.collect()
+        if not values and not self.labelnames:
+            values = {(): [0.0]}
+        for labels, (value,) in sorted(values.items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+    def clear(self) -> None:
+        self._values.clear()
+
+
+class Histogram(Metric):
+    """Histogram z kubełkami - aktualizacja bez blokad"""
+
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float],
+        labelnames: Sequence[str] = ()
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Liczniki kubełków (ostatni: powyżej najwyższej granicy) i suma wartości
+        self._values = _ShardedValues(len(self.buckets) + 2)
+
+    def observe(self, value: float, *labels: str) -> None:
+        slots = self._values.slots(self._labels(labels))
+        slots[bisect_left(self.buckets, value)] += 1
+        slots[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """Mierzy czas wykonania bloku"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def count(self, *labels: str) -> int:
+        values = self._values.collect().get(tuple(labels))
+        return int(sum(values[:-1])) if values else 0
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for labels, values in sorted(self._values.collect().items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (math.inf,), values[:-1]):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, f'le="{_format_value(bound)}"')
+                lines.append(f'{self.name}_bucket{le} {_format_value(cumulative)}')
+            suffix = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{suffix} {_format_value(values[-1])}')
+            lines.append(f'{self.name}_count{suffix} {_format_value(cumulative)}')
+        return lines
+
+    def clear(self) -> None:
+        self._values.clear()
+
+
+class Gauge(Metric):
+    """Wartość chwilowa wyliczana przy odczycie metryk"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, func: Callable[[], float]):
+        super().__init__(name, documentation)
+        self.func = func
+
+    def render(self) -> List[str]:
+        return super().render() + [f'{self.name} {_format_value(self.func())}']
+
+    def clear(self) -> None:
+        pass
+
+
+class MetricsRegistry:
+    """Zarejestrowane metryki procesu"""
+
+    _metrics: Dict[str, Metric] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def register(cls, metric: Metric) -> None:
+        with cls._lock:
+            if metric.name in cls._metrics:
+                raise ValueError(f"Metryka {metric.name} jest już zarejestrowana")
+            cls._metrics[metric.name] = metric
+
+    @classmethod
+    def render(cls) -> str:
+        """Wszystkie metryki w formacie tekstowym Prometheus"""
+        with cls._lock:
+            metrics = list(cls._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                logger.error(f"Błąd odczytu metryki {metric.name}: {e}")
+        return '\n'.join(lines) + '\n'
+
+    @classmethod
+    def clear(cls) -> None:
+        """Zeruje wartości metryk (bez wyrejestrowania)"""
+        with cls._lock:
+            for metric in cls._metrics.values():
+                metric.clear()
+
+
+class ActiveSessions:
+    """Czas ostatniego przebiegu skryptu każdej sesji"""
+
+    _last_seen: Dict[str, float] = {}
+    # Czas następnego usunięcia nieaktywnych sesji przy touch()
+    _next_prune = 0.0
+
+    @classmethod
+    def touch(cls, session_key: str) -> None:
+        # Pojedyncze przypisanie do słownika - bez blokady
+        now = time.time()
+        cls._last_seen[session_key] = now
+        # Nieaktywne sesje usuwane także bez odczytów count() (serwer metryk wyłączony)
+        if now >= cls._next_prune:
+            cls._next_prune = now + ACTIVE_SESSION_WINDOW
+            cls._prune(now - ACTIVE_SESSION_WINDOW)
+
+    @classmethod
+    def _prune(cls, cutoff: float) -> Dict[str, float]:
+        seen = cls._last_seen.copy()
+        for key in [key for key, ts in seen.items() if ts < cutoff]:
+            cls._last_seen.pop(key, None)
+        return seen
+
+    @classmethod
+    def count(cls) -> int:
+        cutoff = time.time() - ACTIVE_SESSION_WINDOW
+        return sum(ts >= cutoff for ts in cls._prune(cutoff).values())
+
+    @classmethod
+    def clear(cls) -> None:
+        cls._last_seen.clear()
+        cls._next_prune = 0.0
+
+
+_process_start = time.time()
+
+RERUN_DURATION = Histogram(
+    'app_rerun_duration_seconds', 'Czas przebiegu skryptu Streamlit', RERUN_BUCKETS
+)
+ACTIVE_SESSIONS = Gauge(
+    'app_active_sessions', f'Sesje z przebiegiem skryptu w ostatnich {ACTIVE_SESSION_WINDOW} s',
+    ActiveSessions.count
+)
+RERUN_PAYLOAD = Histogram(
+    'app_rerun_payload_bytes', 'Dane elementów wysłane do przeglądarki w przebiegu', PAYLOAD_BUCKETS, ['page']
+)
+PAGE_RENDERS = Counter('app_page_renders_total', 'Wyświetlenia stron aplikacji', ['page'])
+LOGIN_ATTEMPTS = Counter('app_login_attempts_total', 'Próby logowania', ['result'])
+SESSION_ENDS = Counter('app_session_ends_total', 'Zakończone sesje', ['reason'])
+BCRYPT_DURATION = Histogram(
+    'app_bcrypt_duration_seconds', 'Czas operacji bcrypt', BCRYPT_BUCKETS, ['operation']
+)
+LDAP_DURATION = Histogram(
+    'app_ldap_duration_seconds', 'Czas operacji katalogu LDAP', LDAP_BUCKETS, ['operation']
+)
+LDAP_CACHE = Counter('app_ldap_cache_total', 'Odczyty pamięci podręcznej LDAP', ['cache', 'result'])
+LOG_RECORDS = Counter('app_log_records_total', 'Wpisy w logu aplikacji', ['level'])
+PROCESS_START = Gauge(
+    'process_start_time_seconds', 'Czas startu procesu (epoch)', lambda: _process_start
+)
+
+
+class MetricsLogHandler(logging.Handler):
+    """Zlicza wpisy w logu wg poziomu"""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        LOG_RECORDS.inc(record.levelname)
+
+
+def install_log_handler(target: Optional[logging.Logger] = None) -> None:
+    """Podłącza licznik wpisów do loggera (domyślnie głównego) - jednokrotnie"""
+    target = target or logging.getLogger()
+    if not any(isinstance(handler, MetricsLogHandler) for handler in target.handlers):
+        target.addHandler(MetricsLogHandler())
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """Obsługa /metrics, /healthz i /readyz - wyłącznie na wątkach serwera"""
+
+    def do_GET(self) -> None:
+        path = self.path.split('?', 1)[0]
+        if path == '/metrics':
+            self._reply(200, MetricsRegistry.render(), CONTENT_TYPE)
+        elif path == '/healthz':
+            self._reply(200, 'ok\n')
+        elif path == '/readyz':
+            failed = MetricsServer.failed_checks()
+            if failed:
+                self._reply(503, f"niegotowe: {', '.join(failed)}\n")
+            else:
+                self._reply(200, 'ok\n')
+        else:
+            self._reply(404, 'nie znaleziono\n')
+
+    def _reply(self, status: int, body: str, content_type: str = 'text/plain; charset=utf-8') -> None:
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        # Odpytania co kilka sekund nie trafiają do logu aplikacji
+        pass
+
+
+class MetricsServer:
+    """Serwer HTTP metryk uruchamiany raz na proces obok serwera Streamlit"""
+
+    _server: Optional[ThreadingHTTPServer] = None
+    _checks: Dict[str, Callable[[], object]] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def start(cls, host: Optional[str] = None, port: Optional[int] = None) -> Optional[int]:
+        """
+        Uruchamia serwer na wątku w tle (kolejne wywołania nic nie robią)
+
+        Args:
+            host: Adres (domyślnie Config.get_metrics_host())
+            port: Port (domyślnie Config.get_metrics_port(), 0 - wyłączony)
+
+        Returns:
+            Port serwera lub None gdy serwer jest wyłączony lub nie wystartował
+        """
+        host = host or Config.get_metrics_host()
+        port = Config.get_metrics_port() if port is None else port
+        with cls._lock:
+            if cls._server is not None:
+                return cls._server.server_address[1]
+            if not port:
+                return None
+            try:
+                cls._server = ThreadingHTTPServer((host, port), _RequestHandler)
+            except OSError as e:
+                # Np. port zajęty przez inny proces aplikacji - aplikacja działa dalej
+                logger.warning(f"Nie uruchomiono serwera metryk na {host}:{port}: {e}")
+                return None
+            cls._server.daemon_threads = True
+            threading.Thread(
+                target=cls._server.serve_forever, name='metrics-server', daemon=True
+            ).start()
+        logger.info(f"Serwer metryk: http://{host}:{port}/metrics")
+        return port
+
+    @classmethod
+    def stop(cls) -> None:
+        with cls._lock:
+            if cls._server is not None:
+                cls._server.shutdown()
+                cls._server.server_close()
+                cls._server = None
+
+    @classmethod
+    def register_check(cls, name: str, check: Callable[[], object]) -> None:
+        """
+        Dodaje warunek gotowości - wyjątek lub wynik False oznacza niegotowość
+
+        Sprawdzenia wykonywane są na wątku serwera, więc nie mogą korzystać ze Streamlit.
+        """
+        with cls._lock:
+            cls._checks[name] = check
+
+    @classmethod
+    def failed_checks(cls) -> List[str]:
+        """Nazwy niespełnionych warunków gotowości"""
+        with cls._lock:
+            checks = list(cls._checks.items())
+        failed = []
+        for name, check in checks:
+            try:
+                if check() is False:
+                    failed.append(name)
+            except Exception as e:
+                logger.warning(f"Sprawdzenie gotowości {name} nie powiodło się: {e}")
+                failed.append(name)
+        return failed
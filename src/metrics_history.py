@@ -0,0 +1,344 @@
+"""
+Długoterminowa historia metryk systemu - pliki binarne o stałej szerokości czytane przez np.memmap
+"""
+import math
+import os
+import re
+import struct
+import threading
+import logging
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 86400
+# Nagłówek pliku: znacznik, wersja, rozmiar próbki, interwał (s), początek dnia, liczba próbek
+HEADER = struct.Struct('<8sHHIqI')
+HEADER_SIZE = 64
+MAGIC = b'METRHIST'
+FORMAT_VERSION = 1
+DTYPE = np.dtype('<f4')
+DEFAULT_INTERVAL = 60
+# Otwarte mapowania plików (dzień x metryka) trzymane między odczytami
+MAX_OPEN_FILES = 512
+# Domyślna liczba punktów okna wykresu
+MAX_POINTS = 2000
+
+METRIC_NAME = re.compile(r'^[a-z0-9_]+$')
+FILE_SUFFIX = '.bin'
+
+# Ścieżka pliku -> (interwał, początek dnia, próbki dnia)
+DayMap = Tuple[int, int, np.memmap]
+
+
+def wall_seconds(day: date) -> int:
+    """Północ danego dnia jako czas ścienny w sekundach (znaczniki czasu bez strefy)"""
+    return int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp())
+
+
+def wall_now() -> float:
+    """Bieżący czas ścienny w sekundach (lokalny zegar bez strefy)"""
+    return datetime.now().replace(tzinfo=timezone.utc).timestamp()
+
+
+class MetricsHistory:
+    """
+    Historia metryk: jeden plik na metrykę i dzień, nagłówek i tablica float32
+
+    Próbka o czasie t trafia do pozycji (t - północ) // interwał pliku swojego
+    dnia, więc dopisanie to jeden zapis w zmapowanym pliku, a okno wykresu to
+    wycinki map kolejnych dni (bez kopiowania, czytane są tylko strony
+    w oknie). Brakujące próbki mają wartość NaN. Czas jest czasem ściennym
+    w sekundach (lokalnym, bez strefy) - jak znaczniki w historii sesji.
+    Pliki starsze niż METRICS_RETENTION_DAYS usuwa purge().
+    """
+
+    _lock = threading.Lock()
+    _maps: 'OrderedDict[str, DayMap]' = OrderedDict()
+    # Dzień ostatniego purge_daily()
+    _purged_on: Optional[date] = None
+
+    @staticmethod
+    def directory(root: Optional[str] = None) -> str:
+        return root or Config.get_metrics_history_dir()
+
+    @classmethod
+    def path(cls, metric: str, day: date, root: Optional[str] = None) -> str:
+        """Plik metryki dla dnia (ValueError dla nazwy spoza [a-z0-9_])"""
+        if not METRIC_NAME.match(metric):
+            raise ValueError(f"Nieprawidłowa nazwa metryki: {metric!r}")
+        return os.path.join(cls.directory(root), metric, f"{day.isoformat()}{FILE_SUFFIX}")
+
+    @staticmethod
+    def _create(path: str, day: date, interval: int) -> None:
+        if interval <= 0 or DAY_SECONDS % interval:
+            raise ValueError(f"Interwał {interval} s nie dzieli doby")
+        slots = DAY_SECONDS // interval
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            header = HEADER.pack(MAGIC, FORMAT_VERSION, DTYPE.itemsize, interval, wall_seconds(day), slots)
+            f.write(header.ljust(HEADER_SIZE, b'\0'))
+            np.full(slots, np.nan, dtype=DTYPE).tofile(f)
+        # Równoległy twórca tego samego pliku - pierwszy wygrywa
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+
+    @classmethod
+    def _open(cls, metric: str, day: date, root: Optional[str] = None,
+              create_interval: Optional[int] = None) -> Optional[DayMap]:
+        """
+        Mapa pliku dnia (z cache otwartych map)
+
+        Args:
+            create_interval: Interwał nowego pliku; None - brak pliku oznacza brak danych
+
+        Returns:
+            Krotka (interwał, początek dnia, próbki) lub None
+        """
+        path = cls.path(metric, day, root)
+        with cls._lock:
+            cached = cls._maps.get(path)
+            if cached is not None:
+                cls._maps.move_to_end(path)
+                return cached
+        if not os.path.exists(path):
+            if create_interval is None:
+                return None
+            cls._create(path, day, create_interval)
+        with open(path, 'rb') as f:
+            magic, version, itemsize, interval, start, slots = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != FORMAT_VERSION or itemsize != DTYPE.itemsize:
+            raise ValueError(f"Nieobsługiwany plik metryk: {path}")
+        values = np.memmap(path, dtype=DTYPE, mode='r+', offset=HEADER_SIZE, shape=(slots,))
+        day_map = (interval, start, values)
+        with cls._lock:
+            day_map = cls._maps.setdefault(path, day_map)
+            cls._maps.move_to_end(path)
+            while len(cls._maps) > MAX_OPEN_FILES:
+                cls._maps.popitem(last=False)[1][2].flush()
+        return day_map
+
+    @classmethod
+    def append(cls, metric: str, t: float, value: float, interval: int = DEFAULT_INTERVAL,
+               root: Optional[str] = None, keep_max: bool = False) -> None:
+        """
+        Zapisuje jedną próbkę (nadpisuje próbkę tego samego interwału)
+
+        Args:
+            metric: Nazwa metryki
+            t: Czas ścienny próbki (s)
+            value: Wartość
+            interval: Interwał pliku, gdy dzień nie ma jeszcze pliku
+            root: Katalog historii (domyślnie METRICS_HISTORY_DIR)
+            keep_max: Zachowuje największą próbkę interwału zamiast ostatniej
+        """
+        day = date(1970, 1, 1) + timedelta(days=int(t // DAY_SECONDS))
+        file_interval, start, values = cls._open(metric, day, root, create_interval=interval)
+        slot = int(t - start) // file_interval
+        values[slot] = np.fmax(values[slot], value) if keep_max else value
+
+    @classmethod
+    def write(cls, metric: str, times: np.ndarray, values: np.ndarray, interval: int = DEFAULT_INTERVAL,
+              root: Optional[str] = None) -> int:
+        """
+        Zapisuje serię próbek (wektorowo, po jednym pliku na dzień)
+
+        Args:
+            metric: Nazwa metryki
+            times: Czasy ścienne próbek (s)
+            values: Wartości
+            interval: Interwał nowych plików
+            root: Katalog historii
+
+        Returns:
+            Liczba zapisanych próbek
+        """
+        times = np.asarray(times, dtype=np.int64)
+        values = np.asarray(values, dtype=DTYPE)
+        days, positions = np.unique(times // DAY_SECONDS, return_inverse=True)
+        for i, day_number in enumerate(days):
+            day = date(1970, 1, 1) + timedelta(days=int(day_number))
+            file_interval, start, day_values = cls._open(metric, day, root, create_interval=interval)
+            if file_interval != interval:
+                raise ValueError(f"Plik {metric} z {day} ma interwał {file_interval} s, a nie {interval} s")
+            selected = positions == i
+            day_values[(times[selected] - start) // file_interval] = values[selected]
+        return len(times)
+
+    @classmethod
+    def slices(cls, metric: str, since: float, until: float,
+               root: Optional[str] = None) -> Iterator[Tuple[int, int, np.ndarray]]:
+        """
+        Wycinki map dni pokrywające okno [since, until) - widoki bez kopiowania
+
+        Returns:
+            Iterator krotek (czas pierwszej próbki, interwał, próbki)
+        """
+        first = int(since // DAY_SECONDS)
+        last = int(math.ceil(until / DAY_SECONDS))
+        for day_number in range(first, last):
+            day = date(1970, 1, 1) + timedelta(days=day_number)
+            day_map = cls._open(metric, day, root)
+            if day_map is None:
+                continue
+            interval, start, values = day_map
+            begin = max(0, math.ceil((since - start) / interval))
+            end = min(len(values), math.ceil((until - start) / interval))
+            if begin < end:
+                yield start + begin * interval, interval, values[begin:end]
+
+    @classmethod
+    def window(cls, metrics: Sequence[str], since: float, until: float, max_points: int = MAX_POINTS,
+               agg: Optional[Dict[str, str]] = None, root: Optional[str] = None) -> pd.DataFrame:
+        """
+        Okno wykresu: metryki w co najwyżej max_points przedziałach czasu
+
+        Args:
+            metrics: Nazwy metryk (kolumny)
+            since: Początek okna (czas ścienny, s)
+            until: Koniec okna (rozłącznie)
+            max_points: Maksymalna liczba wierszy
+            agg: Agregacja w przedziale dla metryki - 'mean' (domyślnie) lub 'max'
+            root: Katalog historii
+
+        Returns:
+            Ramka z kolumną 'Czas' i kolumnami metryk; pusta, gdy brak próbek
+        """
+        agg = agg or {}
+        parts = {metric: list(cls.slices(metric, since, until, root)) for metric in metrics}
+        intervals = [interval for chunks in parts.values() for _, interval, _ in chunks]
+        if not intervals:
+            return pd.DataFrame()
+        step = min(intervals)
+        width = step * max(1, math.ceil((until - since) / (max_points * step)))
+        buckets = max(1, math.ceil((until - since) / width))
+
+        columns = {}
+        for metric, chunks in parts.items():
+            peak = agg.get(metric, 'mean') == 'max'
+            sums = np.full(buckets, np.nan) if peak else np.zeros(buckets)
+            counts = np.zeros(buckets)
+            for first, interval, values in chunks:
+                # Odcinki wycinka w kolejnych przedziałach - granice z arytmetyki czasu
+                offset = first - since
+                targets = np.arange(offset // width, (offset + (len(values) - 1) * interval) // width + 1)
+                starts = np.maximum(0, -((offset - targets * width) // interval))
+                if interval > step:
+                    # Przedziały bez próbki (plik o dłuższym interwale) - ta sama granica co następny
+                    filled = np.r_[starts[1:] != starts[:-1], True]
+                    targets, starts = targets[filled], starts[filled]
+                if peak:
+                    sums[targets] = np.fmax(sums[targets], np.fmax.reduceat(values, starts))
+                else:
+                    present = ~np.isnan(values)
+                    sums[targets] += np.add.reduceat(np.where(present, values, 0), starts, dtype=np.float64)
+                    counts[targets] += np.add.reduceat(present, starts, dtype=np.float64)
+            columns[metric] = sums if peak else np.divide(
+                sums, counts, out=np.full(buckets, np.nan), where=counts > 0
+            )
+
+        frame = pd.DataFrame(columns)
+        frame.insert(0, 'Czas', pd.to_datetime(since + np.arange(buckets) * width, unit='s'))
+        return frame.dropna(how='all', subset=list(metrics)).reset_index(drop=True)
+
+    @classmethod
+    def stats(cls, metric: str, since: float, until: float, root: Optional[str] = None) -> Dict[str, float]:
+        """
+        Liczba próbek, średnia i maksimum metryki w oknie
+
+        Returns:
+            Słownik z kluczami 'samples', 'mean', 'max' (NaN bez próbek)
+        """
+        samples, total, peak = 0, 0.0, np.nan
+        for _, _, values in cls.slices(metric, since, until, root):
+            present = values[~np.isnan(values)]
+            if len(present):
+                samples += len(present)
+                total += float(present.sum(dtype=np.float64))
+                peak = np.fmax(peak, float(present.max()))
+        return {'samples': samples, 'mean': total / samples if samples else np.nan, 'max': float(peak)}
+
+    @classmethod
+    def days(cls, metric: str, root: Optional[str] = None) -> List[date]:
+        """Dni z zapisanym plikiem metryki (rosnąco)"""
+        directory = os.path.join(cls.directory(root), metric)
+        if not os.path.isdir(directory):
+            return []
+        found = []
+        for entry in os.scandir(directory):
+            if entry.name.endswith(FILE_SUFFIX):
+                try:
+                    found.append(date.fromisoformat(entry.name[:-len(FILE_SUFFIX)]))
+                except ValueError:
+                    continue
+        return sorted(found)
+
+    @classmethod
+    def purge(cls, today: Optional[date] = None, retention_days: Optional[int] = None,
+              root: Optional[str] = None) -> int:
+        """
+        Usuwa pliki dni starszych niż okres przechowywania
+
+        Args:
+            today: Bieżący dzień (domyślnie dzisiaj)
+            retention_days: Dni przechowywania (domyślnie METRICS_RETENTION_DAYS)
+            root: Katalog historii
+
+        Returns:
+            Liczba usuniętych plików
+        """
+        cutoff = (today or date.today()) - timedelta(days=retention_days or Config.get_metrics_retention_days())
+        directory = cls.directory(root)
+        if not os.path.isdir(directory):
+            return 0
+        removed = 0
+        for entry in os.scandir(directory):
+            if not (entry.is_dir() and METRIC_NAME.match(entry.name)):
+                continue
+            for day in cls.days(entry.name, root):
+                if day >= cutoff:
+                    break
+                path = cls.path(entry.name, day, root)
+                with cls._lock:
+                    cls._maps.pop(path, None)
+                os.remove(path)
+                removed += 1
+        if removed:
+            logger.info(f"Usunięto {removed} plików historii metryk sprzed {cutoff}")
+        return removed
+
+    @classmethod
+    def purge_daily(cls) -> int:
+        """purge() co najwyżej raz dziennie w procesie - wywoływane przy każdym przebiegu aplikacji"""
+        today = date.today()
+        with cls._lock:
+            if cls._purged_on == today:
+                return 0
+            cls._purged_on = today
+        return cls.purge(today)
+
+    @classmethod
+    def flush(cls) -> None:
+        """Zapisuje zmienione strony otwartych map na dysk"""
+        with cls._lock:
+            maps = list(cls._maps.values())
+        for _, _, values in maps:
+            values.flush()
+
+    @classmethod
+    def close(cls) -> None:
+        """Zapisuje i zamyka wszystkie otwarte mapy"""
+        cls.flush()
+        with cls._lock:
+            cls._maps.clear()
+            cls._purged_on = None
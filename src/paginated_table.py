@@ -0,0 +1,136 @@
+"""
+Tabela stronicowana - pobiera z warstwy danych tylko wyświetlaną stronę
+"""
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+import pyarrow as pa
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# fetch_page(after, limit, **query) -> (strona jako tabela Arrow, kursor następnej strony)
+PageFetcher = Callable[..., Tuple[pa.Table, Optional[Any]]]
+
+# Maksymalna liczba stron trzymanych w pamięci procesu
+PAGE_CACHE_SIZE = 128
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class PageCache:
+    """Współdzielony między sesjami cache stron (LRU) w postaci tabel Arrow"""
+
+    _pages: 'OrderedDict[Hashable, Tuple[pa.Table, Optional[Any]]]' = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_page(
+        cls,
+        fetch_page: PageFetcher,
+        after: Optional[Any],
+        limit: int,
+        version: Hashable = 0,
+        **query
+    ) -> Tuple[pa.Table, Optional[Any]]:
+        """
+        Zwraca stronę z cache lub pobiera ją z warstwy danych
+
+        Args:
+            fetch_page: Funkcja pobierająca stronę
+            after: Kursor poprzedniej strony
+            limit: Rozmiar strony
+            version: Wersja danych - zmiana unieważnia zapamiętane strony
+            **query: Parametry filtrowania i sortowania
+
+        Returns:
+            Krotka (tabela Arrow, kursor następnej strony)
+        """
+        key = (
+            fetch_page.__module__,
+            fetch_page.__qualname__,
+            tuple(sorted((name, _freeze(value)) for name, value in query.items())),
+            after,
+            limit,
+            version
+        )
+        with cls._lock:
+            if key in cls._pages:
+                cls._pages.move_to_end(key)
+                return cls._pages[key]
+
+        page = fetch_page(after, limit, **query)
+
+        with cls._lock:
+            cls._pages[key] = page
+            while len(cls._pages) > PAGE_CACHE_SIZE:
+                cls._pages.popitem(last=False)
+        return page
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._pages.clear()
+
+
+def show_paginated_table(
+    key: str,
+    fetch_page: PageFetcher,
+    page_size: int,
+    version: Hashable = 0,
+    **query
+) -> None:
+    """
+    Wyświetla tabelę stronicowaną z przyciskami nawigacji
+
+    Stan nawigacji (stos kursorów) trzymany jest w sesji i zerowany po
+    zmianie filtrów lub rozmiaru strony.
+
+    Args:
+        key: Unikalny klucz tabeli na stronie
+        fetch_page: Funkcja pobierająca stronę z warstwy danych
+        page_size: Liczba wierszy na stronę
+        version: Wersja danych (np. najwyższe id w tabeli)
+        **query: Parametry filtrowania i sortowania przekazywane do fetch_page
+    """
+    state_key = f"{key}_pagination"
+    query_key = (_freeze(sorted(query.items())), page_size)
+    state = st.session_state.get(state_key)
+    if state is None or state['query'] != query_key:
+        state = {'query': query_key, 'cursors': [None]}
+        st.session_state[state_key] = state
+
+    cursors = state['cursors']
+    table, next_cursor = PageCache.get_page(fetch_page, cursors[-1], page_size, version, **query)
+
+    if table.num_rows == 0:
+        st.info("Brak danych do wyświetlenia")
+    else:
+        st.dataframe(table, use_container_width=True, hide_index=True)
+
+    # Nawigacja przez callbacki - zmiana strony nie wymaga dodatkowego przebiegu skryptu
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button(
+            "◀ Poprzednia",
+            key=f"{key}_prev",
+            disabled=len(cursors) == 1,
+            on_click=cursors.pop,
+            use_container_width=True
+        )
+    with col2:
+        st.caption(f"Strona {len(cursors)} · {table.num_rows} wierszy")
+    with col3:
+        st.button(
+            "Następna ▶",
+            key=f"{key}_next",
+            disabled=next_cursor is None,
+            on_click=cursors.append,
+            args=(next_cursor,),
+            use_container_width=True
+        )
@@ -0,0 +1,245 @@
+"""
+Rozmiar danych wysyłanych do przeglądarki - bajty każdego elementu przebiegu wg strony, zakładki i typu
+"""
+import heapq
+import threading
+import time
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+from .metrics import RERUN_PAYLOAD
+
+logger = logging.getLogger(__name__)
+
+# Liczba zapamiętanych przebiegów (historia bajtów na przebieg)
+PAYLOAD_HISTORY = 1000
+# Liczba zapamiętanych największych pojedynczych elementów
+LARGEST_ELEMENTS = 20
+
+# Strona przebiegu, w którym router nie wyświetlił żadnej strony (np. błąd konfiguracji)
+PAGE_NONE = 'app'
+TAB_NONE = ''
+
+
+@dataclass
+class ElementPayload:
+    """Pojedynczy element (delta) wysłany w przebiegu"""
+    page: str
+    tab: str
+    element_type: str
+    # Pozycja elementu w drzewie strony (delta_path) - stała między przebiegami
+    path: str
+    bytes: int
+    timestamp: float
+
+
+@dataclass
+class RerunPayload:
+    """Suma danych jednego przebiegu skryptu"""
+    timestamp: float
+    page: str
+    session_id: Optional[str]
+    bytes: int
+    elements: int
+    # Bajty wg typu elementu
+    by_type: Dict[str, int] = field(default_factory=dict)
+
+
+class _RunRecord:
+    """Elementy bieżącego przebiegu (stan wątku skryptu)"""
+
+    def __init__(self):
+        self.page = PAGE_NONE
+        self.elements: List[Tuple[str, str, str, int]] = []
+        # Ścieżki bloków zakładek -> etykieta
+        self.tabs: Dict[Tuple[int, ...], str] = {}
+
+    def tab_of(self, path: Tuple[int, ...]) -> str:
+        for depth in range(len(path) - 1, 0, -1):
+            label = self.tabs.get(path[:depth])
+            if label is not None:
+                return label
+        return TAB_NONE
+
+
+class PayloadMeter:
+    """
+    Pomiar serializowanego rozmiaru elementów wysyłanych w każdym przebiegu
+
+    start_run() podpina się pod kolejkę komunikatów kontekstu skryptu
+    (ScriptRunContext.enqueue) i mierzy ByteSize każdej delty przed ewentualnym
+    zastąpieniem jej odwołaniem do cache przeglądarki. finish_run() zapisuje
+    sumę przebiegu i aktualizuje zestawienie wg strony, zakładki i typu elementu.
+    """
+
+    _local = threading.local()
+    _reruns: Deque[RerunPayload] = deque(maxlen=PAYLOAD_HISTORY)
+    # (strona, zakładka, typ) -> [liczba elementów, bajty, największy element]
+    _totals: Dict[Tuple[str, str, str], List[int]] = {}
+    # Liczba przebiegów każdej strony od startu procesu
+    _page_reruns: Dict[str, int] = {}
+    # Kopiec min największych elementów: (bajty, numer, element)
+    _largest: List[Tuple[int, int, ElementPayload]] = []
+    _counter = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def start_run(cls) -> bool:
+        """
+        Rozpoczyna pomiar przebiegu w bieżącym wątku skryptu
+
+        Returns:
+            Czy pomiar działa (False poza przebiegiem skryptu Streamlit)
+        """
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        if ctx is None:
+            return False
+        cls._local.run = _RunRecord()
+        if not getattr(ctx, '_payload_meter', False):
+            original = ctx.enqueue
+
+            def enqueue(msg):
+                cls._observe(msg)
+                original(msg)
+
+            ctx.enqueue = enqueue
+            ctx._payload_meter = True
+        return True
+
+    @classmethod
+    def set_page(cls, page: str) -> None:
+        """Oznacza stronę wyświetlaną w bieżącym przebiegu"""
+        run = getattr(cls._local, 'run', None)
+        if run is not None:
+            run.page = page
+
+    @classmethod
+    def _observe(cls, msg) -> None:
+        run = getattr(cls._local, 'run', None)
+        if run is None or msg.WhichOneof('type') != 'delta':
+            return
+        try:
+            path = tuple(msg.metadata.delta_path)
+            kind = msg.delta.WhichOneof('type')
+            if kind == 'new_element':
+                element_type = msg.delta.new_element.WhichOneof('type')
+            elif kind == 'add_block':
+                block = msg.delta.add_block
+                if block.WhichOneof('type') == 'tab':
+                    run.tabs[path] = block.tab.label
+                element_type = f"block:{block.WhichOneof('type')}"
+            else:
+                element_type = kind
+            run.elements.append((run.tab_of(path), element_type, '.'.join(map(str, path)), msg.ByteSize()))
+        except Exception as e:
+            # Pomiar nie może przerwać wysyłki elementu
+            logger.debug(f"Nie udało się zmierzyć elementu: {e}")
+
+    @classmethod
+    def finish_run(cls, session_id: Optional[str] = None) -> Optional[RerunPayload]:
+        """
+        Kończy pomiar przebiegu i dopisuje go do historii i zestawień
+
+        Args:
+            session_id: Identyfikator sesji
+
+        Returns:
+            Suma przebiegu lub None, gdy pomiar nie był rozpoczęty
+        """
+        run = getattr(cls._local, 'run', None)
+        if run is None:
+            return None
+        cls._local.run = None
+
+        now = time.time()
+        by_type: Dict[str, int] = {}
+        for _, element_type, _, size in run.elements:
+            by_type[element_type] = by_type.get(element_type, 0) + size
+        payload = RerunPayload(
+            timestamp=now,
+            page=run.page,
+            session_id=session_id,
+            bytes=sum(by_type.values()),
+            elements=len(run.elements),
+            by_type=by_type
+        )
+
+        with cls._lock:
+            cls._reruns.append(payload)
+            cls._page_reruns[run.page] = cls._page_reruns.get(run.page, 0) + 1
+            for tab, element_type, path, size in run.elements:
+                totals = cls._totals.setdefault((run.page, tab, element_type), [0, 0, 0])
+                totals[0] += 1
+                totals[1] += size
+                totals[2] = max(totals[2], size)
+                if len(cls._largest) < LARGEST_ELEMENTS or size > cls._largest[0][0]:
+                    cls._counter += 1
+                    element = ElementPayload(run.page, tab, element_type, path, size, now)
+                    entry = (size, cls._counter, element)
+                    if len(cls._largest) < LARGEST_ELEMENTS:
+                        heapq.heappush(cls._largest, entry)
+                    else:
+                        heapq.heapreplace(cls._largest, entry)
+        RERUN_PAYLOAD.observe(payload.bytes, payload.page)
+        return payload
+
+    @classmethod
+    def reruns(cls, page: Optional[str] = None) -> List[RerunPayload]:
+        """
+        Zapamiętane przebiegi od najstarszego
+
+        Args:
+            page: Tylko przebiegi tej strony
+
+        Returns:
+            Lista sum przebiegów
+        """
+        with cls._lock:
+            return [payload for payload in cls._reruns if page is None or payload.page == page]
+
+    @classmethod
+    def offenders(cls, limit: int = 20) -> List[Dict]:
+        """
+        Elementy wysyłające najwięcej danych
+
+        Args:
+            limit: Liczba pozycji
+
+        Returns:
+            Słowniki page, tab, element_type, count, bytes, avg_bytes, max_bytes
+            i bytes_per_rerun (średnio na przebieg strony), od największej sumy
+        """
+        with cls._lock:
+            reruns = dict(cls._page_reruns)
+            rows = [
+                {
+                    'page': page,
+                    'tab': tab,
+                    'element_type': element_type,
+                    'count': count,
+                    'bytes': size,
+                    'avg_bytes': size / count,
+                    'max_bytes': largest,
+                    'bytes_per_rerun': size / max(reruns.get(page, 0), 1)
+                }
+                for (page, tab, element_type), (count, size, largest) in cls._totals.items()
+            ]
+        rows.sort(key=lambda row: row['bytes'], reverse=True)
+        return rows[:limit]
+
+    @classmethod
+    def largest(cls) -> List[ElementPayload]:
+        """Największe pojedyncze elementy od największego"""
+        with cls._lock:
+            return [element for _, _, element in sorted(cls._largest, reverse=True)]
+
+    @classmethod
+    def reset(cls) -> None:
+        """Czyści historię i zestawienia"""
+        with cls._lock:
+            cls._reruns.clear()
+            cls._totals.clear()
+            cls._page_reruns.clear()
+            cls._largest.clear()
@@ -0,0 +1,239 @@
+"""
+Preferencje użytkowników - wczytywane raz na sesję, zapisywane w tle porcjami
+"""
+import atexit
+import json
+import os
+import threading
+import time
+import logging
+from dataclasses import dataclass, asdict, fields, replace
+from datetime import datetime
+from typing import Dict, Optional
+from zoneinfo import ZoneInfo
+import streamlit as st
+from .config import Config
+from .credential_store import CredentialStore
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS preferences (
+    username TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+)
+'''
+
+DATE_FORMATS = {
+    'DD/MM/YYYY': '%d/%m/%Y',
+    'MM/DD/YYYY': '%m/%d/%Y',
+    'YYYY-MM-DD': '%Y-%m-%d'
+}
+TIME_FORMATS = {
+    '24h': '%H:%M:%S',
+    '12h AM/PM': '%I:%M:%S %p'
+}
+SIDEBAR_STATES = {
+    'Rozwinięty': 'expanded',
+    'Zwinięty': 'collapsed',
+    'Auto': 'auto'
+}
+
+
+@dataclass
+class UserPreferences:
+    """Ustawienia użytkownika ze strony ustawień"""
+    sidebar_state: str = 'Rozwinięty'
+    page_layout: str = 'Szeroki'
+    auto_refresh: bool = False
+    refresh_interval: int = 30
+    items_per_page: int = 20
+    date_format: str = 'YYYY-MM-DD'
+    time_format: str = '24h'
+    show_tooltips: bool = True
+    timezone: str = 'Europe/Warsaw'
+    email: str = ''
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'UserPreferences':
+        """Tworzy preferencje ze słownika, ignorując nieznane klucze"""
+        known = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+    def tooltip(self, text: str) -> Optional[str]:
+        """Zwraca podpowiedź lub None gdy podpowiedzi są wyłączone"""
+        return text if self.show_tooltips else None
+
+    def format_timestamp(self, timestamp: float, with_date: bool = True) -> str:
+        """
+        Formatuje czas zgodnie z formatem daty/czasu i strefą czasową użytkownika
+
+        Args:
+            timestamp: Czas (epoch)
+            with_date: Czy dołączyć datę
+
+        Returns:
+            Sformatowany czas
+        """
+        try:
+            tz = ZoneInfo(self.timezone)
+        except (KeyError, ValueError):
+            tz = None
+        moment = datetime.fromtimestamp(timestamp, tz)
+        pattern = TIME_FORMATS.get(self.time_format, TIME_FORMATS['24h'])
+        if with_date:
+            pattern = f"{DATE_FORMATS.get(self.date_format, DATE_FORMATS['YYYY-MM-DD'])} {pattern}"
+        return moment.strftime(pattern)
+
+
+class PreferencesStore:
+    """Magazyn preferencji z buforem zapisu (write-behind)"""
+
+    # Zmienione, jeszcze niezapisane preferencje - kolejne zmiany nadpisują wpis
+    _dirty: Dict[str, UserPreferences] = {}
+    # Porcja w trakcie zapisu - odczyt widzi ją do zatwierdzenia transakcji
+    _inflight: Dict[str, UserPreferences] = {}
+    _lock = threading.Lock()
+    # Jeden zapis porcji naraz (wątek w tle i zapis przy zamknięciu procesu)
+    _flush_lock = threading.Lock()
+    _flusher: Optional[threading.Thread] = None
+    _wakeup = threading.Event()
+
+    @staticmethod
+    def _connect():
+        conn = CredentialStore.connect()
+        conn.execute(SCHEMA)
+        return conn
+
+    @classmethod
+    def load(cls, username: str) -> UserPreferences:
+        """
+        Wczytuje preferencje użytkownika z bazy
+
+        Args:
+            username: Nazwa użytkownika
+
+        Returns:
+            Preferencje (domyślne jeśli użytkownik ich nie zapisał)
+        """
+        with cls._lock:
+            pending = cls._dirty.get(username) or cls._inflight.get(username)
+        if pending is not None:
+            return replace(pending)
+
+        if not os.path.exists(Config.get_database_file()):
+            return UserPreferences()
+
+        conn = cls._connect()
+        try:
+            row = conn.execute(
+                'SELECT data FROM preferences WHERE username = ?', (username,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return UserPreferences.from_dict(json.loads(row[0])) if row else UserPreferences()
+
+    @classmethod
+    def save(cls, username: str, preferences: UserPreferences) -> None:
+        """
+        Zleca zapis preferencji - bez operacji I/O w wątku wywołującym
+
+        Args:
+            username: Nazwa użytkownika
+            preferences: Preferencje do zapisania
+        """
+        with cls._lock:
+            cls._dirty[username] = replace(preferences)
+            if cls._flusher is None:
+                cls._flusher = threading.Thread(
+                    target=cls._flush_loop, name='preferences-flusher', daemon=True
+                )
+                cls._flusher.start()
+                atexit.register(cls.flush)
+
+    @classmethod
+    def flush(cls) -> int:
+        """
+        Zapisuje wszystkie oczekujące preferencje w jednej transakcji
+
+        Returns:
+            Liczba zapisanych użytkowników
+        """
+        with cls._flush_lock:
+            with cls._lock:
+                batch, cls._dirty = cls._dirty, {}
+                cls._inflight = batch
+            if not batch:
+                return 0
+
+            now = time.time()
+            conn = cls._connect()
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.executemany(
+                    'INSERT INTO preferences (username, data, updated_at) VALUES (?, ?, ?) '
+                    'ON CONFLICT(username) DO UPDATE SET '
+                    'data = excluded.data, updated_at = excluded.updated_at',
+                    [(username, json.dumps(asdict(prefs)), now) for username, prefs in batch.items()]
+                )
+                conn.execute('COMMIT')
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                logger.error(f"Błąd zapisu preferencji: {e}")
+                # Nowsze zmiany z bufora mają pierwszeństwo przed ponowieniem zapisu
+                with cls._lock:
+                    cls._dirty = {**batch, **cls._dirty}
+                    cls._inflight = {}
+                return 0
+            finally:
+                conn.close()
+
+            with cls._lock:
+                cls._inflight = {}
+
+        logger.debug(f"Zapisano preferencje {len(batch)} użytkowników")
+        return len(batch)
+
+    @classmethod
+    def _flush_loop(cls) -> None:
+        while True:
+            cls._wakeup.wait(Config.get_preferences_flush_interval())
+            cls._wakeup.clear()
+            cls.flush()
+
+
+def get_session_preferences() -> UserPreferences:
+    """
+    Zwraca preferencje zalogowanego użytkownika z pamięci sesji
+
+    Preferencje wczytywane są z bazy tylko raz na sesję - kolejne odczyty
+    nie wykonują żadnych operacji I/O.
+
+    Returns:
+        Preferencje bieżącego użytkownika (domyślne gdy nikt nie jest zalogowany)
+    """
+    username = st.session_state.get('username')
+    if username is None:
+        return UserPreferences()
+
+    if st.session_state.get('preferences_user') != username:
+        st.session_state['preferences'] = PreferencesStore.load(username)
+        st.session_state['preferences_user'] = username
+    return st.session_state['preferences']
+
+
+def save_session_preferences(preferences: UserPreferences) -> None:
+    """
+    Zapisuje preferencje w pamięci sesji i zleca ich zapis w tle
+
+    Args:
+        preferences: Zmienione preferencje bieżącego użytkownika
+    """
+    username = st.session_state.get('username')
+    if username is None:
+        return
+    st.session_state['preferences'] = preferences
+    st.session_state['preferences_user'] = username
+    PreferencesStore.save(username, preferences)
@@ -0,0 +1,393 @@
+"""
+Profilowanie na żądanie - kolejne przebiegi wybranej strony lub sesji, zapis profili na dysk
+"""
+import cProfile
+import functools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+import logging
+from collections import Counter
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import streamlit as st
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+MODE_DETERMINISTIC = 'deterministic'
+MODE_SAMPLING = 'sampling'
+
+MODE_LABELS = {
+    MODE_DETERMINISTIC: 'Deterministyczny (cProfile)',
+    MODE_SAMPLING: 'Próbkujący (stosy co 5 ms)'
+}
+
+# Odstęp próbkowania stosu wątku strony (s)
+SAMPLE_INTERVAL = 0.005
+# Liczba najdroższych funkcji zapisywanych w profilu
+TOP_FUNCTIONS = 25
+# Gałęzie wykresu płomieniowego poniżej tej części całości są pomijane
+MIN_FLAME_SHARE = 0.005
+MAX_FLAME_DEPTH = 40
+# Liczba profili przechowywanych na dysku (najstarsze są usuwane)
+MAX_PROFILES = 50
+
+Stack = Tuple[str, ...]
+
+
+@dataclass
+class ProfileRequest:
+    """Uzbrojone profilowanie - kolejne przebiegi pasujące do filtra"""
+    runs: int
+    page: Optional[str] = None
+    session_id: Optional[str] = None
+    mode: str = MODE_DETERMINISTIC
+
+    def matches(self, page: str, session_id: Optional[str]) -> bool:
+        return (self.page is None or self.page == page) and \
+            (self.session_id is None or self.session_id == session_id)
+
+
+@dataclass
+class ProfileCapture:
+    """Profil jednego przebiegu strony"""
+    id: str
+    timestamp: float
+    page: str
+    session_id: Optional[str]
+    mode: str
+    duration: float
+    # Najdroższe funkcje: function, calls (None w trybie próbkującym), self_s, total_s
+    top: List[Dict] = field(default_factory=list)
+    # Stosy wywołań od funkcji strony w dół z czasem własnym ostatniej ramki (s)
+    stacks: List[Tuple[List[str], float]] = field(default_factory=list)
+
+
+def _label(filename: str, line: int, name: str) -> str:
+    if filename == '~':
+        # Funkcje wbudowane: cProfile podaje samą nazwę, np. "<built-in method time.sleep>"
+        return name
+    parts = filename.replace('\\', '/').rsplit('/', 2)
+    return f"{name} ({'/'.join(parts[-2:])}:{line})"
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return _label(code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def _cprofile_result(profile: cProfile.Profile) -> Tuple[List[Dict], Dict[Stack, float]]:
+    """Najdroższe funkcje i stosy z grafu wywołań cProfile"""
+    # Bez wywołania wyłączającego sam profiler
+    stats = {
+        func: entry for func, entry in pstats.Stats(profile).stats.items()
+        if '_lsprof.Profiler' not in func[2]
+    }
+    top = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:TOP_FUNCTIONS]
+    top = [
+        {'function': _label(*func), 'calls': nc, 'self_s': tt, 'total_s': ct}
+        for func, (cc, nc, tt, ct, callers) in top
+    ]
+
+    # cProfile zna tylko krawędzie wywołujący -> wywoływany, więc czas gałęzi jest
+    # przybliżany proporcjonalnie do udziału ścieżki w czasie wywołującego
+    callees: Dict[Tuple, Dict[Tuple, float]] = {}
+    for func, (cc, nc, tt, ct, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge[3]
+    roots = [func for func, entry in stats.items() if not entry[4]]
+    total = sum(stats[root][3] for root in roots) or 1.0
+    stacks: Dict[Stack, float] = {}
+
+    def walk(func, path: Stack, value: float, seen: frozenset):
+        children = callees.get(func, {})
+        func_total = stats[func][3] or 1.0
+        child_sum = 0.0
+        if len(path) < MAX_FLAME_DEPTH:
+            for child, edge_time in children.items():
+                child_value = min(edge_time * value / func_total, value - child_sum)
+                if child in seen or child_value < total * MIN_FLAME_SHARE:
+                    continue
+                child_sum += child_value
+                walk(child, path + (_label(*child),), child_value, seen | {child})
+        stacks[path] = stacks.get(path, 0.0) + max(value - child_sum, 0.0)
+
+    for root in roots:
+        walk(root, (_label(*root),), stats[root][3], frozenset([root]))
+    return top, stacks
+
+
+def _sampling_result(samples: Counter, interval: float) -> Tuple[List[Dict], Dict[Stack, float]]:
+    """Najdroższe funkcje i stosy z próbek stosu"""
+    self_time: Counter = Counter()
+    total_time: Counter = Counter()
+    for stack, count in samples.items():
+        self_time[stack[-1]] += count
+        for label in set(stack):
+            total_time[label] += count
+    top = [
+        {'function': label, 'calls': None, 'self_s': self_time[label] * interval, 'total_s': count * interval}
+        for label, count in total_time.items()
+    ]
+    top.sort(key=lambda row: row['self_s'], reverse=True)
+    return top[:TOP_FUNCTIONS], {stack: count * interval for stack, count in samples.items()}
+
+
+class _StackSampler:
+    """Wątek próbkujący stos wątku strony od ramki funkcji strony w dół"""
+
+    def __init__(self, code, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.code = code
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                if frame.f_code is self.code:
+                    self.samples[tuple(reversed(stack))] += 1
+                    break
+                frame = frame.f_back
+
+
+def flame_nodes(stacks: Dict[Stack, float]) -> Dict[str, List]:
+    """
+    Węzły wykresu płomieniowego (icicle) ze stosów wywołań
+
+    Args:
+        stacks: Czas własny (s) ostatniej ramki każdego stosu
+
+    Returns:
+        Słownik list ids, labels, parents i values (wartość węzła = czas całkowity);
+        identyfikator węzła to ramki stosu połączone średnikiem
+    """
+    totals: Dict[Stack, float] = {}
+    for stack, value in stacks.items():
+        for depth in range(1, len(stack) + 1):
+            prefix = stack[:depth]
+            totals[prefix] = totals.get(prefix, 0.0) + value
+    nodes = sorted(totals.items(), key=lambda item: len(item[0]))
+    return {
+        'ids': [';'.join(stack) for stack, _ in nodes],
+        'labels': [stack[-1] for stack, _ in nodes],
+        'parents': [';'.join(stack[:-1]) for stack, _ in nodes],
+        'values': [value for _, value in nodes]
+    }
+
+
+class RerunProfiler:
+    """
+    Profilowanie kolejnych N przebiegów strony lub sesji uzbrojone z narzędzi deweloperskich
+
+    Funkcje stron są opakowane dekoratorem page() - gdy nic nie jest uzbrojone,
+    koszt to jedno sprawdzenie pustej listy. Profil trafia do pliku JSON
+    w katalogu Config.get_profile_dir() (najwyżej MAX_PROFILES plików).
+    """
+
+    _armed: List[ProfileRequest] = []
+    _lock = threading.Lock()
+    # Jeden profilowany przebieg naraz w procesie
+    _busy = threading.Lock()
+
+    @classmethod
+    def arm(
+        cls,
+        runs: int,
+        page: Optional[str] = None,
+        session_id: Optional[str] = None,
+        mode: str = MODE_DETERMINISTIC
+    ) -> ProfileRequest:
+        """
+        Uzbraja profilowanie kolejnych przebiegów
+
+        Args:
+            runs: Liczba profilowanych przebiegów
+            page: Nazwa strony (None - każda strona)
+            session_id: Identyfikator sesji (None - każda sesja)
+            mode: MODE_DETERMINISTIC lub MODE_SAMPLING
+
+        Returns:
+            Uzbrojone żądanie
+        """
+        if runs < 1:
+            raise ValueError("Liczba przebiegów musi być dodatnia")
+        if mode not in MODE_LABELS:
+            raise ValueError(f"Nieznany tryb profilowania: {mode}")
+        request = ProfileRequest(runs, page, session_id, mode)
+        with cls._lock:
+            cls._armed.append(request)
+        logger.info(f"Profilowanie uzbrojone: {runs} przebiegów, strona {page or 'dowolna'}, tryb {mode}")
+        return request
+
+    @classmethod
+    def disarm(cls) -> None:
+        """Anuluje wszystkie uzbrojone profilowania"""
+        with cls._lock:
+            cls._armed.clear()
+
+    @classmethod
+    def armed(cls) -> List[ProfileRequest]:
+        """Kopie uzbrojonych żądań (z pozostałą liczbą przebiegów)"""
+        with cls._lock:
+            return [ProfileRequest(**asdict(request)) for request in cls._armed]
+
+    @classmethod
+    def _claim(cls, page: str, session_id: Optional[str]) -> Optional[ProfileRequest]:
+        with cls._lock:
+            for request in cls._armed:
+                if request.matches(page, session_id):
+                    request.runs -= 1
+                    if request.runs <= 0:
+                        cls._armed.remove(request)
+                    return request
+        return None
+
+    @classmethod
+    def page(cls, name: str) -> Callable:
+        """
+        Dekorator funkcji strony - profiluje przebieg, gdy pasuje do uzbrojonego żądania
+
+        Args:
+            name: Nazwa strony w filtrze profilowania
+        """
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not cls._armed:
+                    return func(*args, **kwargs)
+                return cls._run(name, func, args, kwargs)
+            return wrapper
+        return decorator
+
+    @classmethod
+    def _run(cls, page: str, func: Callable, args, kwargs):
+        if not cls._busy.acquire(blocking=False):
+            # Inny przebieg jest właśnie profilowany - ten nie zużywa żądania
+            return func(*args, **kwargs)
+        try:
+            session_id = st.session_state.get('metrics_session_id')
+            request = cls._claim(page, session_id)
+            if request is None:
+                return func(*args, **kwargs)
+
+            timestamp = time.time()
+            started = time.perf_counter()
+            if request.mode == MODE_SAMPLING:
+                sampler = _StackSampler(func.__code__, threading.get_ident())
+                try:
+                    with sampler:
+                        return func(*args, **kwargs)
+                finally:
+                    duration = time.perf_counter() - started
+                    top, stacks = _sampling_result(sampler.samples, sampler.interval)
+                    cls._store(page, session_id, request.mode, timestamp, duration, top, stacks)
+            else:
+                profile = cProfile.Profile()
+                try:
+                    return profile.runcall(func, *args, **kwargs)
+                finally:
+                    duration = time.perf_counter() - started
+                    top, stacks = _cprofile_result(profile)
+                    cls._store(page, session_id, request.mode, timestamp, duration, top, stacks)
+        finally:
+            cls._busy.release()
+
+    @classmethod
+    def _store(
+        cls,
+        page: str,
+        session_id: Optional[str],
+        mode: str,
+        timestamp: float,
+        duration: float,
+        top: List[Dict],
+        stacks: Dict[Stack, float]
+    ) -> Optional[ProfileCapture]:
+        capture = ProfileCapture(
+            id=f"{datetime.fromtimestamp(timestamp):%Y%m%d-%H%M%S-%f}-{page}-{uuid.uuid4().hex[:6]}",
+            timestamp=timestamp,
+            page=page,
+            session_id=session_id,
+            mode=mode,
+            duration=duration,
+            top=top,
+            stacks=[(list(stack), value) for stack, value in stacks.items()]
+        )
+        directory = Config.get_profile_dir()
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"{capture.id}.json"), 'w', encoding='utf-8') as f:
+                json.dump(asdict(capture), f)
+            for old in cls._files()[MAX_PROFILES:]:
+                os.remove(old)
+        except OSError as e:
+            # Błąd zapisu profilu nie może przerwać przebiegu strony
+            logger.error(f"Nie udało się zapisać profilu: {e}")
+            return None
+        logger.info(f"Zapisano profil {capture.id} ({duration * 1000:.0f} ms)")
+        return capture
+
+    @classmethod
+    def _files(cls) -> List[str]:
+        """Pliki profili od najnowszego"""
+        directory = Config.get_profile_dir()
+        if not os.path.isdir(directory):
+            return []
+        names = sorted((name for name in os.listdir(directory) if name.endswith('.json')), reverse=True)
+        return [os.path.join(directory, name) for name in names]
+
+    @classmethod
+    def captures(cls) -> List[str]:
+        """
+        Identyfikatory zapisanych profili
+
+        Returns:
+            Identyfikatory od najnowszego (zaczynają się od czasu przebiegu)
+        """
+        return [os.path.basename(path)[:-len('.json')] for path in cls._files()]
+
+    @classmethod
+    def load(cls, capture_id: str) -> Optional[ProfileCapture]:
+        """
+        Wczytuje zapisany profil
+
+        Args:
+            capture_id: Identyfikator profilu
+
+        Returns:
+            Profil lub None, gdy go nie ma
+        """
+        path = os.path.join(Config.get_profile_dir(), f"{os.path.basename(capture_id)}.json")
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        data['stacks'] = [(stack, value) for stack, value in data['stacks']]
+        return ProfileCapture(**data)
+
+    @classmethod
+    def clear(cls) -> None:
+        """Usuwa zapisane profile"""
+        for path in cls._files():
+            os.remove(path)
@@ -0,0 +1,176 @@
+"""
+Masowe zakładanie kont - równoległe hashowanie haseł z pliku CSV/JSONL
+
+Użycie:
+    python -m src.provisioning users.csv [--workers N] [--batch-size N] [--overwrite]
+
+Plik CSV musi mieć nagłówek z kolumnami `username` i `password`, plik JSONL
+obiekty z tymi samymi kluczami. Hashe zapisywane są w magazynie poświadczeń
+porcjami, każda w osobnej transakcji. Ponowne uruchomienie po przerwaniu
+pomija użytkowników, którzy mają już wpis w bazie.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import logging
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterator, List, Tuple, Dict, Optional
+from .auth_service import AuthService
+from .credential_store import CredentialStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 256
+
+
+def read_users(path: str) -> Iterator[Tuple[str, str]]:
+    """
+    Czyta użytkowników z pliku CSV lub JSONL (strumieniowo)
+
+    Args:
+        path: Ścieżka do pliku (.csv lub .jsonl)
+
+    Returns:
+        Iterator par (nazwa użytkownika, hasło)
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.endswith('.csv'):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            username = (row.get('username') or '').strip()
+            password = row.get('password') or ''
+            if not username or not password:
+                logger.warning(f"Pominięto niekompletny wpis: {username or '<brak nazwy>'}")
+                continue
+            yield username, password
+
+
+def _batches(users: Iterator[Tuple[str, str]], size: int) -> Iterator[List[Tuple[str, str]]]:
+    batch = []
+    for user in users:
+        batch.append(user)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _hash_chunk(users: List[Tuple[str, str]], rounds: int) -> Tuple[int, List[Tuple[str, str]], float]:
+    """Hashuje porcję haseł w procesie roboczym"""
+    start = time.perf_counter()
+    hashed = [(username, AuthService.hash_password(password, rounds)) for username, password in users]
+    return os.getpid(), hashed, time.perf_counter() - start
+
+
+class ProvisioningStats:
+    """Statystyki przepustowości - łącznie i na proces roboczy"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.written = 0
+        self.skipped = 0
+        self.per_worker: Dict[int, List[float]] = defaultdict(lambda: [0, 0.0])
+
+    def record_chunk(self, pid: int, count: int, elapsed: float) -> None:
+        self.per_worker[pid][0] += count
+        self.per_worker[pid][1] += elapsed
+
+    def report(self) -> str:
+        wall = time.perf_counter() - self.started
+        lines = [
+            f"Zapisano: {self.written}, pominięto (już istnieją): {self.skipped}, "
+            f"czas: {wall:.1f} s, przepustowość: {self.written / max(wall, 1e-9):.1f} hashy/s"
+        ]
+        for index, (pid, (count, busy)) in enumerate(sorted(self.per_worker.items()), 1):
+            lines.append(
+                f"  proces {index} (pid {pid}): {int(count)} hashy, "
+                f"{count / max(busy, 1e-9):.1f} hashy/s"
+            )
+        return '\n'.join(lines)
+
+
+def provision_users(
+    path: str,
+    workers: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    overwrite: bool = False
+) -> ProvisioningStats:
+    """
+    Hashuje hasła użytkowników z pliku w puli procesów i zapisuje je w bazie
+
+    Args:
+        path: Plik CSV/JSONL z użytkownikami
+        workers: Liczba procesów roboczych (domyślnie liczba rdzeni)
+        batch_size: Liczba użytkowników zapisywanych w jednej transakcji
+        overwrite: Nadpisz hashe użytkowników istniejących w bazie
+
+    Returns:
+        Statystyki przebiegu
+    """
+    rounds = AuthService.configure_bcrypt_cost()
+    workers = workers or os.cpu_count() or 1
+    stats = ProvisioningStats()
+    logger.info(f"Zakładanie kont z {path}: {workers} procesów, koszt bcrypt {rounds}")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch in _batches(read_users(path), batch_size):
+            if not overwrite:
+                existing = CredentialStore.existing_usernames([username for username, _ in batch])
+                stats.skipped += len(existing)
+                batch = [user for user in batch if user[0] not in existing]
+
+            # Porcja dzielona równo między wszystkie procesy robocze
+            chunk_size = max(1, -(-len(batch) // workers))
+            pending = {
+                pool.submit(_hash_chunk, batch[start:start + chunk_size], rounds)
+                for start in range(0, len(batch), chunk_size)
+            }
+            hashed = []
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pid, rows, elapsed = future.result()
+                    stats.record_chunk(pid, len(rows), elapsed)
+                    hashed.extend(rows)
+
+            # Cała porcja w jednej transakcji - przerwanie nie zostawia połowy porcji
+            if hashed:
+                stats.written += CredentialStore.upsert_many(hashed)
+                logger.info(f"Zapisano porcję {len(hashed)} użytkowników (łącznie {stats.written})")
+
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m src.provisioning',
+        description='Masowe zakładanie kont z pliku CSV/JSONL'
+    )
+    parser.add_argument('path', help='Plik .csv lub .jsonl z kolumnami username, password')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Liczba procesów roboczych (domyślnie liczba rdzeni)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help='Liczba użytkowników na transakcję')
+    parser.add_argument('--overwrite', action='store_true',
+                        help='Nadpisz hashe istniejących użytkowników')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        stats = provision_users(args.path, args.workers, args.batch_size, args.overwrite)
+    except KeyboardInterrupt:
+        print("Przerwano - uruchom ponownie, aby kontynuować od ostatniej zapisanej porcji")
+        return 130
+    print(stats.report())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
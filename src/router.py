@@ -0,0 +1,100 @@
+"""
+Router stron - wybór strony raz na przebieg skryptu i nawigacja przez callbacki
+"""
+import importlib
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional
+import streamlit as st
+from .metrics import PAGE_RENDERS
+from .payload import PayloadMeter
+
+logger = logging.getLogger(__name__)
+
+# Klucze stanu sesji
+PAGE_STATE_KEY = 'page'
+RUN_COUNT_KEY = 'script_runs'
+
+
+@dataclass(frozen=True)
+class Page:
+    """Strona aplikacji - funkcja wyświetlająca importowana przy pierwszym użyciu"""
+    key: str
+    title: str
+    module: str
+    function: str
+
+    def render(self) -> None:
+        getattr(importlib.import_module(self.module), self.function)()
+
+
+def navigate(page: str) -> None:
+    """
+    Callback nawigacji (on_click) - ustawia stronę przed przebiegiem wywołanym kliknięciem
+
+    Streamlit wykonuje callback przed skryptem, więc wybrana strona wyświetla
+    się w tym samym przebiegu - bez st.switch_page i dodatkowego st.rerun.
+
+    Args:
+        page: Klucz strony
+    """
+    st.session_state[PAGE_STATE_KEY] = page
+
+
+def nav_button(label: str, page: str, container=st, **kwargs) -> bool:
+    """
+    Przycisk przejścia do strony
+
+    Args:
+        label: Etykieta przycisku
+        page: Klucz strony docelowej
+        container: Miejsce przycisku (np. st.sidebar)
+        **kwargs: Dodatkowe argumenty st.button
+
+    Returns:
+        Czy przycisk został kliknięty
+    """
+    return container.button(label, on_click=navigate, args=(page,), **kwargs)
+
+
+def current_page(pages: Dict[str, Page], default: str) -> Page:
+    """
+    Strona wybrana w tej sesji (nieznany klucz zastępowany domyślną stroną)
+
+    Args:
+        pages: Strony wg klucza
+        default: Klucz strony domyślnej
+
+    Returns:
+        Strona do wyświetlenia w tym przebiegu
+    """
+    key = st.session_state.get(PAGE_STATE_KEY, default)
+    if key not in pages:
+        logger.warning(f"Nieznana strona '{key}' - wyświetlana strona domyślna")
+        key = default
+    st.session_state[PAGE_STATE_KEY] = key
+    return pages[key]
+
+
+def render_page(page: Page) -> None:
+    """Wyświetla stronę, zlicza jej wyświetlenia i oznacza nią pomiar danych przebiegu"""
+    PAGE_RENDERS.inc(page.key)
+    PayloadMeter.set_page(page.key)
+    page.render()
+
+
+def count_run() -> int:
+    """
+    Zlicza przebiegi skryptu w sesji - jedno działanie użytkownika to jeden przebieg
+
+    Returns:
+        Liczba przebiegów skryptu w tej sesji
+    """
+    runs = st.session_state.get(RUN_COUNT_KEY, 0) + 1
+    st.session_state[RUN_COUNT_KEY] = runs
+    return runs
+
+
+def run_count() -> Optional[int]:
+    """Liczba przebiegów skryptu w tej sesji (None przed pierwszym)"""
+    return st.session_state.get(RUN_COUNT_KEY)
@@ -0,0 +1,474 @@
+"""
+Historia sesji - zbiór Parquet partycjonowany po dniu logowania
+"""
+import atexit
+import os
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from .config import Config
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+GROUP_ADMINS = 'Administratorzy'
+GROUP_USERS = 'Użytkownicy'
+
+SESSION_SCHEMA = pa.schema([
+    ('username', pa.string()),
+    ('user_group', pa.string()),
+    ('login_time', pa.timestamp('us')),
+    ('end_time', pa.timestamp('us')),
+    ('duration_s', pa.float64()),
+    ('end_reason', pa.string())
+])
+
+# Partycje katalogowe w stylu Hive: <katalog>/date=YYYY-MM-DD/part-*.parquet
+PARTITIONING = ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive')
+
+# Mapa logowań: 7 dni tygodnia (od poniedziałku) x 24 godziny
+HOURS_PER_WEEK = 7 * 24
+US_PER_HOUR = 3600 * 10**6
+# 1970-01-01 był czwartkiem - przesunięcie godzin epoki do tygodnia od poniedziałku
+EPOCH_WEEK_OFFSET = 3 * 24
+# Liczba zapamiętanych map logowań (zakresów dat) i liczników plików partycji
+HEATMAP_CACHE_SIZE = 32
+HEATMAP_FILES_CACHE_SIZE = 100000
+# Przyrostek pliku liczników logowań zapisywanego obok pliku partycji
+HEATMAP_SUFFIX = '.logins.npy'
+
+# Mikro-porcje: zapis po zebraniu FLUSH_BATCH_SIZE sesji lub co FLUSH_INTERVAL sekund
+FLUSH_BATCH_SIZE = 1000
+FLUSH_INTERVAL = 10.0
+# Scalanie plików minionych dni w jeden plik na dzień - najwyżej co COMPACT_INTERVAL sekund
+COMPACT_INTERVAL = 3600
+# Plik blokady scalania (czytelnicy - blokada wspólna, scalanie - wyłączna)
+COMPACT_LOCK_FILE = '_compact.lock'
+
+
+def user_group(username: str) -> str:
+    """Grupa użytkownika dla filtrów historii sesji"""
+    return GROUP_ADMINS if username == Config.get_admin_user() else GROUP_USERS
+
+
+def bin_logins(login_us: np.ndarray, counts: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Zlicza logowania w kubełkach dzień tygodnia x godzina
+
+    Czas logowania jest zapisany jako lokalny czas zegarowy (µs), więc numer
+    kubełka to godzina od epoki przesunięta do poniedziałku, modulo tydzień -
+    dwie operacje na całej tablicy i np.bincount, bez konwersji dat.
+
+    Args:
+        login_us: Czasy logowania (int64, µs)
+        counts: Tablica HOURS_PER_WEEK liczników do powiększenia
+
+    Returns:
+        Liczniki wg kubełka dzień * 24 + godzina (poniedziałek = 0)
+    """
+    if counts is None:
+        counts = np.zeros(HOURS_PER_WEEK, dtype=np.int64)
+    bins = login_us // US_PER_HOUR
+    bins += EPOCH_WEEK_OFFSET
+    bins %= HOURS_PER_WEEK
+    counts += np.bincount(bins, minlength=HOURS_PER_WEEK)
+    return counts
+
+
+class SessionHistory:
+    """Zapis i odczyt historii sesji"""
+
+    _buffer: List[Dict] = []
+    _lock = threading.Lock()
+    _flusher: Optional[threading.Thread] = None
+    _wakeup = threading.Event()
+
+    @classmethod
+    def record_session(
+        cls,
+        username: str,
+        login_time: float,
+        end_time: float,
+        end_reason: str
+    ) -> None:
+        """
+        Dodaje zakończoną sesję do bufora zapisu
+
+        Args:
+            username: Nazwa użytkownika
+            login_time: Czas zalogowania (epoch)
+            end_time: Czas zakończenia sesji (epoch)
+            end_reason: Powód zakończenia: 'logout', 'timeout' lub 'revoked'
+        """
+        row = {
+            'username': username,
+            'user_group': user_group(username),
+            'login_time': datetime.fromtimestamp(login_time),
+            'end_time': datetime.fromtimestamp(end_time),
+            'duration_s': end_time - login_time,
+            'end_reason': end_reason
+        }
+        with cls._lock:
+            cls._buffer.append(row)
+            full = len(cls._buffer) >= FLUSH_BATCH_SIZE
+            if cls._flusher is None:
+                cls._flusher = threading.Thread(
+                    target=cls._flush_loop, name='session-history-flusher', daemon=True
+                )
+                cls._flusher.start()
+                atexit.register(cls.flush)
+        if full:
+            cls._wakeup.set()
+
+    @classmethod
+    def flush(cls) -> int:
+        """
+        Zapisuje zebrane sesje - jeden plik Parquet na dzień w porcji
+
+        Returns:
+            Liczba zapisanych sesji
+        """
+        with cls._lock:
+            batch, cls._buffer = cls._buffer, []
+        if not batch:
+            return 0
+
+        by_day: Dict[str, List[Dict]] = {}
+        for row in batch:
+            by_day.setdefault(row['login_time'].strftime('%Y-%m-%d'), []).append(row)
+
+        root = Config.get_session_history_dir()
+        for day, rows in by_day.items():
+            cls.write_partition(root, day, pa.Table.from_pylist(rows, schema=SESSION_SCHEMA))
+
+        logger.debug(f"Zapisano {len(batch)} sesji w historii")
+        return len(batch)
+
+    @staticmethod
+    def write_partition(root: str, day: str, table: pa.Table) -> str:
+        """
+        Zapisuje tabelę sesji jako nowy plik w partycji dnia
+
+        Args:
+            root: Katalog zbioru danych
+            day: Dzień partycji (YYYY-MM-DD)
+            table: Sesje o schemacie SESSION_SCHEMA
+
+        Returns:
+            Ścieżka zapisanego pliku
+        """
+        directory = os.path.join(root, f"date={day}")
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+        path = os.path.join(directory, name)
+        # Zapis do ukrytego pliku tymczasowego i zmiana nazwy - czytelnicy nie widzą niepełnych plików
+        tmp_path = os.path.join(directory, f".{name}.tmp")
+        pq.write_table(table, tmp_path, compression='zstd')
+        os.replace(tmp_path, path)
+        # Liczniki mapy logowań z tabeli w pamięci - bez ponownego odczytu pliku
+        LoginHeatmap.store(path, table)
+        return path
+
+    @classmethod
+    def _flush_loop(cls) -> None:
+        next_compact = time.monotonic() + COMPACT_INTERVAL
+        while True:
+            cls._wakeup.wait(FLUSH_INTERVAL)
+            cls._wakeup.clear()
+            try:
+                cls.flush()
+                if time.monotonic() >= next_compact:
+                    next_compact = time.monotonic() + COMPACT_INTERVAL
+                    cls.compact()
+            except Exception as e:
+                logger.error(f"Błąd zapisu historii sesji: {e}")
+
+    @staticmethod
+    def partition_files(since: Optional[date] = None, until: Optional[date] = None) -> List[str]:
+        """
+        Pliki Parquet partycji z zakresu dat (bez odkrywania całego zbioru)
+
+        Args:
+            since: Pierwszy dzień (włącznie)
+            until: Ostatni dzień (włącznie)
+
+        Returns:
+            Posortowane ścieżki plików
+        """
+        root = Config.get_session_history_dir()
+        if not os.path.isdir(root):
+            return []
+        first = f"date={since.isoformat()}" if since else ''
+        last = f"date={until.isoformat()}" if until else '~'
+        files = []
+        for partition in os.scandir(root):
+            if partition.is_dir() and partition.name.startswith('date=') and first <= partition.name <= last:
+                files.extend(
+                    entry.path for entry in os.scandir(partition.path)
+                    if entry.name.endswith('.parquet') and not entry.name.startswith(('.', '_'))
+                )
+        return sorted(files)
+
+    @staticmethod
+    @contextmanager
+    def compaction_lock(exclusive: bool = False) -> Iterator[bool]:
+        """
+        Blokada między odczytem a scalaniem plików (również między procesami)
+
+        Czytelnicy biorą blokadę wspólną i nie czekają na siebie nawzajem,
+        scalanie - wyłączną bez czekania (pomija przebieg, gdy trwa odczyt).
+
+        Yields:
+            True, jeśli blokadę uzyskano
+        """
+        root = Config.get_session_history_dir()
+        if fcntl is None or not os.path.isdir(root):
+            yield True
+            return
+        with open(os.path.join(root, COMPACT_LOCK_FILE), 'a') as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB if exclusive else fcntl.LOCK_SH)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @classmethod
+    def compact(cls, before: Optional[date] = None) -> int:
+        """
+        Scala pliki minionych dni w jeden plik na dzień
+
+        Mikro-porcje zapisu dodają plik do partycji dnia co FLUSH_INTERVAL
+        sekund - scalanie ogranicza liczbę plików otwieranych przy odczycie.
+
+        Args:
+            before: Scalane są dni przed tym dniem (domyślnie przed dzisiejszym)
+
+        Returns:
+            Liczba usuniętych (scalonych) plików
+        """
+        root = Config.get_session_history_dir()
+        last = f"date={(before or date.today()).isoformat()}"
+        removed = 0
+        with cls.compaction_lock(exclusive=True) as locked:
+            if not locked:
+                return 0
+            partitions = sorted(os.scandir(root), key=lambda entry: entry.name) if os.path.isdir(root) else []
+            for partition in partitions:
+                if not (partition.is_dir() and partition.name.startswith('date=') and partition.name < last):
+                    continue
+                files = sorted(
+                    entry.path for entry in os.scandir(partition.path)
+                    if entry.name.endswith('.parquet') and not entry.name.startswith(('.', '_'))
+                )
+                if len(files) < 2:
+                    continue
+                table = pa.concat_tables(pq.ParquetFile(path).read().cast(SESSION_SCHEMA) for path in files)
+                cls.write_partition(root, partition.name[len('date='):], table)
+                for path in files:
+                    os.remove(path)
+                    LoginHeatmap.forget(path)
+                removed += len(files)
+        if removed:
+            logger.info(f"Scalono {removed} plików historii sesji")
+        return removed
+
+    @classmethod
+    def dataset(cls, since: Optional[date] = None, until: Optional[date] = None) -> Optional[ds.Dataset]:
+        """
+        Otwiera zbiór danych historii sesji z plików partycji z zakresu dat
+
+        Args:
+            since: Pierwszy dzień (włącznie)
+            until: Ostatni dzień (włącznie)
+
+        Returns:
+            Zbiór danych lub None jeśli w zakresie nie ma plików
+        """
+        files = cls.partition_files(since, until)
+        if not files:
+            return None
+        return ds.dataset(
+            files,
+            format='parquet',
+            schema=SESSION_SCHEMA.append(pa.field('date', pa.string())),
+            partitioning=PARTITIONING,
+            partition_base_dir=Config.get_session_history_dir()
+        )
+
+    @classmethod
+    def query(
+        cls,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        group: Optional[str] = None,
+        min_duration_s: float = 0,
+        columns: Optional[Sequence[str]] = None
+    ) -> pa.Table:
+        """
+        Odczytuje sesje spełniające filtry
+
+        Filtr dat wybiera tylko pasujące katalogi partycji (bez listowania
+        pozostałych), pozostałe warunki są przekazywane do czytnika Parquet
+        (pomijanie grup wierszy na podstawie statystyk), a odczytywane są
+        tylko wskazane kolumny.
+
+        Args:
+            since: Pierwszy dzień (włącznie)
+            until: Ostatni dzień (włącznie)
+            group: Grupa użytkowników (GROUP_ADMINS / GROUP_USERS) lub None
+            min_duration_s: Minimalny czas trwania sesji w sekundach
+            columns: Kolumny do odczytania (domyślnie wszystkie poza partycją)
+
+        Returns:
+            Tabela Arrow z sesjami
+        """
+        columns = list(columns or SESSION_SCHEMA.names)
+        condition = ds.scalar(True)
+        if group:
+            condition &= ds.field('user_group') == group
+        if min_duration_s > 0:
+            condition &= ds.field('duration_s') >= min_duration_s
+
+        # Scalanie nie podmienia plików w trakcie odczytu
+        with cls.compaction_lock():
+            dataset = cls.dataset(since, until)
+            if dataset is None:
+                return SESSION_SCHEMA.empty_table().select(columns)
+            return dataset.to_table(columns=columns, filter=condition)
+
+
+class LoginHeatmap:
+    """
+    Liczba logowań wg dnia tygodnia i godziny z historii sesji
+
+    Pliki partycji są niezmienne, więc liczniki każdego pliku liczone są raz:
+    przy zapisie (write_partition) albo przy pierwszym odczycie, i zapisywane
+    obok pliku (_<plik>.logins.npy, pomijany przez czytnik zbioru). Mapa
+    zakresu to suma liczników jego plików, zapamiętywana (LRU) dla zakresu
+    dat i listy plików - nowy plik w zakresie oznacza ponowne sumowanie.
+    """
+
+    _cache: 'OrderedDict[Tuple[Optional[date], Optional[date], Tuple[str, ...]], np.ndarray]' = OrderedDict()
+    _files: 'OrderedDict[str, np.ndarray]' = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def sidecar_path(path: str) -> str:
+        directory, name = os.path.split(path)
+        return os.path.join(directory, f"_{name}{HEATMAP_SUFFIX}")
+
+    @classmethod
+    def store(cls, path: str, table: pa.Table) -> np.ndarray:
+        """
+        Liczy i zapisuje liczniki pliku partycji
+
+        Args:
+            path: Ścieżka pliku partycji
+            table: Zawartość pliku (co najmniej kolumna login_time)
+
+        Returns:
+            Liczniki HOURS_PER_WEEK kubełków
+        """
+        counts = np.zeros(HOURS_PER_WEEK, dtype=np.int64)
+        for chunk in table.column('login_time').chunks:
+            # Widok int64 na bufor znaczników czasu - bez kopii
+            bin_logins(chunk.drop_null().view(pa.int64()).to_numpy(), counts)
+        sidecar = cls.sidecar_path(path)
+        tmp_path = f"{sidecar}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.save(f, counts)
+            os.replace(tmp_path, sidecar)
+        except OSError as e:
+            logger.warning(f"Nie zapisano liczników logowań {sidecar}: {e}")
+        cls._remember(path, counts)
+        return counts
+
+    @classmethod
+    def _remember(cls, path: str, counts: np.ndarray) -> None:
+        with cls._lock:
+            cls._files[path] = counts
+            while len(cls._files) > HEATMAP_FILES_CACHE_SIZE:
+                cls._files.popitem(last=False)
+
+    @classmethod
+    def forget(cls, path: str) -> None:
+        """Usuwa liczniki usuniętego pliku partycji (z pamięci i z dysku)"""
+        with cls._lock:
+            cls._files.pop(path, None)
+        try:
+            os.remove(cls.sidecar_path(path))
+        except FileNotFoundError:
+            pass
+
+    @classmethod
+    def file_counts(cls, path: str) -> np.ndarray:
+        """Liczniki pliku partycji - z pamięci, z pliku obok lub z odczytu kolumny login_time"""
+        with cls._lock:
+            counts = cls._files.get(path)
+        if counts is not None:
+            return counts
+        try:
+            counts = np.load(cls.sidecar_path(path))
+        except (OSError, ValueError):
+            return cls.store(path, pq.read_table(path, columns=['login_time']))
+        cls._remember(path, counts)
+        return counts
+
+    @classmethod
+    def counts(cls, since: Optional[date] = None, until: Optional[date] = None) -> np.ndarray:
+        """
+        Mapa logowań w zakresie dat
+
+        Args:
+            since: Pierwszy dzień (włącznie)
+            until: Ostatni dzień (włącznie)
+
+        Returns:
+            Tablica 7 x 24 (dzień tygodnia od poniedziałku x godzina), tylko do odczytu
+        """
+        # Scalanie nie usuwa plików (ani ich liczników) między listowaniem a odczytem
+        with SessionHistory.compaction_lock():
+            files = SessionHistory.partition_files(since, until)
+            key = (since, until, tuple(files))
+            with cls._lock:
+                cached = cls._cache.get(key)
+                if cached is not None:
+                    cls._cache.move_to_end(key)
+                    return cached
+
+            counts = np.zeros(HOURS_PER_WEEK, dtype=np.int64)
+            for path in files:
+                counts += cls.file_counts(path)
+        result = counts.reshape(7, 24)
+        result.flags.writeable = False
+
+        with cls._lock:
+            cls._cache[key] = result
+            while len(cls._cache) > HEATMAP_CACHE_SIZE:
+                cls._cache.popitem(last=False)
+        return result
+
+    @classmethod
+    def clear(cls) -> None:
+        """Czyści liczniki w pamięci (pliki obok partycji pozostają)"""
+        with cls._lock:
+            cls._cache.clear()
+            cls._files.clear()
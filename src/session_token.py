@@ -0,0 +1,362 @@
+"""
+Tokeny wznawiania sesji - podpisane HMAC tokeny pozwalające odtworzyć sesję
+po odświeżeniu przeglądarki bez ponownej weryfikacji hasła (bcrypt)
+
+Token nie trafia do URL - adres strony zawiera jednorazowy kod wznowienia,
+wymieniany po stronie serwera na token. Unieważnienia tokenów i kody są
+zapisywane w bazie aplikacji, więc obowiązują we wszystkich procesach.
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import threading
+import time
+from functools import lru_cache
+from typing import Optional, Dict, Any, Tuple
+from .config import Config
+from .credential_store import CredentialStore
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VERSION = 'v2'
+# Separator pól w ładunku tokena (ASCII unit separator - nie występuje w nazwach)
+FIELD_SEPARATOR = '\x1f'
+# Co ile sekund proces odświeża z bazy unieważnienia zapisane przez inne procesy
+REVOCATION_SYNC_INTERVAL = 2.0
+
+SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS revoked_tokens (
+        jti TEXT PRIMARY KEY,
+        expires_at REAL NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS user_revocations (
+        username TEXT PRIMARY KEY,
+        revoked_before_us INTEGER NOT NULL,
+        keep_jti TEXT
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS restore_codes (
+        code_hash TEXT PRIMARY KEY,
+        token TEXT NOT NULL,
+        jti TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    )
+    '''
+)
+
+
+def _to_us(moment: float) -> int:
+    """Czas epoki w µs - czasy wydania i unieważnienia porównywane z tą samą dokładnością"""
+    return int(moment * 1_000_000)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _code_hash(code: str) -> str:
+    """W bazie zapisywany jest tylko skrót kodu wznowienia"""
+    return hashlib.sha256(code.encode('utf-8')).hexdigest()
+
+
+@lru_cache(maxsize=4)
+def _signing_key(secret_key: str) -> bytes:
+    """Wyprowadza klucz podpisu tokenów z SECRET_KEY (osobna domena użycia)"""
+    return hmac.new(secret_key.encode('utf-8'), b'session-token', hashlib.sha256).digest()
+
+
+class SessionToken:
+    """Wydawanie, weryfikacja i unieważnianie tokenów wznawiania sesji"""
+
+    # Kopia unieważnień z bazy w procesie - odświeżana co REVOCATION_SYNC_INTERVAL
+    # jti -> czas wygaśnięcia tokena; wpisy usuwane po wygaśnięciu tokena
+    _denylist: Dict[str, float] = {}
+    # użytkownik -> (tokeny wydane przed tą chwilą (µs) są nieważne, jti zachowanej sesji)
+    _user_revocations: Dict[str, Tuple[int, Optional[str]]] = {}
+    # Chwila ostatniego odświeżenia kopii (time.monotonic)
+    _synced_at = 0.0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _connect():
+        conn = CredentialStore.connect()
+        for statement in SCHEMA:
+            conn.execute(statement)
+        return conn
+
+    @classmethod
+    def _sync(cls, force: bool = False) -> None:
+        """Odświeża kopię unieważnień z bazy (także zapisanych przez inne procesy)"""
+        if not force and time.monotonic() - cls._synced_at < REVOCATION_SYNC_INTERVAL:
+            return
+        # Odczyt nie tworzy pliku bazy - brak bazy oznacza brak unieważnień
+        if not os.path.exists(Config.get_database_file()):
+            denylist, user_revocations = {}, {}
+        else:
+            conn = cls._connect()
+            try:
+                denylist = dict(conn.execute(
+                    'SELECT jti, expires_at FROM revoked_tokens WHERE expires_at > ?', (time.time(),)
+                ))
+                user_revocations = {
+                    username: (revoked_before, keep_jti)
+                    for username, revoked_before, keep_jti in conn.execute(
+                        'SELECT username, revoked_before_us, keep_jti FROM user_revocations'
+                    )
+                }
+            finally:
+                conn.close()
+        with cls._lock:
+            cls._denylist = denylist
+            cls._user_revocations = user_revocations
+            cls._synced_at = time.monotonic()
+
+    @staticmethod
+    def _sign(payload: str) -> str:
+        key = _signing_key(Config.get_secret_key())
+        return _b64encode(hmac.new(key, payload.encode('ascii'), hashlib.sha256).digest())
+
+    @staticmethod
+    def issue(username: str, login_time: float) -> str:
+        """
+        Wydaje token wznawiania sesji
+
+        Args:
+            username: Nazwa zalogowanego użytkownika
+            login_time: Czas zalogowania (epoch) - token wygasa razem z sesją
+
+        Returns:
+            Token w postaci `<ładunek>.<podpis>` (base64url); czasy w µs
+        """
+        issued_at = _to_us(login_time)
+        expires_at = issued_at + Config.get_session_timeout() * 1_000_000
+        jti = secrets.token_urlsafe(9)
+        fields = [TOKEN_VERSION, username, str(issued_at), str(expires_at), jti]
+        payload = _b64encode(FIELD_SEPARATOR.join(fields).encode('utf-8'))
+        return f"{payload}.{SessionToken._sign(payload)}"
+
+    @staticmethod
+    def decode(token: str) -> Optional[Dict[str, Any]]:
+        """
+        Sprawdza podpis tokena i zwraca jego pola (bez sprawdzania ważności)
+
+        Args:
+            token: Token do zdekodowania
+
+        Returns:
+            Słownik z polami tokena lub None jeśli token jest nieprawidłowy
+        """
+        try:
+            payload, signature = token.split('.')
+            if not hmac.compare_digest(SessionToken._sign(payload), signature):
+                return None
+            version, username, issued_at, expires_at, jti = (
+                _b64decode(payload).decode('utf-8').split(FIELD_SEPARATOR)
+            )
+            claims = {
+                'username': username,
+                'login_time': int(issued_at) / 1_000_000,
+                'expires_at': int(expires_at) / 1_000_000,
+                'issued_us': int(issued_at),
+                'jti': jti
+            }
+        except (ValueError, TypeError, UnicodeError, binascii.Error):
+            return None
+
+        if version != TOKEN_VERSION:
+            return None
+
+        return claims
+
+    @staticmethod
+    def verify(token: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Weryfikuje token wznawiania sesji
+
+        Args:
+            token: Token do weryfikacji
+            now: Aktualny czas (domyślnie time.time())
+
+        Returns:
+            Słownik z polami tokena lub None jeśli token jest nieważny,
+            wygasł albo został unieważniony
+        """
+        claims = SessionToken.decode(token)
+        if claims is None:
+            return None
+
+        now = time.time() if now is None else now
+        # Zmniejszenie SESSION_TIMEOUT skraca także ważność wydanych tokenów
+        expires_at = min(
+            claims['expires_at'],
+            claims['login_time'] + Config.get_session_timeout()
+        )
+        if now >= expires_at:
+            return None
+
+        SessionToken._sync()
+        if SessionToken.is_revoked(claims['jti']):
+            return None
+
+        revocation = SessionToken._user_revocations.get(claims['username'])
+        if revocation is not None:
+            revoked_before, keep_jti = revocation
+            # Token wydany w tej samej µs co unieważnienie (albo później) pozostaje ważny
+            if claims['issued_us'] < revoked_before and claims['jti'] != keep_jti:
+                return None
+
+        return claims
+
+    @classmethod
+    def revoke(cls, token: str) -> None:
+        """
+        Unieważnia token (dodaje go do denylisty do czasu jego wygaśnięcia)
+
+        Args:
+            token: Token do unieważnienia
+        """
+        claims = cls.decode(token)
+        if claims is None:
+            return
+
+        now = time.time()
+        conn = cls._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            # Wygasłe tokeny i tak nie przejdą weryfikacji - nie trzeba ich pamiętać
+            conn.execute('DELETE FROM revoked_tokens WHERE expires_at <= ?', (now,))
+            conn.execute('DELETE FROM restore_codes WHERE jti = ? OR expires_at <= ?', (claims['jti'], now))
+            if claims['expires_at'] > now:
+                conn.execute(
+                    'INSERT OR REPLACE INTO revoked_tokens (jti, expires_at) VALUES (?, ?)',
+                    (claims['jti'], claims['expires_at'])
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+        with cls._lock:
+            expired = [jti for jti, exp in cls._denylist.items() if exp <= now]
+            for jti in expired:
+                del cls._denylist[jti]
+            if claims['expires_at'] > now:
+                cls._denylist[claims['jti']] = claims['expires_at']
+
+        logger.info(f"Unieważniono token sesji użytkownika {claims['username']}")
+
+    @classmethod
+    def is_revoked(cls, jti: str) -> bool:
+        """
+        Sprawdza czy token o danym identyfikatorze został unieważniony
+
+        Args:
+            jti: Identyfikator tokena
+
+        Returns:
+            True jeśli token jest na denyliście
+        """
+        return jti in cls._denylist
+
+    @classmethod
+    def revoke_user_sessions(cls, username: str, keep_jti: Optional[str] = None) -> None:
+        """
+        Unieważnia wszystkie dotychczas wydane tokeny użytkownika
+
+        Args:
+            username: Nazwa użytkownika
+            keep_jti: Identyfikator tokena sesji, która ma pozostać aktywna
+        """
+        now = time.time()
+        # Po upływie timeoutu sesji starsze tokeny i tak wygasły
+        oldest = _to_us(now - Config.get_session_timeout())
+        conn = cls._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM user_revocations WHERE revoked_before_us < ?', (oldest,))
+            conn.execute(
+                'INSERT OR REPLACE INTO user_revocations (username, revoked_before_us, keep_jti) '
+                'VALUES (?, ?, ?)',
+                (username, _to_us(now), keep_jti)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+        with cls._lock:
+            for user in [u for u, (ts, _) in cls._user_revocations.items() if ts < oldest]:
+                del cls._user_revocations[user]
+            cls._user_revocations[username] = (_to_us(now), keep_jti)
+
+        logger.info(f"Unieważniono pozostałe sesje użytkownika {username}")
+
+    @classmethod
+    def issue_restore_code(cls, token: str) -> str:
+        """
+        Wydaje jednorazowy kod wznowienia sesji do umieszczenia w URL
+
+        Args:
+            token: Token sesji, na który kod zostanie wymieniony
+
+        Returns:
+            Losowy kod bez danych użytkownika; w bazie zapisywany jest tylko jego skrót
+        """
+        claims = cls.decode(token)
+        if claims is None:
+            raise ValueError("Nieprawidłowy token sesji")
+
+        code = secrets.token_urlsafe(24)
+        conn = cls._connect()
+        try:
+            conn.execute('DELETE FROM restore_codes WHERE expires_at <= ?', (time.time(),))
+            conn.execute(
+                'INSERT INTO restore_codes (code_hash, token, jti, expires_at) VALUES (?, ?, ?, ?)',
+                (_code_hash(code), token, claims['jti'], claims['expires_at'])
+            )
+        finally:
+            conn.close()
+        return code
+
+    @classmethod
+    def redeem_restore_code(cls, code: str) -> Optional[str]:
+        """
+        Wymienia kod wznowienia na token sesji - kod jest usuwany przy użyciu
+
+        Args:
+            code: Kod z URL
+
+        Returns:
+            Token sesji lub None jeśli kod jest nieznany, wykorzystany albo wygasł
+        """
+        if not os.path.exists(Config.get_database_file()):
+            return None
+
+        conn = cls._connect()
+        try:
+            row = conn.execute(
+                'DELETE FROM restore_codes WHERE code_hash = ? RETURNING token, expires_at', (_code_hash(code),)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None or row[1] <= time.time():
+            return None
+        return row[0]
@@ -0,0 +1,272 @@
+"""
+Szkice strumieniowe - statystyki w stałej pamięci, łączone między replikami i oknami czasu
+"""
+import base64
+import hashlib
+import math
+from typing import Dict, List, Optional, Tuple
+
+
+class HyperLogLog:
+    """Przybliżona liczba unikalnych elementów (błąd względny ok. 1.04 / sqrt(2^p))"""
+
+    def __init__(self, p: int = 10):
+        self.p = p
+        self.registers = bytearray(1 << p)
+
+    def add(self, item: str) -> None:
+        x = int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'big')
+        index = x >> (64 - self.p)
+        rest = x & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        # Dla małych liczności dokładniejsze jest zliczanie pustych rejestrów
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        if other.p != self.p:
+            raise ValueError("Nie można łączyć szkiców HyperLogLog o różnej precyzji")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def to_dict(self) -> Dict:
+        return {'p': self.p, 'registers': base64.b64encode(bytes(self.registers)).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'HyperLogLog':
+        sketch = cls(data['p'])
+        sketch.registers = bytearray(base64.b64decode(data['registers']))
+        return sketch
+
+
+class TDigest:
+    """Przybliżone kwantyle (t-digest z łączeniem centroidów, funkcja skali k1)"""
+
+    def __init__(self, compression: int = 100):
+        self.compression = compression
+        self.means: List[float] = []
+        self.weights: List[float] = []
+        self.count = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._buffer: List[Tuple[float, float]] = []
+
+    def add(self, value: float, weight: float = 1.0) -> None:
+        self._buffer.append((value, weight))
+        self.count += weight
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _q(self, k: float) -> float:
+        return min(1.0, (math.sin(2 * math.pi * k / self.compression) + 1) / 2)
+
+    def _compress(self) -> None:
+        if not self._buffer:
+            return
+        points = sorted(list(zip(self.means, self.weights)) + self._buffer)
+        self._buffer = []
+        total = sum(weight for _, weight in points)
+
+        means, weights = [], []
+        current_mean, current_weight = points[0]
+        merged_weight = 0.0
+        q_limit = self._q(self._k(0.0) + 1)
+        for mean, weight in points[1:]:
+            if (merged_weight + current_weight + weight) / total <= q_limit:
+                current_weight += weight
+                current_mean += (mean - current_mean) * weight / current_weight
+            else:
+                means.append(current_mean)
+                weights.append(current_weight)
+                merged_weight += current_weight
+                q_limit = self._q(self._k(merged_weight / total) + 1)
+                current_mean, current_weight = mean, weight
+        means.append(current_mean)
+        weights.append(current_weight)
+        self.means, self.weights = means, weights
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Zwraca przybliżony kwantyl
+
+        Args:
+            q: Rząd kwantyla z przedziału [0, 1]
+
+        Returns:
+            Wartość kwantyla lub None dla pustego szkicu
+        """
+        self._compress()
+        if not self.means:
+            return None
+        if len(self.means) == 1:
+            return self.means[0]
+
+        target = q * self.count
+        cumulative = 0.0
+        previous_center, previous_mean = 0.0, self.min
+        for mean, weight in zip(self.means, self.weights):
+            center = cumulative + weight / 2
+            if target < center:
+                span = center - previous_center
+                fraction = (target - previous_center) / span if span else 0.0
+                return previous_mean + (mean - previous_mean) * fraction
+            previous_center, previous_mean = center, mean
+            cumulative += weight
+
+        span = self.count - previous_center
+        fraction = (target - previous_center) / span if span else 1.0
+        return previous_mean + (self.max - previous_mean) * fraction
+
+    def merge(self, other: 'TDigest') -> None:
+        other._compress()
+        if not other.means:
+            return
+        self._buffer.extend(zip(other.means, other.weights))
+        self.count += other.count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._compress()
+
+    def to_dict(self) -> Dict:
+        self._compress()
+        return {
+            'compression': self.compression,
+            'means': self.means,
+            'weights': self.weights,
+            'min': self.min,
+            'max': self.max
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'TDigest':
+        sketch = cls(data['compression'])
+        sketch.means = list(data['means'])
+        sketch.weights = list(data['weights'])
+        sketch.count = float(sum(sketch.weights))
+        sketch.min = data['min']
+        sketch.max = data['max']
+        return sketch
+
+
+class SpaceSaving:
+    """Najczęstsze elementy (algorytm Space-Saving, co najwyżej k liczników)"""
+
+    def __init__(self, k: int = 20):
+        self.k = k
+        self.counts: Dict[str, float] = {}
+        # Górne ograniczenie nadmiaru licznika przejętego po usuniętym elemencie
+        self.errors: Dict[str, float] = {}
+
+    def add(self, item: str, weight: float = 1.0) -> None:
+        if item in self.counts:
+            self.counts[item] += weight
+        elif len(self.counts) < self.k:
+            self.counts[item] = weight
+            self.errors[item] = 0.0
+        else:
+            victim = min(self.counts, key=self.counts.get)
+            floor = self.counts.pop(victim)
+            self.errors.pop(victim)
+            self.counts[item] = floor + weight
+            self.errors[item] = floor
+
+    def top(self, n: int = 1) -> List[Tuple[str, float]]:
+        return sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+    def merge(self, other: 'SpaceSaving') -> None:
+        counts, errors = dict(self.counts), dict(self.errors)
+        for item, count in other.counts.items():
+            counts[item] = counts.get(item, 0.0) + count
+            errors[item] = errors.get(item, 0.0) + other.errors[item]
+        kept = sorted(counts, key=lambda item: -counts[item])[:self.k]
+        self.counts = {item: counts[item] for item in kept}
+        self.errors = {item: errors[item] for item in kept}
+
+    def to_dict(self) -> Dict:
+        return {'k': self.k, 'counts': self.counts, 'errors': self.errors}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'SpaceSaving':
+        sketch = cls(data['k'])
+        sketch.counts = dict(data['counts'])
+        sketch.errors = dict(data['errors'])
+        return sketch
+
+
+class HeartbeatUptime:
+    """
+    Dostępność z przerw między sygnałami życia
+
+    Przerwa dłuższa niż tolerance liczy się jako niedostępność (poza jednym
+    oczekiwanym interwałem). Czasy dostępności i niedostępności są sumowane
+    per dzień, więc okna i repliki łączy się przez dodawanie.
+    """
+
+    def __init__(self, interval: float, tolerance: Optional[float] = None):
+        self.interval = interval
+        self.tolerance = tolerance if tolerance is not None else 3 * interval
+        self.last_beat: Optional[float] = None
+        self.days: Dict[int, List[float]] = {}
+
+    def beat(self, ts: float, day: int) -> None:
+        """
+        Rejestruje sygnał życia
+
+        Args:
+            ts: Czas sygnału (epoch)
+            day: Dzień sygnału (numer porządkowy daty)
+        """
+        if self.last_beat is not None and ts > self.last_beat:
+            gap = ts - self.last_beat
+            up, down = (gap, 0.0) if gap <= self.tolerance else (self.interval, gap - self.interval)
+            totals = self.days.setdefault(day, [0.0, 0.0])
+            totals[0] += up
+            totals[1] += down
+        self.last_beat = ts if self.last_beat is None else max(self.last_beat, ts)
+
+    def uptime(self, first_day: int, last_day: int) -> Optional[float]:
+        """Udział czasu dostępności w dniach [first_day, last_day] lub None bez danych"""
+        up = down = 0.0
+        for day, (day_up, day_down) in self.days.items():
+            if first_day <= day <= last_day:
+                up += day_up
+                down += day_down
+        return up / (up + down) if up + down else None
+
+    def prune(self, oldest_day: int) -> None:
+        for day in [day for day in self.days if day < oldest_day]:
+            del self.days[day]
+
+    def merge(self, other: 'HeartbeatUptime') -> None:
+        for day, (up, down) in other.days.items():
+            totals = self.days.setdefault(day, [0.0, 0.0])
+            totals[0] += up
+            totals[1] += down
+
+    def to_dict(self) -> Dict:
+        return {
+            'interval': self.interval,
+            'tolerance': self.tolerance,
+            'last_beat': self.last_beat,
+            'days': {str(day): totals for day, totals in self.days.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'HeartbeatUptime':
+        sketch = cls(data['interval'], data['tolerance'])
+        sketch.last_beat = data['last_beat']
+        sketch.days = {int(day): list(totals) for day, totals in data['days'].items()}
+        return sketch
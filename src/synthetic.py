@@ -0,0 +1,404 @@
+"""
+Generator danych syntetycznych - sesje, metryki systemu i linie logów w formatach aplikacji
+
+Użycie:
+    python -m src.synthetic [--sessions N] [--log-lines N] [--metrics]
+                            [--start YYYY-MM-DD] [--days N] [--users N] [--seed N]
+
+Dane generowane są wektorowo (numpy / pyarrow) porcjami po --chunk-rows
+wierszy, kolejne porcje obejmują kolejne odcinki czasu. Przy tym samym
+ziarnie wynik jest identyczny. Sesje trafiają do historii sesji (Parquet),
+linie logów do pliku logów w formacie Config.setup_logging, a metryki do
+historii metryk (plik binarny na metrykę i dzień).
+"""
+import argparse
+import sys
+import time
+from datetime import date, timedelta
+from typing import Iterator, List, Optional, Tuple
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from .config import Config
+from .metrics_history import MetricsHistory, wall_seconds
+from .session_history import SessionHistory, SESSION_SCHEMA, GROUP_ADMINS, GROUP_USERS
+
+CHUNK_ROWS = 1_000_000
+
+# Względna aktywność w kolejnych godzinach doby (szczyt w godzinach pracy)
+HOURLY_PROFILE = np.array([
+    0.05, 0.03, 0.02, 0.02, 0.03, 0.06, 0.15, 0.35, 0.70, 0.95, 1.00, 0.95,
+    0.80, 0.90, 0.95, 0.90, 0.80, 0.60, 0.45, 0.35, 0.30, 0.25, 0.15, 0.08
+])
+# Względna aktywność w dniach tygodnia (poniedziałek = 0)
+WEEKDAY_PROFILE = np.array([1.0, 1.0, 1.0, 0.95, 0.85, 0.35, 0.25])
+
+# Szablony wpisów logu: (poziom, moduł, początek wiadomości, koniec wiadomości, waga);
+# między początkiem i końcem wstawiana jest nazwa użytkownika, gdy koniec nie jest None
+LOG_TEMPLATES = [
+    ('INFO', 'src.auth_service', 'Pomyślne logowanie użytkownika: ', '', 30),
+    ('INFO', 'src.auth_service', 'Użytkownik ', ' został zalogowany', 30),
+    ('INFO', 'src.auth_service', 'Użytkownik ', ' został wylogowany', 25),
+    ('INFO', 'src.auth_service', 'Wznowiono sesję użytkownika ', '', 8),
+    ('DEBUG', 'src.preferences', 'Zapisano preferencje 1 użytkowników', None, 6),
+    ('DEBUG', 'src.session_history', 'Zapisano 1 sesji w historii', None, 6),
+    ('WARNING', 'src.auth_service', 'Nieudana próba logowania użytkownika: ', '', 4),
+    ('WARNING', 'src.auth_service', 'Nieznany użytkownik: ', '', 1),
+    ('WARNING', 'src.auth_service', 'Odrzucono nieprawidłowy lub wygasły token sesji', None, 1),
+    ('ERROR', 'src.preferences', 'Błąd zapisu preferencji: database is locked', None, 0.3),
+    ('ERROR', 'src.log_store', 'Błąd synchronizacji logów: disk I/O error', None, 0.1),
+]
+
+METRICS_SCHEMA = pa.schema([
+    ('time', pa.timestamp('s')),
+    ('cpu_percent', pa.float32()),
+    ('ram_percent', pa.float32()),
+    ('response_ms', pa.float32())
+])
+
+
+def _chunk_ranges(rows: int, begin: float, end: float, chunk_rows: int) -> Iterator[Tuple[int, float, float]]:
+    """Dzieli wiersze i przedział czasu na kolejne porcje (liczba wierszy, początek, koniec)"""
+    chunks = max(1, -(-rows // chunk_rows))
+    bounds = np.linspace(begin, end, chunks + 1)
+    for i in range(chunks):
+        size = rows // chunks + (1 if i < rows % chunks else 0)
+        yield size, bounds[i], bounds[i + 1]
+
+
+def diurnal_timestamps(rng: np.random.Generator, begin: float, end: float, n: int) -> np.ndarray:
+    """
+    Losuje posortowane znaczniki czasu z profilem dobowym i tygodniowym
+
+    Args:
+        rng: Generator liczb losowych
+        begin: Początek przedziału (czas ścienny, s)
+        end: Koniec przedziału (czas ścienny, s)
+        n: Liczba znaczników
+
+    Returns:
+        Tablica float64 długości n
+    """
+    result = np.empty(0)
+    while len(result) < n:
+        # Losowanie z odrzucaniem - średnia akceptacja ok. 45%, więc losujemy z zapasem
+        candidates = rng.uniform(begin, end, int((n - len(result)) * 2.5) + 16)
+        seconds = candidates.astype(np.int64)
+        hours = (seconds // 3600) % 24
+        # 1970-01-01 był czwartkiem (3)
+        weekdays = (seconds // 86400 + 3) % 7
+        weight = HOURLY_PROFILE[hours] * WEEKDAY_PROFILE[weekdays]
+        accepted = candidates[rng.random(len(candidates)) < weight]
+        result = np.concatenate([result, accepted])
+    return np.sort(result[:n])
+
+
+def _usernames(users: int) -> np.ndarray:
+    names = np.array([f"user{i:05d}" for i in range(users)], dtype=object)
+    names[0] = Config.get_admin_user()
+    return names
+
+
+def _pick_users(rng: np.random.Generator, users: int, n: int) -> np.ndarray:
+    """Indeksy użytkowników z rozkładu Zipfa - kilku bardzo aktywnych, długi ogon"""
+    return (rng.zipf(1.3, n) - 1) % users
+
+
+def generate_sessions(
+    rows: int,
+    start: date,
+    days: int,
+    users: int = 1000,
+    seed: int = 0,
+    chunk_rows: int = CHUNK_ROWS
+) -> Iterator[pa.Table]:
+    """
+    Generuje sesje o schemacie SESSION_SCHEMA, porcjami w kolejności czasu
+
+    Args:
+        rows: Łączna liczba sesji
+        start: Pierwszy dzień
+        days: Liczba dni
+        users: Liczba użytkowników
+        seed: Ziarno generatora
+        chunk_rows: Maksymalna liczba wierszy porcji
+
+    Returns:
+        Iterator tabel Arrow
+    """
+    rng = np.random.default_rng(seed)
+    names = _usernames(users)
+    timeout = Config.get_session_timeout()
+    begin = wall_seconds(start)
+    for n, chunk_begin, chunk_end in _chunk_ranges(rows, begin, begin + days * 86400, chunk_rows):
+        login = diurnal_timestamps(rng, chunk_begin, chunk_end, n)
+        user_index = _pick_users(rng, users, n)
+        duration = np.minimum(rng.lognormal(np.log(1200), 0.9, n), timeout)
+        reason = np.where(
+            duration >= timeout,
+            'timeout',
+            np.where(rng.random(n) < 0.03, 'revoked', 'logout')
+        )
+        login_us = (login * 1_000_000).astype(np.int64)
+        yield pa.table({
+            'username': pa.array(names[user_index], pa.string()),
+            'user_group': pa.array(np.where(user_index == 0, GROUP_ADMINS, GROUP_USERS), pa.string()),
+            'login_time': pa.array(login_us, pa.timestamp('us')),
+            'end_time': pa.array(login_us + (duration * 1_000_000).astype(np.int64), pa.timestamp('us')),
+            'duration_s': pa.array(duration, pa.float64()),
+            'end_reason': pa.array(reason, pa.string())
+        }, schema=SESSION_SCHEMA)
+
+
+def _write_day_partitions(table: pa.Table, column: str, root: str) -> int:
+    """Zapisuje porcję posortowaną po kolumnie czasu - jeden plik na dzień"""
+    per_day = {'s': 86400, 'ms': 86400 * 10**3, 'us': 86400 * 10**6}[table.schema.field(column).type.unit]
+    days = table.column(column).cast(pa.int64()).to_numpy() // per_day
+    # Porcje są posortowane po czasie, więc dni tworzą ciągłe odcinki
+    boundaries = np.flatnonzero(np.diff(days)) + 1
+    for begin, end in zip(np.r_[0, boundaries], np.r_[boundaries, len(days)]):
+        day = date(1970, 1, 1) + timedelta(days=int(days[begin]))
+        SessionHistory.write_partition(root, day.isoformat(), table.slice(begin, end - begin))
+    return table.num_rows
+
+
+def write_sessions(tables: Iterator[pa.Table], root: Optional[str] = None) -> int:
+    """
+    Zapisuje sesje do historii sesji - jeden plik na dzień w porcji
+
+    Args:
+        tables: Porcje sesji (np. z generate_sessions)
+        root: Katalog historii (domyślnie SESSION_HISTORY_DIR)
+
+    Returns:
+        Liczba zapisanych sesji
+    """
+    root = root or Config.get_session_history_dir()
+    return sum(_write_day_partitions(table, 'login_time', root) for table in tables)
+
+
+def generate_log_lines(
+    rows: int,
+    start: date,
+    days: int,
+    users: int = 1000,
+    seed: int = 0,
+    chunk_rows: int = CHUNK_ROWS
+) -> Iterator[pa.Array]:
+    """
+    Generuje linie logów w formacie Config.setup_logging, porcjami w kolejności czasu
+
+    Args:
+        rows: Łączna liczba linii
+        start: Pierwszy dzień
+        days: Liczba dni
+        users: Liczba użytkowników
+        seed: Ziarno generatora
+        chunk_rows: Maksymalna liczba linii porcji
+
+    Returns:
+        Iterator tablic Arrow z liniami (zakończonymi znakiem nowej linii)
+    """
+    rng = np.random.default_rng(seed)
+    # Ostatni element to pusty napis dla wpisów bez nazwy użytkownika
+    names = pa.array(list(_usernames(users)) + [''], pa.string())
+    heads = pa.array([f"{module} - {level} - {prefix}" for level, module, prefix, _, _ in LOG_TEMPLATES])
+    tails = pa.array([(suffix or '') + '\n' for _, _, _, suffix, _ in LOG_TEMPLATES])
+    with_user = np.array([suffix is not None for _, _, _, suffix, _ in LOG_TEMPLATES])
+    weights = np.array([weight for *_, weight in LOG_TEMPLATES])
+
+    begin = wall_seconds(start)
+    for n, chunk_begin, chunk_end in _chunk_ranges(rows, begin, begin + days * 86400, chunk_rows):
+        ts = diurnal_timestamps(rng, chunk_begin, chunk_end, n)
+        template = rng.choice(len(LOG_TEMPLATES), n, p=weights / weights.sum())
+        user = np.where(with_user[template], _pick_users(rng, users, n), users)
+
+        lines = pc.binary_join_element_wise(
+            format_asctime((ts * 1000).astype(np.int64)), ' - ',
+            heads.take(template),
+            names.take(user),
+            tails.take(template),
+            ''
+        )
+        yield lines.combine_chunks() if isinstance(lines, pa.ChunkedArray) else lines
+
+
+def format_asctime(ms: np.ndarray) -> pa.Array:
+    """
+    Formatuje czas jak logging ('YYYY-MM-DD HH:MM:SS,mmm') - wektorowo
+
+    Args:
+        ms: Czas ścienny w milisekundach
+
+    Returns:
+        Tablica Arrow z napisami
+    """
+    seconds = ms // 1000
+    days, day_index = np.unique(seconds // 86400, return_inverse=True)
+    # Napisy dat tylko dla unikalnych dni, pozostałe pola z arytmetyki na liczbach
+    dates = pa.array([
+        f"{date(1970, 1, 1) + timedelta(days=int(day))} " for day in days
+    ]).take(day_index)
+    time_of_day = seconds % 86400
+
+    def padded(values: np.ndarray, width: int) -> pa.Array:
+        return pc.utf8_lpad(pa.array(values).cast(pa.string()), width, '0')
+
+    return pc.binary_join_element_wise(
+        dates, padded(time_of_day // 3600, 2), ':', padded(time_of_day // 60 % 60, 2), ':',
+        padded(time_of_day % 60, 2), ',', padded(ms % 1000, 3), ''
+    )
+
+
+def write_log_lines(lines: Iterator[pa.Array], path: Optional[str] = None) -> int:
+    """
+    Dopisuje linie do pliku logów - bufor porcji zapisywany bez kopiowania linii
+
+    Args:
+        lines: Porcje linii (np. z generate_log_lines)
+        path: Plik logów (domyślnie LOG_FILE)
+
+    Returns:
+        Liczba zapisanych linii
+    """
+    path = path or Config.get_log_file()
+    written = 0
+    with open(path, 'ab') as f:
+        for chunk in lines:
+            chunk = pa.concat_arrays([chunk]) if chunk.offset else chunk
+            offset_type = np.int64 if pa.types.is_large_string(chunk.type) else np.int32
+            offsets = np.frombuffer(chunk.buffers()[1], dtype=offset_type)
+            data = chunk.buffers()[2]
+            f.write(memoryview(data)[offsets[0]:offsets[len(chunk)]])
+            written += len(chunk)
+    return written
+
+
+def generate_metrics(
+    start: date,
+    days: int,
+    interval: int = 60,
+    seed: int = 0,
+    chunk_rows: int = CHUNK_ROWS
+) -> Iterator[pa.Table]:
+    """
+    Generuje metryki systemu (CPU, RAM, czas odpowiedzi) co interval sekund
+
+    Args:
+        start: Pierwszy dzień
+        days: Liczba dni
+        interval: Odstęp próbek (s)
+        seed: Ziarno generatora
+        chunk_rows: Maksymalna liczba wierszy porcji
+
+    Returns:
+        Iterator tabel Arrow o schemacie METRICS_SCHEMA
+    """
+    rng = np.random.default_rng(seed)
+    begin = wall_seconds(start)
+    total = days * 86400 // interval
+    ram_level = 45.0
+    for offset in range(0, total, chunk_rows):
+        n = min(chunk_rows, total - offset)
+        seconds = begin + (offset + np.arange(n, dtype=np.int64)) * interval
+        hours = (seconds // 3600) % 24
+        weekdays = (seconds // 86400 + 3) % 7
+        load = HOURLY_PROFILE[hours] * WEEKDAY_PROFILE[weekdays]
+
+        cpu = np.clip(10 + 65 * load + rng.normal(0, 5, n), 0, 100)
+        # RAM zmienia się powoli - błądzenie losowe z powrotem do średniej
+        ram = ram_level + np.cumsum(rng.normal(0, 0.3, n)) + 15 * load
+        ram_level = float(ram[-1] - 15 * load[-1]) * 0.9 + 45.0 * 0.1
+        response = rng.gamma(4, 20, n) * (1 + 2 * load ** 3)
+        # Rzadkie skoki czasu odpowiedzi
+        response[rng.random(n) < 0.001] *= 8
+
+        yield pa.table({
+            'time': pa.array(seconds, pa.timestamp('s')),
+            'cpu_percent': pa.array(cpu, pa.float32()),
+            'ram_percent': pa.array(np.clip(ram, 0, 100), pa.float32()),
+            'response_ms': pa.array(response, pa.float32())
+        }, schema=METRICS_SCHEMA)
+
+
+def write_metrics(tables: Iterator[pa.Table], root: Optional[str] = None, interval: int = 60) -> int:
+    """
+    Zapisuje metryki do historii metryk (MetricsHistory)
+
+    Args:
+        tables: Porcje metryk (np. z generate_metrics)
+        root: Katalog historii (domyślnie Config.get_metrics_history_dir())
+        interval: Odstęp próbek (s) - interwał plików dni
+
+    Returns:
+        Liczba zapisanych próbek
+    """
+    written = 0
+    for table in tables:
+        seconds = table.column('time').cast(pa.int64()).to_numpy()
+        for name in table.column_names[1:]:
+            MetricsHistory.write(name, seconds, table.column(name).to_numpy(), interval, root)
+        written += table.num_rows
+    MetricsHistory.flush()
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m src.synthetic',
+        description='Generator syntetycznych sesji, logów i metryk w formatach aplikacji'
+    )
+    parser.add_argument('--sessions', type=int, default=0, help='Liczba sesji do wygenerowania')
+    parser.add_argument('--log-lines', type=int, default=0, help='Liczba linii logów')
+    parser.add_argument('--metrics', action='store_true', help='Generuj metryki systemu')
+    parser.add_argument('--metrics-interval', type=int, default=60, help='Odstęp próbek metryk (s)')
+    parser.add_argument('--start', type=date.fromisoformat, default=None,
+                        help='Pierwszy dzień (domyślnie --days dni temu)')
+    parser.add_argument('--days', type=int, default=30, help='Liczba dni')
+    parser.add_argument('--users', type=int, default=1000, help='Liczba użytkowników')
+    parser.add_argument('--seed', type=int, default=42, help='Ziarno generatora')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='Wierszy na porcję')
+    parser.add_argument('--sessions-dir', default=None, help='Katalog historii sesji')
+    parser.add_argument('--log-file', default=None, help='Plik logów (dopisywanie)')
+    parser.add_argument('--metrics-dir', default=None, help='Katalog historii metryk')
+    args = parser.parse_args(argv)
+
+    if not (args.sessions or args.log_lines or args.metrics):
+        parser.error("wybierz co najmniej jedno z: --sessions, --log-lines, --metrics")
+
+    start = args.start or date.today() - timedelta(days=args.days)
+    generator_args = (start, args.days)
+
+    if args.sessions:
+        started = time.perf_counter()
+        rows = write_sessions(
+            generate_sessions(args.sessions, *generator_args, args.users, args.seed, args.chunk_rows),
+            args.sessions_dir
+        )
+        _report("sesje", rows, time.perf_counter() - started)
+
+    if args.log_lines:
+        started = time.perf_counter()
+        rows = write_log_lines(
+            generate_log_lines(args.log_lines, *generator_args, args.users, args.seed, args.chunk_rows),
+            args.log_file
+        )
+        _report("linie logów", rows, time.perf_counter() - started)
+
+    if args.metrics:
+        started = time.perf_counter()
+        rows = write_metrics(
+            generate_metrics(*generator_args, args.metrics_interval, args.seed, args.chunk_rows),
+            args.metrics_dir,
+            args.metrics_interval
+        )
+        _report("próbki metryk", rows, time.perf_counter() - started)
+    return 0
+
+
+def _report(name: str, rows: int, elapsed: float) -> None:
+    print(f"{name}: {rows:,} w {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f}/s)")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Wspólne fixtures testów
+"""
+import pytest
+from unittest.mock import patch
+
+
+@pytest.fixture(autouse=True)
+def isolated_database(tmp_path, monkeypatch):
+    """Każdy test korzysta z własnej, tymczasowej bazy aplikacji"""
+    db_file = tmp_path / "app.db"
+    monkeypatch.setenv('DATABASE_FILE', str(db_file))
+    monkeypatch.setenv('LOG_DB_FILE', str(tmp_path / "logs.db"))
+    monkeypatch.setenv('SESSION_HISTORY_DIR', str(tmp_path / "sessions"))
+    monkeypatch.setenv('AUTH_EVENTS_FILE', str(tmp_path / "auth_events.jsonl"))
+    monkeypatch.setenv('PROFILE_DIR', str(tmp_path / "profiles"))
+    monkeypatch.setenv('METRICS_HISTORY_DIR', str(tmp_path / "metrics"))
+    return db_file
+
+
+@pytest.fixture(autouse=True)
+def clean_session_revocations():
+    """Unieważnienia tokenów sesji nie przechodzą między testami"""
+    from src.session_token import SessionToken
+    SessionToken._denylist.clear()
+    SessionToken._user_revocations.clear()
+    SessionToken._synced_at = 0.0
+    yield
+    SessionToken._denylist.clear()
+    SessionToken._user_revocations.clear()
+
+
+@pytest.fixture(autouse=True)
+def no_background_flush():
+    """Bufory zapisu w tle są opróżniane jawnie w testach - bez wątków zapisujących"""
+    from src.preferences import PreferencesStore
+    from src.session_history import SessionHistory
+    from src.auth_events import AuthEventStream
+    from src.anomaly import AnomalyDetector
+    from src.log_tail import LogTailer
+    from src.cohorts import CohortStore
+    from src.metrics_history import MetricsHistory
+    from src.auth_service import OpenSessions
+    with patch.object(PreferencesStore, '_flusher', object()), \
+            patch.object(SessionHistory, '_flusher', object()), \
+            patch.object(AuthEventStream, '_flusher', object()), \
+            patch.object(LogTailer, '_thread', object()), \
+            patch.object(CohortStore, '_thread', object()), \
+            patch.object(OpenSessions, '_sweeper', object()):
+        PreferencesStore._dirty.clear()
+        PreferencesStore._inflight.clear()
+        SessionHistory._buffer.clear()
+        AuthEventStream.reset()
+        AnomalyDetector.reset()
+        LogTailer.reset()
+        CohortStore.reset()
+        MetricsHistory.close()
+        OpenSessions.reset()
+        yield
+        PreferencesStore._dirty.clear()
+        SessionHistory._buffer.clear()
+        AuthEventStream.reset()
+        AnomalyDetector.reset()
+        LogTailer.reset()
+        OpenSessions.reset()
@@ -0,0 +1,222 @@
+"""
+Testy dla detektora anomalii
+"""
+import pytest
+import logging
+from unittest.mock import patch
+from src.anomaly import (
+    AnomalyDetector, EwmaDetector, RateDetector, AnomalyLogHandler, install_log_handler,
+    METRIC_ERRORS, METRIC_WARNINGS, METRIC_RESPONSE_TIME
+)
+
+
+@pytest.fixture
+def notifications():
+    """Zbiera powiadomienia zamiast wpisów w logu"""
+    received = []
+    with patch.object(AnomalyDetector, '_notifiers', [received.append]):
+        yield received
+
+
+def warm_up_errors(count_per_window=1, windows=15, start=0.0):
+    """Stała częstość błędów: count_per_window wpisów na minutę"""
+    for window in range(windows):
+        for i in range(count_per_window):
+            AnomalyDetector.observe_log('ERROR', start + window * 60 + i)
+    return start + windows * 60
+
+
+class TestEwmaDetector:
+    """Testy klasy EwmaDetector"""
+
+    def test_no_alert_during_warmup(self):
+        """Test braku alertów przed zbudowaniem bazy"""
+        detector = EwmaDetector(warmup=10)
+        assert all(detector.update(value) is None for value in [1, 1, 100, 1, 1])
+
+    def test_spike_detected_by_zscore(self):
+        """Test wykrycia pojedynczego skoku"""
+        detector = EwmaDetector()
+        for value in [10, 11, 9, 10, 10, 11, 9, 10, 10, 11, 9, 10]:
+            assert detector.update(value) is None
+
+        method, score = detector.update(40)
+
+        assert method == 'z-score'
+        assert score >= 4.0
+
+    def test_spike_does_not_shift_baseline(self):
+        """Test braku wpływu skoku na bazę"""
+        detector = EwmaDetector()
+        for value in [10] * 12:
+            detector.update(value)
+        detector.update(100)
+        assert detector.mean == pytest.approx(10)
+
+    def test_sustained_shift_detected_by_cusum(self):
+        """Test wykrycia utrzymującego się, niewielkiego wzrostu"""
+        detector = EwmaDetector(min_std=1.0)
+        for value in [10] * 20:
+            detector.update(value)
+
+        results = [detector.update(12.5) for _ in range(10)]
+
+        assert ('cusum' in [result[0] for result in results if result])
+        assert all(result is None or result[0] == 'cusum' for result in results)
+
+
+class TestRateDetector:
+    """Testy klasy RateDetector"""
+
+    def test_windows_closed_on_advance(self):
+        """Test zamykania okien i przekazywania częstości do bazy"""
+        detector = RateDetector(window=60)
+        for ts in [0, 10, 20, 65]:
+            detector.observe(ts)
+
+        assert detector.detector.n == 1
+        assert detector.detector.mean == 3
+        assert detector.count == 1
+
+    def test_long_idle_gap_bounded(self):
+        """Test ograniczenia liczby pustych okien po długiej przerwie"""
+        detector = RateDetector(window=60)
+        detector.observe(0)
+        detector.advance(60 * 10000)
+
+        assert detector.detector.n == 60
+        assert detector.window_start == 60 * 10000
+
+
+class TestAnomalyDetector:
+    """Testy klasy AnomalyDetector"""
+
+    def test_error_burst_raises_alert(self, notifications):
+        """Test alertu przy nagłym wzroście liczby błędów - jeszcze w trakcie okna"""
+        now = warm_up_errors()
+        assert AnomalyDetector.active_alerts() == []
+
+        for i in range(10):
+            AnomalyDetector.observe_log('ERROR', now + i)
+
+        alerts = AnomalyDetector.active_alerts()
+        assert len(alerts) == 1
+        assert alerts[0].metric == METRIC_ERRORS
+        assert alerts[0].baseline == pytest.approx(1)
+        assert len(notifications) == 1
+
+    def test_alerts_deduplicated_with_cooldown(self, notifications):
+        """Test deduplikacji alertów i cooldownu powiadomień"""
+        now = warm_up_errors()
+        for i in range(20):
+            AnomalyDetector.observe_log('ERROR', now + i)
+
+        alert = AnomalyDetector.active_alerts()[0]
+        assert alert.count > 1
+        assert len(notifications) == 1
+
+        with patch('src.anomaly.Config.get_alert_cooldown', return_value=5):
+            AnomalyDetector.observe_log('ERROR', now + 30)
+        assert len(notifications) == 2
+
+    def test_warnings_tracked_separately(self, notifications):
+        """Test osobnej metryki dla ostrzeżeń"""
+        now = warm_up_errors()
+        for i in range(10):
+            AnomalyDetector.observe_log('WARNING', now + i)
+
+        assert AnomalyDetector.active_alerts() == []
+        assert METRIC_WARNINGS in AnomalyDetector._rates
+
+    def test_response_time_spike(self, notifications):
+        """Test alertu o wydłużonym czasie odpowiedzi"""
+        for i in range(20):
+            AnomalyDetector.observe_sample(METRIC_RESPONSE_TIME, 100 + i % 3, ts=i)
+
+        AnomalyDetector.observe_sample(METRIC_RESPONSE_TIME, 400, ts=21)
+
+        assert [alert.metric for alert in AnomalyDetector.active_alerts()] == [METRIC_RESPONSE_TIME]
+
+    def test_alert_expires_after_cooldown(self, notifications):
+        """Test wygaszenia alertu po okresie bez anomalii"""
+        now = warm_up_errors()
+        for i in range(10):
+            AnomalyDetector.observe_log('ERROR', now + i)
+
+        AnomalyDetector.tick(now + 299)
+        assert len(AnomalyDetector.active_alerts()) == 1
+        AnomalyDetector.tick(now + 400)
+        assert AnomalyDetector.active_alerts() == []
+        assert len(AnomalyDetector.recent_alerts()) == 1
+
+    def test_acknowledge(self, notifications):
+        """Test potwierdzenia alertu"""
+        now = warm_up_errors()
+        for i in range(10):
+            AnomalyDetector.observe_log('ERROR', now + i)
+
+        AnomalyDetector.acknowledge(METRIC_ERRORS)
+
+        assert AnomalyDetector.active_alerts() == []
+
+    def test_notifications_disabled(self, notifications):
+        """Test wyłączenia powiadomień - alert nadal widoczny"""
+        AnomalyDetector.set_notifications(False)
+        try:
+            now = warm_up_errors()
+            for i in range(10):
+                AnomalyDetector.observe_log('ERROR', now + i)
+        finally:
+            AnomalyDetector.set_notifications(True)
+
+        assert notifications == []
+        assert len(AnomalyDetector.active_alerts()) == 1
+
+    def test_notifications_setting_persisted(self):
+        """Test zapisu ustawienia powiadomień całej aplikacji - odczyt po restarcie procesu"""
+        assert AnomalyDetector.load_settings() is True
+
+        AnomalyDetector.set_notifications(False)
+        AnomalyDetector.reset()
+        assert AnomalyDetector.notifications_enabled is True
+        assert AnomalyDetector.load_settings() is False
+        assert AnomalyDetector.notifications_enabled is False
+
+    def test_failing_notifier_ignored(self):
+        """Test odporności na błąd notyfikatora"""
+        def broken(alert):
+            raise RuntimeError("boom")
+
+        with patch.object(AnomalyDetector, '_notifiers', [broken]):
+            now = warm_up_errors()
+            for i in range(10):
+                AnomalyDetector.observe_log('ERROR', now + i)
+
+        assert len(AnomalyDetector.active_alerts()) == 1
+
+
+class TestAnomalyLogHandler:
+    """Testy podłączenia detektora do logowania"""
+
+    def test_handler_feeds_detector(self):
+        """Test przekazywania wpisów WARNING/ERROR do detektora"""
+        test_logger = logging.getLogger("test_anomaly_handler")
+        install_log_handler(test_logger)
+        install_log_handler(test_logger)
+        try:
+            test_logger.info("info")
+            test_logger.error("błąd")
+
+            assert sum(isinstance(h, AnomalyLogHandler) for h in test_logger.handlers) == 1
+            assert list(AnomalyDetector._rates) == [METRIC_ERRORS]
+        finally:
+            test_logger.handlers.clear()
+
+    def test_detector_own_records_ignored(self):
+        """Test pomijania wpisów samego detektora (powiadomień)"""
+        handler = AnomalyLogHandler()
+        record = logging.LogRecord('src.anomaly', logging.WARNING, __file__, 1, "Anomalia", None, None)
+
+        handler.handle(record)
+
+        assert AnomalyDetector._rates == {}
@@ -0,0 +1,293 @@
+"""
+Testy dla strumienia zdarzeń uwierzytelniania
+"""
+import pytest
+import os
+import json
+import multiprocessing
+from datetime import date, datetime
+from unittest.mock import patch
+from src.auth_events import (
+    AuthEventStream, EventCounters, AuthEvent, activity_series, usage_summary, app_uptime,
+    EVENT_LOGIN, EVENT_LOGOUT, EVENT_FAILURE, EVENT_TIMEOUT
+)
+from src.auth_service import AuthService
+
+
+def ts(day, hour=12, minute=0):
+    return datetime(2025, 7, day, hour, minute).timestamp()
+
+
+def publish_and_spill(username, day, count):
+    """Zdarzenia i sygnały życia z osobnego procesu aplikacji"""
+    AuthEventStream.reset()
+    for i in range(count):
+        AuthEventStream.publish(EVENT_LOGIN, username, ts(day) + i)
+        AuthEventStream.heartbeat(ts(21) + i * 10)
+        AuthEventStream.spill()
+
+
+class TestEventCounters:
+    """Testy liczników zdarzeń"""
+
+    def test_counts_per_resolution(self):
+        """Test zliczania w kubełkach minutowych, godzinowych i dziennych"""
+        counters = EventCounters()
+        for event_ts in [ts(21, 10, 0), ts(21, 10, 0) + 30, ts(21, 10, 5), ts(21, 14), ts(22, 9)]:
+            counters.add(AuthEvent(0, event_ts, EVENT_LOGIN, "admin"))
+
+        minutes = counters.series('minute', ts(21, 10, 0), ts(21, 10, 5))
+        hours = counters.series('hour', ts(21, 9), ts(21, 14))
+        days = counters.series('day', ts(21), ts(22))
+
+        assert len(minutes) == 6
+        assert minutes[EVENT_LOGIN].tolist() == [2, 0, 0, 0, 0, 1]
+        assert hours[EVENT_LOGIN].tolist() == [0, 3, 0, 0, 0, 1]
+        assert days[EVENT_LOGIN].tolist() == [4, 1]
+        assert days.index[0] == datetime(2025, 7, 21)
+
+    def test_counts_per_kind(self):
+        """Test osobnych liczników dla rodzajów zdarzeń"""
+        counters = EventCounters()
+        counters.add(AuthEvent(0, ts(21), EVENT_LOGIN, "admin"))
+        counters.add(AuthEvent(0, ts(21), EVENT_FAILURE, "eve"))
+        counters.add(AuthEvent(0, ts(21), EVENT_FAILURE, "eve"))
+
+        day = counters.series('day', ts(21), ts(21), kinds=[EVENT_LOGIN, EVENT_FAILURE]).iloc[0]
+
+        assert day[EVENT_LOGIN] == 1
+        assert day[EVENT_FAILURE] == 2
+
+    def test_old_buckets_pruned(self):
+        """Test usuwania kubełków starszych niż okres przechowywania"""
+        counters = EventCounters()
+        counters.add(AuthEvent(0, ts(1), EVENT_LOGIN, "admin"))
+        counters.add(AuthEvent(0, ts(3), EVENT_LOGIN, "admin"))
+
+        assert counters.series('minute', ts(1), ts(1))[EVENT_LOGIN].sum() == 0
+        assert counters.series('day', ts(1), ts(1))[EVENT_LOGIN].sum() == 1
+
+    def test_dict_roundtrip(self):
+        """Test zapisu i odtworzenia liczników"""
+        counters = EventCounters()
+        counters.add(AuthEvent(0, ts(21), EVENT_LOGIN, "admin"))
+
+        restored = EventCounters()
+        restored.load_dict(json.loads(json.dumps(counters.to_dict())))
+
+        assert restored.series('hour', ts(21), ts(21))[EVENT_LOGIN].tolist() == [1]
+
+
+class TestAuthEventStream:
+    """Testy klasy AuthEventStream"""
+
+    def test_publish_updates_counters(self):
+        """Test aktualizacji liczników przy publikacji"""
+        AuthEventStream.publish(EVENT_LOGIN, "admin", ts(21))
+        AuthEventStream.publish(EVENT_TIMEOUT, "admin", ts(21, 13))
+
+        activity = activity_series('day', ts(21), ts(21))
+
+        assert activity['Logowania'].tolist() == [1]
+        assert activity['Zakończone sesje'].tolist() == [1]
+
+    def test_subscribe_and_read(self):
+        """Test subskrybentów i odczytu zdarzeń po numerze"""
+        received = []
+        AuthEventStream.subscribe(received.append)
+        try:
+            first = AuthEventStream.publish(EVENT_LOGIN, "admin", ts(21))
+            second = AuthEventStream.publish(EVENT_LOGOUT, "admin", ts(21, 13))
+        finally:
+            AuthEventStream.unsubscribe(received.append)
+
+        assert received == [first, second]
+        assert AuthEventStream.read(after_seq=first.seq) == [second]
+
+    def test_failing_subscriber_does_not_break_publish(self):
+        """Test odporności publikacji na błąd subskrybenta"""
+        def broken(event):
+            raise RuntimeError("boom")
+
+        AuthEventStream.subscribe(broken)
+        try:
+            AuthEventStream.publish(EVENT_LOGIN, "admin", ts(21))
+        finally:
+            AuthEventStream.unsubscribe(broken)
+
+        assert activity_series('day', ts(21), ts(21))['Logowania'].tolist() == [1]
+
+    def test_spill_appends_only_new_events(self):
+        """Test dopisywania do pliku tylko nowych zdarzeń"""
+        AuthEventStream.publish(EVENT_LOGIN, "admin", ts(21))
+        assert AuthEventStream.spill() == 1
+        assert AuthEventStream.spill() == 0
+        AuthEventStream.publish(EVENT_LOGOUT, "admin", ts(21, 13))
+        assert AuthEventStream.spill() == 1
+
+        with open(os.environ['AUTH_EVENTS_FILE'], encoding='utf-8') as f:
+            assert len(f.readlines()) == 2
+
+    def test_counters_survive_restart(self):
+        """Test odtworzenia liczników po restarcie z migawki"""
+        AuthEventStream.publish(EVENT_LOGIN, "admin", ts(21))
+        AuthEventStream.publish(EVENT_LOGIN, "jan", ts(22))
+        AuthEventStream.spill()
+
+        AuthEventStream.reset()
+
+        assert activity_series('day', ts(21), ts(22))['Logowania'].tolist() == [1, 1]
+
+    def test_restart_replays_events_after_snapshot(self):
+        """Test odtworzenia zdarzeń zapisanych w pliku po ostatniej migawce"""
+        AuthEventStream.publish(EVENT_LOGIN, "admin", ts(21))
+        AuthEventStream.spill()
+        with open(os.environ['AUTH_EVENTS_FILE'], 'a', encoding='utf-8') as f:
+            f.write(json.dumps([ts(21, 15), EVENT_FAILURE, "eve"]) + '\n')
+
+        AuthEventStream.reset()
+        activity = activity_series('day', ts(21), ts(21))
+
+        assert activity['Logowania'].tolist() == [1]
+        assert activity['Nieudane logowania'].tolist() == [1]
+
+    def test_events_file_rotated(self):
+        """Test przeniesienia pliku zdarzeń objętego migawką po przekroczeniu rozmiaru"""
+        path = os.environ['AUTH_EVENTS_FILE']
+        with patch('src.auth_events.MAX_EVENTS_FILE_BYTES', 1):
+            AuthEventStream.publish(EVENT_LOGIN, "admin", ts(21))
+            AuthEventStream.spill()
+
+        assert not os.path.exists(path)
+        assert os.path.getsize(f"{path}.1") > 0
+        AuthEventStream.publish(EVENT_LOGIN, "jan", ts(21, 13))
+        AuthEventStream.spill()
+        with open(path, encoding='utf-8') as f:
+            assert len(f.readlines()) == 1
+
+        AuthEventStream.reset()
+        assert activity_series('day', ts(21), ts(21))['Logowania'].tolist() == [2]
+
+    def test_replay_after_interrupted_rotation(self):
+        """Test odtworzenia zdarzeń nowego pliku, gdy migawka wskazuje pozycję sprzed przeniesienia"""
+        path = os.environ['AUTH_EVENTS_FILE']
+        for hour in (10, 11, 12):
+            AuthEventStream.publish(EVENT_LOGIN, "admin", ts(21, hour))
+        AuthEventStream.spill()
+        # Przerwa po przeniesieniu pliku, przed migawką z pozycją 0; potem nowe zdarzenie bez migawki
+        os.replace(path, f"{path}.1")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps([ts(21, 15), EVENT_FAILURE, "eve"]) + '\n')
+
+        AuthEventStream.reset()
+        activity = activity_series('day', ts(21), ts(21))
+
+        assert activity['Logowania'].tolist() == [3]
+        assert activity['Nieudane logowania'].tolist() == [1]
+
+    def test_usage_summary(self):
+        """Test statystyk ogólnych ze szkiców dziennych"""
+        for day, user, duration in [(21, "admin", 600), (21, "jan", 1200), (22, "admin", 3600)]:
+            AuthEventStream.publish(EVENT_LOGIN, user, ts(day))
+            AuthEventStream.publish(EVENT_LOGOUT, user, ts(day) + duration, duration)
+        AuthEventStream.publish(EVENT_FAILURE, "eve", ts(22))
+
+        summary = usage_summary(date(2025, 7, 21), date(2025, 7, 22))
+        first_day = usage_summary(date(2025, 7, 21), date(2025, 7, 21))
+
+        assert summary['logins'] == 3
+        assert summary['failures'] == 1
+        assert summary['distinct_users'] == 2
+        assert summary['median_session_s'] == pytest.approx(1200)
+        assert summary['max_session_s'] == 3600
+        assert summary['top_user'] == "admin"
+        assert first_day['max_session_s'] == 1200
+
+    def test_usage_summary_empty(self):
+        """Test statystyk bez zdarzeń"""
+        summary = usage_summary(date(2025, 7, 21), date(2025, 7, 22))
+
+        assert summary['logins'] == 0
+        assert summary['median_session_s'] is None
+        assert summary['top_user'] is None
+        assert summary['uptime'] is None
+
+    def test_usage_and_uptime_survive_restart(self):
+        """Test odtworzenia szkiców i dostępności z migawki"""
+        AuthEventStream.publish(EVENT_LOGIN, "admin", ts(21))
+        AuthEventStream.publish(EVENT_LOGOUT, "admin", ts(21, 13), 3600)
+        for i in range(4):
+            AuthEventStream.heartbeat(ts(21, 14) + i * 10)
+        AuthEventStream.spill()
+
+        AuthEventStream.reset()
+        # Pierwszy sygnał po restarcie - przerwa liczy się jako niedostępność
+        AuthEventStream.heartbeat(ts(21, 14) + 30 + 100)
+
+        summary = usage_summary(date(2025, 7, 21), date(2025, 7, 21))
+        assert summary['top_user'] == "admin"
+        assert summary['max_session_s'] == 3600
+        assert app_uptime(date(2025, 7, 21), date(2025, 7, 21)) == pytest.approx(40 / 130)
+
+    def test_heartbeat_snapshot_without_events(self):
+        """Test wymuszonej migawki bez nowych zdarzeń"""
+        AuthEventStream.heartbeat(ts(21))
+        AuthEventStream.heartbeat(ts(21) + 10)
+
+        assert AuthEventStream.spill() == 0
+        assert not os.path.exists(AuthEventStream.snapshot_file())
+        AuthEventStream.spill(force=True)
+        assert os.path.exists(AuthEventStream.snapshot_file())
+
+    def test_spill_from_concurrent_processes(self):
+        """Test migawki zapisywanej przez kilka procesów - żaden nie nadpisuje zdarzeń pozostałych"""
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=publish_and_spill, args=(f"user{i}", 21 + i % 2, 20)) for i in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        AuthEventStream.reset()
+        summary = usage_summary(date(2025, 7, 21), date(2025, 7, 22))
+
+        assert activity_series('day', ts(21), ts(22))['Logowania'].tolist() == [40, 40]
+        assert summary['logins'] == 80
+        assert summary['distinct_users'] == 4
+        assert app_uptime(date(2025, 7, 21), date(2025, 7, 21)) == pytest.approx(1.0)
+
+        # Kolejny zapis po restarcie dolicza tylko nowe zdarzenia
+        AuthEventStream.publish(EVENT_LOGIN, "admin", ts(21, 15))
+        AuthEventStream.spill()
+        AuthEventStream.reset()
+        assert activity_series('day', ts(21), ts(22))['Logowania'].tolist() == [41, 40]
+
+    def test_load_without_files(self):
+        """Test pustych liczników bez zapisanego strumienia"""
+        assert activity_series('hour', ts(21), ts(21, 23))['Logowania'].sum() == 0
+
+
+class TestAuthServiceEvents:
+    """Testy publikacji zdarzeń przez AuthService"""
+
+    @patch('src.auth_service.st')
+    def test_login_and_logout_published(self, mock_st):
+        """Test zdarzeń logowania i wylogowania"""
+        mock_st.session_state = {}
+        mock_st.query_params = {}
+
+        AuthService.login_user("admin")
+        AuthService.logout_user()
+
+        kinds = [event.kind for event in AuthEventStream.read()]
+        assert kinds == [EVENT_LOGIN, EVENT_LOGOUT]
+
+    def test_failed_authentication_published(self):
+        """Test zdarzenia nieudanego logowania"""
+        with patch.object(AuthService, 'get_password_hash', return_value=None):
+            assert AuthService.authenticate_user("eve", "secret") is False
+
+        events = AuthEventStream.read()
+        assert [(event.kind, event.username) for event in events] == [(EVENT_FAILURE, "eve")]
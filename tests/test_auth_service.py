@@ -7,6 +7,8 @@ import time
 from unittest.mock import patch, MagicMock
 from src.auth_service import AuthService
 from src.config import Config
+from src.session_token import SessionToken
+from src.credential_store import CredentialStore
 
 
 class TestAuthService:
@@ -126,7 +128,7 @@ class TestAuthService:
         
         with patch('src.auth_service.Config.get_session_timeout', return_value=3600):  # 1 godzina
             assert AuthService.is_authenticated() is False
-            mock_logout.assert_called_once()
+            mock_logout.assert_called_once_with(reason='timeout')
     
     @patch('src.auth_service.st')
     def test_get_current_user_authenticated(self, mock_st):
@@ -173,3 +175,311 @@ class TestAuthService:
         
         session_info = AuthService.get_session_info()
         assert session_info == {}
+    
+    @patch('src.auth_service.st')
+    def test_login_user_issues_session_token(self, mock_st):
+        """Test wydania tokena wznawiania sesji przy logowaniu"""
+        mock_st.session_state = {}
+        mock_st.query_params = {}
+        
+        AuthService.login_user("testuser")
+        
+        token = mock_st.session_state['session_token']
+        code = mock_st.query_params['session']
+        assert code != token and "testuser" not in code
+        assert SessionToken.verify(token)['username'] == "testuser"
+        assert SessionToken.redeem_restore_code(code) == token
+    
+    @patch('src.auth_service.st')
+    def test_resume_from_restore_code(self, mock_st):
+        """Test wznowienia sesji z jednorazowego kodu w URL i wydania kolejnego kodu"""
+        token = SessionToken.issue("testuser", time.time() - 100)
+        code = SessionToken.issue_restore_code(token)
+        mock_st.session_state = {'authenticated': False}
+        mock_st.query_params = {'session': code}
+        
+        assert AuthService.resume_from_restore_code(code) is True
+        assert mock_st.session_state['session_token'] == token
+        assert mock_st.query_params['session'] != code
+        # Wykorzystany kod nie wznawia sesji ponownie
+        assert AuthService.resume_from_restore_code(code) is False
+        assert 'session' not in mock_st.query_params
+    
+    @patch('src.auth_service.st')
+    def test_resume_session(self, mock_st):
+        """Test wznowienia sesji z tokena bez weryfikacji hasła"""
+        login_time = time.time() - 100
+        token = SessionToken.issue("testuser", login_time)
+        mock_st.session_state = {'authenticated': False}
+        
+        with patch('src.auth_service.bcrypt') as mock_bcrypt:
+            assert AuthService.resume_session(token) is True
+            mock_bcrypt.checkpw.assert_not_called()
+        
+        assert mock_st.session_state['authenticated'] is True
+        assert mock_st.session_state['username'] == "testuser"
+        assert mock_st.session_state['login_time'] == pytest.approx(login_time, abs=1e-6)
+    
+    @patch('src.auth_service.st')
+    def test_resume_session_invalid_token(self, mock_st):
+        """Test odrzucenia nieprawidłowego tokena"""
+        mock_st.session_state = {'authenticated': False}
+        
+        assert AuthService.resume_session("invalid.token") is False
+        assert mock_st.session_state['authenticated'] is False
+    
+    @patch('src.auth_service.st')
+    def test_logout_user_revokes_session_token(self, mock_st):
+        """Test unieważnienia tokena przy wylogowaniu"""
+        token = SessionToken.issue("testuser", time.time())
+        mock_st.session_state = {
+            'authenticated': True,
+            'username': 'testuser',
+            'login_time': time.time(),
+            'session_token': token
+        }
+        code = SessionToken.issue_restore_code(token)
+        mock_st.query_params = {'session': code}
+        
+        AuthService.logout_user()
+        
+        assert SessionToken.verify(token) is None
+        assert SessionToken.redeem_restore_code(code) is None
+        assert 'session' not in mock_st.query_params
+        assert mock_st.session_state['session_token'] is None
+    
+    @patch('src.auth_service.st')
+    @patch('src.auth_service.SessionHistory.record_session')
+    def test_logout_user_records_session(self, mock_record, mock_st):
+        """Test zapisu zakończonej sesji w historii"""
+        mock_st.session_state = {
+            'authenticated': True,
+            'username': 'testuser',
+            'login_time': 1000
+        }
+        
+        with patch('src.auth_service.time.time', return_value=1600):
+            AuthService.logout_user(reason='logout')
+        
+        mock_record.assert_called_once_with('testuser', 1000, 1600, 'logout')
+    
+    @patch('src.auth_service.st')
+    @patch('src.auth_service.SessionHistory.record_session')
+    @patch.object(Config, 'get_session_timeout', return_value=3600)
+    def test_logout_timeout_ends_at_expiry(self, mock_timeout, mock_record, mock_st):
+        """Test końca sesji wygasłej w chwili logowania + SESSION_TIMEOUT, nie powrotu karty"""
+        mock_st.session_state = {
+            'authenticated': True,
+            'username': 'testuser',
+            'login_time': 1000
+        }
+        
+        with patch('src.auth_service.time.time', return_value=90000):
+            AuthService.logout_user(reason='timeout')
+        
+        mock_record.assert_called_once_with('testuser', 1000, 4600, 'timeout')
+    
+    @patch('src.auth_service.st')
+    @patch('src.auth_service.SessionHistory.record_session')
+    @patch.object(Config, 'get_session_timeout', return_value=3600)
+    def test_sweep_records_abandoned_session_once(self, mock_timeout, mock_record, mock_st):
+        """Test zapisu porzuconej sesji przez przegląd i pominięcia jej po powrocie karty"""
+        mock_st.session_state = {}
+        mock_st.query_params = {}
+        with patch('src.auth_service.time.time', return_value=1000):
+            AuthService.login_user("testuser")
+        
+        assert AuthService.sweep_expired_sessions(now=4000) == 0
+        assert AuthService.sweep_expired_sessions(now=5000) == 1
+        assert AuthService.sweep_expired_sessions(now=6000) == 0
+        mock_record.assert_called_once_with('testuser', 1000, 4600, 'timeout')
+        
+        # Karta wraca po wygaśnięciu - sesja jest już zapisana
+        AuthService.logout_user(reason='timeout')
+        mock_record.assert_called_once()
+    
+    @patch('src.auth_service.st')
+    @patch('src.auth_service.SessionHistory.record_session')
+    def test_logout_user_not_logged_in_not_recorded(self, mock_record, mock_st):
+        """Test pominięcia historii przy wylogowaniu bez aktywnej sesji"""
+        mock_st.session_state = {'authenticated': False, 'login_time': None}
+        
+        AuthService.logout_user()
+        
+        mock_record.assert_not_called()
+    
+    @patch('src.auth_service.st')
+    @patch('src.auth_service.AuthService.logout_user')
+    def test_is_authenticated_revoked_token(self, mock_logout, mock_st):
+        """Test wylogowania z powodem 'revoked' po unieważnieniu tokena"""
+        token = SessionToken.issue("testuser", time.time())
+        SessionToken.revoke(token)
+        mock_st.session_state = {
+            'authenticated': True,
+            'login_time': time.time(),
+            'session_token': token
+        }
+        
+        assert AuthService.is_authenticated() is False
+        mock_logout.assert_called_once_with(reason='revoked')
+    
+    def test_hash_password_uses_configured_rounds(self):
+        """Test hashowania ze skonfigurowanym kosztem"""
+        with patch.object(AuthService, '_bcrypt_rounds', 4):
+            assert AuthService.get_hash_cost(AuthService.hash_password("test123")) == 4
+        assert AuthService.get_hash_cost(AuthService.hash_password("test123", rounds=5)) == 5
+    
+    def test_get_hash_cost_invalid(self):
+        """Test odczytu kosztu z nieprawidłowego hasha"""
+        assert AuthService.get_hash_cost("invalid_hash") is None
+        assert AuthService.needs_rehash("invalid_hash") is False
+    
+    @patch('src.auth_service.time')
+    def test_calibrate_bcrypt_cost(self, mock_time):
+        """Test kalibracji kosztu - ekstrapolacja z pomiaru przy niskim koszcie"""
+        # Pomiar przy koszcie 8 trwa 16 ms -> koszt 12 to ok. 256 ms
+        mock_time.perf_counter.side_effect = [0, 0.016] * 3
+        
+        assert AuthService.calibrate_bcrypt_cost(250, probe_rounds=8) == 12
+    
+    @patch('src.auth_service.time')
+    def test_calibrate_bcrypt_cost_clamped(self, mock_time):
+        """Test ograniczenia kosztu do bezpiecznego zakresu"""
+        mock_time.perf_counter.side_effect = [0, 0.016] * 6
+        
+        assert AuthService.calibrate_bcrypt_cost(1, probe_rounds=8) == 10
+        assert AuthService.calibrate_bcrypt_cost(10 ** 6, probe_rounds=8) == 16
+    
+    @patch('src.auth_service.Config')
+    def test_configure_bcrypt_cost_from_config(self, mock_config):
+        """Test ustawienia kosztu z BCRYPT_ROUNDS bez kalibracji"""
+        mock_config.get_bcrypt_rounds.return_value = 11
+        
+        with patch.object(AuthService, '_bcrypt_rounds', 12), \
+                patch.object(AuthService, '_bcrypt_configured', False), \
+                patch.object(AuthService, 'calibrate_bcrypt_cost') as mock_calibrate:
+            assert AuthService.configure_bcrypt_cost() == 11
+            assert AuthService._bcrypt_rounds == 11
+            mock_config.get_bcrypt_rounds.return_value = 13
+            assert AuthService.configure_bcrypt_cost() == 11
+            mock_calibrate.assert_not_called()
+    
+    @patch('src.auth_service.Config')
+    def test_authenticate_user_from_credential_store(self, mock_config):
+        """Test uwierzytelnienia użytkownika zapisanego w bazie"""
+        mock_config.get_admin_user.return_value = "admin"
+        CredentialStore.set_password_hash("jan", AuthService.hash_password("secret1"))
+        
+        assert AuthService.authenticate_user("jan", "secret1") is True
+        assert AuthService.authenticate_user("jan", "wrong") is False
+    
+    @patch('src.auth_service.Config')
+    def test_authenticate_user_rehashes_outdated_cost(self, mock_config):
+        """Test przeliczenia hasha o nieaktualnym koszcie po udanym logowaniu"""
+        mock_config.get_admin_user.return_value = "admin"
+        CredentialStore.set_password_hash("jan", AuthService.hash_password("secret1", rounds=4))
+        
+        with patch.object(AuthService, '_bcrypt_rounds', 5), \
+                patch.object(AuthService, 'schedule_rehash', wraps=AuthService.schedule_rehash) as spy:
+            assert AuthService.authenticate_user("jan", "secret1") is True
+            spy.assert_called_once()
+            deadline = time.time() + 10
+            while AuthService._rehash_pending and time.time() < deadline:
+                time.sleep(0.01)
+        
+        new_hash = CredentialStore.get_password_hash("jan")
+        assert AuthService.get_hash_cost(new_hash) == 5
+        assert AuthService.verify_password("secret1", new_hash) is True
+    
+    @patch('src.auth_service.Config')
+    def test_admin_config_hash_not_persisted(self, mock_config):
+        """Test pominięcia przeliczenia hasha admina z konfiguracji - zmiana zmiennej nadal działa"""
+        mock_config.get_admin_user.return_value = "admin"
+        mock_config.get_admin_password_hash.return_value = AuthService.hash_password("admin123", rounds=4)
+        
+        with patch.object(AuthService, '_bcrypt_rounds', 5):
+            assert AuthService.authenticate_user("admin", "admin123") is True
+            assert AuthService.schedule_rehash(
+                "admin", "admin123", mock_config.get_admin_password_hash.return_value
+            ) is None
+        
+        assert CredentialStore.get_password_hash("admin") is None
+        mock_config.get_admin_password_hash.return_value = AuthService.hash_password("rotated", rounds=4)
+        assert AuthService.authenticate_user("admin", "rotated") is True
+    
+    @patch('src.auth_service.Config')
+    def test_authenticate_user_current_cost_not_rehashed(self, mock_config):
+        """Test braku przeliczenia hasha o aktualnym koszcie"""
+        mock_config.get_admin_user.return_value = "admin"
+        mock_config.get_admin_password_hash.return_value = AuthService.hash_password("admin123")
+        
+        with patch.object(AuthService, 'schedule_rehash') as mock_rehash:
+            assert AuthService.authenticate_user("admin", "admin123") is True
+            mock_rehash.assert_not_called()
+    
+    def test_change_password(self):
+        """Test zmiany hasła z unieważnieniem pozostałych sesji"""
+        CredentialStore.set_password_hash("jan", AuthService.hash_password("old-pass", rounds=4))
+        current = SessionToken.issue("jan", time.time())
+        other = SessionToken.issue("jan", time.time())
+        
+        success, _ = AuthService.change_password("jan", "old-pass", "new-pass", keep_token=current)
+        
+        assert success is True
+        assert AuthService.verify_password("new-pass", CredentialStore.get_password_hash("jan"))
+        assert SessionToken.verify(current) is not None
+        assert SessionToken.verify(other) is None
+    
+    def test_change_password_wrong_current(self):
+        """Test odrzucenia zmiany hasła przy błędnym aktualnym haśle"""
+        old_hash = AuthService.hash_password("old-pass", rounds=4)
+        CredentialStore.set_password_hash("jan", old_hash)
+        
+        success, message = AuthService.change_password("jan", "wrong", "new-pass")
+        
+        assert success is False
+        assert "nieprawidłowe" in message
+        assert CredentialStore.get_password_hash("jan") == old_hash
+    
+    @patch('src.auth_service.Config')
+    def test_change_password_admin_from_config(self, mock_config):
+        """Test zmiany hasła admina zdefiniowanego w konfiguracji"""
+        mock_config.get_admin_user.return_value = "admin"
+        mock_config.get_admin_password_hash.return_value = AuthService.hash_password("admin123", rounds=4)
+        
+        success, _ = AuthService.change_password("admin", "admin123", "new-pass")
+        
+        assert success is True
+        assert AuthService.authenticate_user("admin", "new-pass") is True
+        assert AuthService.authenticate_user("admin", "admin123") is False
+    
+    def test_change_password_concurrent_serialised(self):
+        """Test serializacji równoczesnych zmian hasła tego samego konta"""
+        CredentialStore.set_password_hash("jan", AuthService.hash_password("old-pass", rounds=4))
+        
+        with patch.object(AuthService, '_bcrypt_rounds', 4):
+            futures = [
+                AuthService.change_password_async("jan", "old-pass", f"new-pass-{i}")
+                for i in range(4)
+            ]
+            results = [future.result(timeout=30) for future in futures]
+        
+        # Tylko pierwsza zmiana zna aktualne hasło - pozostałe muszą zostać odrzucone
+        assert [success for success, _ in results].count(True) == 1
+    
+    @patch('src.auth_service.st')
+    def test_is_authenticated_revoked_session(self, mock_st):
+        """Test wylogowania sesji unieważnionej po zmianie hasła w innej sesji"""
+        token = SessionToken.issue("testuser", time.time() - 100)
+        mock_st.session_state = {
+            'authenticated': True,
+            'username': 'testuser',
+            'login_time': time.time() - 100,
+            'session_token': token
+        }
+        mock_st.query_params = {}
+        
+        SessionToken.revoke_user_sessions("testuser")
+        
+        assert AuthService.is_authenticated() is False
+        assert mock_st.session_state['authenticated'] is False
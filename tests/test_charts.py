@@ -0,0 +1,84 @@
+"""
+Testy dla wykresów dużych serii
+"""
+import json
+import numpy as np
+import pandas as pd
+from src.charts import (
+    line_chart, area_chart, bar_chart, heatmap_chart, figure_json, WEBGL_THRESHOLD, TEMPLATES
+)
+
+
+def sample(points):
+    return pd.DataFrame({
+        'Czas': pd.date_range('2025-07-01', periods=points, freq='min'),
+        'CPU (%)': np.arange(points, dtype=float),
+        'RAM (%)': np.ones(points)
+    })
+
+
+class TestCharts:
+    """Testy funkcji budujących wykresy"""
+
+    def test_svg_below_threshold(self):
+        """Test zwykłych śladów dla małych serii"""
+        fig = line_chart(sample(100), x='Czas', y='CPU (%)', title="CPU")
+
+        assert [trace.type for trace in fig.data] == ['scatter']
+        assert fig.layout.title.text == "CPU"
+        assert fig.layout.yaxis.title.text == 'CPU (%)'
+
+    def test_webgl_above_threshold(self):
+        """Test śladów WebGL dla dużych serii"""
+        fig = line_chart(sample(WEBGL_THRESHOLD + 1), x='Czas', y=['CPU (%)', 'RAM (%)'])
+
+        assert [trace.type for trace in fig.data] == ['scattergl', 'scattergl']
+        assert fig.layout.yaxis.title.text is None
+
+    def test_labels_and_colors(self):
+        """Test nazw serii i kolorów"""
+        fig = line_chart(sample(10), x='Czas', y=['CPU (%)', 'RAM (%)'],
+                         labels={'CPU (%)': 'CPU'}, colors=['red', 'blue'])
+
+        assert [trace.name for trace in fig.data] == ['CPU', 'RAM (%)']
+        assert [trace.line.color for trace in fig.data] == ['red', 'blue']
+
+    def test_index_as_x_and_all_columns(self):
+        """Test domyślnej osi X z indeksu i serii ze wszystkich kolumn"""
+        data = sample(10).set_index('Czas')
+        fig = line_chart(data)
+
+        assert [trace.name for trace in fig.data] == ['CPU (%)', 'RAM (%)']
+        assert fig.layout.xaxis.title.text == 'Czas'
+        assert len(fig.data[0].x) == 10
+
+    def test_area_chart(self):
+        """Test wypełnienia pod linią (także w trybie WebGL)"""
+        small = area_chart(sample(10), x='Czas', y='CPU (%)')
+        large = area_chart(sample(WEBGL_THRESHOLD + 1), x='Czas', y='CPU (%)')
+
+        assert small.data[0].fill == 'tozeroy'
+        assert (large.data[0].type, large.data[0].fill) == ('scattergl', 'tozeroy')
+
+    def test_bar_chart_uses_template(self):
+        """Test wykresu słupkowego z gotowym szablonem"""
+        fig = bar_chart(sample(10), x='Czas', y=['CPU (%)', 'RAM (%)'], title="Zasoby")
+
+        assert [trace.type for trace in fig.data] == ['bar', 'bar']
+        assert fig.layout.template.layout.barmode == TEMPLATES['bar'].layout.barmode == 'relative'
+
+    def test_figure_json(self):
+        """Test serializacji z datami"""
+        spec = json.loads(figure_json(line_chart(sample(3), x='Czas', y='CPU (%)')))
+
+        assert spec['data'][0]['type'] == 'scatter'
+        assert spec['data'][0]['x'][1].startswith('2025-07-01T00:01:00')
+
+    def test_heatmap_chart(self):
+        """Test mapy cieplnej z etykietami wierszy i kolumn"""
+        fig = heatmap_chart(np.arange(6).reshape(2, 3), x=['a', 'b', 'c'], y=['Pon', 'Wt'], value_label="Logowania")
+
+        assert fig.data[0].type == 'heatmap'
+        assert list(fig.data[0].y) == ['Pon', 'Wt']
+        assert fig.layout.yaxis.autorange == 'reversed'
+        assert 'Logowania' in fig.data[0].hovertemplate
@@ -0,0 +1,137 @@
+"""
+Testy dla kohort tygodniowych i statystyk użytkowników
+"""
+import os
+import math
+from datetime import date, datetime
+import pytest
+from unittest.mock import patch
+from src.cohorts import CohortStore, COHORTS_DIRNAME, week_of, week_start
+from src.session_history import SessionHistory
+
+# Poniedziałki kolejnych tygodni
+WEEK1, WEEK2, WEEK3 = date(2025, 7, 14), date(2025, 7, 21), date(2025, 7, 28)
+TODAY = date(2025, 8, 6)
+
+
+def record(username, day, hour=12, minutes=10):
+    start = datetime(day.year, day.month, day.day, hour).timestamp()
+    SessionHistory.record_session(username, start, start + minutes * 60, "logout")
+
+
+@pytest.fixture
+def sessions():
+    """Kohorta 1: jan, ola; kohorta 2: ewa; jan wraca w tygodniu 3, sesja w bieżącym tygodniu"""
+    record("jan", WEEK1, minutes=10)
+    record("jan", WEEK1.replace(day=16), minutes=30)
+    record("ola", WEEK1.replace(day=18))
+    record("ewa", WEEK2.replace(day=22), minutes=60)
+    record("ola", WEEK2.replace(day=23))
+    record("jan", WEEK3.replace(day=30), minutes=20)
+    record("jan", TODAY)
+    SessionHistory.flush()
+
+
+class TestWeeks:
+    """Testy numeracji tygodni"""
+
+    def test_week_of(self):
+        """Test tygodni od poniedziałku do niedzieli"""
+        assert week_of(WEEK1) == week_of(date(2025, 7, 20))
+        assert week_of(WEEK2) == week_of(WEEK1) + 1
+        assert week_start(week_of(date(2025, 7, 24))) == WEEK2
+
+
+class TestCohortStore:
+    """Testy klasy CohortStore"""
+
+    def test_no_history(self):
+        """Test braku wyników przed pierwszą materializacją"""
+        assert CohortStore.refresh(TODAY) == 0
+        assert CohortStore.load() is None
+        assert CohortStore.version() == 0
+        assert CohortStore.retention_matrix().empty
+
+    def test_current_week_excluded(self, sessions):
+        """Test pomijania bieżącego tygodnia"""
+        assert sorted(CohortStore.closed_weeks(TODAY)) == [week_of(WEEK1), week_of(WEEK2), week_of(WEEK3)]
+
+    def test_refresh_incremental(self, sessions):
+        """Test przetwarzania zamkniętych tygodni tylko raz"""
+        assert CohortStore.refresh(WEEK3) == 2
+        assert CohortStore.refresh(WEEK3) == 0
+        assert CohortStore.refresh(TODAY) == 1
+        assert os.path.isdir(os.path.join(os.environ['SESSION_HISTORY_DIR'], COHORTS_DIRNAME))
+
+    def test_user_stats(self, sessions):
+        """Test statystyk sesji użytkowników (bez bieżącego tygodnia)"""
+        CohortStore.refresh(TODAY)
+        users = CohortStore.load()[0].set_index('username')
+
+        assert users.loc['jan', 'sessions'] == 3
+        assert users.loc['jan', 'total_duration_s'] == 3600
+        assert users.loc['jan', 'max_duration_s'] == 1800
+        assert users.loc['jan', 'first_week'] == week_of(WEEK1)
+        assert users.loc['ewa', 'first_week'] == week_of(WEEK2)
+        assert users.loc['jan', 'last_login'].date() == date(2025, 7, 30)
+
+    def test_retention_matrix(self, sessions):
+        """Test odsetka aktywnych w kolejnych tygodniach i pustych przyszłych tygodni"""
+        CohortStore.refresh(TODAY)
+        matrix = CohortStore.retention_matrix(weeks=3)
+
+        assert list(matrix.index) == [WEEK1.isoformat(), WEEK2.isoformat()]
+        assert list(matrix['Użytkownicy']) == [2, 1]
+        assert matrix.loc[WEEK1.isoformat(), 'Tydzień 1'] == 50.0
+        assert matrix.loc[WEEK1.isoformat(), 'Tydzień 2'] == 50.0
+        assert math.isnan(matrix.loc[WEEK1.isoformat(), 'Tydzień 3'])
+        assert matrix.loc[WEEK2.isoformat(), 'Tydzień 1'] == 0.0
+        assert math.isnan(matrix.loc[WEEK2.isoformat(), 'Tydzień 2'])
+
+    def test_changed_week_regrouped_alone(self, sessions):
+        """Test ponownego zgrupowania tylko tygodnia z nowym plikiem"""
+        CohortStore.refresh(TODAY)
+        record("ewa", WEEK1)
+        SessionHistory.flush()
+
+        with patch.object(CohortStore, '_aggregate_week', wraps=CohortStore._aggregate_week) as aggregate:
+            assert CohortStore.refresh(TODAY) == 1
+        assert [call.args[0] for call in aggregate.call_args_list] == [week_of(WEEK1)]
+        matrix = CohortStore.retention_matrix()
+        assert list(matrix.index) == [WEEK1.isoformat()]
+        assert list(matrix['Użytkownicy']) == [3]
+        users = CohortStore.load()[0].set_index('username')
+        assert users.loc['ewa', 'sessions'] == 2
+        assert users.loc['ewa', 'first_week'] == week_of(WEEK1)
+
+    def test_removed_week_dropped(self, sessions):
+        """Test usunięcia sum tygodnia, którego pliki zniknęły z historii"""
+        CohortStore.refresh(TODAY)
+        for path in CohortStore.closed_weeks(TODAY)[week_of(WEEK1)]:
+            os.remove(path)
+
+        assert CohortStore.refresh(TODAY) == 0
+        users = CohortStore.load()[0].set_index('username')
+        assert users.loc['jan', 'sessions'] == 1
+        assert list(CohortStore.retention_matrix()['Użytkownicy']) == [2, 1]
+
+    def test_fetch_users_page(self, sessions):
+        """Test stron tabeli od najaktywniejszych użytkowników"""
+        CohortStore.refresh(TODAY)
+
+        page, cursor = CohortStore.fetch_users_page(None, 2)
+        assert page.column('Użytkownik').to_pylist() == ['jan', 'ola']
+        assert page.column('Średni czas sesji (min)').to_pylist() == [20.0, 10.0]
+        assert cursor == 2
+        page, cursor = CohortStore.fetch_users_page(cursor, 2)
+        assert page.column('Użytkownik').to_pylist() == ['ewa']
+        assert cursor is None
+
+    def test_load_cached(self, sessions):
+        """Test ponownego odczytu wyników tylko po zmianie pliku stanu"""
+        CohortStore.refresh(WEEK3)
+        first = CohortStore.load()
+        assert CohortStore.load()[0] is first[0]
+
+        CohortStore.refresh(TODAY)
+        assert CohortStore.load()[0] is not first[0]
@@ -3,7 +3,7 @@ Testy dla modułu konfiguracji
 """
 import pytest
 import os
-from unittest.mock import patch, mock_open
+from unittest.mock import patch, mock_open, MagicMock
 from src.config import Config
 
 
@@ -109,6 +109,7 @@ class TestConfig:
     def test_setup_logging(self, mock_get_logger, mock_basic_config):
         """Test konfiguracji systemu logowania"""
         mock_logger = mock_get_logger.return_value
+        mock_logger.handlers = []
         
         logger = Config.setup_logging()
         
@@ -123,3 +124,15 @@ class TestConfig:
         
         # Sprawdź czy zwrócono logger
         assert logger == mock_logger
+    
+    @patch('logging.FileHandler')
+    @patch('logging.basicConfig')
+    @patch('logging.getLogger')
+    def test_setup_logging_configured_once(self, mock_get_logger, mock_basic_config, mock_file_handler):
+        """Test pominięcia konfiguracji przy kolejnym przebiegu skryptu - bez nowych handlerów"""
+        mock_get_logger.return_value.handlers = [MagicMock()]
+        
+        assert Config.setup_logging() == mock_get_logger.return_value
+        
+        mock_basic_config.assert_not_called()
+        mock_file_handler.assert_not_called()
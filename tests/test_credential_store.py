@@ -0,0 +1,45 @@
+"""
+Testy dla magazynu poświadczeń
+"""
+from src.credential_store import CredentialStore
+
+
+class TestCredentialStore:
+    """Testy klasy CredentialStore"""
+
+    def test_get_password_hash_without_database(self, isolated_database):
+        """Test odczytu gdy baza nie istnieje - bez tworzenia pliku"""
+        assert CredentialStore.get_password_hash("admin") is None
+        assert not isolated_database.exists()
+
+    def test_set_and_get_password_hash(self):
+        """Test zapisu i odczytu hasha"""
+        assert CredentialStore.set_password_hash("admin", "hash1") is True
+        assert CredentialStore.get_password_hash("admin") == "hash1"
+        assert CredentialStore.get_password_hash("other") is None
+
+    def test_set_password_hash_overwrites(self):
+        """Test nadpisania hasha bez warunku"""
+        CredentialStore.set_password_hash("admin", "hash1")
+        CredentialStore.set_password_hash("admin", "hash2")
+
+        assert CredentialStore.get_password_hash("admin") == "hash2"
+
+    def test_set_password_hash_expected_match(self):
+        """Test zapisu warunkowego - hash zgodny z oczekiwanym"""
+        CredentialStore.set_password_hash("admin", "hash1")
+
+        assert CredentialStore.set_password_hash("admin", "hash2", expected_hash="hash1") is True
+        assert CredentialStore.get_password_hash("admin") == "hash2"
+
+    def test_set_password_hash_expected_mismatch(self):
+        """Test zapisu warunkowego - hash zmieniony w międzyczasie"""
+        CredentialStore.set_password_hash("admin", "hash1")
+
+        assert CredentialStore.set_password_hash("admin", "hash3", expected_hash="stale") is False
+        assert CredentialStore.get_password_hash("admin") == "hash1"
+
+    def test_set_password_hash_expected_without_row(self):
+        """Test zapisu warunkowego gdy użytkownik nie ma jeszcze wpisu"""
+        assert CredentialStore.set_password_hash("admin", "hash1", expected_hash="env") is True
+        assert CredentialStore.get_password_hash("admin") == "hash1"
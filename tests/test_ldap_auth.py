@@ -0,0 +1,217 @@
+"""
+Testy dla uwierzytelniania w katalogu LDAP (serwer ldap3 w trybie MOCK_SYNC)
+"""
+import pytest
+import threading
+from unittest.mock import patch
+
+ldap3 = pytest.importorskip('ldap3')
+
+from src.auth_service import AuthService
+from src.ldap_auth import LdapDirectory, LdapUnavailable, TtlCache
+
+BASE_DN = 'dc=example,dc=com'
+SERVICE_DN = 'cn=svc,dc=example,dc=com'
+JAN_DN = 'uid=jan,ou=people,dc=example,dc=com'
+
+
+@pytest.fixture
+def server():
+    """Katalog w pamięci: konto serwisowe, dwóch użytkowników i grupa"""
+    server = ldap3.Server('ldap-test', get_info=ldap3.NONE)
+    setup = ldap3.Connection(server, client_strategy=ldap3.MOCK_SYNC)
+    setup.strategy.add_entry(SERVICE_DN, {'objectClass': 'person', 'userPassword': 'svc-haslo'})
+    setup.strategy.add_entry(JAN_DN, {'objectClass': 'inetOrgPerson', 'uid': 'jan', 'userPassword': 'tajne'})
+    setup.strategy.add_entry(
+        'uid=ewa,ou=people,dc=example,dc=com',
+        {'objectClass': 'inetOrgPerson', 'uid': 'ewa', 'userPassword': 'haslo-ewy'}
+    )
+    setup.strategy.add_entry(
+        'cn=analitycy,ou=groups,dc=example,dc=com',
+        {'objectClass': 'groupOfNames', 'cn': 'analitycy', 'member': [JAN_DN]}
+    )
+    return server
+
+
+@pytest.fixture
+def directory(server):
+    directory = LdapDirectory(
+        server, BASE_DN, bind_dn=SERVICE_DN, bind_password='svc-haslo',
+        pool_size=2, timeout=0.5, client_strategy=ldap3.MOCK_SYNC
+    )
+    yield directory
+    directory.close()
+
+
+def count_searches(directory):
+    """Licznik wyszukiwań wykonanych na połączeniach z puli"""
+    calls = []
+    original = directory._search
+
+    def search(pooled, search_filter, attributes):
+        calls.append(search_filter)
+        return original(pooled, search_filter, attributes)
+
+    directory._search = search
+    return calls
+
+
+class TestLdapDirectory:
+    """Testy klasy LdapDirectory"""
+
+    def test_authenticate(self, directory):
+        """Test logowania poprawnym i błędnym hasłem oraz nieznanego użytkownika"""
+        assert directory.authenticate('jan', 'tajne') is True
+        assert directory.authenticate('jan', 'zle') is False
+        assert directory.authenticate('nikt', 'tajne') is None
+
+    def test_empty_password_rejected(self, directory):
+        """Test odrzucenia pustego hasła (bind nieuwierzytelniony)"""
+        assert directory.authenticate('jan', '') is False
+
+    def test_pool_reuses_connections(self, directory):
+        """Test ponownego użycia połączeń - bez nowego połączenia na logowanie"""
+        for _ in range(5):
+            assert directory.authenticate('jan', 'tajne') is True
+            assert directory.authenticate('ewa', 'haslo-ewy') is True
+
+        assert directory.pool.opened == 1
+        assert directory.pool.idle() == 1
+
+    def test_service_identity_restored(self, directory):
+        """Test wyszukiwania kontem serwisowym po bindzie użytkownika na tym samym połączeniu"""
+        directory.authenticate('jan', 'tajne')
+        assert directory.find_user_dn('ewa') == 'uid=ewa,ou=people,dc=example,dc=com'
+
+        with directory.pool.connection() as pooled:
+            assert pooled.identity == SERVICE_DN
+
+    def test_dn_cache(self, directory):
+        """Test zapamiętania DN - kolejne logowania bez wyszukiwania"""
+        searches = count_searches(directory)
+        for _ in range(3):
+            directory.authenticate('jan', 'tajne')
+
+        assert len(searches) == 1
+        directory.invalidate('jan')
+        directory.authenticate('jan', 'tajne')
+        assert len(searches) == 2
+
+    def test_negative_cache(self, directory):
+        """Test zapamiętania nieznanego użytkownika"""
+        searches = count_searches(directory)
+        for _ in range(3):
+            assert directory.authenticate('nikt', 'x') is None
+
+        assert len(searches) == 1
+        assert directory.authenticate('jan', 'zle') is False
+        # Błędne hasło nie oznacza nieznanego użytkownika
+        assert directory.unknown_users.get('jan') is None
+
+    def test_groups_cached(self, directory):
+        """Test grup użytkownika i ich zapamiętania"""
+        searches = count_searches(directory)
+
+        assert directory.groups('jan') == {'analitycy'}
+        assert directory.groups('jan') == {'analitycy'}
+        assert directory.groups('ewa') == frozenset()
+        assert directory.groups('nikt') == frozenset()
+        assert len(searches) == 5
+
+    def test_required_group(self, server):
+        """Test logowania tylko członków wymaganej grupy"""
+        directory = LdapDirectory(
+            server, BASE_DN, bind_dn=SERVICE_DN, bind_password='svc-haslo',
+            required_group='analitycy', client_strategy=ldap3.MOCK_SYNC
+        )
+        assert directory.authenticate('jan', 'tajne') is True
+        assert directory.authenticate('ewa', 'haslo-ewy') is False
+
+    def test_filter_escaping(self, directory):
+        """Test escapowania nazwy użytkownika w filtrze"""
+        assert directory.authenticate('*', 'tajne') is None
+        assert directory.authenticate('jan)(uid=*', 'tajne') is None
+
+    def test_pool_bounded(self, directory):
+        """Test ograniczenia liczby wypożyczonych połączeń"""
+        with directory.pool.connection(), directory.pool.connection():
+            with pytest.raises(LdapUnavailable):
+                with directory.pool.connection():
+                    pass
+
+    def test_concurrent_logins(self, directory):
+        """Test równoległych logowań przy puli mniejszej niż liczba wątków"""
+        results = []
+
+        def login():
+            results.append(directory.authenticate('jan', 'tajne'))
+
+        threads = [threading.Thread(target=login) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == [True] * 8
+        assert directory.pool.opened <= 2
+
+    def test_dead_connection_replaced(self, directory):
+        """Test zastąpienia martwego połączenia po czasie bezczynności"""
+        directory.authenticate('jan', 'tajne')
+        directory.pool.keepalive = 0
+        with directory.pool.connection() as pooled:
+            dead = pooled
+        dead.conn.unbind()
+
+        with directory.pool.connection() as pooled:
+            assert pooled is not dead
+        assert directory.pool.opened == 2
+
+    def test_service_bind_failure(self, server):
+        """Test błędu konta serwisowego jako niedostępności katalogu"""
+        directory = LdapDirectory(
+            server, BASE_DN, bind_dn=SERVICE_DN, bind_password='zle', client_strategy=ldap3.MOCK_SYNC
+        )
+        with pytest.raises(LdapUnavailable):
+            directory.authenticate('jan', 'tajne')
+
+
+class TestTtlCache:
+    """Testy klasy TtlCache"""
+
+    def test_expiry_and_size(self):
+        """Test wygasania wpisów i limitu rozmiaru"""
+        now = [0.0]
+        cache = TtlCache(10, maxsize=2, clock=lambda: now[0])
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.set('c', 3)
+
+        assert cache.get('a') is None
+        assert cache.get('b') == 2
+        now[0] = 11
+        assert cache.get('c') is None
+        assert len(cache) == 1
+
+
+class TestAuthServiceLdap:
+    """Testy logowania przez AuthService z katalogiem LDAP"""
+
+    def test_ldap_fallback(self, directory, monkeypatch):
+        """Test logowania użytkownika katalogu po kontach lokalnych"""
+        monkeypatch.setenv('ADMIN_USER', 'admin')
+        with patch.object(AuthService, 'get_directory', return_value=directory):
+            assert AuthService.authenticate_user('jan', 'tajne') is True
+            assert AuthService.authenticate_user('jan', 'zle') is False
+            assert AuthService.authenticate_user('nikt', 'tajne') is False
+
+    def test_directory_unavailable(self, directory):
+        """Test odrzucenia logowania przy niedostępnym katalogu"""
+        with patch.object(AuthService, 'get_directory', return_value=directory), \
+                patch.object(directory, 'authenticate', side_effect=LdapUnavailable('brak')):
+            assert AuthService.authenticate_user('jan', 'tajne') is False
+
+    def test_not_configured(self, monkeypatch):
+        """Test braku katalogu bez LDAP_URL"""
+        monkeypatch.delenv('LDAP_URL', raising=False)
+        assert LdapDirectory.from_config() is None
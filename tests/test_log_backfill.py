@@ -0,0 +1,169 @@
+"""
+Testy dla importu historycznych logów
+"""
+import os
+import sqlite3
+import pytest
+from datetime import date
+from itertools import chain
+from unittest.mock import patch
+from src.log_store import LogStore, parse_lines
+from src import log_backfill
+from src.log_backfill import backfill, split_ranges, parse_chunk, join_chunks, main
+from src.synthetic import generate_log_lines, write_log_lines
+
+
+def log_line(second, level="INFO", message="wiadomość"):
+    return f"2025-07-23 14:35:{second:02d},123 - src.auth_service - {level} - {message}\n"
+
+
+@pytest.fixture
+def archive(tmp_path):
+    """Archiwum logów z wpisami wielolinijkowymi i wpisami spoza kolejności"""
+    path = tmp_path / "app.log.1"
+    write_log_lines(generate_log_lines(3000, date(2025, 7, 7), 2, users=20, seed=5), str(path))
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(log_line(10, "ERROR", "Błąd") + "Traceback:\n\n  line 1\n")
+        f.write(log_line(5) + log_line(1, "WARNING"))
+    return path
+
+
+class TestChunkParsing:
+    """Testy parsowania zakresów pliku"""
+
+    def test_ranges_aligned_to_lines(self, archive):
+        """Test podziału na przylegające zakresy zaczynające się od początku linii"""
+        size = archive.stat().st_size
+        ranges = split_ranges(str(archive), 0, size, chunk_bytes=10000)
+        data = archive.read_bytes()
+
+        assert len(ranges) > 10
+        assert ranges[0][1] == 0 and ranges[-1][2] == size
+        assert all(a[2] == b[1] for a, b in zip(ranges, ranges[1:]))
+        assert all(data[start - 1:start] == b"\n" for _, start, _ in ranges[1:])
+
+    def test_same_result_as_parse_lines(self, archive):
+        """Test zgodności z parse_lines niezależnie od podziału na zakresy"""
+        with open(archive, encoding="utf-8") as f:
+            expected = sorted(parse_lines(f), key=lambda record: record[0])
+
+        for chunk_bytes in [200, 10000, 10 ** 9]:
+            ranges = split_ranges(str(archive), 0, archive.stat().st_size, chunk_bytes)
+            chunks = list(join_chunks(parse_chunk(r) for r in ranges))
+            assert len(chunks) == len(ranges)
+            assert sorted(chain.from_iterable(chunks), key=lambda record: record[0]) == expected
+
+    def test_continuation_across_ranges(self, tmp_path):
+        """Test doklejenia kontynuacji z początku zakresu do wpisu z poprzedniego"""
+        path = tmp_path / "app.log"
+        first = log_line(1, "ERROR", "Błąd")
+        path.write_text(first + "Traceback:\n  line 1\n" + log_line(2), encoding="utf-8")
+        first_line = len(first.encode())
+        ranges = [(str(path), 0, first_line), (str(path), first_line, path.stat().st_size)]
+
+        records = list(chain.from_iterable(join_chunks(parse_chunk(r) for r in ranges)))
+
+        assert [record[3] for record in records] == ["Błąd\nTraceback:\n  line 1", "wiadomość"]
+
+
+class TestBackfill:
+    """Testy importu do magazynu logów"""
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_backfill_into_log_store(self, archive, workers):
+        """Test importu (bez puli i w puli procesów) z indeksem pełnotekstowym"""
+        result = backfill([str(archive)], workers=workers, chunk_bytes=20000)
+        page, _ = LogStore.fetch_page(None, 5000, descending=False)
+
+        assert result.records == 3003
+        assert result.bytes == archive.stat().st_size
+        assert page.num_rows == 3003
+        assert page.column("Czas").is_valid().to_pylist() == [True] * 3003
+        times = page.column("Czas").to_pylist()
+        assert times == sorted(times)
+        assert LogStore.search("Traceback").num_rows == 1
+        assert LogStore.search("zalogowany").num_rows > 0
+
+    def test_backfill_resumes_and_sync_continues(self, tmp_path):
+        """Test braku duplikatów przy ponownym imporcie i synchronizacji pliku"""
+        path = tmp_path / "app.log"
+        path.write_text(log_line(1) + log_line(2) + log_line(3)[:30], encoding="utf-8")
+
+        assert backfill([str(path)], workers=1).records == 2
+        assert backfill([str(path)], workers=1).records == 0
+        assert LogStore.sync(str(path)) == 0
+
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(log_line(3)[30:] + log_line(4))
+        assert LogStore.sync(str(path)) == 2
+        assert LogStore.version() == 4
+
+    def test_rotated_file_not_duplicated(self, tmp_path):
+        """Test braku duplikatów po rotacji - pozycja przypisana do pliku, nie ścieżki"""
+        path = tmp_path / "app.log"
+        path.write_text("".join(log_line(i) for i in range(5)), encoding="utf-8")
+        assert LogStore.sync(str(path)) == 5
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(log_line(5) + log_line(6))
+        os.rename(path, tmp_path / "app.log.1")
+
+        assert backfill([str(tmp_path / "app.log.1")], workers=1).records == 2
+        assert LogStore.version() == 7
+
+    def test_range_synced_meanwhile_skipped(self, tmp_path):
+        """Test pominięcia zakresów wczytanych przez sync w trakcie importu"""
+        path = tmp_path / "app.log"
+        path.write_text("".join(log_line(i % 60, message=f"wpis {i}") for i in range(500)), encoding="utf-8")
+        original = log_backfill.parse_chunk
+
+        def parse_and_sync(byte_range):
+            LogStore.sync(str(path))
+            return original(byte_range)
+
+        with patch.object(log_backfill, 'parse_chunk', side_effect=parse_and_sync):
+            result = backfill([str(path)], workers=1, chunk_bytes=5000)
+
+        assert result.records == 0
+        assert LogStore.version() == 500
+
+    def test_migrates_path_offsets(self, tmp_path):
+        """Test przeniesienia pozycji zapisanych wg ścieżki (schemat w wersji 2)"""
+        path = tmp_path / "app.log"
+        path.write_text(log_line(1) + log_line(2), encoding="utf-8")
+        conn = sqlite3.connect(os.environ['LOG_DB_FILE'])
+        conn.execute('CREATE TABLE log_ingest_state (path TEXT PRIMARY KEY, inode INTEGER, offset INTEGER)')
+        conn.execute('INSERT INTO log_ingest_state VALUES (?, ?, ?)',
+                     (str(path), path.stat().st_ino, path.stat().st_size))
+        conn.execute('PRAGMA user_version = 2')
+        conn.commit()
+        conn.close()
+
+        assert LogStore.sync(str(path)) == 0
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(log_line(3))
+        assert LogStore.sync(str(path)) == 1
+
+    def test_sync_indexes_after_backfill(self, tmp_path):
+        """Test przywrócenia indeksowania pełnotekstowego po imporcie"""
+        archived, current = tmp_path / "app.log.1", tmp_path / "app.log"
+        archived.write_text(log_line(1, message="archiwum"), encoding="utf-8")
+        current.write_text(log_line(2, message="bieżący"), encoding="utf-8")
+
+        backfill([str(archived)], workers=1)
+        LogStore.sync(str(current))
+
+        assert LogStore.search("archiwum").num_rows == 1
+        assert LogStore.search("bieżący").num_rows == 1
+
+    def test_main(self, archive, capsys):
+        """Test uruchomienia z linii poleceń"""
+        assert main([str(archive), "--workers", "1"]) == 0
+        output = capsys.readouterr().out
+
+        assert "wpisy: 3,003" in output
+        assert "MB/s" in output
+
+    def test_main_missing_file(self, tmp_path):
+        """Test błędu dla nieistniejącego pliku"""
+        with pytest.raises(SystemExit):
+            main([str(tmp_path / "missing.log")])
@@ -0,0 +1,172 @@
+"""
+Testy dla kolektora logów wielu procesów
+"""
+import logging
+import multiprocessing
+import os
+import socket
+import time
+import pytest
+from src.log_collector import LogCollector, CollectorHandler, frame
+from src.log_store import parse_line
+
+FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason="wymaga gniazd Unix")
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / 'c.sock'), str(tmp_path / 'app.log')
+
+
+@pytest.fixture
+def collector(paths):
+    collector = LogCollector(*paths, flush_interval=0.01, order_window=0.05)
+    collector.start()
+    yield collector
+    collector.stop()
+
+
+def make_logger(name, handler):
+    handler.setFormatter(logging.Formatter(FORMAT))
+    test_logger = logging.getLogger(name)
+    test_logger.propagate = False
+    test_logger.handlers = [handler]
+    test_logger.setLevel(logging.INFO)
+    return test_logger
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "przekroczono czas oczekiwania"
+        time.sleep(0.01)
+
+
+def write_records(socket_path, log_file, name, count):
+    handler = CollectorHandler(socket_path, log_file)
+    writer = make_logger(name, handler)
+    for i in range(count):
+        writer.info(f"wpis {i}")
+    handler.close()
+
+
+def read_lines(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read().splitlines()
+
+
+class TestLogCollector:
+    """Testy klas LogCollector i CollectorHandler"""
+
+    def test_same_format(self, collector, paths):
+        """Test zapisu w formacie czytanym przez magazyn logów"""
+        handler = CollectorHandler(paths[0], paths[1])
+        make_logger('app.test', handler).warning("uwaga - test")
+        handler.close()
+        wait_for(lambda: collector.stats())
+        collector.flush(force=True)
+
+        record = parse_line(read_lines(paths[1])[0])
+        assert record[1:] == ('WARNING', 'app.test', 'uwaga - test')
+
+    def test_connects_on_first_record(self, paths):
+        """Test połączenia z kolektorem dopiero przy pierwszym wpisie"""
+        handler = CollectorHandler(*paths)
+        assert handler._sock is None
+
+        collector = LogCollector(*paths, flush_interval=0.01, order_window=0.05)
+        collector.start()
+        try:
+            make_logger('app.lazy', handler).info("pierwszy wpis")
+            assert handler._sock is not None
+            handler.close()
+            wait_for(lambda: collector.stats())
+        finally:
+            collector.stop()
+        assert parse_line(read_lines(paths[1])[0])[1:] == ('INFO', 'app.lazy', 'pierwszy wpis')
+
+    def test_multiple_processes(self, collector, paths):
+        """Test wpisów z kilku procesów - kompletne linie i numeracja w procesie"""
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=write_records, args=(*paths, f'proc{n}', 200)) for n in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        wait_for(lambda: sum(s['records'] for s in collector.stats().values()) == 800)
+        collector.flush(force=True)
+
+        lines = read_lines(paths[1])
+        assert len(lines) == 800
+        assert all(parse_line(line) for line in lines)
+        stats = collector.stats()
+        assert sorted(stats) == sorted(process.pid for process in processes)
+        assert all(s == {'records': 200, 'last_seq': 200, 'gaps': 0} for s in stats.values())
+        for n in range(4):
+            messages = [line.rsplit(' - ', 1)[1] for line in lines if f' - proc{n} - ' in line]
+            assert messages == [f"wpis {i}" for i in range(200)]
+
+    def test_ordered_by_time(self, collector, paths):
+        """Test zapisu porcji w kolejności czasu wpisów"""
+        now = time.time()
+        collector.add(1, 1, now + 0.002, 'c')
+        collector.add(2, 1, now, 'a')
+        collector.add(1, 2, now + 0.003, 'd')
+        collector.add(2, 2, now + 0.001, 'b')
+        collector.flush(force=True)
+
+        assert read_lines(paths[1]) == ['a', 'b', 'c', 'd']
+
+    def test_order_window(self, paths):
+        """Test wstrzymania świeżych wpisów do następnej porcji"""
+        collector = LogCollector(*paths, order_window=60)
+        collector.add(1, 1, time.time() - 120, 'stary')
+        collector.add(1, 2, time.time(), 'nowy')
+        collector._file = open(paths[1], 'ab')
+
+        assert collector.flush() == 1
+        assert collector.pending() == 1
+        collector.stop()
+        assert read_lines(paths[1]) == ['stary', 'nowy']
+
+    def test_sequence_gaps(self, collector, paths):
+        """Test wykrywania luk w numeracji i ponownie użytego pid"""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(paths[0])
+            for seq in (1, 2, 5, 6):
+                sock.sendall(frame(42, seq, time.time(), f"wpis {seq}"))
+        wait_for(lambda: collector.stats().get(42, {}).get('records') == 4)
+        assert collector.stats()[42] == {'records': 4, 'last_seq': 6, 'gaps': 2}
+
+        collector.add(42, 1, time.time(), 'nowy proces')
+        assert collector.stats()[42] == {'records': 1, 'last_seq': 1, 'gaps': 0}
+
+    def test_fallback_without_collector(self, paths):
+        """Test bezpośredniego zapisu do pliku, gdy kolektor nie działa"""
+        handler = CollectorHandler(*paths)
+        make_logger('app.fallback', handler).error("bez kolektora")
+        handler.close()
+
+        record = parse_line(read_lines(paths[1])[0])
+        assert record[1:] == ('ERROR', 'app.fallback', 'bez kolektora')
+
+    def test_stale_socket_and_running_collector(self, collector, paths):
+        """Test odmowy drugiego kolektora i usunięcia gniazda po zakończonym"""
+        with pytest.raises(RuntimeError):
+            LogCollector(*paths).start()
+
+        collector.stop()
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(paths[0])
+        stale.close()
+        assert os.path.exists(paths[0])
+
+        collector.start()
+        handler = CollectorHandler(*paths)
+        make_logger('app.restart', handler).info("po restarcie")
+        handler.close()
+        wait_for(lambda: collector.stats())
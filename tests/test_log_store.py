@@ -0,0 +1,204 @@
+"""
+Testy dla magazynu logów
+"""
+import pytest
+import os
+import multiprocessing
+from unittest.mock import patch
+from datetime import datetime
+from src.log_store import LogStore, parse_line, parse_lines, build_match_query
+
+
+def log_line(second, level="INFO", module="src.auth_service", message="wiadomość"):
+    return f"2025-07-23 14:35:{second:02d},123 - {module} - {level} - {message}\n"
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = tmp_path / "app.log"
+    levels = ["INFO", "WARNING", "ERROR"]
+    path.write_text(
+        "".join(log_line(i, levels[i % 3], message=f"wpis {i}") for i in range(30)),
+        encoding="utf-8"
+    )
+    return path
+
+
+class TestParsing:
+    """Testy parsowania linii logów"""
+
+    def test_parse_line(self):
+        """Test parsowania linii w formacie Config.setup_logging"""
+        ts, level, module, message = parse_line(log_line(5, "WARNING", message="a - b").rstrip())
+
+        assert ts == datetime(2025, 7, 23, 14, 35, 5).timestamp() + 0.123
+        assert (level, module, message) == ("WARNING", "src.auth_service", "a - b")
+
+    def test_parse_line_invalid(self):
+        """Test linii niebędącej początkiem wpisu"""
+        assert parse_line("Traceback (most recent call last):") is None
+
+    def test_parse_lines_continuation(self):
+        """Test doklejania linii kontynuacji (traceback) do poprzedniego wpisu"""
+        lines = [log_line(1, "ERROR", message="Błąd"), "Traceback:\n", "  line 1\n", log_line(2)]
+        records = parse_lines(lines)
+
+        assert len(records) == 2
+        assert records[0][3] == "Błąd\nTraceback:\n  line 1"
+
+
+class TestLogStore:
+    """Testy klasy LogStore"""
+
+    def test_sync_incremental(self, log_file):
+        """Test przyrostowego wczytywania pliku logów"""
+        assert LogStore.sync(str(log_file)) == 30
+        assert LogStore.sync(str(log_file)) == 0
+
+        with open(log_file, "a", encoding="utf-8") as f:
+            f.write(log_line(40))
+            f.write("2025-07-23 14:35:41,000 - niedokończona")
+
+        assert LogStore.sync(str(log_file)) == 1
+        assert LogStore.version() == 31
+
+    def test_sync_after_truncation(self, log_file):
+        """Test wczytania od początku po obcięciu pliku (rotacja)"""
+        LogStore.sync(str(log_file))
+        log_file.write_text(log_line(50), encoding="utf-8")
+
+        assert LogStore.sync(str(log_file)) == 1
+
+    def test_sync_min_interval(self, log_file):
+        """Test pominięcia synchronizacji przed upływem interwału"""
+        LogStore.sync(str(log_file))
+        with open(log_file, "a", encoding="utf-8") as f:
+            f.write(log_line(40))
+
+        assert LogStore.sync(str(log_file), min_interval=60) == 0
+
+    def test_sync_concurrent_processes(self, tmp_path):
+        """Test równoległej synchronizacji z kilku procesów - każdy wpis raz"""
+        path = tmp_path / "app.log"
+        path.write_text("".join(log_line(i % 60, message=f"wpis {i}") for i in range(20000)), encoding="utf-8")
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=LogStore._sync_file, args=(str(path),)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        assert LogStore.version() == 20000
+        assert LogStore.sync(str(path)) == 0
+
+    def test_sync_missing_file(self, tmp_path):
+        """Test synchronizacji nieistniejącego pliku"""
+        assert LogStore.sync(str(tmp_path / "missing.log")) == 0
+
+    def test_fetch_page_keyset(self, log_file):
+        """Test stronicowania po kluczu - strony nie nachodzą na siebie"""
+        LogStore.sync(str(log_file))
+
+        seen = []
+        cursor = None
+        while True:
+            table, cursor = LogStore.fetch_page(cursor, 7)
+            seen.extend(table.column("Wiadomość").to_pylist())
+            if cursor is None:
+                break
+
+        assert seen == [f"wpis {i}" for i in reversed(range(30))]
+
+    def test_fetch_page_filters(self, log_file):
+        """Test filtrowania po poziomie i czasie"""
+        LogStore.sync(str(log_file))
+        since = datetime(2025, 7, 23, 14, 35, 10).timestamp()
+
+        table, cursor = LogStore.fetch_page(None, 100, levels=["ERROR"], since=since, descending=False)
+
+        assert cursor is None
+        assert set(table.column("Poziom").to_pylist()) == {"ERROR"}
+        assert table.column("Wiadomość").to_pylist()[0] == "wpis 11"
+        assert table.column_names == ["ID", "Czas", "Poziom", "Moduł", "Wiadomość"]
+
+    def test_fetch_page_without_database(self, isolated_database):
+        """Test pobrania strony przy braku bazy logów"""
+        table, cursor = LogStore.fetch_page(None, 10)
+
+        assert table.num_rows == 0
+        assert cursor is None
+        assert not os.path.exists(os.environ['LOG_DB_FILE'])
+
+
+class TestLogSearch:
+    """Testy wyszukiwania pełnotekstowego"""
+
+    @pytest.fixture
+    def search_log(self, tmp_path):
+        path = tmp_path / "search.log"
+        path.write_text(
+            log_line(1, "INFO", "src.auth_service", "Pomyślne logowanie użytkownika: admin")
+            + log_line(2, "WARNING", "src.auth_service", "Nieudana próba logowania użytkownika: jan")
+            + log_line(3, "ERROR", "src.database", "Błąd połączenia z bazą danych")
+            + log_line(4, "INFO", "src.auth_service", "Użytkownik admin został wylogowany"),
+            encoding="utf-8"
+        )
+        LogStore.sync(str(path))
+        return path
+
+    def test_build_match_query(self):
+        """Test budowania zapytania FTS5 z tekstu użytkownika"""
+        assert build_match_query('logowanie admin') == '"logowanie" "admin"'
+        assert build_match_query('połącz*') == '"połącz"*'
+        assert build_match_query('a"b OR') == '"a""b" "OR"'
+        assert build_match_query('  * ') == ''
+
+    def test_search_all_terms(self, search_log):
+        """Test wyszukiwania wpisów zawierających wszystkie słowa"""
+        results = LogStore.search("logowania jan")
+        assert results.column("Wiadomość").to_pylist() == ["Nieudana próba logowania użytkownika: jan"]
+
+    def test_search_prefix_and_diacritics(self, search_log):
+        """Test wyszukiwania prefiksowego bez polskich znaków"""
+        assert LogStore.search("połącz*").num_rows == 1
+        assert LogStore.search("baza").num_rows == 1
+        assert LogStore.search("uzytkownik*").num_rows == 3
+
+    def test_search_filters(self, search_log):
+        """Test filtrów poziomu i modułu"""
+        assert LogStore.search("admin", levels=["INFO"]).num_rows == 2
+        assert LogStore.search("admin", levels=["ERROR"]).num_rows == 0
+        assert LogStore.search("bazą", module="src.database").num_rows == 1
+        assert LogStore.search("bazą", module="src.auth_service").num_rows == 0
+
+    def test_search_time_order(self, search_log):
+        """Test sortowania wyników od najnowszych"""
+        results = LogStore.search("admin", order="time")
+        assert results.column("Wiadomość").to_pylist()[0] == "Użytkownik admin został wylogowany"
+
+    def test_search_incremental_index(self, search_log):
+        """Test przyrostowej aktualizacji indeksu po dopisaniu wpisów"""
+        with open(search_log, "a", encoding="utf-8") as f:
+            f.write(log_line(5, "INFO", "src.app", "Restart aplikacji"))
+        LogStore.sync(str(search_log))
+
+        assert LogStore.search("restart").num_rows == 1
+
+    def test_search_special_characters(self, search_log):
+        """Test zapytania ze znakami specjalnymi FTS5"""
+        assert LogStore.search('admin" OR (').num_rows == 0
+
+    def test_modules(self, search_log):
+        """Test listy modułów"""
+        assert LogStore.modules() == ["src.auth_service", "src.database"]
+
+    def test_modules_cached_per_version(self, search_log):
+        """Test listy modułów zapamiętanej do zmiany wersji danych"""
+        version = LogStore.version()
+        modules = LogStore.modules(version)
+
+        with patch.object(LogStore, 'connect', wraps=LogStore.connect) as connect:
+            assert LogStore.modules(version) is modules
+            connect.assert_not_called()
+            assert LogStore.modules(version + 1) == modules
+            connect.assert_called_once()
@@ -0,0 +1,99 @@
+"""
+Testy dla wspólnego podglądu końcówki logów
+"""
+import pytest
+import os
+from unittest.mock import patch
+from src.log_tail import LogTailer
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("linia 1\nlinia 2\n", encoding="utf-8")
+    LogTailer.start(str(path))
+    return path
+
+
+def append(path, text):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text)
+
+
+class TestLogTailer:
+    """Testy klasy LogTailer"""
+
+    def test_initial_tail(self, log_file):
+        """Test wczytania istniejącej końcówki pliku"""
+        assert LogTailer.poll() == 2
+        assert LogTailer.read() == (["linia 1", "linia 2"], 2)
+
+    def test_only_new_lines_after_seq(self, log_file):
+        """Test odczytu tylko linii nowszych niż ostatnio widziana"""
+        LogTailer.poll()
+        _, seq = LogTailer.read()
+        append(log_file, "linia 3\nlinia 4\n")
+        LogTailer.poll()
+
+        assert LogTailer.read(seq) == (["linia 3", "linia 4"], 4)
+        assert LogTailer.read(4) == ([], 4)
+
+    def test_partial_line_waits(self, log_file):
+        """Test wstrzymania niedokończonej linii do jej zakończenia"""
+        LogTailer.poll()
+        append(log_file, "linia 3 - począt")
+        assert LogTailer.poll() == 0
+        append(log_file, "ek\n")
+
+        assert LogTailer.poll() == 1
+        assert LogTailer.read(2) == (["linia 3 - początek"], 3)
+
+    def test_rotation(self, log_file):
+        """Test dokończenia starego pliku i przejścia na nowy po rotacji"""
+        LogTailer.poll()
+        append(log_file, "linia 3 przed rotacją\n")
+        os.rename(log_file, str(log_file) + ".1")
+        log_file.write_text("nowy plik 1\n", encoding="utf-8")
+
+        assert LogTailer.poll() == 2
+        assert LogTailer.read(2)[0] == ["linia 3 przed rotacją", "nowy plik 1"]
+
+        append(log_file, "nowy plik 2\n")
+        assert LogTailer.poll() == 1
+
+    def test_truncation(self, log_file):
+        """Test czytania od początku po obcięciu pliku"""
+        LogTailer.poll()
+        log_file.write_text("po obcięciu\n", encoding="utf-8")
+
+        assert LogTailer.poll() == 1
+        assert LogTailer.read(2)[0] == ["po obcięciu"]
+
+    def test_missing_file(self, tmp_path):
+        """Test braku pliku - pusty bufor"""
+        LogTailer.start(str(tmp_path / "missing.log"))
+
+        assert LogTailer.poll() == 0
+        assert LogTailer.read() == ([], 0)
+
+    def test_limit_and_stale_seq(self, log_file):
+        """Test limitu linii i numeru spoza bufora"""
+        append(log_file, "".join(f"wpis {i}\n" for i in range(10)))
+        LogTailer.poll()
+
+        assert LogTailer.read(limit=3)[0] == ["wpis 7", "wpis 8", "wpis 9"]
+        with patch.object(LogTailer, '_last_seq', 12):
+            assert len(LogTailer.read(after_seq=100)[0]) == 12
+
+    def test_readers_do_not_read_file(self, log_file):
+        """Test stałej liczby odczytów pliku niezależnie od liczby sesji"""
+        LogTailer.poll()
+        append(log_file, "linia 3\n")
+
+        with patch('builtins.open') as mock_open:
+            for _ in range(100):
+                LogTailer.read(2)
+        LogTailer.poll()
+
+        mock_open.assert_not_called()
+        assert all(LogTailer.read(2)[0] == ["linia 3"] for _ in range(100))
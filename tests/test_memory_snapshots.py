@@ -0,0 +1,155 @@
+"""
+Testy dla migawek pamięci i rozmiarów stanów sesji
+"""
+import pytest
+import json
+import sys
+import tracemalloc
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from src.memory_snapshots import (
+    MemorySnapshots, MAX_SNAPSHOTS, deep_size, session_state_sizes, register_default_owners, to_json
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_snapshots():
+    """Bez migawek, właścicieli i śledzenia alokacji między testami"""
+    owners = dict(MemorySnapshots._owners)
+    MemorySnapshots._owners.clear()
+    yield
+    MemorySnapshots.stop()
+    MemorySnapshots._owners.clear()
+    MemorySnapshots._owners.update(owners)
+
+
+def fake_runtime(states):
+    """Runtime Streamlit z aktywnymi sesjami o podanych stanach"""
+    sessions = [
+        SimpleNamespace(session=SimpleNamespace(id=session_id, session_state=SimpleNamespace(filtered_state=state)))
+        for session_id, state in states.items()
+    ]
+    runtime = MagicMock()
+    runtime.exists.return_value = True
+    runtime.get_instance.return_value._session_mgr.list_active_sessions.return_value = sessions
+    return patch('streamlit.runtime', runtime)
+
+
+class TestDeepSize:
+    """Testy przybliżonego rozmiaru obiektów"""
+
+    def test_nested_containers(self):
+        """Test sumowania zagnieżdżonych obiektów i jednokrotnego liczenia wspólnych"""
+        text = "x" * 10_000
+        assert deep_size([text]) >= 10_000
+        assert deep_size([text, text]) < 2 * 10_000
+
+    def test_data_buffers(self):
+        """Test rozmiaru tablic numpy, ramek pandas i tabel Arrow razem z danymi"""
+        values = np.arange(100_000, dtype=np.int64)
+
+        assert deep_size({'a': values}) >= values.nbytes
+        assert deep_size(pd.DataFrame({'a': values})) >= values.nbytes
+        assert deep_size(pa.table({'a': values})) >= values.nbytes
+
+    def test_skips_code(self):
+        """Test pomijania klas, funkcji i modułów"""
+        assert deep_size([json, deep_size, MemorySnapshots]) == sys.getsizeof([json, deep_size, MemorySnapshots])
+
+
+class TestMemorySnapshots:
+    """Testy klasy MemorySnapshots"""
+
+    def test_first_snapshot_starts_tracing(self):
+        """Test włączenia śledzenia alokacji dopiero przy migawce"""
+        assert not tracemalloc.is_tracing()
+
+        snapshot = MemorySnapshots.take("start")
+
+        assert tracemalloc.is_tracing()
+        assert snapshot.label == "start"
+        assert snapshot.rss > 0
+
+    def test_diff_by_line(self):
+        """Test przyrostu alokacji pogrupowanego po pliku i linii"""
+        old = MemorySnapshots.take()
+        retained = [str(i) * 20 for i in range(20_000)]
+        new = MemorySnapshots.take()
+
+        diff = MemorySnapshots.diff(old, new)
+
+        assert diff['traced_diff'] > 0
+        assert 'test_memory_snapshots.py' in diff['allocations'][0]['location']
+        assert diff['allocations'][0]['count_diff'] >= len(retained)
+
+    def test_diff_by_owner(self):
+        """Test przyrostu wg zarejestrowanych właścicieli pamięci"""
+        cache = []
+        MemorySnapshots.register_owner('cache', lambda: deep_size(cache))
+        MemorySnapshots.register_owner('broken', lambda: 1 / 0)
+        old = MemorySnapshots.take()
+        cache.extend(str(i) * 1000 for i in range(100))
+        new = MemorySnapshots.take()
+
+        owners = MemorySnapshots.diff(old, new)['owners']
+
+        assert [row['owner'] for row in owners] == ['cache']
+        assert owners[0]['diff'] >= 100 * 1000
+
+    def test_session_state_sizes(self):
+        """Test rozmiarów stanów sesji i ich przyrostu"""
+        small = {'username': 'anna'}
+        large = {'username': 'admin', 'frame': pd.DataFrame({'a': np.arange(50_000)})}
+        with fake_runtime({'s1': small, 's2': large}):
+            sizes = session_state_sizes()
+            old = MemorySnapshots.take()
+            small['rows'] = list(range(10_000))
+            new = MemorySnapshots.take()
+
+        assert [row['session_id'] for row in sizes] == ['s2', 's1']
+        assert list(sizes[0]['top_keys'])[0] == 'frame'
+        assert sizes[0]['size'] >= 50_000 * 8
+        sessions = MemorySnapshots.diff(old, new)['sessions']
+        assert (sessions[0]['session_id'], sessions[0]['username']) == ('s1', 'anna')
+        assert sessions[0]['diff'] >= 10_000 * 8
+
+    def test_no_runtime(self):
+        """Test braku sesji poza serwerem Streamlit"""
+        assert session_state_sizes() == []
+
+    def test_retention(self):
+        """Test przechowywania tylko ostatnich migawek"""
+        for _ in range(MAX_SNAPSHOTS + 2):
+            last = MemorySnapshots.take()
+
+        snapshots = MemorySnapshots.snapshots()
+        assert len(snapshots) == MAX_SNAPSHOTS
+        assert snapshots[-1] is last
+        assert MemorySnapshots.get(last.id) is last
+
+    def test_json_export(self):
+        """Test eksportu migawki i porównania do JSON"""
+        MemorySnapshots.register_owner('cache', lambda: 10)
+        old = MemorySnapshots.take()
+        new = MemorySnapshots.take()
+
+        snapshot = json.loads(to_json(new.to_dict(top=5)))
+        diff = json.loads(to_json(MemorySnapshots.diff(old, new)))
+
+        assert 'snapshot' not in snapshot
+        assert snapshot['owners'] == {'cache': 10}
+        assert len(snapshot['allocations']) <= 5
+        assert diff['new']['id'] == new.id
+
+    def test_default_owners(self):
+        """Test rejestracji buforów i cache aplikacji"""
+        register_default_owners()
+
+        sizes = MemorySnapshots.owner_sizes()
+
+        assert 'Bufor podglądu logów' in sizes
+        assert 'Cache Streamlit (st.cache_*)' in sizes
+        assert all(size >= 0 for size in sizes.values())
@@ -0,0 +1,247 @@
+"""
+Testy dla metryk Prometheus i serwera sond zdrowia
+"""
+import pytest
+import os
+import socket
+import threading
+import logging
+import urllib.request
+import urllib.error
+from unittest.mock import patch
+from src.config import Config
+from src.metrics import (
+    Counter, Histogram, Gauge, MetricsRegistry, MetricsServer, ActiveSessions,
+    MetricsLogHandler, install_log_handler, LOGIN_ATTEMPTS, BCRYPT_DURATION
+)
+from src.auth_service import AuthService
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    """Każdy test zaczyna od wyzerowanych metryk i bez własnych metryk testowych"""
+    registered = dict(MetricsRegistry._metrics)
+    MetricsRegistry.clear()
+    ActiveSessions.clear()
+    yield
+    MetricsRegistry._metrics = registered
+    MetricsRegistry.clear()
+    ActiveSessions.clear()
+
+
+@pytest.fixture
+def server():
+    """Serwer metryk na wolnym porcie"""
+    with socket.socket() as probe:
+        probe.bind(('localhost', 0))
+        port = probe.getsockname()[1]
+    assert MetricsServer.start('localhost', port) == port
+    yield f"http://localhost:{port}"
+    MetricsServer.stop()
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, response.headers['Content-Type'], response.read().decode('utf-8')
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers['Content-Type'], e.read().decode('utf-8')
+
+
+class TestMetrics:
+    """Testy liczników, histogramów i formatu tekstowego"""
+
+    def test_counter_sums_thread_shards(self):
+        """Test sumowania fragmentów wątków, także zakończonych"""
+        counter = Counter('test_events_total', 'Zdarzenia', ['kind'])
+
+        def work():
+            for _ in range(1000):
+                counter.inc('a')
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc('b', amount=2.5)
+
+        assert counter.value('a') == 8000
+        # Ponowny odczyt - fragmenty zakończonych wątków są już w sumie wspólnej
+        assert counter.value('a') == 8000
+        assert counter.value('b') == 2.5
+        assert 'test_events_total{kind="a"} 8000' in counter.render()
+
+    def test_dead_shards_retired_without_reads(self):
+        """Test przenoszenia fragmentów zakończonych wątków przy rejestracji nowego (bez odczytów)"""
+        counter = Counter('test_reruns_total', 'Przebiegi')
+        for _ in range(50):
+            thread = threading.Thread(target=counter.inc)
+            thread.start()
+            thread.join()
+
+        assert len(counter._values._shards) <= 1
+        assert counter.value() == 50
+
+    def test_counter_without_labels_rendered_as_zero(self):
+        """Test licznika bez etykiet przed pierwszym zdarzeniem"""
+        counter = Counter('test_idle_total', 'Bez zdarzeń')
+
+        assert counter.render()[-1] == 'test_idle_total 0'
+
+    def test_wrong_labels(self):
+        """Test błędu przy niezgodnych etykietach"""
+        counter = Counter('test_labels_total', 'Etykiety', ['result'])
+
+        with pytest.raises(ValueError):
+            counter.inc()
+
+    def test_duplicate_name(self):
+        """Test odrzucenia drugiej metryki o tej samej nazwie"""
+        Counter('test_duplicate_total', 'Pierwsza')
+
+        with pytest.raises(ValueError):
+            Counter('test_duplicate_total', 'Druga')
+
+    def test_histogram_buckets(self):
+        """Test skumulowanych kubełków, sumy i liczby obserwacji"""
+        histogram = Histogram('test_duration_seconds', 'Czas', [0.1, 1.0], ['op'])
+        for value in [0.05, 0.1, 0.5, 3.0]:
+            histogram.observe(value, 'x')
+
+        lines = histogram.render()
+
+        assert 'test_duration_seconds_bucket{op="x",le="0.1"} 2' in lines
+        assert 'test_duration_seconds_bucket{op="x",le="1"} 3' in lines
+        assert 'test_duration_seconds_bucket{op="x",le="+Inf"} 4' in lines
+        assert 'test_duration_seconds_sum{op="x"} 3.65' in lines
+        assert 'test_duration_seconds_count{op="x"} 4' in lines
+
+    def test_histogram_timer(self):
+        """Test pomiaru czasu bloku"""
+        histogram = Histogram('test_timer_seconds', 'Czas', [1.0])
+        with histogram.time():
+            pass
+
+        assert histogram.count() == 1
+
+    def test_label_escaping(self):
+        """Test cytowania znaków specjalnych w etykietach"""
+        counter = Counter('test_escape_total', 'Etykiety', ['path'])
+        counter.inc('a"b\\c\nd')
+
+        assert counter.render()[-1] == 'test_escape_total{path="a\\"b\\\\c\\nd"} 1'
+
+    def test_gauge_and_failing_metric(self):
+        """Test wskaźnika i pominięcia metryki z błędem odczytu"""
+        Gauge('test_gauge', 'Wskaźnik', lambda: 42)
+        Gauge('test_broken_gauge', 'Błąd', lambda: 1 / 0)
+
+        text = MetricsRegistry.render()
+
+        assert 'test_gauge 42\n' in text
+        assert 'test_broken_gauge' not in text
+
+    def test_active_sessions(self):
+        """Test liczby sesji aktywnych w oknie czasu"""
+        ActiveSessions.touch('a')
+        ActiveSessions.touch('a')
+        ActiveSessions.touch('b')
+        assert ActiveSessions.count() == 2
+
+        with patch('src.metrics.time.time', return_value=10 ** 12):
+            assert ActiveSessions.count() == 0
+
+    def test_active_sessions_pruned_on_touch(self):
+        """Test usuwania nieaktywnych sesji bez odczytów count()"""
+        ActiveSessions.touch('a')
+        with patch('src.metrics.time.time', return_value=10 ** 12):
+            ActiveSessions.touch('b')
+
+        assert list(ActiveSessions._last_seen) == ['b']
+
+    def test_log_handler(self):
+        """Test zliczania wpisów w logu wg poziomu"""
+        test_logger = logging.getLogger("test_metrics_handler")
+        install_log_handler(test_logger)
+        install_log_handler(test_logger)
+        try:
+            test_logger.warning("ostrzeżenie")
+
+            assert sum(isinstance(h, MetricsLogHandler) for h in test_logger.handlers) == 1
+            assert 'app_log_records_total{level="WARNING"} 1' in MetricsRegistry.render()
+        finally:
+            test_logger.handlers.clear()
+
+    def test_auth_service_metrics(self):
+        """Test metryk logowania i czasu bcrypt"""
+        hashed = AuthService.hash_password("secret", rounds=4)
+        with patch.object(AuthService, 'get_password_hash', return_value=hashed):
+            AuthService.authenticate_user("admin", "secret")
+            AuthService.authenticate_user("admin", "wrong")
+        with patch.object(AuthService, 'get_password_hash', return_value=None):
+            AuthService.authenticate_user("eve", "secret")
+
+        assert LOGIN_ATTEMPTS.value('success') == 1
+        assert LOGIN_ATTEMPTS.value('failure') == 2
+        assert BCRYPT_DURATION.count('hash') == 1
+        assert BCRYPT_DURATION.count('verify') == 2
+
+
+class TestMetricsServer:
+    """Testy serwera metryk i sond"""
+
+    def test_metrics_endpoint(self, server):
+        """Test endpointu /metrics w formacie Prometheus"""
+        LOGIN_ATTEMPTS.inc('success')
+
+        status, content_type, body = get(server + "/metrics")
+
+        assert status == 200
+        assert content_type.startswith('text/plain; version=0.0.4')
+        assert '# TYPE app_login_attempts_total counter' in body
+        assert 'app_login_attempts_total{result="success"} 1' in body
+
+    def test_health_and_readiness(self, server):
+        """Test sond żywotności i gotowości"""
+        with patch.object(MetricsServer, '_checks', {'ok': lambda: None}):
+            assert get(server + "/healthz")[0] == 200
+            assert get(server + "/readyz")[0] == 200
+
+        checks = {'ok': lambda: True, 'config': lambda: False, 'database': lambda: 1 / 0}
+        with patch.object(MetricsServer, '_checks', checks):
+            status, _, body = get(server + "/readyz")
+
+        assert status == 503
+        assert body == "niegotowe: config, database\n"
+
+    def test_unknown_path(self, server):
+        """Test nieznanej ścieżki"""
+        assert get(server + "/admin")[0] == 404
+
+    def test_start_once(self, server):
+        """Test jednego serwera na proces"""
+        port = int(server.rsplit(':', 1)[1])
+
+        assert MetricsServer.start('localhost', port + 1) == port
+
+    def test_disabled(self):
+        """Test wyłączenia serwera portem 0"""
+        with patch.dict(os.environ, {'METRICS_PORT': '0'}):
+            assert MetricsServer.start() is None
+
+    def test_port_in_use(self):
+        """Test pracy aplikacji mimo zajętego portu"""
+        with socket.socket() as busy:
+            busy.bind(('localhost', 0))
+            busy.listen()
+            assert MetricsServer.start('localhost', busy.getsockname()[1]) is None
+
+    def test_config(self):
+        """Test konfiguracji adresu i portu serwera metryk"""
+        with patch.dict(os.environ, {'HOST': '0.0.0.0'}, clear=True):
+            assert Config.get_metrics_host() == '0.0.0.0'
+            assert Config.get_metrics_port() == 9464
+        with patch.dict(os.environ, {'METRICS_HOST': '127.0.0.1', 'METRICS_PORT': '9100'}):
+            assert Config.get_metrics_host() == '127.0.0.1'
+            assert Config.get_metrics_port() == 9100
@@ -0,0 +1,125 @@
+"""
+Testy dla historii metryk w plikach mapowanych do pamięci
+"""
+import os
+import math
+from datetime import date
+import numpy as np
+import pytest
+from src.metrics_history import MetricsHistory, HEADER_SIZE, wall_seconds
+
+DAY = date(2025, 7, 7)
+START = wall_seconds(DAY)
+
+
+class TestMetricsHistory:
+    """Testy klasy MetricsHistory"""
+
+    def test_append_and_slices(self):
+        """Test zapisu próbek i odczytu wycinka okna bez kopiowania"""
+        MetricsHistory.append("cpu_percent", START + 120, 42.0)
+        MetricsHistory.append("cpu_percent", START + 185, 50.0)
+
+        chunks = list(MetricsHistory.slices("cpu_percent", START + 60, START + 240))
+        assert len(chunks) == 1
+        first, interval, values = chunks[0]
+        assert (first, interval) == (START + 60, 60)
+        assert math.isnan(values[0])
+        assert list(values[1:]) == [42.0, 50.0]
+        assert isinstance(values, np.memmap)
+
+    def test_append_keep_max(self):
+        """Test zachowania największej próbki interwału"""
+        for value in (30.0, 80.0, 45.0):
+            MetricsHistory.append("response_ms", START + 10, value, keep_max=True)
+        MetricsHistory.append("response_ms", START + 70, 12.0, keep_max=True)
+
+        _, _, values = next(MetricsHistory.slices("response_ms", START, START + 120))
+        assert list(values) == [80.0, 12.0]
+
+    def test_file_layout(self):
+        """Test pliku o stałym rozmiarze: nagłówek i próbka na każdy interwał doby"""
+        MetricsHistory.append("ram_percent", START, 1.0, interval=30)
+        MetricsHistory.flush()
+        path = MetricsHistory.path("ram_percent", DAY)
+
+        assert os.path.getsize(path) == HEADER_SIZE + 2880 * 4
+        MetricsHistory.close()
+        first, interval, values = next(MetricsHistory.slices("ram_percent", START, START + 30))
+        assert (interval, values[0]) == (30, 1.0)
+
+    def test_write_across_days(self):
+        """Test zapisu serii obejmującej kilka dni i okna między dniami"""
+        times = START + np.arange(3 * 1440) * 60
+        MetricsHistory.write("response_ms", times, np.arange(len(times)))
+
+        assert MetricsHistory.days("response_ms") == [DAY, date(2025, 7, 8), date(2025, 7, 9)]
+        chunks = list(MetricsHistory.slices("response_ms", START + 86400 - 120, START + 86400 + 120))
+        assert [len(values) for _, _, values in chunks] == [2, 2]
+        assert np.concatenate([values for _, _, values in chunks]).tolist() == [1438, 1439, 1440, 1441]
+
+    def test_interval_mismatch(self):
+        """Test odrzucenia serii o innym interwale niż istniejący plik"""
+        MetricsHistory.append("cpu_percent", START, 1.0)
+        with pytest.raises(ValueError):
+            MetricsHistory.write("cpu_percent", [START], [1.0], interval=30)
+
+    def test_invalid_metric_name(self):
+        """Test odrzucenia nazwy metryki spoza dozwolonych znaków"""
+        with pytest.raises(ValueError):
+            MetricsHistory.append("../cpu", START, 1.0)
+
+    def test_window_downsampled(self):
+        """Test okna wykresu: średnia lub maksimum w przedziałach, puste przedziały pominięte"""
+        times = START + np.arange(1440) * 60
+        values = np.ones(1440)
+        values[600] = 100
+        MetricsHistory.write("cpu_percent", times, values)
+        MetricsHistory.write("response_ms", times, values)
+
+        frame = MetricsHistory.window(
+            ["cpu_percent", "response_ms"], START, START + 2 * 86400, max_points=96,
+            agg={"response_ms": "max"}
+        )
+        assert len(frame) == 48
+        assert frame["Czas"].iloc[1] - frame["Czas"].iloc[0] == np.timedelta64(30, 'm')
+        assert frame["cpu_percent"].iloc[20] == pytest.approx(1 + 99 / 30)
+        assert frame["response_ms"].iloc[20] == 100
+        assert MetricsHistory.window(["cpu_percent"], START - 86400, START).empty
+
+    def test_stats(self):
+        """Test liczby próbek, średniej i maksimum w oknie"""
+        MetricsHistory.write("cpu_percent", [START, START + 60, START + 86400], [10, 30, 50])
+
+        assert MetricsHistory.stats("cpu_percent", START, START + 86400) == {
+            'samples': 2, 'mean': 20.0, 'max': 30.0
+        }
+        assert MetricsHistory.stats("ram_percent", START, START + 86400)['samples'] == 0
+
+    def test_purge(self):
+        """Test usuwania dni starszych niż okres przechowywania"""
+        times = START + np.arange(5) * 86400
+        MetricsHistory.write("cpu_percent", times, np.ones(5))
+
+        assert MetricsHistory.purge(today=date(2025, 7, 11), retention_days=2) == 2
+        assert MetricsHistory.days("cpu_percent") == [date(2025, 7, 9), date(2025, 7, 10), date(2025, 7, 11)]
+        assert list(MetricsHistory.slices("cpu_percent", START, START + 86400)) == []
+
+    def test_purge_daily(self):
+        """Test usuwania starych plików najwyżej raz dziennie"""
+        MetricsHistory.append("cpu_percent", START, 1.0)
+
+        assert MetricsHistory.purge_daily() == 1
+        MetricsHistory.append("cpu_percent", START, 1.0)
+        assert MetricsHistory.purge_daily() == 0
+        assert MetricsHistory.days("cpu_percent") == [DAY]
+
+    def test_window_mixed_intervals(self):
+        """Test okna z metrykami o różnych interwałach plików"""
+        MetricsHistory.write("cpu_percent", START + np.arange(4) * 30, [1, 2, 3, 4], interval=30)
+        MetricsHistory.write("ram_percent", START + np.arange(2) * 60, [10, 20], interval=60)
+
+        frame = MetricsHistory.window(["cpu_percent", "ram_percent"], START, START + 120, max_points=4)
+        assert frame["cpu_percent"].tolist() == [1, 2, 3, 4]
+        assert frame["ram_percent"].tolist()[::2] == [10, 20]
+        assert np.isnan(frame["ram_percent"].tolist()[1::2]).all()
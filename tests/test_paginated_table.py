@@ -0,0 +1,56 @@
+"""
+Testy dla tabeli stronicowanej
+"""
+import pytest
+import pyarrow as pa
+from unittest.mock import MagicMock
+from src.paginated_table import PageCache, PAGE_CACHE_SIZE
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    PageCache.clear()
+    yield
+    PageCache.clear()
+
+
+def make_fetcher():
+    fetcher = MagicMock(side_effect=lambda after, limit, **query: (pa.table({'x': [after]}), None))
+    fetcher.__module__ = __name__
+    fetcher.__qualname__ = 'fetcher'
+    return fetcher
+
+
+class TestPageCache:
+    """Testy klasy PageCache"""
+
+    def test_page_fetched_once(self):
+        """Test pobrania strony tylko raz dla tego samego klucza"""
+        fetcher = make_fetcher()
+
+        first = PageCache.get_page(fetcher, None, 20, levels=["INFO"])
+        second = PageCache.get_page(fetcher, None, 20, levels=["INFO"])
+
+        assert fetcher.call_count == 1
+        assert first is second
+
+    def test_key_includes_query_cursor_and_version(self):
+        """Test osobnych wpisów dla różnych filtrów, kursorów i wersji danych"""
+        fetcher = make_fetcher()
+
+        PageCache.get_page(fetcher, None, 20, levels=["INFO"])
+        PageCache.get_page(fetcher, None, 20, levels=["ERROR"])
+        PageCache.get_page(fetcher, (1.0, 5), 20, levels=["INFO"])
+        PageCache.get_page(fetcher, None, 20, version=2, levels=["INFO"])
+
+        assert fetcher.call_count == 4
+
+    def test_lru_eviction(self):
+        """Test ograniczenia rozmiaru cache"""
+        fetcher = make_fetcher()
+
+        for page in range(PAGE_CACHE_SIZE + 1):
+            PageCache.get_page(fetcher, page, 20)
+        PageCache.get_page(fetcher, 0, 20)
+
+        assert fetcher.call_count == PAGE_CACHE_SIZE + 2
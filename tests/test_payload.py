@@ -0,0 +1,157 @@
+"""
+Testy dla pomiaru danych wysyłanych do przeglądarki
+"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from src.metrics import RERUN_PAYLOAD
+from src.payload import PayloadMeter, RerunPayload, LARGEST_ELEMENTS
+from benchmarks import bench_payload
+
+
+@pytest.fixture(autouse=True)
+def clean_meter():
+    PayloadMeter.reset()
+    yield
+    PayloadMeter.reset()
+    PayloadMeter._local.run = None
+
+
+@pytest.fixture
+def ctx():
+    """Kontekst skryptu z kolejką komunikatów"""
+    sent = []
+    context = SimpleNamespace(enqueue=sent.append, sent=sent)
+    with patch('streamlit.runtime.scriptrunner.get_script_run_ctx', return_value=context):
+        yield context
+
+
+def markdown(path, body):
+    msg = ForwardMsg()
+    msg.metadata.delta_path[:] = path
+    msg.delta.new_element.markdown.body = body
+    return msg
+
+
+def tab(path, label):
+    msg = ForwardMsg()
+    msg.metadata.delta_path[:] = path
+    msg.delta.add_block.tab.label = label
+    return msg
+
+
+def run(ctx, page, *messages):
+    PayloadMeter.start_run()
+    PayloadMeter.set_page(page)
+    for msg in messages:
+        ctx.enqueue(msg)
+    return PayloadMeter.finish_run("sesja")
+
+
+class TestPayloadMeter:
+    """Testy klasy PayloadMeter"""
+
+    def test_measures_elements_and_passes_through(self, ctx):
+        """Test pomiaru elementów bez zmiany wysyłki"""
+        messages = [markdown([0, 0], "a" * 1000), markdown([0, 1], "b")]
+
+        payload = run(ctx, 'dashboard', *messages)
+
+        assert ctx.sent == messages
+        assert payload.page == 'dashboard'
+        assert payload.elements == 2
+        assert payload.bytes == sum(msg.ByteSize() for msg in messages)
+        assert payload.by_type == {'markdown': payload.bytes}
+
+    def test_tabs(self, ctx):
+        """Test przypisania elementów do zakładki"""
+        run(ctx, 'data', tab([0, 2, 0], "Wykresy"), markdown([0, 2, 0, 0], "x" * 500), markdown([0, 3], "y"))
+
+        rows = {(row['tab'], row['element_type']): row for row in PayloadMeter.offenders()}
+
+        assert rows[('Wykresy', 'markdown')]['count'] == 1
+        assert rows[('', 'markdown')]['count'] == 1
+        assert ('', 'block:tab') in rows
+
+    def test_wraps_context_once(self, ctx):
+        """Test jednokrotnego podpięcia pod kontekst przy kolejnych przebiegach"""
+        run(ctx, 'dashboard', markdown([0, 0], "a"))
+        wrapped = ctx.enqueue
+        run(ctx, 'dashboard', markdown([0, 0], "a"))
+
+        assert ctx.enqueue is wrapped
+        assert [payload.elements for payload in PayloadMeter.reruns()] == [1, 1]
+
+    def test_ignores_non_delta_and_outside_run(self, ctx):
+        """Test pominięcia komunikatów spoza delt i spoza pomiaru"""
+        PayloadMeter.start_run()
+        PayloadMeter.finish_run()
+        ctx.enqueue(markdown([0, 0], "poza przebiegiem"))
+        status = ForwardMsg()
+        status.script_finished = 1
+
+        payload = run(ctx, 'login', status)
+
+        assert payload.elements == 0
+        assert len(ctx.sent) == 2
+
+    def test_no_script_context(self):
+        """Test braku pomiaru poza przebiegiem Streamlit"""
+        with patch('streamlit.runtime.scriptrunner.get_script_run_ctx', return_value=None):
+            assert PayloadMeter.start_run() is False
+        assert PayloadMeter.finish_run() is None
+
+    def test_offenders_per_rerun(self, ctx):
+        """Test sumy, średniej i bajtów na przebieg strony"""
+        for _ in range(2):
+            run(ctx, 'data', markdown([0, 0], "x" * 1000), markdown([0, 1], "x" * 1000))
+        run(ctx, 'login', markdown([0, 0], "y"))
+
+        top = PayloadMeter.offenders(limit=1)[0]
+
+        assert (top['page'], top['count']) == ('data', 4)
+        assert top['bytes_per_rerun'] == top['bytes'] / 2
+        assert top['avg_bytes'] == top['max_bytes']
+        assert [payload.page for payload in PayloadMeter.reruns('login')] == ['login']
+
+    def test_largest(self, ctx):
+        """Test zachowania tylko największych elementów"""
+        run(ctx, 'data', *[markdown([0, i], "x" * i) for i in range(LARGEST_ELEMENTS + 10)])
+
+        largest = PayloadMeter.largest()
+
+        assert len(largest) == LARGEST_ELEMENTS
+        assert largest[0].path == f"0.{LARGEST_ELEMENTS + 9}"
+        assert largest[0].bytes >= largest[-1].bytes
+
+    def test_metric(self, ctx):
+        """Test histogramu bajtów przebiegu w metrykach"""
+        before = RERUN_PAYLOAD.count('test_page')
+
+        run(ctx, 'test_page', markdown([0, 0], "a"))
+
+        assert RERUN_PAYLOAD.count('test_page') == before + 1
+
+
+class TestPayloadBudget:
+    """Testy benchmarku z kontrolą budżetu stron"""
+
+    def test_over_budget(self):
+        """Test wyboru stron ponad budżetem"""
+        results = {
+            'data': RerunPayload(0, 'data', None, 200 * 1024, 10),
+            'login': RerunPayload(0, 'login', None, 1024, 5),
+            'other': RerunPayload(0, 'other', None, 10 ** 9, 5)
+        }
+
+        assert bench_payload.over_budget(results, {'data': 100, 'login': 8}) == ['data']
+
+    def test_check_fails_benchmark(self, capsys):
+        """Test kodu wyjścia po przekroczeniu budżetu na prawdziwych stronach"""
+        assert bench_payload.main(['--sessions', '100', '--log-lines', '100']) == 0
+        assert bench_payload.main(['--sessions', '100', '--log-lines', '0', '--check', '--budget', 'data=0.1']) == 1
+
+        output = capsys.readouterr().out
+        assert "Przekroczony budżet: data" in output
+        assert all(page in output for page in ['login', 'dashboard', 'data', 'settings'])
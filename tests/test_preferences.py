@@ -0,0 +1,139 @@
+"""
+Testy dla preferencji użytkowników
+"""
+from unittest.mock import patch
+from src.preferences import (
+    UserPreferences, PreferencesStore, get_session_preferences, save_session_preferences
+)
+
+
+class TestUserPreferences:
+    """Testy klasy UserPreferences"""
+
+    def test_from_dict_ignores_unknown_keys(self):
+        """Test odczytu preferencji z nieznanymi kluczami"""
+        prefs = UserPreferences.from_dict({'page_layout': 'Normalny', 'theme': 'Ciemny', 'language': 'English'})
+        assert prefs.page_layout == 'Normalny'
+        assert prefs.items_per_page == 20
+
+    def test_tooltip(self):
+        """Test wyłączania podpowiedzi"""
+        assert UserPreferences().tooltip("tekst") == "tekst"
+        assert UserPreferences(show_tooltips=False).tooltip("tekst") is None
+
+    def test_format_timestamp(self):
+        """Test formatowania czasu wg formatu i strefy czasowej"""
+        prefs = UserPreferences(date_format='DD/MM/YYYY', time_format='12h AM/PM', timezone='UTC')
+        assert prefs.format_timestamp(0) == "01/01/1970 12:00:00 AM"
+        assert prefs.format_timestamp(3600, with_date=False) == "01:00:00 AM"
+
+    def test_format_timestamp_unknown_timezone(self):
+        """Test formatowania przy nieznanej strefie czasowej"""
+        assert UserPreferences(timezone='Mars/Base').format_timestamp(0)
+
+
+class TestPreferencesStore:
+    """Testy klasy PreferencesStore"""
+
+    def test_load_defaults(self, isolated_database):
+        """Test domyślnych preferencji bez bazy"""
+        assert PreferencesStore.load("admin") == UserPreferences()
+        assert not isolated_database.exists()
+
+    def test_save_is_buffered(self, isolated_database):
+        """Test zapisu do bufora bez operacji I/O"""
+        PreferencesStore.save("admin", UserPreferences(page_layout='Normalny'))
+
+        assert not isolated_database.exists()
+        assert PreferencesStore.load("admin").page_layout == 'Normalny'
+
+    def test_flush_writes_batch(self):
+        """Test zapisu wielu użytkowników w jednej porcji"""
+        PreferencesStore.save("admin", UserPreferences(page_layout='Normalny'))
+        PreferencesStore.save("jan", UserPreferences(items_per_page=50))
+
+        assert PreferencesStore.flush() == 2
+        assert PreferencesStore.flush() == 0
+        assert PreferencesStore.load("admin").page_layout == 'Normalny'
+        assert PreferencesStore.load("jan").items_per_page == 50
+
+    def test_flush_coalesces_updates(self):
+        """Test łączenia wielu zmian tego samego użytkownika w jeden zapis"""
+        for size in (10, 20, 30):
+            PreferencesStore.save("admin", UserPreferences(items_per_page=size))
+
+        assert PreferencesStore.flush() == 1
+        assert PreferencesStore.load("admin").items_per_page == 30
+
+    def test_save_copies_preferences(self):
+        """Test niezależności bufora od dalszych zmian obiektu w sesji"""
+        prefs = UserPreferences()
+        PreferencesStore.save("admin", prefs)
+        prefs.page_layout = 'Normalny'
+
+        PreferencesStore.flush()
+        assert PreferencesStore.load("admin").page_layout == 'Szeroki'
+
+
+    def test_load_during_flush(self):
+        """Test odczytu porcji w trakcie zapisu - przed zatwierdzeniem transakcji"""
+        PreferencesStore.save("admin", UserPreferences(items_per_page=50))
+        seen = []
+        connect = PreferencesStore._connect
+
+        def connect_and_load():
+            # Porcja jest już poza buforem, a transakcja jeszcze niezatwierdzona
+            seen.append(PreferencesStore.load("admin").items_per_page)
+            return connect()
+
+        with patch.object(PreferencesStore, '_connect', side_effect=connect_and_load):
+            assert PreferencesStore.flush() == 1
+
+        assert seen == [50]
+        assert PreferencesStore._inflight == {}
+        assert PreferencesStore.load("admin").items_per_page == 50
+
+
+class TestSessionPreferences:
+    """Testy preferencji w stanie sesji"""
+
+    @patch('src.preferences.st')
+    def test_loaded_once_per_session(self, mock_st):
+        """Test jednokrotnego wczytania preferencji w sesji"""
+        mock_st.session_state = {'username': 'admin'}
+
+        with patch.object(PreferencesStore, 'load', return_value=UserPreferences()) as mock_load:
+            first = get_session_preferences()
+            second = get_session_preferences()
+
+        mock_load.assert_called_once_with('admin')
+        assert first is second
+
+    @patch('src.preferences.st')
+    def test_reloaded_for_other_user(self, mock_st):
+        """Test ponownego wczytania po zmianie użytkownika w sesji"""
+        mock_st.session_state = {'username': 'admin'}
+        get_session_preferences()
+        mock_st.session_state['username'] = 'jan'
+
+        with patch.object(PreferencesStore, 'load', return_value=UserPreferences()) as mock_load:
+            get_session_preferences()
+
+        mock_load.assert_called_once_with('jan')
+
+    @patch('src.preferences.st')
+    def test_not_logged_in(self, mock_st):
+        """Test domyślnych preferencji gdy nikt nie jest zalogowany"""
+        mock_st.session_state = {}
+        assert get_session_preferences() == UserPreferences()
+
+    @patch('src.preferences.st')
+    def test_save_session_preferences(self, mock_st):
+        """Test zapisu preferencji sesji do bufora"""
+        mock_st.session_state = {'username': 'admin'}
+        prefs = UserPreferences(page_layout='Normalny')
+
+        save_session_preferences(prefs)
+
+        assert mock_st.session_state['preferences'] is prefs
+        assert PreferencesStore._dirty['admin'] == prefs
@@ -0,0 +1,143 @@
+"""
+Testy dla profilowania przebiegów stron na żądanie
+"""
+import pytest
+import time
+from unittest.mock import patch
+from src.profiler import (
+    RerunProfiler, MODE_DETERMINISTIC, MODE_SAMPLING, MAX_PROFILES, flame_nodes
+)
+
+
+@pytest.fixture(autouse=True)
+def session():
+    """Stan sesji Streamlit i brak uzbrojonych profilowań"""
+    RerunProfiler.disarm()
+    with patch('src.profiler.st') as mock_st:
+        mock_st.session_state = {'metrics_session_id': 'sesja-a'}
+        yield mock_st.session_state
+    RerunProfiler.disarm()
+
+
+def slow_helper():
+    time.sleep(0.05)
+    return sum(range(1000))
+
+
+@RerunProfiler.page("dashboard")
+def dashboard():
+    return slow_helper()
+
+
+@RerunProfiler.page("data")
+def data():
+    return 42
+
+
+class TestRerunProfiler:
+    """Testy klasy RerunProfiler"""
+
+    def test_not_armed_runs_directly(self):
+        """Test braku profilowania i zapisu, gdy nic nie jest uzbrojone"""
+        with patch('src.profiler.cProfile.Profile') as mock_profile:
+            assert dashboard() == sum(range(1000))
+
+        mock_profile.assert_not_called()
+        assert RerunProfiler.captures() == []
+
+    def test_profiles_next_runs(self):
+        """Test profilowania dokładnie N kolejnych przebiegów"""
+        RerunProfiler.arm(2, page="dashboard")
+        for _ in range(3):
+            dashboard()
+
+        captures = [RerunProfiler.load(capture_id) for capture_id in RerunProfiler.captures()]
+
+        assert len(captures) == 2
+        assert RerunProfiler.armed() == []
+        assert all(c.page == "dashboard" and c.mode == MODE_DETERMINISTIC for c in captures)
+        assert captures[0].duration >= 0.05
+        assert captures[0].timestamp >= captures[1].timestamp
+
+    def test_top_functions_and_stacks(self):
+        """Test najdroższych funkcji i stosów z cProfile"""
+        RerunProfiler.arm(1)
+        dashboard()
+
+        capture = RerunProfiler.load(RerunProfiler.captures()[0])
+        functions = [row['function'] for row in capture.top]
+
+        assert any('time.sleep' in name for name in functions)
+        assert any(name.startswith('slow_helper (tests/test_profiler.py') for name in functions)
+        assert any(stack[0].startswith('dashboard ') and len(stack) > 1 for stack, _ in capture.stacks)
+
+    def test_page_filter(self):
+        """Test profilowania tylko wybranej strony"""
+        RerunProfiler.arm(1, page="dashboard")
+        data()
+
+        assert RerunProfiler.captures() == []
+        assert RerunProfiler.armed()[0].runs == 1
+
+    def test_session_filter(self, session):
+        """Test profilowania tylko wybranej sesji"""
+        RerunProfiler.arm(1, session_id="sesja-b")
+        dashboard()
+        assert RerunProfiler.captures() == []
+
+        session['metrics_session_id'] = "sesja-b"
+        dashboard()
+
+        capture = RerunProfiler.load(RerunProfiler.captures()[0])
+        assert capture.session_id == "sesja-b"
+
+    def test_sampling_mode(self):
+        """Test profilera próbkującego stos wątku strony"""
+        RerunProfiler.arm(1, page="dashboard", mode=MODE_SAMPLING)
+        dashboard()
+
+        capture = RerunProfiler.load(RerunProfiler.captures()[0])
+
+        assert capture.mode == MODE_SAMPLING
+        assert capture.stacks
+        assert all(stack[0].startswith('dashboard ') for stack, _ in capture.stacks)
+        assert any(row['function'].startswith('slow_helper') for row in capture.top)
+
+    def test_capture_saved_on_exception(self):
+        """Test zapisu profilu także po błędzie strony"""
+        @RerunProfiler.page("broken")
+        def broken():
+            raise RuntimeError("błąd")
+
+        RerunProfiler.arm(1)
+        with pytest.raises(RuntimeError):
+            broken()
+
+        assert len(RerunProfiler.captures()) == 1
+
+    def test_retention_and_clear(self):
+        """Test usuwania najstarszych profili i czyszczenia"""
+        RerunProfiler.arm(MAX_PROFILES + 2, page="data")
+        for _ in range(MAX_PROFILES + 2):
+            data()
+
+        assert len(RerunProfiler.captures()) == MAX_PROFILES
+        RerunProfiler.clear()
+        assert RerunProfiler.captures() == []
+        assert RerunProfiler.load("brak") is None
+
+    def test_invalid_arguments(self):
+        """Test odrzucenia błędnej liczby przebiegów i trybu"""
+        with pytest.raises(ValueError):
+            RerunProfiler.arm(0)
+        with pytest.raises(ValueError):
+            RerunProfiler.arm(1, mode='perf')
+
+    def test_flame_nodes(self):
+        """Test węzłów wykresu płomieniowego z czasami całkowitymi"""
+        nodes = flame_nodes({('a',): 1.0, ('a', 'b'): 2.0, ('a', 'c'): 3.0, ('a', 'b', 'd'): 0.5})
+        values = dict(zip(nodes['ids'], nodes['values']))
+
+        assert values == {'a': 6.5, 'a;b': 2.5, 'a;c': 3.0, 'a;b;d': 0.5}
+        assert dict(zip(nodes['ids'], nodes['parents']))['a;b;d'] == 'a;b'
+        assert nodes['parents'][0] == ''
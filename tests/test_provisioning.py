@@ -0,0 +1,80 @@
+"""
+Testy dla masowego zakładania kont
+"""
+import pytest
+import json
+from unittest.mock import patch
+from src.auth_service import AuthService
+from src.credential_store import CredentialStore
+from src.provisioning import read_users, provision_users, main
+
+
+@pytest.fixture(autouse=True)
+def fast_bcrypt():
+    """Minimalny koszt bcrypt - testy nie mierzą wydajności hashowania"""
+    with patch.object(AuthService, 'configure_bcrypt_cost', return_value=4):
+        yield
+
+
+@pytest.fixture
+def users_csv(tmp_path):
+    path = tmp_path / "users.csv"
+    lines = ["username,password"] + [f"user{i},pass{i}" for i in range(10)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+class TestProvisioning:
+    """Testy zakładania kont z pliku"""
+
+    def test_read_users_csv(self, users_csv):
+        """Test odczytu użytkowników z CSV"""
+        users = list(read_users(str(users_csv)))
+        assert len(users) == 10
+        assert users[0] == ("user0", "pass0")
+
+    def test_read_users_jsonl_skips_incomplete(self, tmp_path):
+        """Test odczytu JSONL z pominięciem niekompletnych wpisów"""
+        path = tmp_path / "users.jsonl"
+        rows = [{"username": "a", "password": "x"}, {"username": "b"}, {"password": "y"}]
+        path.write_text("\n".join(json.dumps(r) for r in rows) + "\n\n", encoding="utf-8")
+
+        assert list(read_users(str(path))) == [("a", "x")]
+
+    def test_provision_users(self, users_csv):
+        """Test hashowania i zapisu wszystkich użytkowników porcjami"""
+        with patch.object(CredentialStore, 'upsert_many', wraps=CredentialStore.upsert_many) as spy:
+            stats = provision_users(str(users_csv), workers=2, batch_size=4)
+
+        assert stats.written == 10
+        assert spy.call_count == 3
+        assert sum(count for count, _ in stats.per_worker.values()) == 10
+        hashed = CredentialStore.get_password_hash("user7")
+        assert AuthService.verify_password("pass7", hashed) is True
+
+    def test_provision_users_resume(self, users_csv):
+        """Test wznowienia - istniejący użytkownicy są pomijani"""
+        CredentialStore.set_password_hash("user3", "existing")
+
+        stats = provision_users(str(users_csv), workers=1)
+
+        assert stats.written == 9
+        assert stats.skipped == 1
+        assert CredentialStore.get_password_hash("user3") == "existing"
+
+    def test_provision_users_overwrite(self, users_csv):
+        """Test nadpisania istniejących użytkowników"""
+        CredentialStore.set_password_hash("user3", "existing")
+
+        stats = provision_users(str(users_csv), workers=1, overwrite=True)
+
+        assert stats.written == 10
+        assert CredentialStore.get_password_hash("user3") != "existing"
+
+    def test_main_reports_throughput(self, users_csv, capsys):
+        """Test raportu przepustowości w CLI"""
+        assert main([str(users_csv), "--workers", "1"]) == 0
+
+        output = capsys.readouterr().out
+        assert "Zapisano: 10" in output
+        assert "hashy/s" in output
@@ -0,0 +1,161 @@
+"""
+Testy dla routera stron i liczby przebiegów skryptu
+"""
+import pytest
+import bcrypt
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+from streamlit.testing.v1 import AppTest
+from src.credential_store import CredentialStore
+from src.metrics import PAGE_RENDERS
+from src.router import (
+    Page, navigate, nav_button, current_page, render_page, count_run, run_count, PAGE_STATE_KEY
+)
+
+APP_FILE = str(Path(__file__).resolve().parent.parent / "app.py")
+
+PAGES = {
+    'home': Page('home', "Start", 'json', 'dumps'),
+    'other': Page('other', "Inna", 'json', 'loads')
+}
+
+
+@pytest.fixture
+def session_state():
+    with patch('src.router.st') as mock_st:
+        mock_st.session_state = {}
+        yield mock_st.session_state
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """Cała aplikacja w AppTest z kontem admin/admin123"""
+    monkeypatch.setenv('SECRET_KEY', 'x' * 32)
+    monkeypatch.setenv('DEBUG', 'True')
+    monkeypatch.setenv('METRICS_PORT', '0')
+    monkeypatch.setenv('BCRYPT_ROUNDS', '4')
+    monkeypatch.setenv('LOG_FILE', str(tmp_path / "app.log"))
+    monkeypatch.setenv('ADMIN_PASSWORD_HASH', bcrypt.hashpw(b"admin123", bcrypt.gensalt(4)).decode())
+    at = AppTest.from_file(APP_FILE, default_timeout=60)
+    at.run()
+    return at
+
+
+def login(at, password="admin123", username="admin"):
+    at.text_input(key='login_username').input(username)
+    at.text_input(key='login_password').input(password)
+    at.button[0].click().run()
+
+
+class TestRouter:
+    """Testy funkcji routera"""
+
+    def test_navigate_and_current_page(self, session_state):
+        """Test wyboru strony domyślnej i ustawionej przez callback"""
+        assert current_page(PAGES, 'home').key == 'home'
+
+        navigate('other')
+
+        assert current_page(PAGES, 'home').key == 'other'
+
+    def test_unknown_page_falls_back(self, session_state):
+        """Test zastąpienia nieznanej strony domyślną"""
+        session_state[PAGE_STATE_KEY] = 'missing'
+
+        assert current_page(PAGES, 'home').key == 'home'
+        assert session_state[PAGE_STATE_KEY] == 'home'
+
+    def test_nav_button_uses_callback(self):
+        """Test przycisku nawigacji z callbackiem zamiast switch_page"""
+        container = MagicMock()
+
+        nav_button("Inna", 'other', container=container, key='nav_other')
+
+        container.button.assert_called_once_with("Inna", on_click=navigate, args=('other',), key='nav_other')
+
+    def test_render_page(self):
+        """Test wywołania funkcji strony i zliczenia wyświetlenia"""
+        page = Page('test_page', "Test", 'tests.test_router', 'render_target')
+        before = PAGE_RENDERS.value('test_page')
+
+        with patch('tests.test_router.render_target') as target:
+            render_page(page)
+
+        target.assert_called_once_with()
+        assert PAGE_RENDERS.value('test_page') == before + 1
+
+    def test_run_counter(self, session_state):
+        """Test licznika przebiegów skryptu w sesji"""
+        assert run_count() is None
+        count_run()
+
+        assert count_run() == 2
+        assert run_count() == 2
+
+
+def render_target():
+    """Funkcja strony w teście render_page"""
+
+
+class TestSinglePassNavigation:
+    """Testy jednego przebiegu skryptu na działanie użytkownika"""
+
+    def test_login_renders_dashboard_in_same_run(self, app):
+        """Test wyświetlenia dashboardu w przebiegu wysłania formularza logowania"""
+        assert [title.value for title in app.title] == ["🔐 Logowanie"]
+        assert app.session_state['script_runs'] == 1
+
+        login(app)
+
+        assert not app.exception
+        assert [header.value for header in app.header] == ["📊 Dashboard"]
+        assert app.session_state['script_runs'] == 2
+        assert app.session_state['login_password'] == ''
+
+    def test_failed_login(self, app):
+        """Test komunikatu błędu w tym samym przebiegu"""
+        login(app, password="wrong")
+
+        assert app.session_state['script_runs'] == 2
+        assert [error.value for error in app.error] == ["Nieprawidłowa nazwa użytkownika lub hasło"]
+
+    def test_navigation_one_run_per_click(self, app):
+        """Test jednego przebiegu na przejście z paska bocznego i szybkich akcji"""
+        login(app)
+
+        app.button(key='nav_data').click().run()
+        assert [header.value for header in app.header] == ["📈 Analiza danych"]
+        assert app.session_state['script_runs'] == 3
+
+        app.button(key='nav_dashboard').click().run()
+        next(button for button in app.button if button.label == "⚙️ Ustawienia" and button.key is None).click().run()
+        assert [header.value for header in app.header] == ["⚙️ Ustawienia"]
+        assert app.session_state['script_runs'] == 5
+        assert not app.exception
+
+    def test_dev_tools_only_for_admin(self, app):
+        """Test zakładki narzędzi deweloperskich (profile i pamięć wszystkich sesji) tylko dla administratora"""
+        dev_tab = "🛠️ Narzędzia deweloperskie"
+        CredentialStore.set_password_hash("jan", bcrypt.hashpw(b"secret1", bcrypt.gensalt(4)).decode())
+        login(app, password="secret1", username="jan")
+
+        app.button(key='nav_settings').click().run()
+        assert [header.value for header in app.header] == ["⚙️ Ustawienia"]
+        assert not app.exception
+        assert dev_tab not in [tab.label for tab in app.tabs]
+        assert "🎯 Uzbrój profilowanie" not in [button.label for button in app.button]
+
+        app.button(key='nav_logout').click().run()
+        login(app)
+        app.button(key='nav_settings').click().run()
+        assert dev_tab in [tab.label for tab in app.tabs]
+        assert "🎯 Uzbrój profilowanie" in [button.label for button in app.button]
+
+    def test_logout_shows_login_in_same_run(self, app):
+        """Test strony logowania w przebiegu kliknięcia wylogowania"""
+        login(app)
+
+        app.button(key='nav_logout').click().run()
+
+        assert [title.value for title in app.title] == ["🔐 Logowanie"]
+        assert app.session_state['script_runs'] == 3
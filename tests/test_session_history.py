@@ -0,0 +1,217 @@
+"""
+Testy dla historii sesji
+"""
+import pytest
+import os
+import threading
+from datetime import date, datetime
+import numpy as np
+import pyarrow.dataset as ds
+from unittest.mock import patch
+from src.session_history import (
+    SessionHistory, LoginHeatmap, GROUP_ADMINS, GROUP_USERS, HEATMAP_SUFFIX, bin_logins
+)
+
+
+def ts(day, hour=12):
+    return datetime(2025, 7, day, hour).timestamp()
+
+
+@pytest.fixture
+def history():
+    """Sesje z trzech dni: admin i zwykli użytkownicy"""
+    SessionHistory.record_session("admin", ts(21), ts(21) + 3600, "logout")
+    SessionHistory.record_session("jan", ts(22), ts(22) + 120, "logout")
+    SessionHistory.record_session("ola", ts(22, 20), ts(22, 20) + 1800, "timeout")
+    SessionHistory.record_session("jan", ts(23), ts(23) + 600, "revoked")
+    SessionHistory.flush()
+
+
+class TestSessionHistory:
+    """Testy klasy SessionHistory"""
+
+    def test_record_is_buffered(self):
+        """Test buforowania sesji do zapisu w mikro-porcji"""
+        SessionHistory.record_session("admin", ts(21), ts(21) + 60, "logout")
+
+        assert len(SessionHistory._buffer) == 1
+        assert not os.path.exists(os.environ['SESSION_HISTORY_DIR'])
+
+    def test_flush_partitions_by_day(self, history):
+        """Test zapisu partycji dziennych"""
+        partitions = sorted(os.listdir(os.environ['SESSION_HISTORY_DIR']))
+
+        assert partitions == ["date=2025-07-21", "date=2025-07-22", "date=2025-07-23"]
+        assert SessionHistory.flush() == 0
+
+    def test_query_all(self, history):
+        """Test odczytu całej historii"""
+        sessions = SessionHistory.query()
+
+        assert sessions.num_rows == 4
+        assert set(sessions.column("end_reason").to_pylist()) == {"logout", "timeout", "revoked"}
+
+    def test_query_date_range(self, history):
+        """Test filtrowania po zakresie dni"""
+        sessions = SessionHistory.query(since=date(2025, 7, 22), until=date(2025, 7, 22))
+        assert sorted(sessions.column("username").to_pylist()) == ["jan", "ola"]
+
+    def test_date_filter_prunes_partitions(self, history):
+        """Test pomijania plików partycji spoza zakresu dni"""
+        dataset = SessionHistory.dataset()
+        fragments = list(dataset.get_fragments(filter=ds.field('date') == '2025-07-22'))
+        assert len(fragments) == 1
+
+    def test_dataset_lists_only_range(self, history):
+        """Test zbioru z plików partycji z zakresu dni - bez listowania pozostałych katalogów"""
+        dataset = SessionHistory.dataset(since=date(2025, 7, 22), until=date(2025, 7, 22))
+
+        assert len(dataset.files) == 1
+        assert set(dataset.to_table(columns=['date']).column('date').to_pylist()) == {'2025-07-22'}
+        assert SessionHistory.dataset(since=date(2025, 8, 1)) is None
+
+    def test_query_group_and_min_duration(self, history):
+        """Test filtrów grupy użytkowników i minimalnego czasu sesji"""
+        admins = SessionHistory.query(group=GROUP_ADMINS)
+        long_user_sessions = SessionHistory.query(group=GROUP_USERS, min_duration_s=300)
+
+        assert admins.column("username").to_pylist() == ["admin"]
+        assert sorted(long_user_sessions.column("username").to_pylist()) == ["jan", "ola"]
+
+    def test_query_columns(self, history):
+        """Test odczytu tylko wybranych kolumn"""
+        sessions = SessionHistory.query(columns=["username", "duration_s"])
+        assert sessions.column_names == ["username", "duration_s"]
+
+    def test_query_empty_history(self):
+        """Test odczytu pustej historii"""
+        sessions = SessionHistory.query(columns=["username"])
+
+        assert sessions.num_rows == 0
+        assert sessions.column_names == ["username"]
+
+    def test_micro_batches_append_files(self, history):
+        """Test dopisywania kolejnych mikro-porcji jako nowych plików"""
+        SessionHistory.record_session("jan", ts(23, 15), ts(23, 15) + 60, "logout")
+        SessionHistory.flush()
+
+        partition = os.path.join(os.environ['SESSION_HISTORY_DIR'], "date=2025-07-23")
+        assert len([name for name in os.listdir(partition) if not name.startswith('_')]) == 2
+        assert SessionHistory.query(since=date(2025, 7, 23)).num_rows == 2
+
+    def test_compact_merges_past_days(self, history):
+        """Test scalania plików minionych dni w jeden plik na dzień"""
+        for hour in (13, 14):
+            SessionHistory.record_session("jan", ts(22, hour), ts(22, hour) + 60, "logout")
+            SessionHistory.flush()
+        SessionHistory.record_session("ola", ts(23, 15), ts(23, 15) + 60, "logout")
+        SessionHistory.flush()
+        before = SessionHistory.query().sort_by('login_time')
+        heatmap = LoginHeatmap.counts().copy()
+
+        assert SessionHistory.compact(before=date(2025, 7, 23)) == 3
+
+        partition = os.path.join(os.environ['SESSION_HISTORY_DIR'], "date=2025-07-22")
+        assert len([name for name in os.listdir(partition) if not name.startswith('_')]) == 1
+        assert len(SessionHistory.partition_files(since=date(2025, 7, 23))) == 2
+        assert SessionHistory.query().sort_by('login_time').equals(before)
+        LoginHeatmap.clear()
+        with patch('src.session_history.pq.read_table') as read_table:
+            assert (LoginHeatmap.counts() == heatmap).all()
+        read_table.assert_not_called()
+        assert SessionHistory.compact(before=date(2025, 7, 23)) == 0
+
+
+class TestLoginHeatmap:
+    """Testy mapy logowań wg dnia tygodnia i godziny"""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        LoginHeatmap.clear()
+        yield
+        LoginHeatmap.clear()
+
+    def test_bin_logins(self):
+        """Test kubełków dnia tygodnia i godziny (także przed 1970)"""
+        moments = [datetime(2025, 7, 21, 0, 30), datetime(2025, 7, 27, 23, 59), datetime(1969, 12, 31, 10)]
+        login_us = np.array(
+            [int((moment - datetime(1970, 1, 1)).total_seconds()) * 10**6 for moment in moments]
+        )
+
+        counts = bin_logins(login_us).reshape(7, 24)
+
+        assert counts.sum() == 3
+        assert counts[0, 0] == counts[6, 23] == counts[2, 10] == 1
+
+    def test_counts(self, history):
+        """Test mapy logowań z historii (21.07.2025 - poniedziałek)"""
+        counts = LoginHeatmap.counts()
+
+        assert counts.shape == (7, 24)
+        assert counts.sum() == 4
+        assert counts[0, 12] == counts[1, 12] == counts[1, 20] == counts[2, 12] == 1
+
+    def test_date_range(self, history):
+        """Test mapy tylko z partycji zakresu dat"""
+        counts = LoginHeatmap.counts(since=date(2025, 7, 22), until=date(2025, 7, 22))
+
+        assert counts.sum() == 2
+        assert LoginHeatmap.counts(since=date(2025, 8, 1)).sum() == 0
+
+    def test_empty_history(self):
+        """Test pustej mapy bez historii sesji"""
+        assert LoginHeatmap.counts().sum() == 0
+
+    def test_counts_stored_at_write(self, history):
+        """Test liczników zapisanych przy zapisie partycji - mapa bez odczytu Parquet"""
+        with patch('src.session_history.pq.read_table') as read_table:
+            assert LoginHeatmap.counts().sum() == 4
+
+        read_table.assert_not_called()
+        assert SessionHistory.query().num_rows == 4
+
+    def test_missing_counts_rebuilt(self, history):
+        """Test odtworzenia brakujących liczników z pliku partycji"""
+        for path in SessionHistory.partition_files():
+            os.remove(LoginHeatmap.sidecar_path(path))
+        LoginHeatmap.clear()
+
+        assert LoginHeatmap.counts().sum() == 4
+        assert all(os.path.exists(LoginHeatmap.sidecar_path(path)) for path in SessionHistory.partition_files())
+        assert LoginHeatmap.sidecar_path('d/part-1.parquet') == os.path.join('d', '_part-1.parquet' + HEATMAP_SUFFIX)
+
+    def test_counts_during_compaction(self, history):
+        """Test mapy liczonej w trakcie scalania - czeka na jego koniec zamiast czytać usunięte pliki"""
+        SessionHistory.record_session("jan", ts(22, 13), ts(22, 13) + 60, "logout")
+        SessionHistory.flush()
+        LoginHeatmap.clear()
+        result = {}
+        reader = threading.Thread(target=lambda: result.setdefault('counts', LoginHeatmap.counts()))
+        write_partition = SessionHistory.write_partition
+
+        def write_and_read(*args):
+            # Odczyt mapy startuje po zapisie scalonego pliku, przed usunięciem plików źródłowych
+            path = write_partition(*args)
+            LoginHeatmap.clear()
+            reader.start()
+            reader.join(0.2)
+            assert reader.is_alive()
+            return path
+
+        with patch.object(SessionHistory, 'write_partition', side_effect=write_and_read):
+            assert SessionHistory.compact(before=date(2025, 7, 23)) == 2
+        reader.join(5)
+
+        assert result['counts'].sum() == 5
+        assert len(SessionHistory.partition_files(since=date(2025, 7, 22), until=date(2025, 7, 22))) == 1
+
+    def test_cache_per_range(self, history):
+        """Test zapamiętania mapy zakresu i przeliczenia po nowym pliku w zakresie"""
+        first = LoginHeatmap.counts()
+        assert LoginHeatmap.counts() is first
+        assert not first.flags.writeable
+
+        SessionHistory.record_session("jan", ts(23, 15), ts(23, 15) + 60, "logout")
+        SessionHistory.flush()
+
+        assert LoginHeatmap.counts()[2, 15] == 1
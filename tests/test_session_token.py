@@ -0,0 +1,157 @@
+"""
+Testy dla tokenów wznawiania sesji
+"""
+import pytest
+import os
+import time
+from unittest.mock import patch
+from src.session_token import SessionToken
+
+
+@pytest.fixture(autouse=True)
+def token_env():
+    """Stały klucz i timeout sesji dla każdego testu"""
+    env_vars = {'SECRET_KEY': 'test-secret', 'SESSION_TIMEOUT': '3600'}
+    with patch.dict(os.environ, env_vars):
+        yield
+
+
+class TestSessionToken:
+    """Testy klasy SessionToken"""
+
+    def test_issue_and_verify(self):
+        """Test wydania i weryfikacji tokena"""
+        login_time = time.time()
+        token = SessionToken.issue("admin", login_time)
+
+        claims = SessionToken.verify(token)
+
+        assert claims is not None
+        assert claims['username'] == "admin"
+        assert claims['login_time'] == pytest.approx(login_time, abs=1e-6)
+        assert claims['expires_at'] == pytest.approx(login_time + 3600, abs=1e-6)
+
+    def test_token_is_compact(self):
+        """Test rozmiaru tokena"""
+        token = SessionToken.issue("admin", time.time())
+        assert len(token) < 120
+
+    def test_username_with_separator_characters(self):
+        """Test nazwy użytkownika zawierającej kropki"""
+        token = SessionToken.issue("jan.kowalski", time.time())
+        assert SessionToken.verify(token)['username'] == "jan.kowalski"
+
+    def test_tampered_payload_rejected(self):
+        """Test odrzucenia tokena ze zmienionym ładunkiem"""
+        token = SessionToken.issue("admin", time.time())
+        forged = SessionToken.issue("eve", time.time())
+        tampered = forged.split('.')[0] + '.' + token.split('.')[1]
+
+        assert SessionToken.verify(tampered) is None
+
+    def test_other_secret_key_rejected(self):
+        """Test odrzucenia tokena podpisanego innym kluczem"""
+        token = SessionToken.issue("admin", time.time())
+
+        with patch.dict(os.environ, {'SECRET_KEY': 'other-secret'}):
+            assert SessionToken.verify(token) is None
+
+    @pytest.mark.parametrize("token", ["", "abc", "a.b.c", "ąę.źż", "=.="])
+    def test_malformed_token_rejected(self, token):
+        """Test odrzucenia zniekształconych tokenów"""
+        assert SessionToken.verify(token) is None
+
+    def test_expired_token_rejected(self):
+        """Test odrzucenia tokena po upływie timeoutu sesji"""
+        token = SessionToken.issue("admin", 1000)
+
+        assert SessionToken.verify(token, now=1000 + 3599) is not None
+        assert SessionToken.verify(token, now=1000 + 3600) is None
+
+    def test_reduced_timeout_shortens_token(self):
+        """Test skrócenia ważności tokena po zmniejszeniu SESSION_TIMEOUT"""
+        token = SessionToken.issue("admin", 1000)
+
+        with patch.dict(os.environ, {'SESSION_TIMEOUT': '60'}):
+            assert SessionToken.verify(token, now=1100) is None
+
+    def test_revoke(self):
+        """Test unieważnienia tokena"""
+        token = SessionToken.issue("admin", time.time())
+        other = SessionToken.issue("admin", time.time())
+
+        SessionToken.revoke(token)
+
+        assert SessionToken.verify(token) is None
+        assert SessionToken.verify(other) is not None
+
+    def test_revoke_prunes_expired_entries(self):
+        """Test usuwania wygasłych wpisów z denylisty"""
+        SessionToken._denylist['old'] = time.time() - 1
+
+        SessionToken.revoke(SessionToken.issue("admin", time.time()))
+
+        assert 'old' not in SessionToken._denylist
+        assert len(SessionToken._denylist) == 1
+
+    def test_revoke_invalid_token_is_noop(self):
+        """Test unieważnienia nieprawidłowego tokena"""
+        SessionToken.revoke("invalid")
+        assert SessionToken._denylist == {}
+
+    def test_revocations_shared_between_processes(self):
+        """Test unieważnień zapisanych w bazie - widocznych w procesie bez kopii w pamięci"""
+        token = SessionToken.issue("admin", time.time())
+        other = SessionToken.issue("jan", time.time() - 10)
+        SessionToken.revoke(token)
+        SessionToken.revoke_user_sessions("jan")
+
+        # Inny proces: pusta kopia unieważnień, odświeżana z bazy
+        SessionToken._denylist.clear()
+        SessionToken._user_revocations.clear()
+        SessionToken._synced_at = 0.0
+
+        assert SessionToken.verify(token) is None
+        assert SessionToken.verify(other) is None
+
+    def test_restore_code_single_use(self):
+        """Test jednorazowego kodu wznowienia bez danych tokena"""
+        token = SessionToken.issue("admin", time.time())
+        code = SessionToken.issue_restore_code(token)
+
+        assert token not in code
+        assert SessionToken.redeem_restore_code(code) == token
+        assert SessionToken.redeem_restore_code(code) is None
+        assert SessionToken.redeem_restore_code("unknown") is None
+
+    def test_restore_code_expires_with_token(self):
+        """Test wygaśnięcia kodu wznowienia razem z tokenem"""
+        code = SessionToken.issue_restore_code(SessionToken.issue("admin", 1000))
+
+        assert SessionToken.redeem_restore_code(code) is None
+
+    def test_revoke_user_sessions(self):
+        """Test unieważnienia wszystkich sesji użytkownika poza bieżącą"""
+        login_time = time.time() - 10
+        current = SessionToken.issue("admin", login_time)
+        other = SessionToken.issue("admin", login_time)
+        foreign = SessionToken.issue("jan", login_time)
+
+        SessionToken.revoke_user_sessions("admin", keep_jti=SessionToken.decode(current)['jti'])
+
+        assert SessionToken.verify(current) is not None
+        assert SessionToken.verify(other) is None
+        assert SessionToken.verify(foreign) is not None
+        assert SessionToken.verify(SessionToken.issue("admin", time.time() + 5)) is not None
+
+    def test_login_in_same_second_after_revocation(self):
+        """Test ważności tokena wydanego w tej samej sekundzie tuż po unieważnieniu sesji"""
+        with patch('src.session_token.time.time', return_value=1000.25):
+            earlier = SessionToken.issue("admin", 1000.1)
+            SessionToken.revoke_user_sessions("admin")
+            same_moment = SessionToken.issue("admin", 1000.25)
+            later = SessionToken.issue("admin", 1000.4)
+
+            assert SessionToken.verify(earlier) is None
+            assert SessionToken.verify(same_moment) is not None
+            assert SessionToken.verify(later) is not None
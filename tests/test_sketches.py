@@ -0,0 +1,153 @@
+"""
+Testy dla szkiców strumieniowych
+"""
+import pytest
+import json
+import random
+from src.sketches import HyperLogLog, TDigest, SpaceSaving, HeartbeatUptime
+
+
+class TestHyperLogLog:
+    """Testy klasy HyperLogLog"""
+
+    def test_small_cardinality_exact(self):
+        """Test dokładnego wyniku dla kilku elementów"""
+        sketch = HyperLogLog()
+        for name in ["admin", "jan", "ola", "jan", "admin"]:
+            sketch.add(name)
+        assert sketch.count() == 3
+
+    def test_large_cardinality_error(self):
+        """Test błędu względnego dla dużej liczby elementów"""
+        sketch = HyperLogLog()
+        for i in range(20000):
+            sketch.add(f"user{i}")
+        assert abs(sketch.count() - 20000) / 20000 < 0.1
+
+    def test_merge_is_union(self):
+        """Test łączenia szkiców jako sumy zbiorów"""
+        first, second = HyperLogLog(), HyperLogLog()
+        for i in range(1000):
+            first.add(f"user{i}")
+            second.add(f"user{i + 500}")
+
+        first.merge(second)
+
+        assert abs(first.count() - 1500) / 1500 < 0.1
+
+    def test_merge_different_precision(self):
+        """Test odrzucenia szkiców o różnej precyzji"""
+        with pytest.raises(ValueError):
+            HyperLogLog(10).merge(HyperLogLog(12))
+
+    def test_dict_roundtrip(self):
+        """Test serializacji szkicu"""
+        sketch = HyperLogLog()
+        sketch.add("admin")
+        restored = HyperLogLog.from_dict(json.loads(json.dumps(sketch.to_dict())))
+        assert restored.registers == sketch.registers
+
+
+class TestTDigest:
+    """Testy klasy TDigest"""
+
+    def test_empty(self):
+        """Test pustego szkicu"""
+        sketch = TDigest()
+        assert sketch.quantile(0.5) is None
+        assert sketch.max is None
+
+    def test_quantiles_uniform(self):
+        """Test kwantyli rozkładu jednostajnego"""
+        values = list(range(1, 10001))
+        random.Random(1).shuffle(values)
+        sketch = TDigest()
+        for value in values:
+            sketch.add(value)
+
+        assert sketch.quantile(0.5) == pytest.approx(5000, rel=0.02)
+        assert sketch.quantile(0.99) == pytest.approx(9900, rel=0.01)
+        assert sketch.max == 10000
+        assert len(sketch.means) < 200
+
+    def test_merge(self):
+        """Test łączenia szkiców z dwóch okien czasu"""
+        first, second = TDigest(), TDigest()
+        for value in range(1000):
+            first.add(value)
+            second.add(value + 1000)
+
+        first.merge(second)
+
+        assert first.count == 2000
+        assert first.quantile(0.5) == pytest.approx(1000, rel=0.02)
+        assert first.min == 0
+        assert first.max == 1999
+
+    def test_dict_roundtrip(self):
+        """Test serializacji szkicu"""
+        sketch = TDigest()
+        for value in range(100):
+            sketch.add(value)
+        restored = TDigest.from_dict(json.loads(json.dumps(sketch.to_dict())))
+        assert restored.quantile(0.5) == pytest.approx(sketch.quantile(0.5))
+
+
+class TestSpaceSaving:
+    """Testy klasy SpaceSaving"""
+
+    def test_top_items(self):
+        """Test wyznaczenia najczęstszego elementu przy ograniczonej liczbie liczników"""
+        sketch = SpaceSaving(k=5)
+        stream = ["admin"] * 50 + [f"user{i}" for i in range(100)] + ["jan"] * 20
+        random.Random(2).shuffle(stream)
+        for item in stream:
+            sketch.add(item)
+
+        assert sketch.top(1)[0][0] == "admin"
+        assert len(sketch.counts) == 5
+
+    def test_merge(self):
+        """Test łączenia szkiców z dwóch replik"""
+        first, second = SpaceSaving(k=3), SpaceSaving(k=3)
+        for item in ["admin"] * 3 + ["jan"] * 4:
+            first.add(item)
+        for item in ["admin"] * 3 + ["ola"]:
+            second.add(item)
+
+        first.merge(second)
+
+        assert first.top(2) == [("admin", 6), ("jan", 4)]
+
+
+class TestHeartbeatUptime:
+    """Testy klasy HeartbeatUptime"""
+
+    def test_regular_beats(self):
+        """Test pełnej dostępności przy regularnych sygnałach"""
+        sketch = HeartbeatUptime(10)
+        for i in range(10):
+            sketch.beat(i * 10, day=1)
+        assert sketch.uptime(1, 1) == 1.0
+
+    def test_gap_counts_as_downtime(self):
+        """Test przerwy w sygnałach jako niedostępności"""
+        sketch = HeartbeatUptime(10)
+        for ts in [0, 10, 20, 110, 120]:
+            sketch.beat(ts, day=1)
+        # 30 s dostępności, 90 s przerwy z czego 10 s to oczekiwany interwał
+        assert sketch.uptime(1, 1) == pytest.approx(40 / 120)
+
+    def test_window_and_merge(self):
+        """Test zakresu dni i łączenia replik"""
+        first, second = HeartbeatUptime(10), HeartbeatUptime(10)
+        first.beat(0, day=1)
+        first.beat(10, day=1)
+        second.beat(0, day=2)
+        second.beat(100, day=2)
+
+        first.merge(second)
+
+        assert first.uptime(1, 1) == 1.0
+        assert first.uptime(1, 2) == pytest.approx(20 / 110)
+        assert first.uptime(3, 4) is None
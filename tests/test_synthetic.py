@@ -0,0 +1,119 @@
+"""
+Testy dla generatora danych syntetycznych
+"""
+import pytest
+import os
+import numpy as np
+from datetime import date, datetime
+from src.log_store import LogStore, parse_lines
+from src.metrics_history import MetricsHistory, wall_seconds
+from src.session_history import SessionHistory, GROUP_ADMINS
+from src.synthetic import (
+    diurnal_timestamps, format_asctime, generate_sessions, write_sessions,
+    generate_log_lines, write_log_lines, generate_metrics, write_metrics, main
+)
+
+START = date(2025, 7, 7)  # poniedziałek
+
+
+class TestSyntheticGenerator:
+    """Testy generatora danych syntetycznych"""
+
+    def test_diurnal_profile(self):
+        """Test profilu dobowego i tygodniowego"""
+        rng = np.random.default_rng(0)
+        # Tydzień od czwartku 1970-01-01 w czasie ściennym
+        ts = diurnal_timestamps(rng, 0, 7 * 86400, 50000)
+        hours = (ts // 3600 % 24).astype(int)
+        weekdays = (ts // 86400 + 3).astype(int) % 7
+
+        assert len(ts) == 50000
+        assert np.all(np.diff(ts) >= 0)
+        assert np.sum(hours == 10) > 10 * np.sum(hours == 3)
+        assert np.sum(weekdays == 0) > 2 * np.sum(weekdays == 6)
+
+    def test_format_asctime(self):
+        """Test formatu czasu zgodnego z logging"""
+        ms = np.array([0, 1753272896789], dtype=np.int64)
+        assert format_asctime(ms).to_pylist() == [
+            "1970-01-01 00:00:00,000", "2025-07-23 12:14:56,789"
+        ]
+
+    def test_sessions_seeded_and_chunked(self):
+        """Test powtarzalności i podziału na porcje"""
+        first = list(generate_sessions(2500, START, 10, users=50, seed=7, chunk_rows=1000))
+        second = list(generate_sessions(2500, START, 10, users=50, seed=7, chunk_rows=1000))
+
+        assert [table.num_rows for table in first] == [834, 833, 833]
+        assert all(a.equals(b) for a, b in zip(first, second))
+        # Kolejne porcje obejmują kolejne odcinki czasu
+        assert first[0].column('login_time')[-1].value <= first[1].column('login_time')[0].value
+
+    def test_sessions_written_to_history(self):
+        """Test zapisu sesji w historii sesji (partycje dzienne)"""
+        rows = write_sessions(generate_sessions(3000, START, 7, users=50, seed=1, chunk_rows=1000))
+        sessions = SessionHistory.query()
+
+        assert rows == 3000
+        assert sessions.num_rows == 3000
+        assert len([name for name in os.listdir(os.environ['SESSION_HISTORY_DIR']) if name.startswith('date=')]) == 7
+        assert set(sessions.column('end_reason').to_pylist()) <= {'logout', 'timeout', 'revoked'}
+        assert SessionHistory.query(group=GROUP_ADMINS).num_rows > 0
+        assert SessionHistory.query(since=date(2025, 7, 8), until=date(2025, 7, 8)).num_rows < 3000
+
+    def test_log_lines_parse(self, tmp_path):
+        """Test zgodności linii logów z formatem aplikacji"""
+        path = tmp_path / "app.log"
+        rows = write_log_lines(generate_log_lines(2000, START, 2, users=20, seed=3, chunk_rows=700), str(path))
+
+        with open(path, encoding='utf-8') as f:
+            lines = f.readlines()
+        records = parse_lines(lines)
+
+        assert rows == len(lines) == len(records) == 2000
+        assert {level for _, level, _, _ in records} >= {'INFO', 'WARNING'}
+        assert all(a[0] <= b[0] for a, b in zip(records, records[1:]))
+        assert datetime.fromtimestamp(records[0][0]).date() == START
+
+    def test_log_lines_indexed_by_log_store(self, tmp_path):
+        """Test indeksowania wygenerowanych linii przez LogStore"""
+        path = tmp_path / "app.log"
+        write_log_lines(generate_log_lines(500, START, 1, users=20, seed=3), str(path))
+
+        assert LogStore.sync(str(path)) == 500
+
+    def test_metrics(self, tmp_path):
+        """Test metryk systemu co zadany interwał"""
+        tables = list(generate_metrics(START, 2, interval=60, seed=1, chunk_rows=1000))
+        rows = write_metrics(iter(tables), str(tmp_path / "metrics"))
+        cpu = np.concatenate([table.column('cpu_percent').to_numpy() for table in tables])
+
+        assert rows == 2 * 1440
+        assert sorted(os.listdir(tmp_path / "metrics")) == ["cpu_percent", "ram_percent", "response_ms"]
+        assert MetricsHistory.days("cpu_percent", str(tmp_path / "metrics")) == [START, date(2025, 7, 8)]
+        assert cpu.min() >= 0 and cpu.max() <= 100
+        # Obciążenie w dzień wyższe niż w nocy
+        assert cpu[10 * 60:11 * 60].mean() > cpu[3 * 60:4 * 60].mean() + 20
+
+    def test_main(self, tmp_path, capsys):
+        """Test uruchomienia z linii poleceń"""
+        log_file = tmp_path / "app.log"
+        code = main([
+            '--sessions', '100', '--log-lines', '100', '--metrics', '--days', '1',
+            '--start', '2025-07-07', '--log-file', str(log_file),
+            '--metrics-dir', str(tmp_path / "metrics")
+        ])
+
+        output = capsys.readouterr().out
+        assert code == 0
+        assert "sesje: 100" in output
+        assert "linie logów: 100" in output
+        assert SessionHistory.query().num_rows == 100
+        since = wall_seconds(date(2025, 7, 7))
+        stats = MetricsHistory.stats("cpu_percent", since, since + 86400, str(tmp_path / "metrics"))
+        assert stats['samples'] == 1440
+
+    def test_main_requires_dataset(self):
+        """Test błędu gdy nie wybrano danych do wygenerowania"""
+        with pytest.raises(SystemExit):
+            main([])